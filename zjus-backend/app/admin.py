@@ -21,6 +21,7 @@ from starlette.responses import RedirectResponse
 
 from app.core.config import settings
 from app.game.balance import balance
+from app.game.config_sync import announce_config_change
 from app.game.items import items
 from app.models.admin import AdminAuditLog, UserBlacklist, UserRestriction
 from app.models.game_save import GameSave
@@ -230,6 +231,7 @@ class BalanceConfigAdmin(BaseView):
             old_config = copy.deepcopy(balance.raw)
             restored_config = snapshot.old_config
             publish_balance_config(balance.config_path, restored_config, balance.reload)
+            await announce_config_change("balance")
             _log_admin_action(
                 request,
                 "balance_restore",
@@ -277,6 +279,7 @@ class BalanceConfigAdmin(BaseView):
                     return _balance_redirect(request, status="unchanged")
 
                 publish_balance_config(balance.config_path, new_config, balance.reload)
+                await announce_config_change("balance")
                 _log_admin_action(
                     request,
                     "balance_update",
@@ -346,6 +349,7 @@ class ItemsConfigAdmin(BaseView):
             old_config = load_items_config(items.config_path)
             restored_config = snapshot.old_config
             publish_items_config(items.config_path, restored_config, items.reload)
+            await announce_config_change("items")
             _log_admin_action(
                 request,
                 "items_restore",
@@ -394,6 +398,7 @@ class ItemsConfigAdmin(BaseView):
                     return _items_redirect(request, status="unchanged")
 
                 publish_items_config(items.config_path, new_config, items.reload)
+                await announce_config_change("items")
                 _log_admin_action(
                     request,
                     "items_update",
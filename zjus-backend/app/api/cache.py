@@ -6,18 +6,120 @@ connection creation, teardown, TTL normalization, and async-call compatibility
 in one place.
 """
 
+import asyncio
 import inspect
 import logging
-from typing import Any, Awaitable, Optional, Sequence, TypeVar
+import time
+import uuid
+from typing import Any, Awaitable, ClassVar, Optional, Sequence, TypeVar
 
 from redis import asyncio as aioredis
+from redis.asyncio.client import Pipeline
 from redis.asyncio.connection import ConnectionPool
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from redis.client import NEVER_DECODE
+from redis.commands.core import AsyncScript
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.state_backend import MemoryStateBackend, StateBackend
 
 logger = logging.getLogger(__name__)
 T = TypeVar("T")
 
+# Only side-effect-free reads are replayed after a transient connection error;
+# replaying HINCRBY/LPUSH-style writes could apply a game mutation twice.
+IDEMPOTENT_READ_COMMANDS = frozenset(
+    {
+        "EXISTS",
+        "GET",
+        "GETBIT",
+        "GETRANGE",
+        "HEXISTS",
+        "HGET",
+        "HGETALL",
+        "HKEYS",
+        "HLEN",
+        "HMGET",
+        "LINDEX",
+        "LLEN",
+        "LRANGE",
+        "MGET",
+        "PING",
+        "PTTL",
+        "SCAN",
+        "SCARD",
+        "SISMEMBER",
+        "SMEMBERS",
+        "STRLEN",
+        "TTL",
+        "TYPE",
+        "ZCARD",
+        "ZRANGE",
+        "ZSCORE",
+    }
+)
+_READ_RETRY_BACKOFF_SECONDS = 0.05
+
+# Same clamp semantics as MemoryStateBackend.hincrby_clamped, run atomically.
+_HINCRBY_CLAMPED_LUA = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or 0)
+local delta = tonumber(ARGV[2])
+local new_val = current + delta
+if new_val < tonumber(ARGV[3]) then new_val = tonumber(ARGV[3]) end
+if new_val > tonumber(ARGV[4]) then new_val = tonumber(ARGV[4]) end
+redis.call('HSET', KEYS[1], ARGV[1], new_val)
+return new_val
+"""
+
+# Lock release: delete the key only while it still holds the caller's token.
+_DELETE_IF_EQUALS_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+REDIS_COMMAND_LATENCY = metrics.histogram(
+    "zjus_redis_command_duration_seconds",
+    "Redis command and pipeline latency, including pool wait.",
+)
+REDIS_COMMAND_ERRORS = metrics.counter(
+    "zjus_redis_command_errors_total",
+    "Redis commands that failed with a connection or timeout error.",
+)
+REDIS_COMMAND_RETRIES = metrics.counter(
+    "zjus_redis_command_retries_total",
+    "Idempotent Redis reads replayed after a transient error.",
+)
+REDIS_POOL_WAIT = metrics.histogram(
+    "zjus_redis_pool_wait_seconds",
+    "Time spent waiting for a pooled Redis connection.",
+)
+REDIS_POOL_TIMEOUTS = metrics.counter(
+    "zjus_redis_pool_timeouts_total",
+    "Connection checkouts that gave up after the pool wait timeout.",
+)
+REDIS_POOL_IN_USE = metrics.gauge(
+    "zjus_redis_pool_connections_in_use",
+    "Redis connections currently checked out of the pool.",
+)
+REDIS_POOL_IDLE = metrics.gauge(
+    "zjus_redis_pool_connections_idle",
+    "Open Redis connections currently idle in the pool.",
+)
+REDIS_POOL_WAITERS = metrics.gauge(
+    "zjus_redis_pool_waiters",
+    "Callers currently queued for a Redis connection.",
+)
+REDIS_POOL_MAX = metrics.gauge(
+    "zjus_redis_pool_max_connections",
+    "Configured Redis connection pool cap.",
+)
+
 
 async def _await_if_needed(value: T | Awaitable[T]) -> T:
     if inspect.isawaitable(value):
@@ -25,10 +127,159 @@ async def _await_if_needed(value: T | Awaitable[T]) -> T:
     return value
 
 
+class PoolTimeoutError(RedisConnectionError):
+    """Raised when no pooled Redis connection frees up within the wait timeout."""
+
+
+class InstrumentedBlockingConnectionPool(aioredis.BlockingConnectionPool):
+    """Blocking pool that grows lazily to its cap and reports occupancy.
+
+    Connections are only opened on demand, so the pool sizes itself to actual
+    concurrency; once the cap is reached callers queue for up to `timeout`
+    seconds instead of failing immediately.
+    """
+
+    def _record_occupancy(self) -> None:
+        in_use = len(getattr(self, "_in_use_connections", ()))
+        idle = len(getattr(self, "_available_connections", ()))
+        REDIS_POOL_IN_USE.set(in_use)
+        REDIS_POOL_IDLE.set(idle)
+
+    async def get_connection(self, *args: Any, **kwargs: Any):
+        """Check out a connection, recording queue time and timeouts."""
+        started = time.perf_counter()
+        REDIS_POOL_WAITERS.inc()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except RedisConnectionError as exc:
+            if isinstance(exc.__cause__, asyncio.TimeoutError):
+                REDIS_POOL_TIMEOUTS.inc()
+                raise PoolTimeoutError(
+                    f"No Redis connection available within {self.timeout}s"
+                ) from exc
+            raise
+        finally:
+            REDIS_POOL_WAITERS.dec()
+            REDIS_POOL_WAIT.observe(time.perf_counter() - started)
+        self._record_occupancy()
+        return connection
+
+    async def release(self, connection: Any) -> None:
+        """Return a connection to the pool and refresh occupancy gauges."""
+        await super().release(connection)
+        self._record_occupancy()
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline that records one latency sample per round trip."""
+
+    def get_bytes(self, name: str) -> "InstrumentedPipeline":
+        """Queue a GET whose reply stays raw bytes; needs transaction=False."""
+        return self.execute_command("GET", name, **{NEVER_DECODE: True})
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        """Execute queued commands; pipelines are never replayed."""
+        name = "MULTI" if self.is_transaction else "PIPELINE"
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        except (RedisConnectionError, RedisTimeoutError) as exc:
+            REDIS_COMMAND_ERRORS.inc(command=name, error=type(exc).__name__)
+            raise
+        finally:
+            REDIS_COMMAND_LATENCY.observe(time.perf_counter() - started, command=name)
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """Redis client with latency metrics and retries for idempotent reads."""
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: Any = None
+    ) -> InstrumentedPipeline:
+        """Return an instrumented pipeline sharing this client's pool."""
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        """Execute one command, replaying safe reads on transient errors."""
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        retries = (
+            max(0, settings.REDIS_READ_RETRIES)
+            if command in IDEMPOTENT_READ_COMMANDS
+            else 0
+        )
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                return await super().execute_command(*args, **options)
+            except PoolTimeoutError as exc:
+                # Retrying would only queue again behind the same saturation.
+                REDIS_COMMAND_ERRORS.inc(command=command, error=type(exc).__name__)
+                raise
+            except (RedisConnectionError, RedisTimeoutError) as exc:
+                REDIS_COMMAND_ERRORS.inc(command=command, error=type(exc).__name__)
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                REDIS_COMMAND_RETRIES.inc(command=command)
+                logger.warning(
+                    "Retrying Redis %s after %s (attempt %s/%s)",
+                    command,
+                    type(exc).__name__,
+                    attempt,
+                    retries,
+                )
+                await asyncio.sleep(_READ_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            finally:
+                REDIS_COMMAND_LATENCY.observe(
+                    time.perf_counter() - started, command=command
+                )
+
+
+class RedisStateBackend(InstrumentedRedis):
+    """`StateBackend` implementation backed by a Redis server."""
+
+    # `get_client()` builds a client per call, so scripts are hashed once per
+    # process here and run against whichever client invokes them.
+    _scripts: ClassVar[dict[str, AsyncScript]] = {}
+
+    def _script(self, source: str) -> AsyncScript:
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self.register_script(source)
+        return script
+
+    async def get_bytes(self, name: str) -> Optional[bytes]:
+        """Read a string value without UTF-8 decoding (binary blobs)."""
+        return await self.execute_command("GET", name, **{NEVER_DECODE: True})
+
+    async def getdel_bytes(self, name: str) -> Optional[bytes]:
+        """Atomically read and delete a string value without decoding it."""
+        return await self.execute_command("GETDEL", name, **{NEVER_DECODE: True})
+
+    async def hincrby_clamped(
+        self, name: str, key: str, delta: int, min_val: int, max_val: int
+    ) -> int:
+        """Add `delta` to a hash field and clamp it in one server-side step."""
+        script = self._script(_HINCRBY_CLAMPED_LUA)
+        result = await script(
+            keys=[name], args=[key, delta, min_val, max_val], client=self
+        )
+        return int(result)
+
+    async def delete_if_equals(self, name: str, value: str) -> int:
+        """Compare-and-delete a string key in one server-side step."""
+        script = self._script(_DELETE_IF_EQUALS_LUA)
+        return int(await script(keys=[name], args=[value], client=self))
+
+
 class RedisCache:
     """Shared Redis client pool and small cache/list helper methods."""
 
     _connection_pool: ConnectionPool | None = None
+    _memory_backend: MemoryStateBackend | None = None
 
     @staticmethod
     def normalize_ttl(ttl_seconds: int) -> int:
@@ -53,13 +304,31 @@ class RedisCache:
         ]
 
     @classmethod
-    def get_client(cls) -> aioredis.Redis:
-        """Return a Redis client backed by a process-wide connection pool."""
+    def get_client(cls) -> StateBackend:
+        """Return the configured state backend.
+
+        `STATE_BACKEND=memory` keeps all state inside this process, which only
+        works for single-worker deployments.
+        """
+        if settings.STATE_BACKEND.lower() == "memory":
+            if cls._memory_backend is None:
+                cls._memory_backend = MemoryStateBackend()
+            return cls._memory_backend
         if cls._connection_pool is None:
-            cls._connection_pool = aioredis.ConnectionPool.from_url(
-                settings.REDIS_URL, decode_responses=True, max_connections=20
+            max_connections = max(1, settings.REDIS_MAX_CONNECTIONS)
+            cls._connection_pool = InstrumentedBlockingConnectionPool.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                max_connections=max_connections,
+                timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                # Read replay lives in InstrumentedRedis so writes are never
+                # retried blindly by the connection layer.
+                retry=Retry(NoBackoff(), 0),
             )
-        return aioredis.Redis(connection_pool=cls._connection_pool)
+            REDIS_POOL_MAX.set(max_connections)
+        return RedisStateBackend(connection_pool=cls._connection_pool)
 
     @classmethod
     async def lpop(cls, key: str) -> Any | None:
@@ -125,6 +394,22 @@ class RedisCache:
         redis = cls.get_client()
         return await _await_if_needed(redis.set(key, value, ex=ex))
 
+    @classmethod
+    async def acquire_lock(cls, key: str, ttl_seconds: int) -> Optional[str]:
+        """Take a cluster-wide lock with SET NX; returns its token or None."""
+        token = uuid.uuid4().hex
+        redis = cls.get_client()
+        acquired = await _await_if_needed(
+            redis.set(key, token, ex=int(ttl_seconds), nx=True)
+        )
+        return token if acquired else None
+
+    @classmethod
+    async def release_lock(cls, key: str, token: str) -> bool:
+        """Release a lock only if this caller still owns it."""
+        redis = cls.get_client()
+        return bool(await _await_if_needed(redis.delete_if_equals(key, token)))
+
     @classmethod
     async def get(cls, key: str) -> Any | None:
         """Get a Redis string value."""
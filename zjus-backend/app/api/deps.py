@@ -9,12 +9,12 @@ from typing import AsyncGenerator
 
 from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
-from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.cache import RedisCache
 from app.core.config import settings
 from app.core.database import AsyncSessionLocal
+from app.core.state_backend import StateBackend
 from app.repositories.redis_repo import RedisRepository
 from app.services.game_service import GameService
 from app.services.save_service import SaveService
@@ -30,8 +30,8 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
-async def get_redis() -> Redis:
-    """Return the shared async Redis client."""
+async def get_redis() -> StateBackend:
+    """Return the shared async state backend client."""
     return RedisCache.get_client()
 
 
@@ -68,7 +68,7 @@ def get_world_service() -> WorldService:
 
 def get_redis_repo(
     user_info: dict = Depends(get_current_user_info),
-    redis: Redis = Depends(get_redis),
+    redis: StateBackend = Depends(get_redis),
 ) -> RedisRepository:
     """Build a Redis repository scoped to the authenticated user."""
     return RedisRepository(user_info["user_id"], redis)
@@ -23,6 +23,7 @@ from app.core.events import GameEvent
 from app.game.balance import balance
 from app.game.engine import GameEngine
 from app.repositories.redis_repo import RedisRepository
+from app.schemas.dingtalk import DINGTALK_HISTORY_PAGE_SIZE
 from app.services.game_service import GameService
 from app.services.restriction_service import RestrictionService
 from app.services.save_service import SaveService
@@ -327,7 +328,9 @@ async def websocket_endpoint(websocket: WebSocket):
         elapsed = int(final_stats.get("elapsed_game_time", 0))
         semester_time_left = max(0, base_duration - elapsed)
         relax_cooldowns = await engine._get_relax_cooldowns()
-        dingtalk_state = await repo.get_dingtalk_state()
+        dingtalk_state = await repo.get_dingtalk_state(
+            message_limit=DINGTALK_HISTORY_PAGE_SIZE
+        )
         items_state = await engine._get_items_state_payload()
 
         await manager.send_personal_message(
@@ -343,10 +346,6 @@ async def websocket_endpoint(websocket: WebSocket):
             },
             user_id,
         )
-        await manager.send_personal_message(
-            {"type": "dingtalk_state", "state": dingtalk_state.model_dump()},
-            user_id,
-        )
         await manager.send_personal_message(
             {"type": "items_state", "data": items_state},
             user_id,
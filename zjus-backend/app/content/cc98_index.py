@@ -0,0 +1,185 @@
+"""Effect and trigger index for the CC98 post library.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Posts are grouped by effect and indexed by character bigrams of their
+normalized topic/content once at load time, so trigger lookups never rescan
+or re-lowercase the library.
+"""
+
+import random
+from typing import Any, Container, Dict, List, Optional, Sequence, Tuple
+
+# Random draws tried against the recent set before filtering the pool.
+_REJECTION_ATTEMPTS = 8
+# Cached (effect, trigger) lookups; the engine only uses a handful of triggers.
+_LOOKUP_CACHE_SIZE = 256
+# Topic and content are joined with a character normalization never keeps, so
+# a trigger cannot match across the boundary.
+_FIELD_SEPARATOR = "\n"
+
+
+def normalize_text(text: Any) -> str:
+    """Lowercase and drop all whitespace, the matching form for triggers."""
+    return "".join(str(text or "").lower().split())
+
+
+def _grams(text: str) -> set[str]:
+    if len(text) == 1:
+        return {text}
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+class Cc98Index:
+    """Precomputed effect pools and bigram postings over CC98 posts."""
+
+    def __init__(
+        self,
+        posts: Sequence[Dict[str, Any]],
+        state: Optional[Dict[str, Any]] = None,
+    ):
+        """Index `posts`, or adopt a `to_state()` dump built for the same list."""
+        self.posts = list(posts)
+        self.ids = [str(post.get("id") or "") for post in self.posts]
+        self._all: Tuple[int, ...] = tuple(range(len(self.posts)))
+        self._lookups: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+        if state is not None:
+            self._restore(state)
+        else:
+            self._build()
+
+    def _build(self) -> None:
+        self._texts = [
+            normalize_text(post.get("topic"))
+            + _FIELD_SEPARATOR
+            + normalize_text(post.get("content"))
+            for post in self.posts
+        ]
+        by_effect: Dict[str, List[int]] = {}
+        postings: Dict[str, List[int]] = {}
+        for idx, (post, text) in enumerate(zip(self.posts, self._texts, strict=True)):
+            by_effect.setdefault(str(post.get("effect") or ""), []).append(idx)
+            grams: set[str] = set()
+            for field in text.split(_FIELD_SEPARATOR):
+                grams.update(field)
+                grams.update(_grams(field))
+            for gram in grams:
+                postings.setdefault(gram, []).append(idx)
+        self._by_effect: Dict[str, Tuple[int, ...]] = {
+            effect: tuple(indices) for effect, indices in by_effect.items()
+        }
+        # All posting lists live in one flat tuple; each gram maps to its end
+        # offset, with lists in ascending post order. Unigrams serve
+        # one-character triggers.
+        flat: List[int] = []
+        self._grams: Dict[str, int] = {}
+        for gram, indices in postings.items():
+            flat.extend(indices)
+            self._grams[gram] = len(flat)
+        self._flat: Tuple[int, ...] = tuple(flat)
+        self._starts = self._posting_starts()
+
+    def _restore(self, state: Dict[str, Any]) -> None:
+        if state.get("ids") != self.ids:
+            raise ValueError("CC98 index state was built for different posts")
+        self._texts = list(state["texts"])
+        self._by_effect = {
+            effect: tuple(indices) for effect, indices in state["effects"].items()
+        }
+        self._grams = dict(zip(state["grams"], state["ends"], strict=True))
+        self._flat = tuple(state["postings"])
+        self._starts = self._posting_starts()
+
+    def _posting_starts(self) -> Dict[str, int]:
+        starts, prev = {}, 0
+        for gram, end in self._grams.items():
+            starts[gram] = prev
+            prev = end
+        return starts
+
+    def _postings(self, gram: str) -> Tuple[int, ...]:
+        end = self._grams.get(gram)
+        if end is None:
+            return ()
+        return self._flat[self._starts[gram] : end]
+
+    def to_state(self) -> Dict[str, Any]:
+        """Dump texts and postings for the compiled world bundle."""
+        return {
+            "ids": self.ids,
+            "texts": self._texts,
+            "effects": {k: list(v) for k, v in self._by_effect.items()},
+            "grams": list(self._grams),
+            "ends": list(self._grams.values()),
+            "postings": list(self._flat),
+        }
+
+    def __len__(self) -> int:
+        return len(self.posts)
+
+    def pool(self, effect: str) -> Tuple[int, ...]:
+        """Return post indices for an effect, or the whole library if none."""
+        return self._by_effect.get(effect) or self._all
+
+    def _trigger_hits(self, trigger: str) -> List[int]:
+        lists = sorted((self._postings(gram) for gram in _grams(trigger)), key=len)
+        if not lists or not lists[0]:
+            return []
+        hits = set(lists[0])
+        for postings in lists[1:]:
+            hits.intersection_update(postings)
+            if not hits:
+                return []
+        # Sharing every bigram is necessary but not sufficient; confirm once.
+        return sorted(i for i in hits if trigger in self._texts[i])
+
+    def candidates(self, effect: str, trigger: str = "") -> Tuple[int, ...]:
+        """Return effect-matched posts, narrowed to trigger hits when any exist."""
+        pool = self.pool(effect)
+        trigger = normalize_text(trigger)
+        if not trigger:
+            return pool
+        key = (effect, trigger)
+        cached = self._lookups.get(key)
+        if cached is not None:
+            return cached
+        in_pool = set(pool)
+        hits = tuple(i for i in self._trigger_hits(trigger) if i in in_pool)
+        result = hits or pool
+        if len(self._lookups) >= _LOOKUP_CACHE_SIZE:
+            self._lookups.clear()
+        self._lookups[key] = result
+        return result
+
+    def _sample_fresh(
+        self, pool: Tuple[int, ...], recent: Container[str], rng: random.Random
+    ) -> Optional[int]:
+        for _ in range(_REJECTION_ATTEMPTS):
+            idx = rng.choice(pool)
+            if self.ids[idx] not in recent:
+                return idx
+        fresh = [i for i in pool if self.ids[i] not in recent]
+        return rng.choice(fresh) if fresh else None
+
+    def sample(
+        self,
+        effect: str,
+        trigger: str = "",
+        recent: Container[str] = (),
+        rng: Optional[random.Random] = None,
+    ) -> Optional[int]:
+        """Draw one post index, avoiding recently shown posts when possible.
+
+        Order: fresh trigger hits, fresh effect posts, then any trigger hit.
+        """
+        if not self.posts:
+            return None
+        rng = rng or random  # type: ignore[assignment]
+        hits = self.candidates(effect, trigger)
+        idx = self._sample_fresh(hits, recent, rng)
+        if idx is None:
+            pool = self.pool(effect)
+            if pool is not hits:
+                idx = self._sample_fresh(pool, recent, rng)
+        if idx is None:
+            idx = rng.choice(hits)
+        return idx
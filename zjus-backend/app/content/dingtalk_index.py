@@ -0,0 +1,119 @@
+"""Context index for the pre-generated DingTalk thread library.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Threads are grouped by trigger context and tagged with their deterministic
+contact ID once at load time, so openers and scripted replies never need an LLM.
+"""
+
+import random
+from typing import Any, Collection, Container, Dict, List, Optional, Sequence, Tuple
+
+from app.schemas.dingtalk import build_contact_id, normalize_dingtalk_role
+
+DINGTALK_LIBRARY_CONTEXTS = ("random", "low_sanity", "high_stress", "low_gpa")
+
+
+def _option_text(option: Any) -> str:
+    if isinstance(option, dict):
+        option = option.get("text") or option.get("content")
+    return str(option or "").strip()[:80]
+
+
+class DingTalkIndex:
+    """Context pools over library threads, keyed by ID and contact."""
+
+    def __init__(self, threads: Sequence[Dict[str, Any]]):
+        self.threads = [t for t in threads if t.get("id") and t.get("opener")]
+        self.ids = [str(t["id"]) for t in self.threads]
+        self.contact_ids = [
+            build_contact_id(
+                str(t.get("character") or "未知"),
+                normalize_dingtalk_role(str(t.get("role") or "unknown")),
+            )
+            for t in self.threads
+        ]
+        self._by_id = {thread_id: idx for idx, thread_id in enumerate(self.ids)}
+        by_context: Dict[str, List[int]] = {}
+        for idx, thread in enumerate(self.threads):
+            by_context.setdefault(str(thread.get("context") or "random"), []).append(
+                idx
+            )
+        self._by_context: Dict[str, Tuple[int, ...]] = {
+            context: tuple(indices) for context, indices in by_context.items()
+        }
+        self._all: Tuple[int, ...] = tuple(range(len(self.threads)))
+
+    def __len__(self) -> int:
+        return len(self.threads)
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        idx = self._by_id.get(thread_id)
+        return self.threads[idx] if idx is not None else None
+
+    def pool(self, context: str) -> Tuple[int, ...]:
+        """Thread indices for a context, then `random`, then the whole library."""
+        return (
+            self._by_context.get(context) or self._by_context.get("random") or self._all
+        )
+
+    def sample(
+        self,
+        context: str = "random",
+        recent: Container[str] = (),
+        busy: Container[str] = (),
+        contacts: Optional[Collection[str]] = None,
+        rng: Optional[random.Random] = None,
+        allow_repeat: bool = True,
+    ) -> Optional[int]:
+        """Draw one thread index for `context`.
+
+        Threads whose contact is `busy` (an open round) are never drawn; when
+        `contacts` is given only those contacts may speak, which keeps a full
+        contact list from being overwritten by another character. Recently
+        shown threads are skipped while a fresh one remains; once none is
+        left they are reused only if `allow_repeat` is set.
+        """
+        rng = rng or random  # type: ignore[assignment]
+        for pool in (self.pool(context), self._all):
+            usable = [
+                i
+                for i in pool
+                if self.contact_ids[i] not in busy
+                and (contacts is None or self.contact_ids[i] in contacts)
+            ]
+            fresh = [i for i in usable if self.ids[i] not in recent]
+            if fresh:
+                return rng.choice(fresh)
+            if allow_repeat and usable and pool is self._all:
+                return rng.choice(usable)
+        return None
+
+    def reply(
+        self, thread_id: str, reply_count: int, option_text: str
+    ) -> Optional[Dict[str, Any]]:
+        """Scripted NPC reply to the player's `reply_count`-th option.
+
+        The last turn carries a settlement instead of further options. Returns
+        None when the thread or option is unknown, so callers can fall back.
+        """
+        thread = self.get(thread_id)
+        turns = thread.get("turns") if thread else None
+        if not isinstance(turns, list) or not 1 <= reply_count <= len(turns):
+            return None
+        turn = turns[reply_count - 1]
+        options = [_option_text(opt) for opt in turn.get("options") or []]
+        replies = turn.get("replies") or []
+        try:
+            choice = options.index(option_text.strip()[:80])
+        except ValueError:
+            return None
+        if choice >= len(replies) or not str(replies[choice] or "").strip():
+            return None
+        result: Dict[str, Any] = {"content": str(replies[choice]).strip()}
+        if reply_count >= len(turns):
+            settlements = turn.get("settlements") or []
+            if choice < len(settlements):
+                result["settlement"] = settlements[choice]
+        else:
+            result["reply_options"] = list(turns[reply_count].get("options") or [])
+        return result
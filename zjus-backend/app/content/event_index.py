@@ -0,0 +1,256 @@
+"""Interval bucket index for state-ranged library events.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Events are bucketed once over the (sanity, stress) grid at load time so each
+trigger looks up its candidates in O(1), independent of library size.
+"""
+
+import random
+import zlib
+from bisect import bisect_right
+from typing import (
+    Any,
+    Container,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Events whose tags fit the player's state are drawn with this extra weight.
+TAG_MATCH_WEIGHT = 2.0
+# Random draws tried against the seen set before scanning the bucket.
+_REJECTION_ATTEMPTS = 8
+# Pool key for the whole library, used when a state bucket is exhausted.
+_ALL_POOL = -1
+# Seen-bitmap layout: a fixed hashed region for generated (LLM) event IDs,
+# then one bit per library event in file order. A rare false "seen" for a
+# generated event is accepted to keep the bitmap small and fixed-size.
+SEEN_HASHED_BITS = 512
+
+
+class _Axis:
+    """Dense value-to-cell lookup for one integer stat axis."""
+
+    def __init__(self, lo: int, hi: int, cuts: Sequence[int]):
+        self.lo, self.hi = lo, hi
+        # Cell i spans [cuts[i], cuts[i + 1]); every range edge is a cut.
+        self.cuts = list(cuts)
+        self._cells = [bisect_right(self.cuts, v) - 1 for v in range(lo, hi + 1)]
+
+    @classmethod
+    def from_ranges(
+        cls, lo: int, hi: int, ranges: Sequence[Tuple[int, int]]
+    ) -> "_Axis":
+        cuts = {lo, hi + 1}
+        for r_lo, r_hi in ranges:
+            if r_lo > hi or r_hi < lo or r_lo > r_hi:
+                continue
+            cuts.add(max(r_lo, lo))
+            cuts.add(min(r_hi, hi) + 1)
+        return cls(lo, hi, sorted(cuts))
+
+    @property
+    def size(self) -> int:
+        return len(self.cuts) - 1
+
+    def cell(self, value: int) -> int:
+        clamped = min(max(int(value), self.lo), self.hi)
+        return self._cells[clamped - self.lo]
+
+    def cells_for(self, r_lo: int, r_hi: int) -> range:
+        if r_lo > self.hi or r_hi < self.lo or r_lo > r_hi:
+            return range(0)
+        return range(self.cell(r_lo), self.cell(r_hi) + 1)
+
+
+def _parse_range(raw: Any, default: Tuple[int, int]) -> Tuple[int, int]:
+    try:
+        lo, hi = raw
+        return int(lo), int(hi)
+    except (TypeError, ValueError):
+        return default
+
+
+class EventIndex:
+    """Precomputed (sanity, stress) buckets of library event indices."""
+
+    def __init__(
+        self,
+        events: Sequence[Dict[str, Any]],
+        sanity_bounds: Tuple[int, int],
+        stress_bounds: Tuple[int, int],
+        state: Optional[Dict[str, Any]] = None,
+    ):
+        """Bucket `events`, or adopt a `to_state()` dump built for the same list."""
+        self.events = list(events)
+        self.ids = [str(evt.get("id") or "") for evt in self.events]
+        self._positions = {event_id: i for i, event_id in enumerate(self.ids)}
+        # Tags stored bitmaps with the library order, which library bits follow.
+        layout = zlib.crc32("\n".join(self.ids).encode("utf-8"))
+        self.seen_layout = f"{layout:08x}"
+        self._tags = [frozenset(evt.get("tags") or ()) for evt in self.events]
+        if state is not None:
+            self._restore(sanity_bounds, stress_bounds, state)
+        else:
+            self._build(sanity_bounds, stress_bounds)
+        self._all: Tuple[int, ...] = tuple(range(len(self.events)))
+        # (pool key, affinity tags) -> indices in that pool carrying any tag.
+        self._preferred: Dict[Tuple[int, FrozenSet[str]], Tuple[int, ...]] = {}
+
+    def _build(
+        self, sanity_bounds: Tuple[int, int], stress_bounds: Tuple[int, int]
+    ) -> None:
+        sanity_ranges = [
+            _parse_range(evt.get("sanity_range"), sanity_bounds) for evt in self.events
+        ]
+        stress_ranges = [
+            _parse_range(evt.get("stress_range"), stress_bounds) for evt in self.events
+        ]
+        self._sanity = _Axis.from_ranges(*sanity_bounds, sanity_ranges)
+        self._stress = _Axis.from_ranges(*stress_bounds, stress_ranges)
+
+        width = self._stress.size
+        buckets: List[List[int]] = [[] for _ in range(self._sanity.size * width)]
+        for idx, (sr, tr) in enumerate(zip(sanity_ranges, stress_ranges, strict=True)):
+            stress_cells = self._stress.cells_for(*tr)
+            for s_cell in self._sanity.cells_for(*sr):
+                for t_cell in stress_cells:
+                    buckets[s_cell * width + t_cell].append(idx)
+        self._buckets: List[Tuple[int, ...]] = [tuple(b) for b in buckets]
+
+    def _restore(
+        self,
+        sanity_bounds: Tuple[int, int],
+        stress_bounds: Tuple[int, int],
+        state: Dict[str, Any],
+    ) -> None:
+        if state.get("ids") != self.ids or state.get("bounds") != [
+            list(sanity_bounds),
+            list(stress_bounds),
+        ]:
+            raise ValueError("event index state was built for different data")
+        self._sanity = _Axis(*sanity_bounds, state["sanity_cuts"])
+        self._stress = _Axis(*stress_bounds, state["stress_cuts"])
+        self._buckets = [tuple(b) for b in state["buckets"]]
+        if len(self._buckets) != self._sanity.size * self._stress.size:
+            raise ValueError("event index state has a malformed bucket grid")
+
+    def to_state(self) -> Dict[str, Any]:
+        """Dump the bucket grid for the compiled world bundle."""
+        return {
+            "ids": self.ids,
+            "bounds": [
+                [self._sanity.lo, self._sanity.hi],
+                [self._stress.lo, self._stress.hi],
+            ],
+            "sanity_cuts": self._sanity.cuts,
+            "stress_cuts": self._stress.cuts,
+            "buckets": [list(b) for b in self._buckets],
+        }
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def seen_bit_offset(self, event_id: str) -> int:
+        """Return the seen-bitmap bit for a library or generated event ID."""
+        pos = self._positions.get(event_id)
+        if pos is not None:
+            return SEEN_HASHED_BITS + pos
+        return zlib.crc32(event_id.encode("utf-8")) % SEEN_HASHED_BITS
+
+    def _bucket_key(self, sanity: int, stress: int) -> int:
+        return self._sanity.cell(sanity) * self._stress.size + self._stress.cell(stress)
+
+    def candidates(self, sanity: int, stress: int) -> Tuple[int, ...]:
+        """Return indices of events whose ranges contain the given state."""
+        return self._buckets[self._bucket_key(sanity, stress)]
+
+    def _preferred_for(
+        self, key: int, pool: Tuple[int, ...], tags: FrozenSet[str]
+    ) -> Tuple[int, ...]:
+        cache_key = (key, tags)
+        preferred = self._preferred.get(cache_key)
+        if preferred is None:
+            preferred = tuple(i for i in pool if self._tags[i] & tags)
+            self._preferred[cache_key] = preferred
+        return preferred
+
+    def _sample_pool(
+        self,
+        key: int,
+        pool: Tuple[int, ...],
+        seen: Container[str],
+        tags: FrozenSet[str],
+        rng: random.Random,
+    ) -> Optional[int]:
+        if not pool:
+            return None
+        preferred = self._preferred_for(key, pool, tags) if tags else ()
+        # Matching events weigh 1 + TAG_MATCH_WEIGHT against 1 for the rest.
+        boosted = TAG_MATCH_WEIGHT * len(preferred)
+        p_preferred = boosted / (boosted + len(pool))
+        for _ in range(_REJECTION_ATTEMPTS):
+            if preferred and rng.random() < p_preferred:
+                idx = rng.choice(preferred)
+            else:
+                idx = rng.choice(pool)
+            if self.ids[idx] not in seen:
+                return idx
+        # Mostly-seen pool: one exact weighted pass over the unseen rest.
+        unseen = [i for i in pool if self.ids[i] not in seen]
+        if not unseen:
+            return None
+        if not preferred:
+            return rng.choice(unseen)
+        weights = [
+            1.0 + TAG_MATCH_WEIGHT if self._tags[i] & tags else 1.0 for i in unseen
+        ]
+        return rng.choices(unseen, weights=weights)[0]
+
+    def sample(
+        self,
+        sanity: int,
+        stress: int,
+        seen: Container[str] = (),
+        affinity_tags: FrozenSet[str] = frozenset(),
+        rng: Optional[random.Random] = None,
+    ) -> Optional[int]:
+        """Draw one unseen event index for the given state.
+
+        Falls back to the whole library when the state bucket is exhausted,
+        mirroring the old "relax state matching" behaviour.
+        """
+        rng = rng or random  # type: ignore[assignment]
+        key = self._bucket_key(sanity, stress)
+        idx = self._sample_pool(key, self._buckets[key], seen, affinity_tags, rng)
+        if idx is None:
+            idx = self._sample_pool(_ALL_POOL, self._all, seen, affinity_tags, rng)
+        return idx
+
+
+class SeenEventBitmap:
+    """Read-only view of a player's seen-event bitmap.
+
+    Library events map to exact bits; generated IDs share a small hashed
+    region, so a rare false "seen" is possible for them but never a miss.
+    """
+
+    def __init__(
+        self, data: bytes | None, index: EventIndex, extra: Iterable[str] = ()
+    ):
+        self._data = data or b""
+        self._index = index
+        # IDs recorded before the bitmap existed, e.g. a legacy history list.
+        self._extra = frozenset(extra)
+
+    def __contains__(self, event_id: object) -> bool:
+        if not isinstance(event_id, str) or not event_id:
+            return False
+        if event_id in self._extra:
+            return True
+        byte, bit = divmod(self._index.seen_bit_offset(event_id), 8)
+        return byte < len(self._data) and bool(self._data[byte] & (0x80 >> bit))
@@ -1,4 +1,4 @@
-"""Precompiled event and CC98 library retrieval.
+"""Precompiled event, CC98, and DingTalk library retrieval.
 
 Copyright (c) 2026 pirate-608. Licensed under the MIT License.
 
@@ -7,98 +7,123 @@ Notes:
     state ranges, tags, and recent event history.
 """
 
-import json
 import logging
-import random
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Collection, Container, Dict, Iterable, List, Optional
 
+from app.content.cc98_index import Cc98Index
+from app.content.dingtalk_index import DingTalkIndex
+from app.content.event_index import EventIndex, SeenEventBitmap
+from app.content.state_vector import PlayerStateVector
+from app.core.world_bundle import load_world_section, read_world_json, world_dir
 from app.game.stat_definitions import stat_definitions
 
 logger = logging.getLogger(__name__)
 
-# ============================================================
-# World data path resolution.
-# ============================================================
-
-
-def _world_dir() -> Path:
-    """Prefer Docker's `/app/world`, then fall back to the local repo path."""
-    docker_path = Path("/app/world")
-    if docker_path.exists():
-        return docker_path
-    return Path(__file__).resolve().parent.parent.parent / "world"
-
-
 # ============================================================
 # Random event library.
 # ============================================================
 
 _event_library: List[Dict[str, Any]] = []
+_event_index: Optional[EventIndex] = None
 
 
 def _stat_default(stat_id: str) -> int:
     return stat_definitions.by_id[stat_id].default
 
 
-def _stat_range(stat_id: str) -> list[int]:
+def _stat_bounds(stat_id: str) -> tuple[int, int]:
     definition = stat_definitions.by_id[stat_id]
-    return [definition.min, definition.max]
+    return definition.min, definition.max
 
 
 def _load_event_library() -> List[Dict[str, Any]]:
     global _event_library
     if _event_library:
         return _event_library
-    path = _world_dir() / "event_library.json"
+    path = world_dir() / "event_library.json"
     if not path.exists():
         logger.warning("event_library.json not found at %s", path)
         return []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            _event_library = json.load(f)
+        _event_library = read_world_json(path)
         logger.info("Loaded %d events from event_library.json", len(_event_library))
     except Exception as e:
         logger.error("Failed to load event_library.json: %s", e)
     return _event_library
 
 
+def _load_event_index() -> Optional[EventIndex]:
+    global _event_index
+    if _event_index is not None:
+        return _event_index
+    library = _load_event_library()
+    if not library:
+        return None
+    bounds = _stat_bounds("sanity"), _stat_bounds("stress")
+    # The compiled bundle carries a prebuilt grid; rebuild if it does not fit.
+    state = load_world_section("index:events")
+    if state is not None:
+        try:
+            _event_index = EventIndex(library, *bounds, state=state)
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning("Rebuilding event index: %s", exc)
+    if _event_index is None:
+        _event_index = EventIndex(library, *bounds)
+    return _event_index
+
+
+def seen_event_offset(event_id: str) -> Optional[int]:
+    """Return the seen-bitmap bit for an event ID, or None without a library."""
+    index = _load_event_index()
+    return index.seen_bit_offset(event_id) if index else None
+
+
+def seen_events_layout() -> str:
+    """Return the library's seen-bitmap layout tag, or "" without a library."""
+    index = _load_event_index()
+    return index.seen_layout if index else ""
+
+
+def seen_events(
+    bitmap: Optional[bytes], recent_ids: Iterable[str] = ()
+) -> Container[str]:
+    """Wrap a player's seen-event bitmap for membership checks.
+
+    `recent_ids` covers events recorded before the bitmap existed.
+    """
+    index = _load_event_index()
+    if index is None:
+        return set(recent_ids)
+    return SeenEventBitmap(bitmap, index, recent_ids)
+
+
 def pick_random_event(
     sanity: int | None = None,
     stress: int | None = None,
-    seen_ids: Optional[Set[str]] = None,
+    seen_ids: Optional[Container[str]] = None,
+    state: Optional[PlayerStateVector] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Pick an unseen event from the precompiled library by player state range.
 
-    The returned shape remains compatible with the LLM event payload and carries
-    `id` for history-based deduplication:
+    Candidates come from the load-time (sanity, stress) bucket index; events
+    whose tags fit `state` are drawn more often. The returned shape remains
+    compatible with the LLM event payload and carries `id` for deduplication:
     {"id": "evt_xxx", "title": ..., "desc": ..., "options": [...]}。
     """
-    library = _load_event_library()
-    if not library:
+    index = _load_event_index()
+    if index is None:
         return None
 
     sanity = _stat_default("sanity") if sanity is None else sanity
     stress = _stat_default("stress") if stress is None else stress
-    seen = seen_ids or set()
-    candidates = []
-    for evt in library:
-        if evt.get("id") in seen:
-            continue
-        sr = evt.get("sanity_range", _stat_range("sanity"))
-        tr = evt.get("stress_range", _stat_range("stress"))
-        if sr[0] <= sanity <= sr[1] and tr[0] <= stress <= tr[1]:
-            candidates.append(evt)
-
-    if not candidates:
-        # Relax state matching before giving up, but still avoid seen events.
-        candidates = [e for e in library if e.get("id") not in seen]
-
-    if not candidates:
+    affinity = state.event_affinity_tags() if state else frozenset()
+    # Falls back to the whole library, still avoiding seen events.
+    idx = index.sample(sanity, stress, seen_ids or (), affinity)
+    if idx is None:
         return None
 
-    chosen = random.choice(candidates)
+    chosen = index.events[idx]
     # Return the clean LLM-compatible shape and expose `id` for deduplication.
     return {
         "id": chosen.get("id"),
@@ -113,66 +138,163 @@ def pick_random_event(
 # ============================================================
 
 _cc98_library: List[Dict[str, Any]] = []
+_cc98_index: Optional[Cc98Index] = None
 
 
 def _load_cc98_library() -> List[Dict[str, Any]]:
     global _cc98_library
     if _cc98_library:
         return _cc98_library
-    path = _world_dir() / "cc98_library.json"
+    path = world_dir() / "cc98_library.json"
     if not path.exists():
         logger.warning("cc98_library.json not found at %s", path)
         return []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            _cc98_library = json.load(f)
+        _cc98_library = read_world_json(path)
         logger.info("Loaded %d posts from cc98_library.json", len(_cc98_library))
     except Exception as e:
         logger.error("Failed to load cc98_library.json: %s", e)
     return _cc98_library
 
 
-def pick_cc98_post(
+def _load_cc98_index() -> Optional[Cc98Index]:
+    global _cc98_index
+    if _cc98_index is not None:
+        return _cc98_index
+    library = _load_cc98_library()
+    if not library:
+        return None
+    state = load_world_section("index:cc98")
+    if state is not None:
+        try:
+            _cc98_index = Cc98Index(library, state=state)
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning("Rebuilding CC98 index: %s", exc)
+    if _cc98_index is None:
+        _cc98_index = Cc98Index(library)
+    return _cc98_index
+
+
+def sample_cc98_post(
     effect: str = "neutral",
     trigger: str = "",
-) -> Optional[str]:
+    recent_ids: Optional[Container[str]] = None,
+) -> Optional[Dict[str, Any]]:
     """
-        Pick a CC98 post from the precompiled library by trigger and effect.
+    Pick a CC98 post from the precompiled library by trigger and effect.
 
-        Matching strategy:
-            1) Filter by effect first.
-            2) Prefer topic/content hits for the trigger.
-            3) Fall back to a random effect-matched candidate.
+    Matching strategy:
+        1) Filter by effect first (the whole library if no post has it).
+        2) Prefer topic/content hits for the whitespace-insensitive trigger.
+        3) Skip `recent_ids` while an unseen candidate remains.
 
     Returns:
-        Post content, or None when the library is empty and LLM fallback should run.
+        The post dict, or None when the library is empty and LLM fallback
+        should run.
     """
-    library = _load_cc98_library()
+    index = _load_cc98_index()
+    if index is None:
+        return None
+    idx = index.sample(effect, trigger, recent_ids or ())
+    return index.posts[idx] if idx is not None else None
+
+
+def pick_cc98_post(
+    effect: str = "neutral",
+    trigger: str = "",
+    recent_ids: Optional[Container[str]] = None,
+) -> Optional[str]:
+    """Return only the content of `sample_cc98_post`."""
+    post = sample_cc98_post(effect, trigger, recent_ids)
+    if post is None:
+        return None
+    return post.get("content", "CC98 帖子加载失败...")
+
+
+# ============================================================
+# DingTalk thread library.
+# ============================================================
+
+_dingtalk_library: List[Dict[str, Any]] = []
+_dingtalk_index: Optional[DingTalkIndex] = None
+
+
+def _load_dingtalk_library() -> List[Dict[str, Any]]:
+    global _dingtalk_library
+    if _dingtalk_library:
+        return _dingtalk_library
+    path = world_dir() / "dingtalk_library.json"
+    if not path.exists():
+        logger.warning("dingtalk_library.json not found at %s", path)
+        return []
+    try:
+        _dingtalk_library = read_world_json(path)
+        logger.info(
+            "Loaded %d threads from dingtalk_library.json", len(_dingtalk_library)
+        )
+    except Exception as e:
+        logger.error("Failed to load dingtalk_library.json: %s", e)
+    return _dingtalk_library
+
+
+def _load_dingtalk_index() -> Optional[DingTalkIndex]:
+    global _dingtalk_index
+    if _dingtalk_index is not None:
+        return _dingtalk_index
+    library = _load_dingtalk_library()
     if not library:
         return None
+    _dingtalk_index = DingTalkIndex(library)
+    return _dingtalk_index
+
+
+def pick_dingtalk_thread(
+    context: str = "random",
+    recent_ids: Container[str] = (),
+    busy_contact_ids: Container[str] = (),
+    contact_ids: Optional[Collection[str]] = None,
+    allow_repeat: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """
+    Pick a pre-generated DingTalk opener for a trigger context.
+
+    With `allow_repeat` off, returns None instead of a recently shown thread
+    so a caller with an LLM can generate something new.
 
-    # Filter by effect before applying the optional trigger preference.
-    candidates = [p for p in library if p.get("effect") == effect]
-    if not candidates:
-        candidates = library
-
-    trigger_norm = (trigger or "").strip().lower()
-    if trigger_norm:
-        trigger_hits = []
-        for post in candidates:
-            topic = str(post.get("topic", "")).lower()
-            content = str(post.get("content", "")).lower()
-            # Match the literal trigger first, then retry after removing spaces.
-            if (
-                trigger_norm in topic
-                or trigger_norm in content
-                or trigger_norm.replace(" ", "") in topic.replace(" ", "")
-                or trigger_norm.replace(" ", "") in content.replace(" ", "")
-            ):
-                trigger_hits.append(post)
-
-        if trigger_hits:
-            candidates = trigger_hits
-
-    chosen = random.choice(candidates)
-    return chosen.get("content", "CC98 帖子加载失败...")
+    The returned shape matches the LLM DingTalk payload plus `library_id`,
+    which later replies use to continue the same scripted thread:
+    {"sender": ..., "role": ..., "content": ..., "reply_options": [...],
+    "is_urgent": ..., "library_id": "dtl_xxx"}。
+    """
+    index = _load_dingtalk_index()
+    if index is None:
+        return None
+    idx = index.sample(
+        context,
+        recent_ids,
+        busy_contact_ids,
+        contact_ids,
+        allow_repeat=allow_repeat,
+    )
+    if idx is None:
+        return None
+    thread = index.threads[idx]
+    turns = thread.get("turns") or []
+    return {
+        "library_id": index.ids[idx],
+        "sender": thread.get("character"),
+        "role": thread.get("role"),
+        "content": thread["opener"],
+        "reply_options": list(turns[0].get("options") or []) if turns else [],
+        "is_urgent": bool(thread.get("is_urgent", False)),
+    }
+
+
+def library_dingtalk_reply(
+    thread_id: str, reply_count: int, option_text: str
+) -> Optional[Dict[str, Any]]:
+    """Scripted reply for a library thread, or None to fall back."""
+    index = _load_dingtalk_index()
+    if index is None or not thread_id:
+        return None
+    return index.reply(thread_id, reply_count, option_text)
@@ -8,7 +8,7 @@ Notes:
 """
 
 from dataclasses import asdict, dataclass
-from typing import Any, Dict
+from typing import Any, Dict, FrozenSet
 
 from app.game.stat_definitions import stat_definitions
 
@@ -29,6 +29,48 @@ def _stat_ratio(value: int, stat_id: str) -> float:
     return max(0.0, min(1.0, (value - definition.min) / span))
 
 
+# Library event tags that fit each categorical state, used to bias selection.
+_EVENT_TAG_AFFINITY: Dict[str, tuple[str, ...]] = {
+    "崩溃": ("狼狈瞬间", "惊险事故"),
+    "低落": ("狼狈瞬间", "生活小插曲"),
+    "高昂": ("校园传说", "社团社交"),
+    "爆表": ("学业压力", "惊险事故"),
+    "高压": ("学业压力", "科研日常"),
+    "轻松": ("生活小插曲", "食堂"),
+    "学霸": ("科研日常", "科研竞赛"),
+    "挂科边缘": ("学业压力", "选课"),
+    "出众": ("校园恋爱", "社团社交"),
+    "低调": ("图书馆", "生活小插曲"),
+}
+
+
+# Ordinal scales of the categorical axes that partition content pools, with
+# the stat ratio (or GPA) at the middle of each band.
+_MOOD_SCALE = (("崩溃", 0.05), ("低落", 0.15), ("正常", 0.3), ("高昂", 0.7))
+_STRESS_SCALE = (("轻松", 0.05), ("适中", 0.18), ("高压", 0.33), ("爆表", 0.7))
+_ACADEMIC_SCALE = (("挂科边缘", 1.5), ("普通", 3.0), ("学霸", 3.9))
+_BUCKET_AXES = (_MOOD_SCALE, _STRESS_SCALE, _ACADEMIC_SCALE)
+_BUCKET_SEP = "|"
+
+
+def _stat_at_ratio(stat_id: str, ratio: float) -> int:
+    definition = stat_definitions.by_id[stat_id]
+    return round(definition.min + ratio * (definition.max - definition.min))
+
+
+def stats_for_pool_bucket(bucket: str) -> Dict[str, Any]:
+    """Representative default stats that land in `bucket`, for refill prompts."""
+    mood, stress, academic = bucket.split(_BUCKET_SEP)
+    stats: Dict[str, Any] = {
+        stat_id: definition.default
+        for stat_id, definition in stat_definitions.by_id.items()
+    }
+    stats["sanity"] = _stat_at_ratio("sanity", dict(_MOOD_SCALE)[mood])
+    stats["stress"] = _stat_at_ratio("stress", dict(_STRESS_SCALE)[stress])
+    stats["gpa"] = dict(_ACADEMIC_SCALE)[academic]
+    return stats
+
+
 @dataclass(frozen=True)
 class PlayerStateVector:
     """Categorical state summary for retrieval and prompt context."""
@@ -92,6 +134,24 @@ class PlayerStateVector:
             major=str(stats.get("major", "")),
         )
 
+    def pool_bucket(self) -> str:
+        """Content-pool partition: mood, stress, and academic labels."""
+        return _BUCKET_SEP.join((self.mood, self.stress_level, self.academic))
+
+    def neighbour_pool_buckets(self) -> list[str]:
+        """Buckets one step away on a single axis, mood changes first."""
+        labels = [self.mood, self.stress_level, self.academic]
+        neighbours: list[str] = []
+        for axis, scale in enumerate(_BUCKET_AXES):
+            names = [name for name, _ in scale]
+            idx = names.index(labels[axis])
+            for step in (-1, 1):
+                if 0 <= idx + step < len(names):
+                    moved = list(labels)
+                    moved[axis] = names[idx + step]
+                    neighbours.append(_BUCKET_SEP.join(moved))
+        return neighbours
+
     def to_dict(self) -> Dict[str, str]:
         """Return the vector as a plain dictionary."""
         return asdict(self)
@@ -106,5 +166,12 @@ class PlayerStateVector:
 
     def matches_tags(self, tags: list[str]) -> bool:
         """Return whether any event tag matches the current state vector."""
-        state_tags = {self.mood, self.stress_level, self.academic, self.social}
-        return bool(state_tags & set(tags))
+        return bool(self.event_affinity_tags() & set(tags))
+
+    def event_affinity_tags(self) -> FrozenSet[str]:
+        """Return state labels plus the library tags that fit this state."""
+        state_tags = (self.mood, self.stress_level, self.academic, self.social)
+        affinity = set(state_tags)
+        for label in state_tags:
+            affinity.update(_EVENT_TAG_AFFINITY.get(label, ()))
+        return frozenset(affinity)
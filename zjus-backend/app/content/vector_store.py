@@ -10,13 +10,13 @@ Notes:
 
 import json
 import logging
-from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import AsyncSessionLocal
+from app.core.world_bundle import read_world_json, world_dir
 
 logger = logging.getLogger(__name__)
 
@@ -28,13 +28,6 @@ logger = logging.getLogger(__name__)
 _query_embeddings: Dict[str, List[float]] = {}
 
 
-def _world_dir() -> Path:
-    docker_path = Path("/app/world")
-    if docker_path.exists():
-        return docker_path
-    return Path(__file__).resolve().parent.parent.parent / "world"
-
-
 def _load_query_embeddings() -> Dict[str, List[float]]:
     """
     Load precomputed query vectors.
@@ -51,14 +44,13 @@ def _load_query_embeddings() -> Dict[str, List[float]]:
     if _query_embeddings:
         return _query_embeddings
 
-    path = _world_dir() / "query_embeddings.json"
+    path = world_dir() / "query_embeddings.json"
     if not path.exists():
         logger.warning("query_embeddings.json not found at %s", path)
         return {}
 
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            _query_embeddings = json.load(f)
+        _query_embeddings = read_world_json(path)
         logger.info(
             "Loaded %d pre-computed query embeddings: %s",
             len(_query_embeddings),
@@ -41,10 +41,31 @@ class Settings(BaseSettings):
         "DATABASE_URL", "postgresql+asyncpg://zju:password@db/zjuers"
     )
 
+    # "redis" (default) or "memory" for single-process dev/test deployments.
+    STATE_BACKEND: str = os.environ.get("STATE_BACKEND", "redis")
     REDIS_URL: str = os.environ.get("REDIS_URL", "redis://redis:6379/0")
     REDIS_PLAYER_TTL_SECONDS: int = int(
         os.environ.get("REDIS_PLAYER_TTL_SECONDS", 60 * 60 * 24)
     )
+    # Connections are opened lazily up to the cap; callers queue instead of failing.
+    REDIS_MAX_CONNECTIONS: int = int(os.environ.get("REDIS_MAX_CONNECTIONS", 64))
+    REDIS_POOL_TIMEOUT_SECONDS: float = float(
+        os.environ.get("REDIS_POOL_TIMEOUT_SECONDS", 5)
+    )
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = float(
+        os.environ.get("REDIS_SOCKET_TIMEOUT_SECONDS", 5)
+    )
+    REDIS_READ_RETRIES: int = int(os.environ.get("REDIS_READ_RETRIES", 2))
+    # Large JSON-shaped values (DingTalk, items, pending event) are stored as
+    # "msgpack" or "json" and zlib-compressed above the threshold.
+    REDIS_BLOB_CODEC: str = os.environ.get("REDIS_BLOB_CODEC", "msgpack")
+    REDIS_BLOB_COMPRESS_THRESHOLD_BYTES: int = int(
+        os.environ.get("REDIS_BLOB_COMPRESS_THRESHOLD_BYTES", 512)
+    )
+
+    # Compiled world data from `validate_world_data.py --compile`; empty means
+    # build/world.bundle. Missing or stale sections fall back to world/*.json.
+    WORLD_BUNDLE_PATH: str = os.environ.get("WORLD_BUNDLE_PATH", "")
 
     ADMIN_USERNAME: str = os.environ.get("ADMIN_USERNAME", "admin")
     ADMIN_PASSWORD: str = os.environ.get("ADMIN_PASSWORD", "admin123")
@@ -64,6 +85,53 @@ class Settings(BaseSettings):
         "https://api.minimaxi.com/v1",
     )
     INVITE_CODES: str = ""
+    # Background LLM batches keep shared content pools warm; pools without
+    # configured platform keys are skipped either way.
+    CONTENT_POOL_WARMING: bool = os.environ.get(
+        "CONTENT_POOL_WARMING", "true"
+    ).lower() not in {"0", "false", "no"}
+
+    # Per-provider admission limits for chat completions in each worker.
+    LLM_PROVIDER_MAX_CONCURRENCY: int = int(
+        os.environ.get("LLM_PROVIDER_MAX_CONCURRENCY", 16)
+    )
+    LLM_PROVIDER_REQUESTS_PER_SECOND: float = float(
+        os.environ.get("LLM_PROVIDER_REQUESTS_PER_SECOND", 8)
+    )
+    LLM_PROVIDER_TOKENS_PER_MINUTE: float = float(
+        os.environ.get("LLM_PROVIDER_TOKENS_PER_MINUTE", 200000)
+    )
+
+    # Race a slow primary LLM source against its fallback after its p90.
+    LLM_HEDGING: bool = os.environ.get("LLM_HEDGING", "false").lower() in {
+        "1",
+        "true",
+        "yes",
+    }
+
+    # Shared platform-key cache for DingTalk replies in identical contexts.
+    DINGTALK_REPLY_CACHE_TTL_SECONDS: int = int(
+        os.environ.get("DINGTALK_REPLY_CACHE_TTL_SECONDS", 21600)
+    )
+    DINGTALK_REPLY_CACHE_MAX_ENTRIES: int = int(
+        os.environ.get("DINGTALK_REPLY_CACHE_MAX_ENTRIES", 5000)
+    )
+    # Chance a hit is served while an entry still collects reply variants;
+    # 0 disables the cache.
+    DINGTALK_REPLY_CACHE_SAMPLE_RATE: float = float(
+        os.environ.get("DINGTALK_REPLY_CACHE_SAMPLE_RATE", 0.7)
+    )
+
+    # Graduation waits this long for the wenyan report before using the
+    # GPA-branched fallback comment.
+    WENYAN_REPORT_TIMEOUT_SECONDS: float = float(
+        os.environ.get("WENYAN_REPORT_TIMEOUT_SECONDS", 6)
+    )
+
+    # Semester autosaves drain through this many write-behind workers per
+    # process; each save is tried this many times before the player is told.
+    AUTOSAVE_WORKERS: int = int(os.environ.get("AUTOSAVE_WORKERS", 4))
+    AUTOSAVE_ATTEMPTS: int = int(os.environ.get("AUTOSAVE_ATTEMPTS", 2))
 
     @model_validator(mode="after")
     def _check_insecure_defaults(self) -> "Settings":
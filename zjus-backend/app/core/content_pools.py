@@ -0,0 +1,619 @@
+"""Background refill for the shared LLM content pools.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Random events, CC98 posts, DingTalk messages, and the M2-her cache are Redis
+lists that players pop from, partitioned by player-state bucket; a refiller per
+pool keeps each list between a low and high watermark so a player rarely waits
+on a fresh LLM batch, and misses that do happen share one in-flight batch.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Sequence, Union
+
+from app.api.cache import RedisCache
+from app.content.state_vector import PlayerStateVector, stats_for_pool_bucket
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.state_backend import StateBackend
+from app.game.stat_definitions import stat_definitions
+
+logger = logging.getLogger(__name__)
+
+# Items pushed by refillers across all workers; together with the list depth
+# this gives every worker the same consumption rate.
+POOL_PUSHED_KEY = "content_pools:pushed"
+POOL_LOCK_KEY = "content_pools:refilling:{name}"
+REFILL_LOCK_SECONDS = 120
+# The low watermark grows to cover this much observed demand.
+DEMAND_HORIZON_SECONDS = 120.0
+MIN_CHECK_SECONDS = 2.0
+MAX_CHECK_SECONDS = 30.0
+# Batches one pool requests in parallel, and batches in flight per worker.
+POOL_PARALLEL_BATCHES = 2
+WORKER_MAX_BATCHES = 4
+_SMOOTHING = 0.3
+_MAX_BACKOFF_SECONDS = 60.0
+
+POOL_DEPTH = metrics.gauge(
+    "zjus_content_pool_depth",
+    "Items waiting in a shared LLM content pool.",
+)
+POOL_CONSUMPTION = metrics.gauge(
+    "zjus_content_pool_consumption_per_second",
+    "Smoothed consumption rate of a content pool across all workers.",
+)
+POOL_BATCHES = metrics.counter(
+    "zjus_content_pool_refill_batches_total",
+    "LLM batches requested by pool refillers, by result.",
+)
+POOL_POPS = metrics.counter(
+    "zjus_content_pool_pops_total",
+    "Player-facing content pool reads, by hit or miss.",
+)
+POOL_COALESCED = metrics.counter(
+    "zjus_content_pool_coalesced_total",
+    "Pool misses served by another caller's batch, by source worker.",
+)
+
+# One miss-driven batch per pool key is in flight across the cluster; the
+# lock outlives a leader's worst case (5s admission queue, then a 20s LLM
+# timeout over the SDK's three attempts plus backoff) so it is never lost.
+POOL_FLIGHT_KEY = "content_pools:generating:{key}"
+FLIGHT_LOCK_SECONDS = 90
+FLIGHT_WAIT_SECONDS = 25.0
+FLIGHT_POLL_SECONDS = 0.25
+
+# A bucket keeps its refiller while players in this worker asked for it
+# recently; the warmer rescans demand at this interval.
+BUCKET_IDLE_SECONDS = 600.0
+BUCKET_SCAN_SECONDS = 5.0
+
+# pool name -> state bucket -> monotonic time of the last local read.
+_bucket_demand: dict[str, dict[str, float]] = {}
+
+
+def record_pool_pop(pool: str, hit: bool) -> None:
+    """Count a player-facing pool read; misses mean the player waited."""
+    POOL_POPS.inc(pool=pool, result="hit" if hit else "miss")
+
+
+def bucketed_pool_keys(
+    key_template: str, player_stats: dict[str, Any]
+) -> tuple[str, str, list[str]]:
+    """The player's state bucket, its pool key, and neighbouring pool keys."""
+    state = PlayerStateVector.from_stats(player_stats)
+    bucket = state.pool_bucket()
+    neighbours = [
+        key_template.format(bucket=other) for other in state.neighbour_pool_buckets()
+    ]
+    return bucket, key_template.format(bucket=bucket), neighbours
+
+
+def active_buckets(pool: str, within: float = BUCKET_IDLE_SECONDS) -> list[str]:
+    """Buckets of `pool` that players in this worker read recently."""
+    cutoff = time.monotonic() - within
+    return [
+        bucket
+        for bucket, seen in _bucket_demand.get(pool, {}).items()
+        if seen >= cutoff
+    ]
+
+
+class _Flight:
+    """A batch this worker is generating, shared with local waiters."""
+
+    def __init__(self) -> None:
+        self.done = asyncio.Event()
+        self.waiters = 0
+        self.items: list[str] = []
+        self.failed = False
+        # The leader stopped waiting (e.g. lost a hedge race); its item goes
+        # to the pool instead.
+        self.leader_gone = False
+
+
+_local_flights: dict[str, _Flight] = {}
+# Detached flight batches, referenced until they finish.
+_flight_tasks: set[asyncio.Task] = set()
+
+
+def flight_waiters(key: str) -> int:
+    """Callers in this worker waiting on the batch being generated for `key`.
+
+    Generators that produce items one at a time can stop once the leader and
+    these waiters are covered.
+    """
+    flight = _local_flights.get(key)
+    return flight.waiters if flight is not None else 0
+
+
+async def pop_pooled(
+    pool: str,
+    key: str,
+    *,
+    cache: Any = RedisCache,
+    bucket: Optional[str] = None,
+    fallback_keys: Sequence[str] = (),
+) -> Optional[str]:
+    """Pop one item from `key` or a neighbour pool without generating.
+
+    Misses are not counted here; `pop_or_generate` counts the miss a player
+    actually waits on.
+    """
+    if bucket is not None:
+        _bucket_demand.setdefault(pool, {})[bucket] = time.monotonic()
+    item = await cache.lpop(key)
+    if item:
+        record_pool_pop(pool, hit=True)
+        return item
+    for fallback_key in fallback_keys:
+        item = await cache.lpop(fallback_key)
+        if item:
+            POOL_POPS.inc(pool=pool, result="neighbour")
+            return item
+    return None
+
+
+async def pop_or_generate(
+    pool: str,
+    key: str,
+    generate: Callable[[], Awaitable[list[str]]],
+    *,
+    cache: Any = RedisCache,
+    max_len: int,
+    ttl_seconds: int,
+    bucket: Optional[str] = None,
+    fallback_keys: Sequence[str] = (),
+) -> Optional[str]:
+    """Pop one pool item, coalescing misses onto a single in-flight batch.
+
+    For state-bucketed pools `key` is the player's bucket and `fallback_keys`
+    are its neighbours, tried in order before anything is generated; `bucket`
+    records local demand so the warmer keeps that bucket topped up.
+
+    The caller that wins the pool's Redis lock generates the batch: it keeps
+    the first item, hands one to each waiter in this worker, and pushes the
+    rest to the pool, where waiters on other workers pick them up. The batch
+    outlives a cancelled leader, so paid-for items still reach waiters and
+    the pool. Returns None if the batch came back empty or nothing arrived in
+    time. `cache` is the `RedisCache` the calling module uses.
+    """
+    item = await pop_pooled(
+        pool, key, cache=cache, bucket=bucket, fallback_keys=fallback_keys
+    )
+    if item:
+        return item
+    record_pool_pop(pool, hit=False)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + FLIGHT_WAIT_SECONDS
+    lock_key = POOL_FLIGHT_KEY.format(key=key)
+    while loop.time() < deadline:
+        flight = _local_flights.get(key)
+        if flight is not None:
+            flight.waiters += 1
+            try:
+                await asyncio.wait_for(
+                    flight.done.wait(), timeout=max(0.0, deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                flight.waiters -= 1
+            if flight.items:
+                POOL_COALESCED.inc(pool=pool, source="local")
+                return flight.items.pop(0)
+            if flight.failed:
+                return None
+            continue
+
+        token = await cache.acquire_lock(lock_key, FLIGHT_LOCK_SECONDS)
+        if token is not None:
+            return await _lead_flight(
+                key, lock_key, token, generate, cache, max_len, ttl_seconds
+            )
+
+        # Another worker is generating; its leftovers land in the pool.
+        await asyncio.sleep(FLIGHT_POLL_SECONDS)
+        item = await cache.lpop(key)
+        if item:
+            POOL_COALESCED.inc(pool=pool, source="remote")
+            return item
+    return None
+
+
+async def _lead_flight(
+    key: str,
+    lock_key: str,
+    token: str,
+    generate: Callable[[], Awaitable[list[str]]],
+    cache: Any,
+    max_len: int,
+    ttl_seconds: int,
+) -> Optional[str]:
+    flight = _Flight()
+    _local_flights[key] = flight
+    task = asyncio.ensure_future(
+        _run_flight(
+            flight, key, lock_key, token, generate, cache, max_len, ttl_seconds
+        )
+    )
+    _flight_tasks.add(task)
+    task.add_done_callback(_flight_done)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        flight.leader_gone = True
+        raise
+
+
+def _flight_done(task: "asyncio.Task[Optional[str]]") -> None:
+    _flight_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Content pool batch failed: %s", task.exception())
+
+
+async def _run_flight(
+    flight: _Flight,
+    key: str,
+    lock_key: str,
+    token: str,
+    generate: Callable[[], Awaitable[list[str]]],
+    cache: Any,
+    max_len: int,
+    ttl_seconds: int,
+) -> Optional[str]:
+    items: list[str] = []
+    cancelled = False
+    try:
+        items = await generate()
+    except asyncio.CancelledError:
+        # Shutdown, not a provider failure: waiters retry on their own.
+        cancelled = True
+        raise
+    except BaseException:
+        flight.failed = True
+        raise
+    finally:
+        flight.failed = flight.failed or (not items and not cancelled)
+        kept = 0 if flight.leader_gone else 1
+        # Hand items to local waiters synchronously so none of them can
+        # start a second batch before picking up their share.
+        flight.items = items[kept : kept + flight.waiters]
+        leftovers = items[kept + flight.waiters :]
+        flight.done.set()
+        del _local_flights[key]
+        try:
+            if leftovers:
+                await cache.rpush_many_with_limit(
+                    key, leftovers, max_len=max_len, ttl_seconds=ttl_seconds
+                )
+        finally:
+            await cache.release_lock(lock_key, token)
+    return items[0] if items and kept else None
+
+
+@dataclass(frozen=True)
+class PoolSpec:
+    """One Redis list pool and the batch generator that refills it."""
+
+    name: str
+    key: str
+    low_watermark: int
+    high_watermark: int
+    max_len: int
+    ttl_seconds: int
+    generate: Callable[[], Awaitable[list[str]]]
+
+
+@dataclass(frozen=True)
+class BucketedPool:
+    """A pool family with one list per player-state bucket.
+
+    `key_template` has a `{bucket}` field and the watermarks apply to each
+    bucket; only `always_warm` buckets and those players read recently get a
+    refiller, since most of the 48 buckets are empty most of the time.
+    """
+
+    name: str
+    key_template: str
+    low_watermark: int
+    high_watermark: int
+    max_len: int
+    ttl_seconds: int
+    generate: Callable[[str], Awaitable[list[str]]]
+    always_warm: tuple[str, ...] = ()
+
+    def spec(self, bucket: str) -> PoolSpec:
+        return PoolSpec(
+            name=f"{self.name}:{bucket}",
+            key=self.key_template.format(bucket=bucket),
+            low_watermark=self.low_watermark,
+            high_watermark=self.high_watermark,
+            max_len=self.max_len,
+            ttl_seconds=self.ttl_seconds,
+            generate=lambda: self.generate(bucket),
+        )
+
+
+class PoolRefiller:
+    """Keeps one pool above its demand-scaled low watermark."""
+
+    def __init__(
+        self,
+        spec: PoolSpec,
+        client_factory: Callable[[], StateBackend] = RedisCache.get_client,
+        batch_slots: Optional[asyncio.Semaphore] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.spec = spec
+        self._client_factory = client_factory
+        self._batch_slots = batch_slots or asyncio.Semaphore(WORKER_MAX_BATCHES)
+        self._clock = clock
+        self.rate = 0.0
+        self.depth = 0
+        self._batch_size = 3.0
+        self._last_depth: Optional[int] = None
+        self._last_pushed = 0
+        self._last_seen = 0.0
+
+    def target_low(self) -> int:
+        demand = math.ceil(self.rate * DEMAND_HORIZON_SECONDS)
+        return min(self.spec.max_len, max(self.spec.low_watermark, demand))
+
+    def target_high(self) -> int:
+        band = self.spec.high_watermark - self.spec.low_watermark
+        return min(
+            self.spec.max_len,
+            max(self.spec.high_watermark, self.target_low() + band),
+        )
+
+    def next_check_in(self) -> float:
+        """Check again well before observed demand reaches the low watermark."""
+        if self.rate <= 0:
+            return MAX_CHECK_SECONDS
+        headroom = max(0, self.depth - self.target_low())
+        return min(MAX_CHECK_SECONDS, max(MIN_CHECK_SECONDS, headroom / self.rate / 2))
+
+    async def _observe(self, client: StateBackend) -> None:
+        depth = int(await client.llen(self.spec.key))
+        pushed = int(await client.hget(POOL_PUSHED_KEY, self.spec.name) or 0)
+        now = self._clock()
+        if self._last_depth is not None and now > self._last_seen:
+            # TTL expiry and trimming count as consumption, which only makes
+            # the refill a little eager.
+            consumed = max(0, self._last_depth + pushed - self._last_pushed - depth)
+            instant = consumed / (now - self._last_seen)
+            self.rate += _SMOOTHING * (instant - self.rate)
+        self._last_depth, self._last_pushed, self._last_seen = depth, pushed, now
+        self.depth = depth
+        POOL_DEPTH.set(depth, pool=self.spec.name)
+        POOL_CONSUMPTION.set(round(self.rate, 4), pool=self.spec.name)
+
+    async def check_once(self) -> int:
+        """Observe the pool and refill it if needed; returns items pushed."""
+        client = self._client_factory()
+        await self._observe(client)
+        if self.depth >= self.target_low():
+            return 0
+        lock_key = POOL_LOCK_KEY.format(name=self.spec.name)
+        token = uuid.uuid4().hex
+        if not await client.set(lock_key, token, ex=REFILL_LOCK_SECONDS, nx=True):
+            return 0
+        try:
+            return await self._fill(client)
+        finally:
+            await client.delete_if_equals(lock_key, token)
+
+    async def _fill(self, client: StateBackend) -> int:
+        high = self.target_high()
+        total = 0
+        while self.depth < high:
+            batches = min(
+                POOL_PARALLEL_BATCHES,
+                max(1, math.ceil((high - self.depth) / self._batch_size)),
+            )
+            results = await asyncio.gather(
+                *(self._generate_batch() for _ in range(batches))
+            )
+            items = [item for batch in results for item in batch]
+            if not items:
+                break
+            async with client.pipeline() as pipe:
+                pipe.rpush(self.spec.key, *items)
+                pipe.ltrim(self.spec.key, -self.spec.max_len, -1)
+                pipe.expire(self.spec.key, self.spec.ttl_seconds)
+                pipe.hincrby(POOL_PUSHED_KEY, self.spec.name, len(items))
+                pipe.llen(self.spec.key)
+                result = await pipe.execute()
+            self.depth = int(result[-1])
+            total += len(items)
+        POOL_DEPTH.set(self.depth, pool=self.spec.name)
+        return total
+
+    async def _generate_batch(self) -> list[str]:
+        async with self._batch_slots:
+            try:
+                items = await self.spec.generate()
+            except Exception as exc:
+                POOL_BATCHES.inc(pool=self.spec.name, result="error")
+                logger.warning("Refilling pool %s failed: %s", self.spec.name, exc)
+                return []
+        if not items:
+            POOL_BATCHES.inc(pool=self.spec.name, result="empty")
+            return []
+        POOL_BATCHES.inc(pool=self.spec.name, result="ok")
+        self._batch_size += _SMOOTHING * (len(items) - self._batch_size)
+        return items
+
+    async def run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                await self.check_once()
+                backoff = 1.0
+                delay = self.next_check_in()
+            except Exception as exc:
+                logger.warning(
+                    "Pool %s refiller error, retrying in %.0fs: %s",
+                    self.spec.name,
+                    backoff,
+                    exc,
+                )
+                delay = backoff
+                backoff = min(backoff * 2, _MAX_BACKOFF_SECONDS)
+            await asyncio.sleep(delay)
+
+
+def _refill_stats() -> dict[str, Any]:
+    """Neutral player state used for prompts when no player is waiting."""
+    return {
+        stat_id: definition.default
+        for stat_id, definition in stat_definitions.by_id.items()
+    }
+
+
+def _new_player_bucket() -> str:
+    return PlayerStateVector.from_stats(_refill_stats()).pool_bucket()
+
+
+async def serialize_batch(batch: Awaitable[list[dict[str, Any]]]) -> list[str]:
+    """Serialize a generated batch into the strings stored in Redis pools."""
+    return [json.dumps(item, ensure_ascii=False) for item in await batch]
+
+
+PoolConfig = Union[PoolSpec, BucketedPool]
+
+
+def default_pool_specs() -> list[PoolConfig]:
+    """Pools whose platform credentials are configured in this deployment."""
+    from app.core import dingtalk_llm, llm
+
+    warm = (_new_player_bucket(),)
+    specs: list[PoolConfig] = []
+    api_key, _, _ = llm._resolve_llm_config()
+    if api_key:
+        specs.append(
+            BucketedPool(
+                name="events",
+                key_template=llm.EVENTS_POOL_KEY,
+                low_watermark=3,
+                high_watermark=9,
+                max_len=llm.EVENTS_CACHE_MAX_LEN,
+                ttl_seconds=llm.EVENTS_CACHE_TTL_SECONDS,
+                generate=lambda bucket: serialize_batch(
+                    llm.generate_random_event_batch(stats_for_pool_bucket(bucket))
+                ),
+                always_warm=warm,
+            )
+        )
+        specs.append(
+            BucketedPool(
+                name="cc98",
+                key_template=llm.CC98_POOL_KEY,
+                low_watermark=5,
+                high_watermark=15,
+                max_len=llm.CC98_CACHE_MAX_LEN,
+                ttl_seconds=llm.CC98_CACHE_TTL_SECONDS,
+                generate=lambda bucket: llm.generate_cc98_batch(
+                    stats_for_pool_bucket(bucket)
+                ),
+                always_warm=warm,
+            )
+        )
+        # DingTalk contexts are already chosen from the player's state.
+        for context in llm.DINGTALK_CONTEXTS:
+            specs.append(
+                PoolSpec(
+                    name=f"dingtalk:{context}",
+                    key=llm.DINGTALK_POOL_KEY.format(context=context),
+                    low_watermark=3,
+                    high_watermark=10,
+                    max_len=llm.DINGTALK_CACHE_MAX_LEN,
+                    ttl_seconds=llm.DINGTALK_CACHE_TTL_SECONDS,
+                    generate=lambda context=context: serialize_batch(
+                        llm.generate_dingtalk_batch(_refill_stats(), context)
+                    ),
+                )
+            )
+    if settings.MINIMAX_API_KEY:
+        specs.append(
+            BucketedPool(
+                name="m2her",
+                key_template=dingtalk_llm.M2HER_POOL_KEY,
+                low_watermark=2,
+                high_watermark=6,
+                max_len=dingtalk_llm.M2HER_CACHE_MAX_LEN,
+                ttl_seconds=dingtalk_llm.M2HER_CACHE_TTL_SECONDS,
+                generate=lambda bucket: serialize_batch(
+                    dingtalk_llm.generate_m2her_batch(stats_for_pool_bucket(bucket))
+                ),
+                always_warm=warm,
+            )
+        )
+    return specs
+
+
+class ContentPoolWarmer:
+    """Runs one refiller task per configured pool or live bucket in this worker."""
+
+    def __init__(
+        self,
+        specs_factory: Callable[[], list[PoolConfig]] = default_pool_specs,
+        client_factory: Callable[[], StateBackend] = RedisCache.get_client,
+        max_batches: int = WORKER_MAX_BATCHES,
+    ):
+        self._specs_factory = specs_factory
+        self._client_factory = client_factory
+        self._max_batches = max_batches
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        slots = asyncio.Semaphore(self._max_batches)
+        for spec in self._specs_factory():
+            if isinstance(spec, BucketedPool):
+                task = self._watch_buckets(spec, slots)
+            else:
+                task = PoolRefiller(spec, self._client_factory, slots).run()
+            self._tasks.append(
+                asyncio.create_task(task, name=f"pool-refill:{spec.name}")
+            )
+
+    async def _watch_buckets(
+        self, pool: BucketedPool, slots: asyncio.Semaphore
+    ) -> None:
+        """Start refillers for buckets in demand and stop those gone idle."""
+        refillers: dict[str, asyncio.Task] = {}
+        try:
+            while True:
+                wanted = set(pool.always_warm) | set(active_buckets(pool.name))
+                for bucket in wanted - refillers.keys():
+                    spec = pool.spec(bucket)
+                    refiller = PoolRefiller(spec, self._client_factory, slots)
+                    refillers[bucket] = asyncio.create_task(
+                        refiller.run(), name=f"pool-refill:{spec.name}"
+                    )
+                for bucket in refillers.keys() - wanted:
+                    refillers.pop(bucket).cancel()
+                await asyncio.sleep(BUCKET_SCAN_SECONDS)
+        finally:
+            for task in refillers.values():
+                task.cancel()
+            await asyncio.gather(*refillers.values(), return_exceptions=True)
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+content_pool_warmer = ContentPoolWarmer()
@@ -0,0 +1,74 @@
+"""Bounded conversation context for DingTalk reply prompts.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Reply prompts carry the contact's rolling summary plus as many recent turns as
+fit a fixed token budget, so prompt size stays flat as a conversation grows.
+"""
+
+from typing import Any
+
+from app.core.llm_admission import estimate_tokens
+from app.core.metrics import metrics
+
+# Token budget for summary plus recent turns in one reply prompt.
+DINGTALK_CONTEXT_TOKEN_BUDGET = 600
+# Whole-prompt ceiling checked by scripts/report_dingtalk_prompt_tokens.py.
+DINGTALK_PROMPT_TOKEN_BUDGET = 1200
+DINGTALK_RECENT_TURNS = 6
+DINGTALK_SUMMARY_MAX_CHARS = 200
+_TURN_MAX_CHARS = 160
+
+PROMPT_TOKENS = metrics.histogram(
+    "zjus_dingtalk_prompt_tokens",
+    "Estimated prompt tokens per DingTalk reply, by generation path.",
+    buckets=(250, 500, 750, 1000, 1500, 2000, 3000),
+)
+
+
+def text_tokens(text: str) -> int:
+    return estimate_tokens([{"content": text}], 0)
+
+
+def _turn_line(msg: dict[str, Any], sender: str) -> str:
+    speaker = "玩家" if msg.get("speaker") == "player" else sender
+    content = str(msg.get("content") or "").strip()
+    return f"{speaker}: {content[:_TURN_MAX_CHARS]}" if content else ""
+
+
+def conversation_context(
+    sender: str,
+    history: list[dict[str, Any]],
+    summary: str = "",
+    *,
+    budget: int = DINGTALK_CONTEXT_TOKEN_BUDGET,
+    recent: int = DINGTALK_RECENT_TURNS,
+) -> str:
+    """Summary line plus the newest turns that fit `budget`, oldest first.
+
+    The latest turn is always kept; older turns drop out once the budget is
+    spent, since the summary already covers earlier rounds.
+    """
+    summary = summary.strip()[:DINGTALK_SUMMARY_MAX_CHARS]
+    header = f"此前聊天摘要：{summary}" if summary else ""
+    used = text_tokens(header)
+    lines: list[str] = []
+    for msg in reversed(history[-recent:] if recent > 0 else []):
+        line = _turn_line(msg, sender)
+        if not line:
+            continue
+        cost = text_tokens(line)
+        if lines and used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    lines.reverse()
+    return "\n".join([header, *lines] if header else lines)
+
+
+def extractive_summary(
+    previous: str, round_messages: list[dict[str, Any]], sender: str
+) -> str:
+    """Library fallback: the previous summary plus this round's turns, tail-kept."""
+    lines = [_turn_line(msg, sender) for msg in round_messages]
+    text = "；".join(part for part in [previous.strip(), *lines] if part)
+    return text[-DINGTALK_SUMMARY_MAX_CHARS:]
@@ -8,17 +8,31 @@ Notes:
     fallback behavior.
 """
 
+import asyncio
 import json
 import logging
 import random
-from pathlib import Path
 from typing import Any, Dict, List, Optional, cast
 
 from openai import APITimeoutError, AsyncOpenAI, OpenAIError
 
 from app.api.cache import RedisCache
 from app.core.config import settings
+from app.core.content_pools import (
+    bucketed_pool_keys,
+    flight_waiters,
+    pop_or_generate,
+)
+from app.core.dingtalk_context import PROMPT_TOKENS, conversation_context
 from app.core.input_safety import safe_username_for_prompt
+from app.core.llm_admission import (
+    create_chat_completion,
+    estimate_tokens,
+    stream_chat_completion,
+)
+from app.core.llm_clients import ClientPool
+from app.core.reply_stream import DeltaCallback, ReplyTextStream
+from app.core.world_bundle import read_world_json, world_dir
 from app.game.stat_definitions import stat_definitions
 from app.schemas.dingtalk import (
     build_contact_id,
@@ -60,11 +74,18 @@ _M2HER_ALLOWED_ROLES = {
 }
 
 # Redis-backed cache for platform-default generated messages.
-_CACHE_KEY = "game:dingtalk_m2her"
-_CACHE_MAX_LEN = 100
-_CACHE_TTL_SECONDS = 6 * 60 * 60
+M2HER_POOL_KEY = "game:dingtalk_m2her:{bucket}"
+M2HER_CACHE_MAX_LEN = 100
+M2HER_CACHE_TTL_SECONDS = 6 * 60 * 60
 _CHARACTER_CACHE: List[Dict[str, Any]] | None = None
 _M2HER_CLIENTS: dict[tuple[str, str], AsyncOpenAI] = {}
+# Player RP keys lease pooled clients instead of opening one per call.
+_PLAYER_M2HER_CLIENTS = ClientPool(
+    "m2her",
+    lambda api_key, base_url: AsyncOpenAI(
+        api_key=api_key, base_url=base_url, timeout=15.0
+    ),
+)
 _DEFAULT_M2HER_BASE_URL = "https://api.minimaxi.com/v1"
 
 _FALLBACK_REPLY_OPTIONS = {
@@ -87,15 +108,8 @@ def _load_characters() -> List[Dict[str, Any]]:
     if _CHARACTER_CACHE is not None:
         return _CHARACTER_CACHE
 
-    base_dir = Path(__file__).resolve().parent.parent.parent
-    char_path = (
-        Path("/app/world/characters.json")
-        if Path("/app/world/characters.json").exists()
-        else base_dir / "world" / "characters.json"
-    )
     try:
-        with open(char_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = read_world_json(world_dir() / "characters.json")
         _CHARACTER_CACHE = data if isinstance(data, list) else []
     except Exception:
         logger.error("Failed to load characters.json")
@@ -201,6 +215,26 @@ async def _generate_reply_options_via_m2her(
     return _coerce_reply_options(data.get("reply_options"), role)
 
 
+_COMBINED_OPENER_INSTRUCTION = (
+    "\n（请用 JSON 输出这条消息和玩家可点的 2-3 个短回复："
+    '{"content":"消息","reply_options":["回复1","回复2","回复3"]}）'
+)
+
+
+def _split_combined_opener(
+    raw: Optional[str], role: str
+) -> tuple[Optional[str], Optional[list[dict[str, str]]]]:
+    """Opener text plus reply options, or None options for a prose answer."""
+    data = _json_from_text(raw)
+    content = data.get("content") if data else None
+    if isinstance(content, str) and content.strip():
+        options = data.get("reply_options")
+        if isinstance(options, list):
+            return content.strip(), _coerce_reply_options(options, role)
+        return content.strip(), None
+    return (raw.strip() or None) if raw else None, None
+
+
 async def generate_dingtalk_for_character_via_m2her(
     character: Dict[str, Any],
     player_stats: dict,
@@ -212,20 +246,33 @@ async def generate_dingtalk_for_character_via_m2her(
     if not api_key:
         return None
 
-    messages = _build_m2her_messages(character, player_stats, context)
-    content = await _call_m2her_api(messages, llm_override=llm_override)
-    if not content:
-        return None
-
     sender = str(character.get("name") or "未知")
     role = normalize_dingtalk_role(str(character.get("role") or "unknown"))
-    reply_options = await _generate_reply_options_via_m2her(
-        character,
-        player_stats,
-        content,
-        context,
+    messages = _build_m2her_messages(character, player_stats, context)
+    replyable = is_replyable_role(role)
+    if replyable:
+        # Ask for the reply options in the same completion as the opener.
+        messages[-1] = {
+            "role": "user",
+            "content": messages[-1]["content"] + _COMBINED_OPENER_INSTRUCTION,
+        }
+    raw = await _call_m2her_api(
+        messages,
+        max_completion_tokens=320 if replyable else 200,
         llm_override=llm_override,
     )
+    content, reply_options = _split_combined_opener(raw, role)
+    if not content:
+        return None
+    if reply_options is None:
+        # The model answered in plain prose; fetch options separately.
+        reply_options = await _generate_reply_options_via_m2her(
+            character,
+            player_stats,
+            content,
+            context,
+            llm_override=llm_override,
+        )
     contact_id = build_contact_id(sender, role)
     is_urgent = role in ("counselor", "system", "teacher")
     return {
@@ -349,8 +396,12 @@ async def _call_m2her_api(
     messages: List[Dict],
     max_completion_tokens: int = 200,
     llm_override: Optional[dict[str, Any]] = None,
+    on_delta: Optional[DeltaCallback] = None,
 ) -> Optional[str]:
-    """Call MiniMax M2-her through the OpenAI-compatible SDK surface."""
+    """Call MiniMax M2-her through the OpenAI-compatible SDK surface.
+
+    `on_delta` switches to a streamed completion that forwards raw deltas.
+    """
     api_key, model, base_url = _resolve_m2her_config(llm_override)
     payload_messages = _sanitize_m2her_messages(messages)
 
@@ -358,19 +409,33 @@ async def _call_m2her_api(
         return None
 
     client: AsyncOpenAI | None = None
-    should_close_client = _has_custom_m2her_api_key(llm_override)
+    is_player_key = _has_custom_m2her_api_key(llm_override)
     try:
         client = (
-            AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=15.0)
-            if should_close_client
+            _PLAYER_M2HER_CLIENTS.acquire(api_key, base_url)
+            if is_player_key
             else await _get_m2her_client(api_key, base_url)
         )
-        response = await client.chat.completions.create(
-            model=model,
-            messages=cast(Any, payload_messages),
-            temperature=1.0,
-            top_p=0.95,
-            max_completion_tokens=max_completion_tokens,
+        request: dict[str, Any] = {
+            "model": model,
+            "messages": cast(Any, payload_messages),
+            "temperature": 1.0,
+            "top_p": 0.95,
+            "max_completion_tokens": max_completion_tokens,
+        }
+        # A player's own M2-her key is admitted apart from the platform key.
+        credential = api_key if is_player_key else None
+        if on_delta is not None:
+            text = await stream_chat_completion(
+                client,
+                base_url=base_url,
+                on_delta=on_delta,
+                credential=credential,
+                **request,
+            )
+            return text.strip() or None
+        response = await create_chat_completion(
+            client, base_url=base_url, credential=credential, **request
         )
         choices = response.choices or []
         if choices:
@@ -389,8 +454,8 @@ async def _call_m2her_api(
         logger.error("M2-her API call failed: %s", e)
         return None
     finally:
-        if should_close_client and client is not None:
-            await client.close()
+        if is_player_key and client is not None:
+            await _PLAYER_M2HER_CLIENTS.release(client)
 
 
 def _normalize_m2her_base_url(base_url: str | None) -> str:
@@ -446,10 +511,11 @@ async def _get_m2her_client(api_key: str, base_url: str) -> AsyncOpenAI:
 
 
 async def close_m2her_client() -> None:
-    """Close cached platform MiniMax clients during application shutdown."""
+    """Close cached platform and pooled player MiniMax clients at shutdown."""
     for client in list(_M2HER_CLIENTS.values()):
         await client.close()
     _M2HER_CLIENTS.clear()
+    await _PLAYER_M2HER_CLIENTS.close()
 
 
 # ==========================================
@@ -498,110 +564,174 @@ async def _select_characters_vectorized(
 # Public generation entry point.
 # ==========================================
 
-async def generate_dingtalk_via_m2her(
+async def generate_m2her_batch(
     player_stats: dict,
     context: str = "random",
     llm_override: Optional[dict[str, Any]] = None,
-) -> Optional[Dict[str, Any]]:
-    """
-    Generate one role-play DingTalk message through M2-her.
-
-    Returns:
-        A DingTalk payload dictionary, or None so the caller can fall back.
-    """
-    # Missing credentials mean the engine should use its fallback generator.
-    api_key, _, _ = _resolve_m2her_config(llm_override)
-    if not api_key:
-        return None
+) -> List[Dict[str, Any]]:
+    """Generate opening messages from up to three characters concurrently."""
+    tasks = await _start_m2her_candidates(player_stats, context, llm_override)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return [r for r in results if isinstance(r, dict)]
 
-    use_shared_cache = llm_override is None
-    # Shared cache is only safe for the platform key, not user RP keys.
-    if use_shared_cache:
-        cached = await RedisCache.lpop(_CACHE_KEY)
-        if cached:
-            try:
-                cached_data = json.loads(cached) if isinstance(cached, str) else cached
-                return cached_data if isinstance(cached_data, dict) else None
-            except (json.JSONDecodeError, TypeError):
-                pass
 
+async def _start_m2her_candidates(
+    player_stats: dict,
+    context: str,
+    llm_override: Optional[dict[str, Any]] = None,
+) -> list[asyncio.Task]:
+    """Start one opener task per candidate character."""
     # Prefer vector-selected characters, then fall back to random sampling.
     unique_chars = await _select_characters_vectorized(player_stats, context)
 
     if not unique_chars:
         characters = _load_characters()
         if not characters:
-            return None
+            return []
         unique_chars = random.sample(characters, min(3, len(characters)))
 
-    # Generate multiple candidate messages concurrently.
-    import asyncio
-
-    async def _generate_one(char: Dict) -> Optional[Dict[str, Any]]:
-        return await generate_dingtalk_for_character_via_m2her(
-            char,
-            player_stats,
-            context,
-            llm_override=llm_override,
+    return [
+        asyncio.ensure_future(
+            generate_dingtalk_for_character_via_m2her(
+                char,
+                player_stats,
+                context,
+                llm_override=llm_override,
+            )
         )
+        for char in unique_chars
+    ]
 
-    results = await asyncio.gather(
-        *[_generate_one(c) for c in unique_chars],
-        return_exceptions=True,
-    )
 
-    valid_results = [
-        r for r in results
-        if isinstance(r, dict)
-    ]
+async def _first_m2her_candidate(
+    tasks: list[asyncio.Task],
+) -> tuple[Optional[Dict[str, Any]], list[Dict[str, Any]], set[asyncio.Task]]:
+    """Wait for the first usable opener.
 
-    if not valid_results:
-        return None
+    Returns it, any other openers that finished alongside it, and the tasks
+    still running.
+    """
+    pending = set(tasks)
+    first: Optional[Dict[str, Any]] = None
+    extras: list[Dict[str, Any]] = []
+    while pending and first is None:
+        done, pending = await asyncio.wait(
+            pending, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            result = None if task.exception() else task.result()
+            if not isinstance(result, dict):
+                continue
+            if first is None:
+                first = result
+            else:
+                extras.append(result)
+    return first, extras, pending
+
+
+_background_tasks: set[asyncio.Task] = set()
 
-    # Return the first candidate and cache the rest for platform-key sessions.
-    current_msg = valid_results[0]
-    remaining = [json.dumps(m, ensure_ascii=False) for m in valid_results[1:]]
 
-    if use_shared_cache and remaining:
+async def _pool_remaining_candidates(key: str, pending: set[asyncio.Task]) -> None:
+    """Push openers that finished after the players were served to the pool."""
+    results = await asyncio.gather(*pending, return_exceptions=True)
+    items = [r for r in results if isinstance(r, dict)]
+    if items:
         await RedisCache.rpush_many_with_limit(
-            _CACHE_KEY,
-            remaining,
-            max_len=_CACHE_MAX_LEN,
-            ttl_seconds=_CACHE_TTL_SECONDS,
+            key,
+            [json.dumps(item, ensure_ascii=False) for item in items],
+            max_len=M2HER_CACHE_MAX_LEN,
+            ttl_seconds=M2HER_CACHE_TTL_SECONDS,
         )
 
-    return current_msg
 
+async def _generate_first_m2her(
+    player_stats: dict, context: str, key: str
+) -> list[str]:
+    """Serve the first finished platform openers; the rest feed `key`.
 
-async def generate_dingtalk_reply_via_m2her(
-    character: Dict[str, Any],
+    Openers are collected until the leader and every waiter coalesced onto
+    this batch have one, so no local waiter starts a batch of its own.
+    """
+    tasks = await _start_m2her_candidates(player_stats, context)
+    served: list[Dict[str, Any]] = []
+    pending: set[asyncio.Task] = set(tasks)
+    try:
+        while pending and len(served) < 1 + flight_waiters(key):
+            first, extras, pending = await _first_m2her_candidate(list(pending))
+            if first is None:
+                break
+            served.append(first)
+            served.extend(extras)
+    finally:
+        if pending:
+            task = asyncio.ensure_future(_pool_remaining_candidates(key, pending))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+    return [json.dumps(item, ensure_ascii=False) for item in served]
+
+
+async def generate_dingtalk_via_m2her(
     player_stats: dict,
-    history: list[dict[str, Any]],
-    player_reply: str,
-    reply_count: int,
+    context: str = "random",
     llm_override: Optional[dict[str, Any]] = None,
 ) -> Optional[Dict[str, Any]]:
-    """Generate an NPC reply and settle the round after the third player reply."""
+    """
+    Generate one role-play DingTalk message through M2-her.
+
+    Returns:
+        A DingTalk payload dictionary, or None so the caller can fall back.
+    """
+    # Missing credentials mean the engine should use its fallback generator.
     api_key, _, _ = _resolve_m2her_config(llm_override)
     if not api_key:
         return None
 
-    sender = str(character.get("name") or "未知")
-    role = normalize_dingtalk_role(str(character.get("role") or "unknown"))
-    if not is_replyable_role(role):
+    # Shared cache is only safe for the platform key, not user RP keys, so
+    # the slower player-key candidates are simply cancelled.
+    if llm_override is not None:
+        tasks = await _start_m2her_candidates(player_stats, context, llm_override)
+        first, _, pending = await _first_m2her_candidate(tasks)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return first
+
+    # The first finished candidate answers the player; the others keep
+    # running and land in the pool for the next miss.
+    bucket, key, neighbours = bucketed_pool_keys(M2HER_POOL_KEY, player_stats)
+    cached = await pop_or_generate(
+        "m2her",
+        key,
+        lambda: _generate_first_m2her(player_stats, context, key),
+        cache=RedisCache,
+        max_len=M2HER_CACHE_MAX_LEN,
+        ttl_seconds=M2HER_CACHE_TTL_SECONDS,
+        bucket=bucket,
+        fallback_keys=neighbours,
+    )
+    if not cached:
+        return None
+    try:
+        cached_data = json.loads(cached) if isinstance(cached, str) else cached
+    except (json.JSONDecodeError, TypeError):
         return None
+    return cached_data if isinstance(cached_data, dict) else None
 
-    history_lines = []
-    for msg in history[-8:]:
-        speaker = "玩家" if msg.get("speaker") == "player" else sender
-        content = str(msg.get("content") or "").strip()
-        if content:
-            history_lines.append(f"{speaker}: {content}")
-    history_text = "\n".join(history_lines)
-    should_settle = reply_count >= 3
 
+def build_m2her_reply_messages(
+    character: Dict[str, Any],
+    player_stats: dict,
+    history: list[dict[str, Any]],
+    player_reply: str,
+    reply_count: int,
+    summary: str = "",
+) -> List[Dict[str, Any]]:
+    """M2-her messages for one DingTalk reply, history bounded by budget."""
+    sender = str(character.get("name") or "未知")
+    history_text = conversation_context(sender, history, summary)
     messages = _build_m2her_messages(character, player_stats, "random")
-    if should_settle:
+    if reply_count >= 3:
         request = (
             "以下是当前私聊历史：\n"
             f"{history_text}\n玩家刚回复：{player_reply}\n"
@@ -621,8 +751,41 @@ async def generate_dingtalk_reply_via_m2her(
         )
 
     messages.append({"role": "user", "content": request})
+    return messages
+
+
+async def generate_dingtalk_reply_via_m2her(
+    character: Dict[str, Any],
+    player_stats: dict,
+    history: list[dict[str, Any]],
+    player_reply: str,
+    reply_count: int,
+    llm_override: Optional[dict[str, Any]] = None,
+    on_delta: Optional[DeltaCallback] = None,
+    summary: str = "",
+) -> Optional[Dict[str, Any]]:
+    """Generate an NPC reply and settle the round after the third player reply.
+
+    With `on_delta`, the NPC reply text is forwarded while it streams.
+    """
+    api_key, _, _ = _resolve_m2her_config(llm_override)
+    if not api_key:
+        return None
+
+    role = normalize_dingtalk_role(str(character.get("role") or "unknown"))
+    if not is_replyable_role(role):
+        return None
+    should_settle = reply_count >= 3
+
+    messages = build_m2her_reply_messages(
+        character, player_stats, history, player_reply, reply_count, summary
+    )
+    PROMPT_TOKENS.observe(estimate_tokens(messages, 0), path="m2her")
     raw = await _call_m2her_api(
-        messages, max_completion_tokens=420, llm_override=llm_override
+        messages,
+        max_completion_tokens=420,
+        llm_override=llm_override,
+        on_delta=ReplyTextStream(on_delta) if on_delta is not None else None,
     )
     if not raw:
         return None
@@ -0,0 +1,172 @@
+"""Hedged primary/secondary generation for latency-sensitive LLM content.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+When the primary source has not answered by its rolling p90 latency, the
+secondary starts too and the first usable answer wins; the loser is cancelled.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.llm_admission import ProviderGate
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Until enough primary samples exist the hedge fires after the default delay.
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY_SECONDS = 4.0
+HEDGE_MIN_DELAY_SECONDS = 0.5
+HEDGE_MAX_DELAY_SECONDS = 10.0
+_LATENCY_WINDOW = 200
+
+HEDGES = metrics.counter(
+    "zjus_llm_hedges_total",
+    "Hedged generations by outcome.",
+)
+HEDGE_DELAY = metrics.gauge(
+    "zjus_llm_hedge_delay_seconds",
+    "Current hedge delay: the primary's rolling p90 latency.",
+)
+
+
+class LatencyTracker:
+    """Rolling window of primary latencies for one hedged call site."""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def p90(self) -> Optional[float]:
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.9 * len(ordered)) - 1)]
+
+    def hedge_delay(self) -> float:
+        p90 = self.p90()
+        if p90 is None:
+            return HEDGE_DEFAULT_DELAY_SECONDS
+        return min(HEDGE_MAX_DELAY_SECONDS, max(HEDGE_MIN_DELAY_SECONDS, p90))
+
+
+_trackers: dict[str, LatencyTracker] = {}
+
+
+def tracker_for(name: str) -> LatencyTracker:
+    tracker = _trackers.get(name)
+    if tracker is None:
+        tracker = _trackers[name] = LatencyTracker()
+    return tracker
+
+
+@dataclass(frozen=True)
+class HedgeResult(Generic[T]):
+    """The winning value and where it came from.
+
+    `source` is "primary", "secondary", or None when both came back empty;
+    `primary_failed` means the primary errored or returned nothing, as
+    opposed to merely losing the race.
+    """
+
+    value: Optional[T]
+    source: Optional[str]
+    primary_failed: bool
+
+
+def _value(task: "asyncio.Task[Any]", name: str, side: str) -> Any:
+    try:
+        return task.result()
+    except Exception as exc:
+        logger.warning("Hedged %s %s failed: %s", name, side, exc)
+        return None
+
+
+async def hedged(
+    name: str,
+    primary: Callable[[], Awaitable[Optional[T]]],
+    secondary: Callable[[], Awaitable[Optional[T]]],
+    *,
+    secondary_gate: Optional[ProviderGate] = None,
+    enabled: Optional[bool] = None,
+) -> HedgeResult[T]:
+    """Run `primary`, falling back to `secondary` when it fails or is slow.
+
+    A failed or empty primary always falls back sequentially, as the call
+    sites did before hedging. With hedging enabled (`LLM_HEDGING`), a primary
+    still running after its p90 latency races a concurrent secondary, unless
+    `secondary_gate` has no room for an extra call.
+    """
+    if enabled is None:
+        enabled = settings.LLM_HEDGING
+    tracker = tracker_for(name)
+    delay = tracker.hedge_delay()
+    HEDGE_DELAY.set(round(delay, 3), name=name)
+    started = time.monotonic()
+    primary_task = asyncio.ensure_future(primary())
+    secondary_task: Optional[asyncio.Task[Any]] = None
+    try:
+        if enabled:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            has_room = secondary_gate is None or secondary_gate.has_capacity()
+            if not done and has_room:
+                secondary_task = asyncio.ensure_future(secondary())
+            elif not done:
+                HEDGES.inc(name=name, outcome="skipped")
+
+        if secondary_task is None:
+            await asyncio.wait({primary_task})
+            tracker.observe(time.monotonic() - started)
+            value = _value(primary_task, name, "primary")
+            if value:
+                HEDGES.inc(name=name, outcome="primary")
+                return HedgeResult(value, "primary", False)
+            try:
+                value = await secondary()
+            except Exception as exc:
+                logger.warning("Hedged %s secondary failed: %s", name, exc)
+                value = None
+            HEDGES.inc(name=name, outcome="fallback" if value else "failed")
+            return HedgeResult(value or None, "secondary" if value else None, True)
+
+        primary_failed = False
+        pending = {primary_task, secondary_task}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            # On a tie the primary's answer is preferred.
+            for task in sorted(done, key=lambda t: t is not primary_task):
+                side = "primary" if task is primary_task else "secondary"
+                value = _value(task, name, side)
+                if task is primary_task:
+                    tracker.observe(time.monotonic() - started)
+                    primary_failed = not value
+                if value:
+                    HEDGES.inc(name=name, outcome=f"{side}_won")
+                    return HedgeResult(value, side, primary_failed)
+        HEDGES.inc(name=name, outcome="failed")
+        return HedgeResult(None, None, True)
+    finally:
+        if not primary_task.done():
+            # A cancelled primary took at least this long; recording it keeps
+            # lost races from dragging the p90 down.
+            tracker.observe(time.monotonic() - started)
+            await _cancel(primary_task)
+        if secondary_task is not None and not secondary_task.done():
+            await _cancel(secondary_task)
+
+
+async def _cancel(task: "asyncio.Task[Any]") -> None:
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
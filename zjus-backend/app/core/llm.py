@@ -5,7 +5,7 @@ The functions here generate random events, CC98 posts, and non-RP DingTalk
 fallbacks while preserving deterministic library-mode fallbacks.
 """
 
-import inspect
+import hashlib
 import json
 import logging
 import os
@@ -16,7 +16,29 @@ from openai import AsyncOpenAI
 
 from app.api.cache import RedisCache
 from app.content.state_vector import PlayerStateVector
+from app.core.content_pools import (
+    bucketed_pool_keys,
+    pop_or_generate,
+    pop_pooled,
+    serialize_batch,
+)
+from app.core.dingtalk_context import (
+    DINGTALK_SUMMARY_MAX_CHARS,
+    PROMPT_TOKENS,
+    conversation_context,
+    text_tokens,
+)
 from app.core.input_safety import safe_username_for_prompt
+from app.core.llm_admission import (
+    ProviderGate,
+    create_chat_completion,
+    gate_for,
+    provider_for,
+    stream_chat_completion,
+)
+from app.core.llm_clients import ClientPool, close_client
+from app.core.reply_stream import DeltaCallback, ReplyTextStream
+from app.core.world_bundle import read_world_json, world_dir
 from app.game.stat_definitions import stat_definitions
 from app.schemas.dingtalk import (
     build_contact_id,
@@ -39,6 +61,14 @@ PROVIDER_BASE_URLS = {
 DEFAULT_LLM_MODEL = "gpt-4o-mini"
 DEFAULT_LLM_TIMEOUT_SECONDS = 20.0
 _DEFAULT_LLM_CLIENTS: dict[tuple[str | None, str | None], AsyncOpenAI] = {}
+_PLAYER_LLM_CLIENTS = ClientPool(
+    "llm",
+    lambda api_key, base_url: AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=DEFAULT_LLM_TIMEOUT_SECONDS,
+    ),
+)
 _GRADUATION_COMMENTS_CACHE: dict[str, Any] | None = None
 _DEFAULT_GRADUATION_COMMENT = "学业既成，前程似锦。"
 
@@ -77,8 +107,7 @@ def _load_graduation_comments() -> dict[str, Any]:
 
     path = _resolve_graduation_comments_path()
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = read_world_json(path)
         _GRADUATION_COMMENTS_CACHE = data if isinstance(data, dict) else {}
     except Exception as exc:
         logger.warning("Failed to load graduation comments: %s", exc)
@@ -152,14 +181,26 @@ def _resolve_llm_config(
     return api_key, base_url, model
 
 
+def _player_credential(llm_override: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The player's own API key, which is admitted through its own gate."""
+    api_key = (llm_override or {}).get("api_key")
+    return str(api_key) if api_key else None
+
+
+def llm_gate(llm_override: Optional[Dict[str, Any]] = None) -> ProviderGate:
+    """Admission gate for the generic LLM these settings use."""
+    _, base_url, _ = _resolve_llm_config(llm_override)
+    return gate_for(provider_for(base_url), _player_credential(llm_override))
+
+
 def _get_client(
     api_key: Optional[str], base_url: Optional[str], *, cache: bool = False
 ) -> AsyncOpenAI:
     """Return an OpenAI-compatible async client with explicit timeout.
 
     Platform-default clients are safe to reuse across requests. Player-provided
-    overrides are session-sensitive and should be closed after the single call
-    that needed them, so callers pass `cache=False` for overrides.
+    overrides (`cache=False`) are leased from a bounded LRU pool keyed by an
+    HMAC of the credentials; pair every call with `_release_client`.
     """
     if cache:
         key = (api_key, base_url)
@@ -170,36 +211,23 @@ def _get_client(
                 timeout=DEFAULT_LLM_TIMEOUT_SECONDS,
             )
         return _DEFAULT_LLM_CLIENTS[key]
-    return AsyncOpenAI(
-        api_key=api_key,
-        base_url=base_url,
-        timeout=DEFAULT_LLM_TIMEOUT_SECONDS,
-    )
+    return _PLAYER_LLM_CLIENTS.acquire(api_key, base_url)
 
 
-async def _close_client_if_uncached(client: Any, *, cache: bool) -> None:
-    """Close session-scoped clients without assuming concrete SDK types."""
+async def _release_client(client: Any, *, cache: bool) -> None:
+    """Return a player-key client to its pool; platform clients stay open."""
     if cache:
         return
-    close = getattr(client, "close", None)
-    if close is None:
-        return
-    result = close()
-    if inspect.isawaitable(result):
-        await result
+    await _PLAYER_LLM_CLIENTS.release(client)
 
 
 async def close_llm_clients() -> None:
-    """Close cached platform-default LLM clients during process shutdown."""
+    """Close cached platform and pooled player LLM clients at shutdown."""
     clients = list(_DEFAULT_LLM_CLIENTS.values())
     _DEFAULT_LLM_CLIENTS.clear()
     for client in clients:
-        close = getattr(client, "close", None)
-        if close is None:
-            continue
-        result = close()
-        if inspect.isawaitable(result):
-            await result
+        await close_client(client)
+    await _PLAYER_LLM_CLIENTS.close()
 
 
 def _use_global_content_cache(llm_override: Optional[Dict[str, Any]]) -> bool:
@@ -256,15 +284,21 @@ async def check_llm_availability(llm_override: Optional[Dict[str, Any]] = None)
         return False
     finally:
         if client is not None:
-            await _close_client_if_uncached(client, cache=cache_client)
+            await _release_client(client, cache=cache_client)
 
 
+# Pools are partitioned by PlayerStateVector.pool_bucket().
+CC98_POOL_KEY = "cc98:posts:{bucket}"
 CC98_CACHE_MAX_LEN = 200
 CC98_CACHE_TTL_SECONDS = 6 * 60 * 60
+EVENTS_POOL_KEY = "game:events_pool:{bucket}"
 EVENTS_CACHE_MAX_LEN = 100
 EVENTS_CACHE_TTL_SECONDS = 12 * 60 * 60
+DINGTALK_POOL_KEY = "game:dingtalk_pool:{context}"
 DINGTALK_CACHE_MAX_LEN = 200
 DINGTALK_CACHE_TTL_SECONDS = 6 * 60 * 60
+# Coarse contexts chosen by GameEngine._trigger_dingtalk_message.
+DINGTALK_CONTEXTS = ("random", "low_sanity", "high_stress", "low_gpa")
 _KEYWORDS_CACHE_LOADED = False
 _KEYWORDS_CACHE: list[Any] = []
 
@@ -275,17 +309,8 @@ def _load_keywords():
     if _KEYWORDS_CACHE_LOADED:
         return _KEYWORDS_CACHE
 
-    from pathlib import Path
-
-    base_dir = Path(__file__).resolve().parent.parent.parent
-    kw_path = (
-        Path("/app/world/keywords.json")
-        if Path("/app/world/keywords.json").exists()
-        else base_dir / "world" / "keywords.json"
-    )
     try:
-        with open(kw_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = read_world_json(world_dir() / "keywords.json")
         _KEYWORDS_CACHE = data if isinstance(data, list) else []
     except Exception:
         _KEYWORDS_CACHE = []
@@ -293,6 +318,52 @@ def _load_keywords():
     return _KEYWORDS_CACHE
 
 
+async def generate_cc98_batch(
+    player_stats: dict,
+    effect: Optional[str] = None,
+    trigger: Optional[str] = None,
+    llm_override: Optional[Dict[str, Any]] = None,
+) -> list[str]:
+    """Ask the model for a batch of CC98 posts; the first one follows `trigger`.
+
+    Without a trigger every post is a random campus topic, which is what the
+    background pool refill asks for. LLM errors propagate to the caller.
+    """
+    # Compact state context keeps token usage bounded.
+    state = PlayerStateVector.from_stats(player_stats)
+    if trigger:
+        topic_hint = (
+            f'1. 第一条与"{trigger}"相关（{effect}效果）。\n'
+            f"2. 其余 4 条随机校园话题。\n"
+        )
+    else:
+        topic_hint = "5 条都是随机校园话题，风格各异。\n"
+    prompt = (
+        f"玩家状态：{state.to_prompt_fragment()}\n"
+        f"模拟浙江大学CC98论坛，生成 5 条帖子。\n"
+        f"{topic_hint}"
+        f'\n严格输出 JSON：{{ "posts": ["帖1", "帖2", "帖3", "帖4", "帖5"] }}'
+    )
+    messages: List[Any] = [{"role": "user", "content": prompt}]
+
+    use_cache = _use_global_content_cache(llm_override)
+    api_key, base_url, model = _resolve_llm_config(llm_override)
+    llm_client = _get_client(api_key, base_url, cache=use_cache)
+    try:
+        response = await create_chat_completion(
+            llm_client,
+            base_url=base_url,
+            credential=_player_credential(llm_override),
+            model=model,
+            messages=messages,
+            max_tokens=300,
+        )
+    finally:
+        await _release_client(llm_client, cache=use_cache)
+    data = _json_from_text(response.choices[0].message.content)
+    return _string_list(data.get("posts"))
+
+
 async def generate_cc98_post(
     player_stats: dict,
     effect: str,
@@ -319,81 +390,42 @@ async def generate_cc98_post(
 
     feedback = _random.choice(feedback_map[effect]).format(trigger=trigger)
 
-    # Consume from the Redis pool first so cached content is not duplicated.
-    use_cache = _use_global_content_cache(llm_override)
-    cc98_key = "cc98:posts"
-    if use_cache:
-        post_content = await RedisCache.lpop(cc98_key)
-        if post_content:
-            return post_content, feedback
-
-    # Refill the pool with compact state context to keep token usage bounded.
-    state = PlayerStateVector.from_stats(player_stats)
-    messages: List[Any] = []
-    prompt = (
-        f"玩家状态：{state.to_prompt_fragment()}\n"
-        f"模拟浙江大学CC98论坛，生成 5 条帖子。\n"
-        f'1. 第一条与"{trigger}"相关（{effect}效果）。\n'
-        f"2. 其余 4 条随机校园话题。\n"
-        f'\n严格输出 JSON：{{ "posts": ["帖1", "帖2", "帖3", "帖4", "帖5"] }}'
-    )
-    messages.append({"role": "user", "content": prompt})
-
     try:
-        api_key, base_url, model = _resolve_llm_config(llm_override)
-        llm_client = _get_client(api_key, base_url, cache=use_cache)
-
-        response = await llm_client.chat.completions.create(
-            model=model,
-            messages=messages,
-            max_tokens=300,
-        )
-
-        data = _json_from_text(response.choices[0].message.content)
-        posts = _string_list(data.get("posts"))
-
-        if not posts:
-            return "CC98 现在只有烂坑和吐槽...", feedback
-
-        current_post = posts[0]
-        remaining_posts = posts[1:]
-
-        if use_cache:
-            await RedisCache.rpush_many_with_limit(
-                cc98_key,
-                remaining_posts,
+        # Consume from the shared pool first; concurrent misses share a batch.
+        if _use_global_content_cache(llm_override):
+            bucket, key, neighbours = bucketed_pool_keys(CC98_POOL_KEY, player_stats)
+            post = await pop_or_generate(
+                "cc98",
+                key,
+                lambda: generate_cc98_batch(player_stats, effect, trigger),
+                cache=RedisCache,
                 max_len=CC98_CACHE_MAX_LEN,
                 ttl_seconds=CC98_CACHE_TTL_SECONDS,
+                bucket=bucket,
+                fallback_keys=neighbours,
             )
-
-        return current_post, feedback
+        else:
+            posts = await generate_cc98_batch(
+                player_stats, effect, trigger, llm_override=llm_override
+            )
+            post = posts[0] if posts else None
+        if not post:
+            return "CC98 现在只有烂坑和吐槽...", feedback
+        return post, feedback
 
     except Exception as e:
         print(f"[LLM Error] {e}")
         return "CC98 服务器维护中...", feedback
-    finally:
-        if "llm_client" in locals():
-            await _close_client_if_uncached(llm_client, cache=use_cache)
 
 
-async def generate_random_event(
+async def generate_random_event_batch(
     player_stats: dict,
     history: list | None = None,
     llm_override: Optional[Dict[str, Any]] = None,
-) -> dict[str, Any] | None:
-    """Generate a random event with Redis-backed batch caching."""
-    use_cache = _use_global_content_cache(llm_override)
-    event_key = "game:events_pool"
-
-    # Use the cached pool before paying for another LLM batch.
-    if use_cache:
-        cached_event = await RedisCache.lpop(event_key)
-        if cached_event:
-            return _coerce_cached_json(cached_event)
-
+) -> list[dict[str, Any]]:
+    """Ask the model for a batch of random events; LLM errors propagate."""
     # Compact player state and recent history keep the generation prompt small.
     state = PlayerStateVector.from_stats(player_stats)
-    messages: List[Any] = []
     history_hint = ""
     if history:
         history_hint = f"\n已发生事件（勿重复）：{', '.join(history[-5:])}"
@@ -408,59 +440,85 @@ async def generate_random_event(
         f'{{"id": "B", "text": "...", '
         f'"effects": {{"sanity": 5, "desc": "..."}}}}] }}] }}'
     )
-    messages.append({"role": "user", "content": prompt})
-    try:
-        api_key, base_url, model = _resolve_llm_config(llm_override)
-        llm_client = _get_client(api_key, base_url, cache=use_cache)
+    messages: List[Any] = [{"role": "user", "content": prompt}]
 
-        response = await llm_client.chat.completions.create(
+    use_cache = _use_global_content_cache(llm_override)
+    api_key, base_url, model = _resolve_llm_config(llm_override)
+    llm_client = _get_client(api_key, base_url, cache=use_cache)
+    try:
+        response = await create_chat_completion(
+            llm_client,
+            base_url=base_url,
+            credential=_player_credential(llm_override),
             model=model,
             messages=messages,
             max_tokens=800,
         )
-        data = _json_from_text(response.choices[0].message.content)
-        events = _dict_list(data.get("events"))
+    finally:
+        await _release_client(llm_client, cache=use_cache)
+    data = _json_from_text(response.choices[0].message.content)
+    return _dict_list(data.get("events"))
 
-        if not events:
-            return None
 
-        current_event = events[0]
-        remaining_events = [json.dumps(e, ensure_ascii=False) for e in events[1:]]
-        if use_cache:
-            await RedisCache.rpush_many_with_limit(
-                event_key,
-                remaining_events,
+async def pop_pooled_random_event(
+    player_stats: dict,
+    llm_override: Optional[Dict[str, Any]] = None,
+) -> dict[str, Any] | None:
+    """A pooled event for the player's bucket, or None without generating."""
+    if not _use_global_content_cache(llm_override):
+        return None
+    try:
+        bucket, key, neighbours = bucketed_pool_keys(EVENTS_POOL_KEY, player_stats)
+        cached_event = await pop_pooled(
+            "events", key, cache=RedisCache, bucket=bucket, fallback_keys=neighbours
+        )
+    except Exception as e:
+        logger.warning("Event pool read failed: %s", e)
+        return None
+    return _coerce_cached_json(cached_event) if cached_event else None
+
+
+async def generate_random_event(
+    player_stats: dict,
+    history: list | None = None,
+    llm_override: Optional[Dict[str, Any]] = None,
+) -> dict[str, Any] | None:
+    """Generate a random event with Redis-backed batch caching."""
+    try:
+        # Use the shared pool before paying for another LLM batch.
+        if _use_global_content_cache(llm_override):
+            bucket, key, neighbours = bucketed_pool_keys(EVENTS_POOL_KEY, player_stats)
+            cached_event = await pop_or_generate(
+                "events",
+                key,
+                lambda: serialize_batch(
+                    generate_random_event_batch(player_stats, history)
+                ),
+                cache=RedisCache,
                 max_len=EVENTS_CACHE_MAX_LEN,
                 ttl_seconds=EVENTS_CACHE_TTL_SECONDS,
+                bucket=bucket,
+                fallback_keys=neighbours,
             )
+            return _coerce_cached_json(cached_event) if cached_event else None
 
-        return current_event
+        events = await generate_random_event_batch(
+            player_stats, history, llm_override=llm_override
+        )
+        return events[0] if events else None
     except Exception as e:
         print(f"[LLM Event Error] {e}")
         return None
-    finally:
-        if "llm_client" in locals():
-            await _close_client_if_uncached(llm_client, cache=use_cache)
 
 
-async def generate_dingtalk_message(
+async def generate_dingtalk_batch(
     player_stats: dict,
     context: str = "random",
     llm_override: Optional[Dict[str, Any]] = None,
-):
-    """Generate a DingTalk message with context-scoped Redis batch caching."""
-    use_cache = _use_global_content_cache(llm_override)
-    msg_key = f"game:dingtalk_pool:{context}"
-
-    # Use a context-scoped cached pool before generating a new batch.
-    if use_cache:
-        cached_msg = await RedisCache.lpop(msg_key)
-        if cached_msg:
-            return _coerce_cached_json(cached_msg)
-
+) -> list[dict[str, Any]]:
+    """Ask the model for a batch of DingTalk messages; LLM errors propagate."""
     # Compact state context avoids shipping the full game snapshot to the model.
     state = PlayerStateVector.from_stats(player_stats)
-    request_messages: List[Any] = []
     prompt = (
         f"玩家状态：{state.to_prompt_fragment()}\n"
         f"场景：{context}。\n"
@@ -469,41 +527,52 @@ async def generate_dingtalk_message(
         f'{{ "sender": "发送人", "role": "counselor/student/system/teacher", '
         f'"content": "30字内", "is_urgent": false }}] }}'
     )
-    request_messages.append({"role": "user", "content": prompt})
-    try:
-        api_key, base_url, model = _resolve_llm_config(llm_override)
-        llm_client = _get_client(api_key, base_url, cache=use_cache)
+    request_messages: List[Any] = [{"role": "user", "content": prompt}]
 
-        response = await llm_client.chat.completions.create(
+    use_cache = _use_global_content_cache(llm_override)
+    api_key, base_url, model = _resolve_llm_config(llm_override)
+    llm_client = _get_client(api_key, base_url, cache=use_cache)
+    try:
+        response = await create_chat_completion(
+            llm_client,
+            base_url=base_url,
+            credential=_player_credential(llm_override),
             model=model,
             messages=request_messages,
             max_tokens=500,
         )
-        data = _json_from_text(response.choices[0].message.content)
-        generated_messages = _dict_list(data.get("messages"))
+    finally:
+        await _release_client(llm_client, cache=use_cache)
+    data = _json_from_text(response.choices[0].message.content)
+    return _dict_list(data.get("messages"))
 
-        if not generated_messages:
-            return None
 
-        current_msg = generated_messages[0]
-        remaining_msgs = [
-            json.dumps(m, ensure_ascii=False) for m in generated_messages[1:]
-        ]
-        if use_cache:
-            await RedisCache.rpush_many_with_limit(
-                msg_key,
-                remaining_msgs,
+async def generate_dingtalk_message(
+    player_stats: dict,
+    context: str = "random",
+    llm_override: Optional[Dict[str, Any]] = None,
+):
+    """Generate a DingTalk message with context-scoped Redis batch caching."""
+    try:
+        # Use the context-scoped shared pool before generating a new batch.
+        if _use_global_content_cache(llm_override):
+            cached_msg = await pop_or_generate(
+                f"dingtalk:{context}",
+                DINGTALK_POOL_KEY.format(context=context),
+                lambda: serialize_batch(generate_dingtalk_batch(player_stats, context)),
+                cache=RedisCache,
                 max_len=DINGTALK_CACHE_MAX_LEN,
                 ttl_seconds=DINGTALK_CACHE_TTL_SECONDS,
             )
+            return _coerce_cached_json(cached_msg) if cached_msg else None
 
-        return current_msg
+        generated_messages = await generate_dingtalk_batch(
+            player_stats, context, llm_override=llm_override
+        )
+        return generated_messages[0] if generated_messages else None
     except Exception as e:
         print(f"[LLM DingTalk Error] {e}")
         return None
-    finally:
-        if "llm_client" in locals():
-            await _close_client_if_uncached(llm_client, cache=use_cache)
 
 
 async def generate_dingtalk_message_for_character(
@@ -543,7 +612,10 @@ async def generate_dingtalk_message_for_character(
         )
 
         llm_client = _get_client(api_key, base_url, cache=use_cache)
-        response = await llm_client.chat.completions.create(
+        response = await create_chat_completion(
+            llm_client,
+            base_url=base_url,
+            credential=_player_credential(llm_override),
             model=model,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=320,
@@ -585,7 +657,64 @@ async def generate_dingtalk_message_for_character(
         return None
     finally:
         if llm_client is not None:
-            await _close_client_if_uncached(llm_client, cache=use_cache)
+            await _release_client(llm_client, cache=use_cache)
+
+
+def build_dingtalk_reply_prompt(
+    character: Dict[str, Any],
+    player_stats: dict,
+    history: list[dict[str, Any]],
+    player_reply: str,
+    reply_count: int,
+    summary: str = "",
+) -> str:
+    """Prompt for one generic-LLM DingTalk reply, history bounded by budget."""
+    sender = str(character.get("name") or character.get("sender") or "对方")
+    role = str(character.get("role") or "unknown")
+    persona = str(character.get("content") or f"你是{sender}。")
+    examples = character.get("examples")
+    example_hint = ""
+    if isinstance(examples, list) and examples:
+        example_hint = "角色说话示例：" + " / ".join(str(x) for x in examples[:3])
+
+    username = safe_username_for_prompt(player_stats.get("username") or "同学")
+    major = str(player_stats.get("major") or "未知专业")
+    semester = str(player_stats.get("semester") or "当前学期")
+    stats_hint = (
+        f"玩家：{username}，{major}，{semester}。"
+        f"{_stat_label('sanity')} {player_stats.get('sanity', '--')}，"
+        f"{_stat_label('stress')} {player_stats.get('stress', '--')}，"
+        f"GPA {player_stats.get('gpa', '--')}，"
+        f"{_stat_label('charm')} {player_stats.get('charm', '--')}。"
+    )
+
+    history_text = conversation_context(sender, history, summary) or "暂无历史。"
+
+    if reply_count >= 3:
+        output_contract = (
+            '严格返回 JSON：{"npc_reply":"...",'
+            '"settlement":{"desc":"...","effects":{"sanity":1}}}。'
+            f"effects 只能包含 {_allowed_effect_fields_prompt()}，"
+            "整数幅度要克制，通常在 -3 到 3。"
+        )
+    else:
+        output_contract = (
+            '严格返回 JSON：{"npc_reply":"...",'
+            '"reply_options":["选项1","选项2","选项3"]}。'
+            "回复选项要像玩家会点的短句，2-3 个。"
+        )
+
+    return (
+        "你正在模拟浙江大学校园钉钉私聊。\n"
+        f"NPC：{sender}，角色类型：{role}。\n"
+        f"NPC人设：{persona}\n"
+        f"{example_hint}\n"
+        f"{stats_hint}\n"
+        f"当前私聊历史：\n{history_text}\n"
+        f"玩家刚选择回复：{player_reply}\n"
+        "请保持自然、简短、有角色感，不要解释生成过程。\n"
+        f"{output_contract}"
+    )
 
 
 async def generate_dingtalk_reply_message(
@@ -595,8 +724,14 @@ async def generate_dingtalk_reply_message(
     player_reply: str,
     reply_count: int,
     llm_override: Optional[Dict[str, Any]] = None,
+    on_delta: Optional[DeltaCallback] = None,
+    summary: str = "",
 ) -> dict[str, Any] | None:
-    """Generate a DingTalk private-chat reply with the generic LLM."""
+    """Generate a DingTalk private-chat reply with the generic LLM.
+
+    With `on_delta`, the completion is streamed and the NPC reply text is
+    forwarded as it arrives; the returned result is assembled the same way.
+    """
     use_cache = _use_global_content_cache(llm_override)
     llm_client = None
     try:
@@ -604,67 +739,34 @@ async def generate_dingtalk_reply_message(
         if not api_key:
             return None
 
-        sender = str(character.get("name") or character.get("sender") or "对方")
-        role = str(character.get("role") or "unknown")
-        persona = str(character.get("content") or f"你是{sender}。")
-        examples = character.get("examples")
-        example_hint = ""
-        if isinstance(examples, list) and examples:
-            example_hint = "角色说话示例：" + " / ".join(str(x) for x in examples[:3])
-
-        username = safe_username_for_prompt(player_stats.get("username") or "同学")
-        major = str(player_stats.get("major") or "未知专业")
-        semester = str(player_stats.get("semester") or "当前学期")
-        stats_hint = (
-            f"玩家：{username}，{major}，{semester}。"
-            f"{_stat_label('sanity')} {player_stats.get('sanity', '--')}，"
-            f"{_stat_label('stress')} {player_stats.get('stress', '--')}，"
-            f"GPA {player_stats.get('gpa', '--')}，"
-            f"{_stat_label('charm')} {player_stats.get('charm', '--')}。"
+        prompt = build_dingtalk_reply_prompt(
+            character, player_stats, history, player_reply, reply_count, summary
         )
-
-        history_lines = []
-        for msg in history[-8:]:
-            speaker = "玩家" if msg.get("speaker") == "player" else sender
-            text = str(msg.get("content") or "").strip()
-            if text:
-                history_lines.append(f"{speaker}: {text}")
-        history_text = "\n".join(history_lines) or "暂无历史。"
+        PROMPT_TOKENS.observe(text_tokens(prompt), path="generic")
         should_settle = reply_count >= 3
 
-        if should_settle:
-            output_contract = (
-                '严格返回 JSON：{"npc_reply":"...",'
-                '"settlement":{"desc":"...","effects":{"sanity":1}}}。'
-                f"effects 只能包含 {_allowed_effect_fields_prompt()}，"
-                "整数幅度要克制，通常在 -3 到 3。"
+        llm_client = _get_client(api_key, base_url, cache=use_cache)
+        request: dict[str, Any] = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 420,
+        }
+        if on_delta is not None:
+            raw = await stream_chat_completion(
+                llm_client,
+                base_url=base_url,
+                credential=_player_credential(llm_override),
+                on_delta=ReplyTextStream(on_delta),
+                **request,
             )
         else:
-            output_contract = (
-                '严格返回 JSON：{"npc_reply":"...",'
-                '"reply_options":["选项1","选项2","选项3"]}。'
-                "回复选项要像玩家会点的短句，2-3 个。"
+            response = await create_chat_completion(
+                llm_client,
+                base_url=base_url,
+                credential=_player_credential(llm_override),
+                **request,
             )
-
-        prompt = (
-            "你正在模拟浙江大学校园钉钉私聊。\n"
-            f"NPC：{sender}，角色类型：{role}。\n"
-            f"NPC人设：{persona}\n"
-            f"{example_hint}\n"
-            f"{stats_hint}\n"
-            f"当前私聊历史：\n{history_text}\n"
-            f"玩家刚选择回复：{player_reply}\n"
-            "请保持自然、简短、有角色感，不要解释生成过程。\n"
-            f"{output_contract}"
-        )
-
-        llm_client = _get_client(api_key, base_url, cache=use_cache)
-        response = await llm_client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=420,
-        )
-        raw = response.choices[0].message.content
+            raw = response.choices[0].message.content
         data = _json_from_text(raw)
         npc_reply = str(data.get("npc_reply") or raw or "").strip()
         if not npc_reply:
@@ -687,7 +789,71 @@ async def generate_dingtalk_reply_message(
         return None
     finally:
         if llm_client is not None:
-            await _close_client_if_uncached(llm_client, cache=use_cache)
+            await _release_client(llm_client, cache=use_cache)
+
+
+async def generate_dingtalk_summary(
+    sender: str,
+    previous_summary: str,
+    round_messages: list[dict[str, Any]],
+    llm_override: Optional[Dict[str, Any]] = None,
+) -> str | None:
+    """Fold one closed DingTalk round into the contact's rolling summary."""
+    use_cache = _use_global_content_cache(llm_override)
+    llm_client = None
+    try:
+        api_key, base_url, model = _resolve_llm_config(llm_override)
+        if not api_key:
+            return None
+        round_text = conversation_context(
+            sender, round_messages, recent=len(round_messages)
+        )
+        prompt = (
+            f"以下是玩家与{sender}的钉钉私聊记录。\n"
+            f"此前摘要：{previous_summary.strip() or '无'}\n"
+            f"本轮对话：\n{round_text}\n"
+            f"请把本轮要点并入此前摘要，输出不超过 {DINGTALK_SUMMARY_MAX_CHARS} 字的"
+            "第三人称摘要，保留人物关系、约定和未解决的事情，只输出摘要正文。"
+        )
+        llm_client = _get_client(api_key, base_url, cache=use_cache)
+        response = await create_chat_completion(
+            llm_client,
+            base_url=base_url,
+            credential=_player_credential(llm_override),
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=200,
+        )
+        content = response.choices[0].message.content
+        summary = content.strip() if isinstance(content, str) else ""
+        return summary[:DINGTALK_SUMMARY_MAX_CHARS] or None
+    except Exception as e:
+        logger.warning("DingTalk summary generation failed: %s", e)
+        return None
+    finally:
+        if llm_client is not None:
+            await _release_client(llm_client, cache=use_cache)
+
+
+def wenyan_report_digest(final_stats: dict) -> str:
+    """Digest of the stats that materially shape the graduation report.
+
+    Prompt-context stats are bucketed by ten, so small drift between the last
+    final exam and graduation still matches a prefetched report.
+    """
+    stats = final_stats or {}
+    material: dict[str, Any] = {
+        "username": str(stats.get("username") or ""),
+        "major": str(stats.get("major") or ""),
+        "gpa": round(_to_float(stats.get("gpa")), 2),
+        "highest_gpa": round(_to_float(stats.get("highest_gpa")), 2),
+        "achievements": sorted(str(a) for a in stats.get("achievements") or []),
+    }
+    for definition in stat_definitions.stats:
+        if definition.llm_context:
+            material[definition.id] = int(_to_float(stats.get(definition.id)) // 10)
+    raw = json.dumps(material, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
 
 
 async def generate_wenyan_report(
@@ -728,7 +894,10 @@ async def generate_wenyan_report(
         api_key, base_url, model = _resolve_llm_config(llm_override)
         llm_client = _get_client(api_key, base_url, cache=use_cache)
 
-        response = await llm_client.chat.completions.create(
+        response = await create_chat_completion(
+            llm_client,
+            base_url=base_url,
+            credential=_player_credential(llm_override),
             model=model,
             messages=messages,
             max_tokens=200,
@@ -742,4 +911,4 @@ async def generate_wenyan_report(
         return fallback_wenyan_report(final_stats)
     finally:
         if llm_client is not None:
-            await _close_client_if_uncached(llm_client, cache=use_cache)
+            await _release_client(llm_client, cache=use_cache)
@@ -0,0 +1,392 @@
+"""Provider-aware admission control for LLM chat completions.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Every chat-completion call passes a per-provider concurrency cap, request and
+token rate buckets, and a circuit breaker, so a slow provider sheds load to
+the library fallbacks instead of piling up coroutines until they time out.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Longest a caller queues for a slot or rate budget before falling back.
+MAX_QUEUE_SECONDS = 5.0
+# Breaker: trips when at least `min_calls` in the window fail at this ratio;
+# calls slower than `slow_seconds` count as failures.
+BREAKER_WINDOW_SECONDS = 30.0
+BREAKER_MIN_CALLS = 10
+BREAKER_ERROR_RATIO = 0.5
+BREAKER_SLOW_SECONDS = 12.0
+BREAKER_OPEN_SECONDS = 30.0
+# Player-key gates kept per process; the least recently used is dropped.
+PLAYER_GATES_MAX = 512
+
+_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+QUEUE_WAIT = metrics.histogram(
+    "zjus_llm_queue_wait_seconds",
+    "Time LLM calls waited for a provider slot and rate budget.",
+)
+BREAKER_STATE = metrics.gauge(
+    "zjus_llm_breaker_state",
+    "Provider circuit breaker: 0 closed, 1 half-open, 2 open.",
+)
+IN_FLIGHT = metrics.gauge(
+    "zjus_llm_in_flight",
+    "Chat-completion calls currently running, by provider.",
+)
+REJECTED = metrics.counter(
+    "zjus_llm_admission_rejected_total",
+    "LLM calls refused before reaching the provider, by reason.",
+)
+CALL_LATENCY = metrics.histogram(
+    "zjus_llm_call_seconds",
+    "Chat-completion latency by provider and outcome.",
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 12.0, 20.0, 30.0),
+)
+FIRST_TOKEN = metrics.histogram(
+    "zjus_llm_first_token_seconds",
+    "Time from sending a streamed chat completion to its first content token.",
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 12.0),
+)
+
+
+class LLMUnavailable(RuntimeError):
+    """The provider is shedding load; callers should use library content."""
+
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    max_concurrency: int
+    requests_per_second: float
+    tokens_per_minute: float
+
+
+def default_limits() -> ProviderLimits:
+    return ProviderLimits(
+        max_concurrency=settings.LLM_PROVIDER_MAX_CONCURRENCY,
+        requests_per_second=settings.LLM_PROVIDER_REQUESTS_PER_SECOND,
+        tokens_per_minute=settings.LLM_PROVIDER_TOKENS_PER_MINUTE,
+    )
+
+
+class TokenBucket:
+    """Classic token bucket; `take` waits for budget up to a deadline."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def take(self, amount: float, deadline: float) -> bool:
+        """Consume `amount`; False if it cannot be had before `deadline`."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            wait = (amount - self.tokens) / self.rate if self.tokens < amount else 0.0
+            if self._clock() + wait > deadline:
+                return False
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= amount
+            return True
+
+
+class CircuitBreaker:
+    """Error/latency breaker over a sliding window of recent outcomes."""
+
+    def __init__(
+        self,
+        provider: str,
+        clock: Callable[[], float] = time.monotonic,
+        publish: bool = True,
+    ):
+        self.provider = provider
+        self.state = "closed"
+        self._clock = clock
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probing = False
+        self._publish_state = publish
+        self._publish()
+
+    def _publish(self) -> None:
+        if self._publish_state:
+            BREAKER_STATE.set(_BREAKER_STATES[self.state], provider=self.provider)
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if self._clock() - self._opened_at < BREAKER_OPEN_SECONDS:
+                return False
+            self.state = "half_open"
+            self._publish()
+        if self.state == "half_open":
+            # One probe at a time decides whether the provider recovered.
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def abandon_probe(self) -> None:
+        """A half-open probe that never reached the provider proves nothing."""
+        self._probing = False
+
+    def record(self, ok: bool) -> None:
+        now = self._clock()
+        if self.state == "half_open":
+            self._probing = False
+            self._outcomes.clear()
+            if ok:
+                self.state = "closed"
+            else:
+                self.state, self._opened_at = "open", now
+            self._publish()
+            return
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > BREAKER_WINDOW_SECONDS:
+            self._outcomes.popleft()
+        failures = sum(1 for _, success in self._outcomes if not success)
+        if (
+            len(self._outcomes) >= BREAKER_MIN_CALLS
+            and failures / len(self._outcomes) >= BREAKER_ERROR_RATIO
+        ):
+            self.state, self._opened_at = "open", now
+            self._outcomes.clear()
+            self._publish()
+
+
+class ProviderGate:
+    """Admission state for one provider host and credential in this process.
+
+    Player-key gates report metrics as `<host>/player` and keep their breaker
+    state out of the per-provider gauge, which tracks the platform key.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        limits: ProviderLimits,
+        clock: Callable[[], float] = time.monotonic,
+        player_key: bool = False,
+    ):
+        self.provider = f"{provider}/player" if player_key else provider
+        self._slots = asyncio.Semaphore(limits.max_concurrency)
+        self._requests = TokenBucket(
+            limits.requests_per_second,
+            max(1.0, limits.requests_per_second),
+            clock,
+        )
+        self._tokens = TokenBucket(
+            limits.tokens_per_minute / 60.0, limits.tokens_per_minute, clock
+        )
+        self.breaker = CircuitBreaker(self.provider, clock, publish=not player_key)
+        self._clock = clock
+
+    def has_capacity(self) -> bool:
+        """Whether an optional extra call would start without queueing."""
+        return self.breaker.state == "closed" and not self._slots.locked()
+
+    @asynccontextmanager
+    async def admit(self, tokens: int) -> AsyncIterator[None]:
+        """Hold a provider slot for one call, or raise LLMUnavailable."""
+        if not self.breaker.allow():
+            REJECTED.inc(provider=self.provider, reason="breaker_open")
+            raise LLMUnavailable(f"{self.provider} circuit open")
+        started = self._clock()
+        deadline = started + MAX_QUEUE_SECONDS
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=MAX_QUEUE_SECONDS)
+        except asyncio.TimeoutError:
+            self.breaker.abandon_probe()
+            REJECTED.inc(provider=self.provider, reason="queue_timeout")
+            raise LLMUnavailable(f"{self.provider} saturated") from None
+        except BaseException:
+            self.breaker.abandon_probe()
+            raise
+        try:
+            try:
+                admitted = await self._requests.take(1, deadline)
+                admitted = admitted and await self._tokens.take(tokens, deadline)
+            except BaseException:
+                self.breaker.abandon_probe()
+                raise
+            if not admitted:
+                self.breaker.abandon_probe()
+                REJECTED.inc(provider=self.provider, reason="rate_limited")
+                raise LLMUnavailable(f"{self.provider} rate limited")
+            QUEUE_WAIT.observe(self._clock() - started, provider=self.provider)
+            IN_FLIGHT.inc(provider=self.provider)
+            try:
+                yield
+            finally:
+                IN_FLIGHT.dec(provider=self.provider)
+        finally:
+            self._slots.release()
+
+    def record(self, ok: bool, seconds: float) -> None:
+        slow = seconds >= BREAKER_SLOW_SECONDS
+        self.breaker.record(ok and not slow)
+        CALL_LATENCY.observe(
+            seconds,
+            provider=self.provider,
+            outcome="ok" if ok and not slow else ("slow" if ok else "error"),
+        )
+
+    def record_failure(self, error: Exception, seconds: float) -> None:
+        """Record a failed call; client errors say nothing about the provider."""
+        if not is_client_error(error):
+            self.record(False, seconds)
+            return
+        self.breaker.abandon_probe()
+        CALL_LATENCY.observe(seconds, provider=self.provider, outcome="client_error")
+
+
+_gates: dict[str, ProviderGate] = {}
+_player_gates: "OrderedDict[tuple[str, str], ProviderGate]" = OrderedDict()
+
+
+def provider_for(base_url: Optional[str]) -> str:
+    """Provider name used for limits and metrics: the API host."""
+    return urlparse(base_url or "").hostname or "api.openai.com"
+
+
+def is_client_error(error: BaseException) -> bool:
+    """4xx responses (bad key, bad request) other than timeouts and 429s."""
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+def gate_for(provider: str, credential: Optional[str] = None) -> ProviderGate:
+    """The platform gate for `provider`, or a player's own gate for `credential`.
+
+    Player keys get separate limits and breakers, so one player's bad or
+    throttled key cannot shed load for everyone on the same host.
+    """
+    if credential is None:
+        gate = _gates.get(provider)
+        if gate is None:
+            gate = ProviderGate(provider, default_limits())
+            _gates[provider] = gate
+        return gate
+    key = (provider, hashlib.sha256(credential.encode("utf-8")).hexdigest()[:16])
+    gate = _player_gates.get(key)
+    if gate is None:
+        gate = ProviderGate(provider, default_limits(), player_key=True)
+        _player_gates[key] = gate
+        while len(_player_gates) > PLAYER_GATES_MAX:
+            _player_gates.popitem(last=False)
+    else:
+        _player_gates.move_to_end(key)
+    return gate
+
+
+def estimate_tokens(messages: Any, max_tokens: int) -> int:
+    """Prompt plus completion budget; CJK text runs about 1.5 chars a token."""
+    chars = 0
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(str(part.get("text", ""))) for part in content)
+    return int(chars / 1.5) + max_tokens
+
+
+async def create_chat_completion(
+    client: Any,
+    *,
+    base_url: Optional[str],
+    credential: Optional[str] = None,
+    **kwargs: Any,
+) -> Any:
+    """`client.chat.completions.create(**kwargs)` behind the provider gate.
+
+    Pass the player's API key as `credential` for player-key calls.
+    """
+    gate = gate_for(provider_for(base_url), credential)
+    budget = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0
+    async with gate.admit(estimate_tokens(kwargs.get("messages"), budget)):
+        started = time.monotonic()
+        try:
+            response = await client.chat.completions.create(**kwargs)
+        except asyncio.CancelledError:
+            # Cancelled callers say nothing about provider health.
+            gate.breaker.abandon_probe()
+            raise
+        except Exception as e:
+            gate.record_failure(e, time.monotonic() - started)
+            raise
+        gate.record(True, time.monotonic() - started)
+        return response
+
+
+async def stream_chat_completion(
+    client: Any,
+    *,
+    base_url: Optional[str],
+    on_delta: Callable[[str], Awaitable[None]],
+    credential: Optional[str] = None,
+    **kwargs: Any,
+) -> str:
+    """Streamed `create_chat_completion`: forward content deltas, return the text.
+
+    The provider slot is held until the stream ends, and breaker health is
+    judged on the whole stream, not the first token.
+    """
+    gate = gate_for(provider_for(base_url), credential)
+    budget = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0
+    async with gate.admit(estimate_tokens(kwargs.get("messages"), budget)):
+        started = time.monotonic()
+        parts: list[str] = []
+        stream = None
+        try:
+            stream = await client.chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                choices = getattr(chunk, "choices", None) or []
+                delta = getattr(choices[0], "delta", None) if choices else None
+                text = getattr(delta, "content", None)
+                if not isinstance(text, str) or not text:
+                    continue
+                if not parts:
+                    FIRST_TOKEN.observe(
+                        time.monotonic() - started, provider=gate.provider
+                    )
+                parts.append(text)
+                await on_delta(text)
+        except asyncio.CancelledError:
+            gate.breaker.abandon_probe()
+            raise
+        except Exception as e:
+            gate.record_failure(e, time.monotonic() - started)
+            raise
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+        gate.record(True, time.monotonic() - started)
+        return "".join(parts)
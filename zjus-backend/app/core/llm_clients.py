@@ -0,0 +1,217 @@
+"""Bounded pool of LLM clients for player-supplied API keys.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Players who bring their own key reuse one client, and so its keep-alive
+connections, across calls instead of paying a TLS handshake per request.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import inspect
+import logging
+import secrets
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PLAYER_CLIENT_POOL_SIZE = 64
+PLAYER_CLIENT_IDLE_SECONDS = 300.0
+# Recycled even when busy so revoked keys and stale connections age out.
+PLAYER_CLIENT_TTL_SECONDS = 1800.0
+# Expiry also runs on this timer, so clients close even when traffic stops.
+PLAYER_CLIENT_SWEEP_SECONDS = 60.0
+
+CLIENT_POOL_SIZE = metrics.gauge(
+    "zjus_llm_client_pool_size",
+    "Player-key LLM clients currently pooled.",
+)
+CLIENT_POOL_LOOKUPS = metrics.counter(
+    "zjus_llm_client_pool_lookups_total",
+    "Player-key LLM client lookups, by hit or miss.",
+)
+CLIENT_POOL_EVICTIONS = metrics.counter(
+    "zjus_llm_client_pool_evictions_total",
+    "Player-key LLM clients evicted, by reason.",
+)
+
+
+async def close_client(client: Any) -> None:
+    """Close an SDK client without assuming its concrete type."""
+    close = getattr(client, "close", None)
+    if close is None:
+        return
+    result = close()
+    if inspect.isawaitable(result):
+        await result
+
+
+@dataclass(eq=False)
+class _Entry:
+    key: str
+    client: Any
+    created: float
+    last_used: float
+    leases: int = 0
+    retired: bool = field(default=False)
+
+
+_pools: "weakref.WeakSet[ClientPool]" = weakref.WeakSet()
+
+
+class ClientPool:
+    """LRU pool of clients keyed by an HMAC of (api_key, base_url).
+
+    Raw keys never become dict keys or log fields; the HMAC secret is random
+    per process. `acquire` leases a client and must be paired with `release`.
+    Evicted clients that are still leased close on their last release.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[Optional[str], Optional[str]], Any],
+        *,
+        max_size: int = PLAYER_CLIENT_POOL_SIZE,
+        idle_seconds: float = PLAYER_CLIENT_IDLE_SECONDS,
+        ttl_seconds: float = PLAYER_CLIENT_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self._factory = factory
+        self._max_size = max_size
+        self._idle_seconds = idle_seconds
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._secret = secrets.token_bytes(32)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._leased: dict[int, _Entry] = {}
+        self._closing: list[Any] = []
+        _pools.add(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, api_key: Optional[str], base_url: Optional[str]) -> str:
+        material = f"{base_url or ''}\0{api_key or ''}".encode()
+        return hmac.new(self._secret, material, hashlib.sha256).hexdigest()
+
+    def acquire(self, api_key: Optional[str], base_url: Optional[str]) -> Any:
+        """Lease the pooled client for these credentials, creating it if needed."""
+        now = self._clock()
+        self._evict_expired(now)
+        key = self._key(api_key, base_url)
+        entry = self._entries.get(key)
+        if entry is None:
+            CLIENT_POOL_LOOKUPS.inc(pool=self.name, result="miss")
+            entry = _Entry(key, self._factory(api_key, base_url), now, now)
+            self._entries[key] = entry
+            self._evict_overflow()
+        else:
+            CLIENT_POOL_LOOKUPS.inc(pool=self.name, result="hit")
+            self._entries.move_to_end(key)
+        entry.leases += 1
+        entry.last_used = now
+        self._leased[id(entry.client)] = entry
+        CLIENT_POOL_SIZE.set(len(self._entries), pool=self.name)
+        return entry.client
+
+    async def release(self, client: Any) -> None:
+        """End a lease; closes the client if it was evicted meanwhile."""
+        entry = self._leased.get(id(client))
+        if entry is not None and entry.client is client:
+            entry.leases -= 1
+            entry.last_used = self._clock()
+            if entry.leases == 0:
+                del self._leased[id(client)]
+                if entry.retired:
+                    self._closing.append(client)
+        self._evict_expired(self._clock())
+        await self._drain_closing()
+
+    async def sweep(self) -> None:
+        """Close clients past their idle time or TTL without a new lease."""
+        self._evict_expired(self._clock())
+        await self._drain_closing()
+
+    def _evict_expired(self, now: float) -> None:
+        for entry in list(self._entries.values()):
+            if now - entry.created >= self._ttl_seconds:
+                self._retire(entry, "ttl")
+            elif not entry.leases and now - entry.last_used >= self._idle_seconds:
+                self._retire(entry, "idle")
+
+    def _evict_overflow(self) -> None:
+        # Least recently used first; busy clients are skipped, so the pool
+        # may briefly exceed its size while every entry is leased.
+        for entry in list(self._entries.values()):
+            if len(self._entries) <= self._max_size:
+                return
+            if not entry.leases:
+                self._retire(entry, "lru")
+
+    def _retire(self, entry: _Entry, reason: str) -> None:
+        self._entries.pop(entry.key, None)
+        entry.retired = True
+        CLIENT_POOL_EVICTIONS.inc(pool=self.name, reason=reason)
+        if not entry.leases:
+            self._closing.append(entry.client)
+
+    async def _drain_closing(self) -> None:
+        closing, self._closing = self._closing, []
+        for client in closing:
+            try:
+                await close_client(client)
+            except Exception as exc:
+                logger.warning("Closing pooled %s client failed: %s", self.name, exc)
+        CLIENT_POOL_SIZE.set(len(self._entries), pool=self.name)
+
+    async def close(self) -> None:
+        """Close every pooled client during process shutdown."""
+        for entry in list(self._entries.values()):
+            self._retire(entry, "shutdown")
+            if entry.leases:
+                # In-flight calls are cancelled at shutdown anyway.
+                self._closing.append(entry.client)
+        self._leased.clear()
+        await self._drain_closing()
+
+
+class ClientPoolSweeper:
+    """Periodically expires idle clients in every `ClientPool` of the process."""
+
+    def __init__(self, interval: float = PLAYER_CLIENT_SWEEP_SECONDS):
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="llm-client-sweep")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            for pool in list(_pools):
+                try:
+                    await pool.sweep()
+                except Exception as exc:
+                    logger.warning("Sweeping %s client pool failed: %s", pool.name, exc)
+
+
+client_pool_sweeper = ClientPoolSweeper()
@@ -0,0 +1,243 @@
+"""In-process runtime metrics with Prometheus text exposition.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+The backend only needs a handful of counters, gauges, and latency histograms, so
+this module keeps a small dependency-free registry instead of a client library.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator
+
+LabelKey = tuple[tuple[str, str], ...]
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _label_key(labels: dict[str, object]) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(
+            name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """Shared name, help text, and lock for one metric family."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    @abstractmethod
+    def _render_samples(self) -> list[str]: ...
+
+
+class Counter(_Metric):
+    """Monotonic counter keyed by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        """Increase the counter for one label set."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        """Return the current value for one label set."""
+        return self._values.get(_label_key(labels), 0.0)
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """Point-in-time value keyed by label values."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        """Replace the gauge value for one label set."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        """Decrease the gauge for one label set."""
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelKey, list[float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        """Record one observation for one label set."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts, then total count and sum.
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[idx] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Observe the wall-clock duration of a block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: object) -> int:
+        """Return how many observations one label set has recorded."""
+        series = self._series.get(_label_key(labels))
+        return int(series[-2]) if series else 0
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines: list[str] = []
+        for key, series in items:
+            cumulative = 0.0
+            for idx, bound in enumerate(self.buckets):
+                cumulative += series[idx]
+                le = (("le", _format_value(bound)),)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            inf = (("le", "+Inf"),)
+            lines.append(
+                f"{self.name}_bucket{_format_labels(key, inf)} "
+                f"{_format_value(series[-2])}"
+            )
+            lines.append(
+                f"{self.name}_count{_format_labels(key)} {_format_value(series[-2])}"
+            )
+            lines.append(
+                f"{self.name}_sum{_format_labels(key)} {_format_value(series[-1])}"
+            )
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metric families; re-registering a name returns the original."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """Register or fetch a counter."""
+        return self._register(Counter(name, documentation))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        """Register or fetch a gauge."""
+        return self._register(Gauge(name, documentation))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Register or fetch a histogram."""
+        return self._register(  # type: ignore[return-value]
+            Histogram(name, documentation, buckets)
+        )
+
+    def render(self) -> str:
+        """Render all metric families in Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
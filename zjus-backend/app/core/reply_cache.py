@@ -0,0 +1,163 @@
+"""Shared cache of DingTalk replies for identical conversation contexts.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Platform-key replies are keyed by a normalized fingerprint of character, state
+bucket, major and semester, round position, player option, and last NPC line,
+so players in the same situation reuse a reply instead of paying for another
+LLM call.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+import unicodedata
+from typing import Any, Callable, Optional
+
+from app.api.cache import RedisCache
+from app.content.state_vector import PlayerStateVector
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.state_backend import StateBackend
+
+logger = logging.getLogger(__name__)
+
+REPLY_CACHE_KEY = "dingtalk:reply_cache:{fingerprint}"
+# Sorted set of fingerprints scored by last use; the oldest are evicted first.
+REPLY_CACHE_INDEX_KEY = "dingtalk:reply_cache:lru"
+# Each entry collects a few generated variants so cached replies still vary.
+REPLY_CACHE_VARIANTS = 3
+# Prompts for shareable replies address the player by this placeholder name.
+SHARED_REPLY_USERNAME = "同学"
+
+LOOKUPS = metrics.counter(
+    "zjus_dingtalk_reply_cache_lookups_total",
+    "DingTalk reply cache lookups by result: hit, miss, or sampled_out.",
+)
+HIT_RATIO = metrics.gauge(
+    "zjus_dingtalk_reply_cache_hit_ratio",
+    "Share of DingTalk reply cache lookups served from cache in this worker.",
+)
+EVICTIONS = metrics.counter(
+    "zjus_dingtalk_reply_cache_evictions_total",
+    "DingTalk reply cache entries evicted by the LRU cap.",
+)
+
+_NOISE = re.compile(r"[\W_]+")
+
+
+def _normalize(text: Any) -> str:
+    """Case-, width-, whitespace- and punctuation-insensitive form of a line."""
+    return _NOISE.sub("", unicodedata.normalize("NFKC", str(text or ""))).lower()
+
+
+def reply_fingerprint(
+    contact_id: str,
+    stats: dict[str, Any],
+    reply_count: int,
+    player_reply: str,
+    last_npc_line: str,
+) -> str:
+    # Major and semester reach the reply prompt; the username does not, as
+    # shared replies are generated with `SHARED_REPLY_USERNAME`.
+    parts = [
+        contact_id,
+        PlayerStateVector.from_stats(stats).pool_bucket(),
+        str(stats.get("major") or ""),
+        str(stats.get("semester") or ""),
+        str(reply_count),
+        _normalize(player_reply),
+        _normalize(last_npc_line),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _load_variants(raw: Any) -> list[dict[str, Any]]:
+    try:
+        variants = json.loads(raw) if raw else []
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(variants, list):
+        return []
+    return [v for v in variants if isinstance(v, dict) and v.get("content")]
+
+
+class ReplyCache:
+    """Fingerprint-keyed reply variants with a TTL and an LRU entry cap."""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], StateBackend] = RedisCache.get_client,
+        rng: random.Random | None = None,
+    ):
+        self._client_factory = client_factory
+        self._rng = rng or random.Random()
+        self._lookups = 0
+        self._hits = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.DINGTALK_REPLY_CACHE_SAMPLE_RATE > 0
+
+    def _record(self, result: str) -> None:
+        LOOKUPS.inc(result=result)
+        self._lookups += 1
+        self._hits += result == "hit"
+        HIT_RATIO.set(round(self._hits / self._lookups, 4))
+
+    async def get(self, fingerprint: str) -> Optional[dict[str, Any]]:
+        """Return a cached reply, or None when the caller should generate.
+
+        While an entry has fewer than `REPLY_CACHE_VARIANTS` replies, hits are
+        only served at the sample rate; the rest generate a new variant.
+        """
+        if not self.enabled():
+            return None
+        redis = self._client_factory()
+        variants = _load_variants(
+            await redis.get(REPLY_CACHE_KEY.format(fingerprint=fingerprint))
+        )
+        if not variants:
+            self._record("miss")
+            return None
+        sample_rate = settings.DINGTALK_REPLY_CACHE_SAMPLE_RATE
+        if len(variants) < REPLY_CACHE_VARIANTS and self._rng.random() >= sample_rate:
+            self._record("sampled_out")
+            return None
+        await redis.zadd(REPLY_CACHE_INDEX_KEY, {fingerprint: time.time()})
+        self._record("hit")
+        return self._rng.choice(variants)
+
+    async def put(self, fingerprint: str, reply: dict[str, Any]) -> None:
+        """Add one generated reply as a variant and enforce the entry cap."""
+        if not self.enabled() or not reply.get("content"):
+            return
+        redis = self._client_factory()
+        key = REPLY_CACHE_KEY.format(fingerprint=fingerprint)
+        variants = _load_variants(await redis.get(key))
+        if len(variants) >= REPLY_CACHE_VARIANTS:
+            return
+        variants.append(reply)
+        ttl = RedisCache.normalize_ttl(settings.DINGTALK_REPLY_CACHE_TTL_SECONDS)
+        async with redis.pipeline() as pipe:
+            pipe.set(key, json.dumps(variants, ensure_ascii=False), ex=ttl)
+            pipe.zadd(REPLY_CACHE_INDEX_KEY, {fingerprint: time.time()})
+            pipe.expire(REPLY_CACHE_INDEX_KEY, ttl)
+            pipe.zcard(REPLY_CACHE_INDEX_KEY)
+            results = await pipe.execute()
+        excess = int(results[3]) - max(1, settings.DINGTALK_REPLY_CACHE_MAX_ENTRIES)
+        if excess <= 0:
+            return
+        evicted = await redis.zrange(REPLY_CACHE_INDEX_KEY, 0, excess - 1)
+        if not evicted:
+            return
+        async with redis.pipeline() as pipe:
+            pipe.delete(*[REPLY_CACHE_KEY.format(fingerprint=fp) for fp in evicted])
+            pipe.zrem(REPLY_CACHE_INDEX_KEY, *evicted)
+            await pipe.execute()
+        EVICTIONS.inc(len(evicted))
+
+
+dingtalk_reply_cache = ReplyCache()
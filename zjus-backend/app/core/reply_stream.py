@@ -0,0 +1,95 @@
+"""Incremental extraction of NPC reply text from streamed LLM output.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+DingTalk replies are requested as JSON; this forwards the `npc_reply` string
+as it streams so the client can render it before the JSON is complete.
+"""
+
+import re
+from typing import Awaitable, Callable
+
+DeltaCallback = Callable[[str], Awaitable[None]]
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class ReplyTextStream:
+    """Delta callback that decodes one JSON string field out of raw deltas.
+
+    Output that does not start like JSON is treated as a prose reply and
+    forwarded as-is, matching the non-streaming `data.get(field) or raw`.
+    """
+
+    def __init__(
+        self, on_text: DeltaCallback, field: str = "npc_reply", limit: int = 500
+    ):
+        self._on_text = on_text
+        self._key = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self._limit = limit
+        self._buffer = ""
+        self._pos = 0
+        self._mode = "start"
+        self.sent = 0
+
+    async def __call__(self, chunk: str) -> None:
+        self._buffer += chunk
+        text = self._decode()[: self._limit - self.sent]
+        if text:
+            self.sent += len(text)
+            await self._on_text(text)
+
+    def _decode(self) -> str:
+        if self._mode == "start":
+            stripped = self._buffer.lstrip()
+            if not stripped:
+                return ""
+            self._pos = len(self._buffer) - len(stripped)
+            self._mode = "json" if stripped[0] in "{`" else "prose"
+        if self._mode == "prose":
+            text, self._pos = self._buffer[self._pos :], len(self._buffer)
+            return text
+        if self._mode == "json":
+            match = self._key.search(self._buffer, self._pos)
+            if match is None:
+                return ""
+            self._mode, self._pos = "value", match.end()
+        if self._mode != "value":
+            return ""
+
+        out: list[str] = []
+        buffer, i = self._buffer, self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self._mode = "done"
+                break
+            if char != "\\":
+                out.append(char)
+                i += 1
+                continue
+            # Escapes split across deltas wait for the rest of the sequence.
+            if i + 1 >= len(buffer):
+                break
+            code = buffer[i + 1]
+            if code == "u":
+                if i + 6 > len(buffer):
+                    break
+                try:
+                    out.append(chr(int(buffer[i + 2 : i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+                continue
+            out.append(_ESCAPES.get(code, code))
+            i += 2
+        self._pos = i
+        return "".join(out)
@@ -0,0 +1,578 @@
+"""State-backend interface and the in-process implementation.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Repositories only use the Redis command subset described by `StateBackend`, so
+single-node deployments and tests can swap Redis for `MemoryStateBackend`.
+"""
+
+import asyncio
+import fnmatch
+import math
+import time
+from typing import Any, Iterable, Mapping, Optional, Protocol, runtime_checkable
+
+from redis.exceptions import ResponseError
+
+_WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+@runtime_checkable
+class StateBackend(Protocol):
+    """Redis-compatible command subset used by repositories and caches.
+
+    Values come back decoded (`decode_responses=True` semantics). Pipelines
+    queue commands synchronously and apply them atomically on `execute()`.
+    """
+
+    async def get(self, name: str) -> Any: ...
+
+    async def set(
+        self,
+        name: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+    ) -> Any: ...
+
+    async def getdel(self, name: str) -> Any: ...
+
+    async def delete_if_equals(self, name: str, value: str) -> int: ...
+
+    async def get_bytes(self, name: str) -> Optional[bytes]: ...
+
+    async def getdel_bytes(self, name: str) -> Optional[bytes]: ...
+
+    async def setbit(self, name: str, offset: int, value: int) -> int: ...
+
+    async def getbit(self, name: str, offset: int) -> int: ...
+
+    async def delete(self, *names: str) -> int: ...
+
+    async def exists(self, *names: str) -> int: ...
+
+    async def expire(self, name: str, time: int) -> bool: ...
+
+    async def ttl(self, name: str) -> int: ...
+
+    async def scan(
+        self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None
+    ) -> tuple[int, list[str]]: ...
+
+    async def hget(self, name: str, key: str) -> Any: ...
+
+    async def hgetall(self, name: str) -> dict: ...
+
+    async def hmget(self, name: str, keys: Iterable[str], *args: str) -> list: ...
+
+    async def hset(
+        self,
+        name: str,
+        key: Optional[str] = None,
+        value: Any = None,
+        mapping: Optional[Mapping] = None,
+    ) -> int: ...
+
+    async def hdel(self, name: str, *keys: str) -> int: ...
+
+    async def hexists(self, name: str, key: str) -> bool: ...
+
+    async def hkeys(self, name: str) -> list: ...
+
+    async def hincrby(self, name: str, key: str, amount: int = 1) -> int: ...
+
+    async def hincrbyfloat(self, name: str, key: str, amount: float = 1.0) -> float: ...
+
+    async def hincrby_clamped(
+        self, name: str, key: str, delta: int, min_val: int, max_val: int
+    ) -> int: ...
+
+    async def sadd(self, name: str, *values: Any) -> int: ...
+
+    async def smembers(self, name: str) -> set: ...
+
+    async def zadd(self, name: str, mapping: Mapping[str, float]) -> int: ...
+
+    async def zrem(self, name: str, *values: Any) -> int: ...
+
+    async def zcard(self, name: str) -> int: ...
+
+    async def zrange(self, name: str, start: int, end: int) -> list: ...
+
+    async def zremrangebyrank(self, name: str, start: int, end: int) -> int: ...
+
+    async def lpush(self, name: str, *values: Any) -> int: ...
+
+    async def rpush(self, name: str, *values: Any) -> int: ...
+
+    async def lpop(self, name: str) -> Any: ...
+
+    async def lrange(self, name: str, start: int, end: int) -> list: ...
+
+    async def ltrim(self, name: str, start: int, end: int) -> bool: ...
+
+    async def llen(self, name: str) -> int: ...
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> Any: ...
+
+    async def publish(self, channel: str, message: Any) -> int: ...
+
+    def pubsub(self, **kwargs: Any) -> Any: ...
+
+
+def _encode(value: Any) -> Any:
+    """Mirror redis-py argument encoding for stored values."""
+    if isinstance(value, (bytes, str)):
+        return value
+    if isinstance(value, bool):
+        raise ResponseError("Invalid input of type: 'bool'")
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _list_slice(length: int, start: int, end: int) -> tuple[int, int]:
+    """Convert Redis inclusive, negative-aware bounds to a Python slice."""
+    if start < 0:
+        start = max(0, length + start)
+    if end < 0:
+        end = length + end
+    end = min(end, length - 1)
+    return start, end + 1
+
+
+class _SortedSet(dict):
+    """Member-to-score map; a distinct type so zset commands reject hashes."""
+
+
+class MemoryPipeline:
+    """Command queue applied to a `MemoryStateBackend` in one step."""
+
+    def __init__(self, backend: "MemoryStateBackend"):
+        self._backend = backend
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._commands.clear()
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not hasattr(self._backend, name):
+            raise AttributeError(name)
+
+        def queue(*args: Any, **kwargs: Any) -> "MemoryPipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        """Apply queued commands without yielding to other tasks."""
+        commands, self._commands = self._commands, []
+        results: list[Any] = []
+        for name, args, kwargs in commands:
+            try:
+                # Backend commands never suspend, so the batch stays atomic.
+                results.append(await getattr(self._backend, name)(*args, **kwargs))
+            except ResponseError as exc:
+                if raise_on_error:
+                    raise
+                results.append(exc)
+        return results
+
+    async def reset(self) -> None:
+        """Drop queued commands."""
+        self._commands.clear()
+
+
+class MemoryPubSub:
+    """Channel subscription on a `MemoryStateBackend`, shaped like redis-py's."""
+
+    def __init__(self, backend: "MemoryStateBackend"):
+        self._backend = backend
+        self._channels: set[str] = set()
+        self._messages: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    def _deliver(self, kind: str, channel: str, data: Any) -> None:
+        self._messages.put_nowait(
+            {"type": kind, "pattern": None, "channel": channel, "data": data}
+        )
+
+    async def subscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self._channels.add(channel)
+            self._backend._subscribers.setdefault(channel, set()).add(self)
+            self._deliver("subscribe", channel, len(self._channels))
+
+    async def unsubscribe(self, *channels: str) -> None:
+        for channel in channels or tuple(self._channels):
+            self._channels.discard(channel)
+            subscribers = self._backend._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(self)
+                if not subscribers:
+                    del self._backend._subscribers[channel]
+            self._deliver("unsubscribe", channel, len(self._channels))
+
+    async def get_message(
+        self, ignore_subscribe_messages: bool = False, timeout: float = 0.0
+    ) -> Optional[dict[str, Any]]:
+        """Return the next message, or None after `timeout` seconds."""
+        try:
+            message = await asyncio.wait_for(self._messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if ignore_subscribe_messages and message["type"] != "message":
+            return None
+        return message
+
+    async def aclose(self) -> None:
+        await self.unsubscribe()
+
+
+class MemoryStateBackend:
+    """Asyncio-native, single-process implementation of `StateBackend`.
+
+    State lives in this process only, so it suits dev servers, single-worker
+    deployments, benchmarks, and tests. Expired keys are evicted lazily.
+    """
+
+    def __init__(self, clock: Any = time.monotonic):
+        self._data: dict[str, Any] = {}
+        self._expires: dict[str, float] = {}
+        self._clock = clock
+        self._subscribers: dict[str, set[MemoryPubSub]] = {}
+
+    # -- keyspace helpers -------------------------------------------------
+
+    def _alive(self, name: str) -> bool:
+        deadline = self._expires.get(name)
+        if deadline is not None and deadline <= self._clock():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return name in self._data
+
+    def _read(self, name: str, kind: type) -> Any:
+        if not self._alive(name):
+            return None
+        value = self._data[name]
+        if not isinstance(value, kind):
+            raise ResponseError(_WRONGTYPE)
+        return value
+
+    def _write(self, name: str, kind: type) -> Any:
+        value = self._read(name, kind)
+        if value is None:
+            value = kind()
+            self._data[name] = value
+        return value
+
+    def _drop_if_empty(self, name: str) -> None:
+        value = self._data.get(name)
+        if not isinstance(value, (str, bytes)) and not value:
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+
+    def flush(self) -> None:
+        """Remove every key; intended for tests and benchmarks."""
+        self._data.clear()
+        self._expires.clear()
+
+    # -- strings ----------------------------------------------------------
+
+    async def get(self, name: str) -> Any:
+        return self._read(name, (str, bytes))  # type: ignore[arg-type]
+
+    async def set(
+        self,
+        name: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+    ) -> Any:
+        if nx and self._alive(name):
+            return None
+        self._data[name] = _encode(value)
+        self._expires.pop(name, None)
+        if ex is not None:
+            self._expires[name] = self._clock() + int(ex)
+        elif px is not None:
+            self._expires[name] = self._clock() + int(px) / 1000
+        return True
+
+    async def getdel(self, name: str) -> Any:
+        value = await self.get(name)
+        if value is not None:
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return value
+
+    async def delete_if_equals(self, name: str, value: str) -> int:
+        if await self.get(name) != _encode(value):
+            return 0
+        return await self.delete(name)
+
+    async def get_bytes(self, name: str) -> Optional[bytes]:
+        value = await self.get(name)
+        return value.encode("utf-8") if isinstance(value, str) else value
+
+    async def getdel_bytes(self, name: str) -> Optional[bytes]:
+        value = await self.getdel(name)
+        return value.encode("utf-8") if isinstance(value, str) else value
+
+    async def setbit(self, name: str, offset: int, value: int) -> int:
+        current = await self.get_bytes(name) or b""
+        data = bytearray(current)
+        byte, bit = divmod(int(offset), 8)
+        if byte >= len(data):
+            data.extend(b"\x00" * (byte + 1 - len(data)))
+        # Redis numbers bits from the most significant bit of each byte.
+        mask = 0x80 >> bit
+        previous = 1 if data[byte] & mask else 0
+        if value:
+            data[byte] |= mask
+        else:
+            data[byte] &= ~mask & 0xFF
+        self._data[name] = bytes(data)
+        return previous
+
+    async def getbit(self, name: str, offset: int) -> int:
+        data = await self.get_bytes(name) or b""
+        byte, bit = divmod(int(offset), 8)
+        return 1 if byte < len(data) and data[byte] & (0x80 >> bit) else 0
+
+    async def delete(self, *names: str) -> int:
+        removed = 0
+        for name in names:
+            if self._alive(name):
+                removed += 1
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return removed
+
+    async def exists(self, *names: str) -> int:
+        return sum(1 for name in names if self._alive(name))
+
+    async def expire(self, name: str, time: int) -> bool:
+        if not self._alive(name):
+            return False
+        if int(time) <= 0:
+            await self.delete(name)
+            return True
+        self._expires[name] = self._clock() + int(time)
+        return True
+
+    async def ttl(self, name: str) -> int:
+        if not self._alive(name):
+            return -2
+        deadline = self._expires.get(name)
+        if deadline is None:
+            return -1
+        return max(0, math.ceil(deadline - self._clock()))
+
+    async def scan(
+        self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None
+    ) -> tuple[int, list[str]]:
+        keys = [name for name in list(self._data) if self._alive(name)]
+        if match:
+            keys = [name for name in keys if fnmatch.fnmatchcase(name, match)]
+        return 0, keys
+
+    # -- hashes -----------------------------------------------------------
+
+    async def hget(self, name: str, key: str) -> Any:
+        value = self._read(name, dict)
+        return None if value is None else value.get(str(key))
+
+    async def hgetall(self, name: str) -> dict:
+        value = self._read(name, dict)
+        return dict(value) if value else {}
+
+    async def hmget(self, name: str, keys: Iterable[str], *args: str) -> list:
+        fields = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        fields.extend(args)
+        value = self._read(name, dict) or {}
+        return [value.get(str(field)) for field in fields]
+
+    async def hset(
+        self,
+        name: str,
+        key: Optional[str] = None,
+        value: Any = None,
+        mapping: Optional[Mapping] = None,
+    ) -> int:
+        items: dict[str, Any] = {}
+        if key is not None:
+            items[str(key)] = value
+        items.update({str(k): v for k, v in (mapping or {}).items()})
+        if not items:
+            raise ResponseError("wrong number of arguments for 'hset' command")
+        target = self._write(name, dict)
+        added = sum(1 for field in items if field not in target)
+        target.update({field: _encode(v) for field, v in items.items()})
+        return added
+
+    async def hdel(self, name: str, *keys: str) -> int:
+        target = self._read(name, dict)
+        if not target:
+            return 0
+        removed = sum(1 for key in keys if target.pop(str(key), None) is not None)
+        self._drop_if_empty(name)
+        return removed
+
+    async def hexists(self, name: str, key: str) -> bool:
+        value = self._read(name, dict)
+        return bool(value) and str(key) in value
+
+    async def hkeys(self, name: str) -> list:
+        value = self._read(name, dict)
+        return list(value) if value else []
+
+    async def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        target = self._write(name, dict)
+        try:
+            current = int(target.get(str(key), 0))
+        except (TypeError, ValueError) as exc:
+            raise ResponseError("hash value is not an integer") from exc
+        current += int(amount)
+        target[str(key)] = str(current)
+        return current
+
+    async def hincrbyfloat(self, name: str, key: str, amount: float = 1.0) -> float:
+        target = self._write(name, dict)
+        try:
+            current = float(target.get(str(key), 0))
+        except (TypeError, ValueError) as exc:
+            raise ResponseError("hash value is not a float") from exc
+        current += float(amount)
+        target[str(key)] = repr(current)
+        return current
+
+    async def hincrby_clamped(
+        self, name: str, key: str, delta: int, min_val: int, max_val: int
+    ) -> int:
+        target = self._write(name, dict)
+        try:
+            current = float(target.get(str(key), 0))
+        except (TypeError, ValueError):
+            current = 0.0
+        new_val = min(max(current + float(delta), float(min_val)), float(max_val))
+        # Match Lua number formatting: integral results are stored as integers.
+        stored = int(new_val) if new_val.is_integer() else new_val
+        target[str(key)] = str(stored)
+        return int(new_val)
+
+    # -- sets -------------------------------------------------------------
+
+    async def sadd(self, name: str, *values: Any) -> int:
+        target = self._write(name, set)
+        encoded = {_encode(value) for value in values}
+        added = len(encoded - target)
+        target.update(encoded)
+        return added
+
+    async def smembers(self, name: str) -> set:
+        value = self._read(name, set)
+        return set(value) if value else set()
+
+    # -- sorted sets ------------------------------------------------------
+
+    def _zordered(self, name: str) -> list[str]:
+        target = self._read(name, _SortedSet) or {}
+        return sorted(target, key=lambda member: (target[member], member))
+
+    async def zadd(self, name: str, mapping: Mapping[str, float]) -> int:
+        target = self._write(name, _SortedSet)
+        added = 0
+        for member, score in mapping.items():
+            key = _encode(member)
+            added += key not in target
+            target[key] = float(score)
+        return added
+
+    async def zrem(self, name: str, *values: Any) -> int:
+        target = self._read(name, _SortedSet)
+        if not target:
+            return 0
+        removed = sum(1 for v in values if target.pop(_encode(v), None) is not None)
+        self._drop_if_empty(name)
+        return removed
+
+    async def zcard(self, name: str) -> int:
+        target = self._read(name, _SortedSet)
+        return len(target) if target else 0
+
+    async def zrange(self, name: str, start: int, end: int) -> list:
+        ordered = self._zordered(name)
+        lo, hi = _list_slice(len(ordered), int(start), int(end))
+        return ordered[lo:hi] if lo < hi else []
+
+    async def zremrangebyrank(self, name: str, start: int, end: int) -> int:
+        doomed = await self.zrange(name, start, end)
+        return await self.zrem(name, *doomed) if doomed else 0
+
+    # -- lists ------------------------------------------------------------
+
+    async def lpush(self, name: str, *values: Any) -> int:
+        target = self._write(name, list)
+        for value in values:
+            target.insert(0, _encode(value))
+        return len(target)
+
+    async def rpush(self, name: str, *values: Any) -> int:
+        target = self._write(name, list)
+        target.extend(_encode(value) for value in values)
+        return len(target)
+
+    async def lpop(self, name: str) -> Any:
+        target = self._read(name, list)
+        if not target:
+            return None
+        value = target.pop(0)
+        self._drop_if_empty(name)
+        return value
+
+    async def lrange(self, name: str, start: int, end: int) -> list:
+        target = self._read(name, list) or []
+        lo, hi = _list_slice(len(target), int(start), int(end))
+        return list(target[lo:hi]) if lo < hi else []
+
+    async def ltrim(self, name: str, start: int, end: int) -> bool:
+        target = self._read(name, list)
+        if target is None:
+            return True
+        lo, hi = _list_slice(len(target), int(start), int(end))
+        target[:] = target[lo:hi] if lo < hi else []
+        self._drop_if_empty(name)
+        return True
+
+    async def llen(self, name: str) -> int:
+        target = self._read(name, list)
+        return len(target) if target else 0
+
+    # -- client plumbing --------------------------------------------------
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> Any:
+        """Return a pipeline whose batch is applied atomically."""
+        return MemoryPipeline(self)
+
+    async def publish(self, channel: str, message: Any) -> int:
+        """Deliver a message to current subscribers; returns how many got it."""
+        subscribers = tuple(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber._deliver("message", channel, _encode(message))
+        return len(subscribers)
+
+    def pubsub(self, **kwargs: Any) -> MemoryPubSub:
+        """Return a subscription handle for `publish` messages."""
+        return MemoryPubSub(self)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self) -> None:
+        """Compatibility no-op; state is kept for the process lifetime."""
+        return None
@@ -0,0 +1,209 @@
+"""Compiled world-data bundle with lazy per-section access.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+`scripts/validate_world_data.py --compile` packs every world JSON file and the
+prebuilt content indexes into one file; loaders read single sections from it
+through mmap and fall back to the JSON source when a section is absent or stale.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack ships with requirements.txt
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_MAGIC = b"ZJUW"
+BUNDLE_FORMAT_VERSION = 1
+# Magic, format version, table-of-contents length; the JSON TOC follows.
+_HEADER = struct.Struct(">4sHI")
+BACKEND_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_BUNDLE_PATH = BACKEND_ROOT / "build" / "world.bundle"
+
+# A section's source files, each as (world-relative path, size, mtime_ns).
+SourceStamp = Tuple[str, int, int]
+
+
+def world_dir() -> Path:
+    """Prefer Docker's `/app/world`, then fall back to the local repo path."""
+    docker_path = Path("/app/world")
+    if docker_path.exists():
+        return docker_path
+    return BACKEND_ROOT / "world"
+
+
+def bundle_path() -> Path:
+    """Return the configured bundle location."""
+    configured = settings.WORLD_BUNDLE_PATH.strip()
+    return Path(configured) if configured else DEFAULT_BUNDLE_PATH
+
+
+def source_stamp(root: Path, relative: str) -> SourceStamp:
+    """Stat one world file the way the bundle records it."""
+    stat = (root / relative).stat()
+    return relative, stat.st_size, stat.st_mtime_ns
+
+
+def _encode(value: Any) -> Tuple[str, bytes]:
+    if msgpack is not None:
+        return "msgpack", msgpack.packb(value, use_bin_type=True)
+    return "json", json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def write_bundle(
+    output: Path, sections: Iterable[Tuple[str, Any, Iterable[SourceStamp]]]
+) -> Dict[str, int]:
+    """Write `(name, value, sources)` sections into a bundle file.
+
+    Returns the encoded size of each section.
+    """
+    toc: Dict[str, Dict[str, Any]] = {}
+    blobs = []
+    offset = 0
+    for name, value, sources in sections:
+        codec, blob = _encode(value)
+        toc[name] = {
+            "offset": offset,
+            "length": len(blob),
+            "codec": codec,
+            "sources": [list(stamp) for stamp in sources],
+        }
+        blobs.append(blob)
+        offset += len(blob)
+    toc_bytes = json.dumps(
+        {"sections": toc}, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(toc_bytes)))
+        f.write(toc_bytes)
+        for blob in blobs:
+            f.write(blob)
+    # Replace atomically so a running process never maps a half-written file.
+    os.replace(tmp, output)
+    return {name: entry["length"] for name, entry in toc.items()}
+
+
+class WorldBundle:
+    """Memory-mapped bundle; sections are decoded only when requested."""
+
+    def __init__(self, path: Path, root: Path):
+        self.path = path
+        self.root = root
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, toc_len = _HEADER.unpack_from(self._map, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"unsupported world bundle format in {path}")
+        toc_end = _HEADER.size + toc_len
+        toc = json.loads(self._map[_HEADER.size : toc_end])
+        self._sections: Dict[str, Dict[str, Any]] = toc["sections"]
+        self._data_start = toc_end
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._sections
+
+    def is_fresh(self, name: str) -> bool:
+        """Whether every source of a section still matches its recorded stat."""
+        entry = self._sections.get(name)
+        if entry is None:
+            return False
+        for relative, size, mtime_ns in entry["sources"]:
+            try:
+                if source_stamp(self.root, relative) != (relative, size, mtime_ns):
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def section(self, name: str) -> Any:
+        """Decode one section; raises KeyError if it is absent or stale."""
+        if not self.is_fresh(name):
+            raise KeyError(name)
+        entry = self._sections[name]
+        start = self._data_start + entry["offset"]
+        view = memoryview(self._map)[start : start + entry["length"]]
+        try:
+            if entry["codec"] == "msgpack":
+                if msgpack is None:
+                    raise KeyError(name)
+                return msgpack.unpackb(view, raw=False)
+            return json.loads(bytes(view))
+        finally:
+            view.release()
+
+
+_bundle: Optional[WorldBundle] = None
+_bundle_checked = False
+_bundle_lock = threading.Lock()
+
+
+def get_world_bundle() -> Optional[WorldBundle]:
+    """Open the compiled bundle once per process, or return None without one."""
+    global _bundle, _bundle_checked
+    if _bundle_checked:
+        return _bundle
+    with _bundle_lock:
+        if not _bundle_checked:
+            path = bundle_path()
+            if path.exists():
+                try:
+                    _bundle = WorldBundle(path, world_dir())
+                    logger.info("World bundle mapped from %s", path)
+                except (OSError, ValueError, KeyError, struct.error) as exc:
+                    logger.warning("Ignoring world bundle %s: %s", path, exc)
+            _bundle_checked = True
+    return _bundle
+
+
+def reset_world_bundle() -> None:
+    """Forget the mapped bundle so the next access reopens it."""
+    global _bundle, _bundle_checked
+    with _bundle_lock:
+        _bundle, _bundle_checked = None, False
+
+
+def load_world_section(name: str) -> Optional[Any]:
+    """Return a fresh prebuilt section such as `index:cc98`, else None."""
+    bundle = get_world_bundle()
+    if bundle is None:
+        return None
+    try:
+        return bundle.section(name)
+    except KeyError:
+        return None
+
+
+def read_world_json(path: Path) -> Any:
+    """Parse a world JSON file, served from the bundle when it is fresh.
+
+    Paths outside the world directory are always read from disk, so explicit
+    test or admin paths behave exactly as before.
+    """
+    bundle = get_world_bundle()
+    if bundle is not None:
+        try:
+            relative = path.resolve().relative_to(bundle.root.resolve()).as_posix()
+        except ValueError:
+            relative = None
+        if relative is not None:
+            try:
+                return bundle.section(f"json:{relative}")
+            except KeyError:
+                pass
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
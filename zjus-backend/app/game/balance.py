@@ -6,18 +6,348 @@ Notes:
     This singleton reads `world/game_balance.json` and stays separate from
     system/environment settings in `app.core.config`.
 """
-import json
+
 import logging
+import math
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+from app.core.world_bundle import read_world_json
 
 logger = logging.getLogger(__name__)
 
 
+def _section(config: Mapping[str, Any], key: str, path: str) -> Mapping[str, Any]:
+    value = config.get(key, {})
+    if not isinstance(value, Mapping):
+        raise ValueError(f"{f'{path}.' if path else ''}{key} must be an object")
+    return value
+
+
+def _number(
+    config: Mapping[str, Any],
+    key: str,
+    default: float,
+    path: str,
+    minimum: float | None = None,
+    maximum: float | None = None,
+) -> float:
+    value = config.get(key, default)
+    if isinstance(value, str):
+        # Quoted numbers were always cast by the old accessors; keep them valid.
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+    if (
+        isinstance(value, bool)
+        or not isinstance(value, (int, float))
+        or not math.isfinite(value)
+    ):
+        raise ValueError(f"{path}.{key} must be a number, got {value!r}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{path}.{key} must be >= {minimum}, got {value}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"{path}.{key} must be <= {maximum}, got {value}")
+    return float(value)
+
+
+def _int(
+    config: Mapping[str, Any],
+    key: str,
+    default: int,
+    path: str,
+    minimum: int | None = None,
+) -> int:
+    value = _number(config, key, default, path, minimum)
+    if value != int(value):
+        raise ValueError(f"{path}.{key} must be an integer, got {value}")
+    return int(value)
+
+
+@dataclass(frozen=True, slots=True)
+class CourseStateCoeffs:
+    """Growth and drain multipliers for one course strategy."""
+
+    growth: float = 1.0
+    drain: float = 1.0
+
+
+@dataclass(frozen=True, slots=True)
+class EventCheck:
+    """How often a periodic trigger is rolled and how likely it fires."""
+
+    interval_ticks: int
+    probability: float
+
+    def due(self, tick_count: int) -> bool:
+        """Whether this tick is a check tick."""
+        return tick_count % self.interval_ticks == 0
+
+
+@dataclass(frozen=True, slots=True)
+class GrowthModifiers:
+    """Sanity/stress curve applied to course mastery growth."""
+
+    critical_threshold: float = 20
+    critical_factor: float = 0.6
+    low_slope: float = 0.013
+    high_slope: float = 0.007
+    excellent_threshold: float = 80
+    excellent_factor: float = 1.2
+    stress_optimal_low: float = 40
+    stress_optimal_high: float = 70
+    optimal_factor: float = 1.3
+    suboptimal_factor: float = 0.85
+    extreme_factor: float = 0.6
+
+
+@dataclass(frozen=True, slots=True)
+class ExamModifiers:
+    """Sanity/stress adjustments applied to final-exam scores."""
+
+    low_slope: float = 0.3
+    high_slope: float = 0.12
+    excellent_bonus: float = 6
+    optimal_bonus: float = 6
+    suboptimal_penalty: float = -5
+    extreme_penalty: float = -10
+
+
+@dataclass(frozen=True, slots=True)
+class BalanceSnapshot:
+    """Validated, immutable view of `game_balance.json` used by the tick loop.
+
+    A reload builds a new snapshot and swaps the reference, so a holder never
+    sees a half-applied config.
+    """
+
+    version: str
+    tick_interval: int
+    base_energy_drain: float
+    base_mastery_growth: float
+    default_semester_duration: int
+    # Indexed by semester index; indexes past the end use the default.
+    semester_durations: tuple[int, ...]
+    # Indexed by course state (0=lay flat, 1=balanced, 2=hardcore).
+    course_states: tuple[CourseStateCoeffs, ...]
+    growth: GrowthModifiers
+    exam: ExamModifiers
+    random_event: EventCheck
+    dingtalk: EventCheck
+    dingtalk_max_contacts: int
+    dingtalk_reuse_closed_contact_probability: float
+    relax_cooldowns: Mapping[str, int]
+    fail_threshold: float
+    fail_sanity_penalty: int
+    pass_all_bonus: int
+
+    def semester_duration(self, semester_index: int) -> int:
+        """Configured duration in seconds for a semester index."""
+        if 0 <= semester_index < len(self.semester_durations):
+            return self.semester_durations[semester_index]
+        return self.default_semester_duration
+
+    def course_state(self, state: int) -> CourseStateCoeffs:
+        """Coefficients for a course state; unknown states count as balanced."""
+        if 0 <= state < len(self.course_states):
+            return self.course_states[state]
+        return self.course_states[1]
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "BalanceSnapshot":
+        """Validate a raw balance dict; raises ValueError naming the bad field."""
+        tick = _section(config, "tick", "")
+        semester = _section(config, "semester", "")
+        default_duration = _int(
+            semester, "default_duration_seconds", 360, "semester", minimum=1
+        )
+        by_index = _section(semester, "duration_by_index", "semester")
+        durations: dict[int, int] = {}
+        for raw_index in by_index:
+            try:
+                index = int(raw_index)
+            except ValueError:
+                raise ValueError(
+                    f"semester.duration_by_index key {raw_index!r} is not an index"
+                ) from None
+            if index < 0:
+                raise ValueError(f"semester.duration_by_index.{index} is negative")
+            durations[index] = _int(
+                by_index,
+                raw_index,
+                default_duration,
+                "semester.duration_by_index",
+                minimum=1,
+            )
+        semester_durations = tuple(
+            durations.get(i, default_duration)
+            for i in range(max(durations, default=-1) + 1)
+        )
+
+        states = _section(config, "course_states", "")
+        state_coeffs: dict[int, CourseStateCoeffs] = {}
+        for raw_state, state_cfg in states.items():
+            try:
+                state = int(raw_state)
+            except ValueError:
+                raise ValueError(
+                    f"course_states key {raw_state!r} is not a state number"
+                ) from None
+            if state < 0 or not isinstance(state_cfg, Mapping):
+                raise ValueError(f"course_states.{raw_state} is invalid")
+            path = f"course_states.{raw_state}"
+            state_coeffs[state] = CourseStateCoeffs(
+                growth=_number(state_cfg, "growth", 1.0, path, minimum=0),
+                drain=_number(state_cfg, "drain", 1.0, path, minimum=0),
+            )
+        course_states = tuple(
+            state_coeffs.get(i, CourseStateCoeffs())
+            for i in range(max(max(state_coeffs, default=1), 1) + 1)
+        )
+
+        modifiers = _section(config, "sanity_stress_modifiers", "")
+        growth_cfg = _section(modifiers, "growth", "sanity_stress_modifiers")
+        growth_sanity = _section(growth_cfg, "sanity", "sanity_stress_modifiers.growth")
+        growth_stress = _section(growth_cfg, "stress", "sanity_stress_modifiers.growth")
+        critical = _section(
+            growth_sanity, "critical_low", "sanity_stress_modifiers.growth.sanity"
+        )
+        excellent = _section(
+            growth_sanity, "excellent", "sanity_stress_modifiers.growth.sanity"
+        )
+        optimal_range = growth_stress.get("optimal_range", [40, 70])
+        try:
+            stress_low, stress_high = (float(v) for v in optimal_range)
+        except (TypeError, ValueError):
+            stress_low = stress_high = math.nan
+        # NaN fails the comparison, so malformed ranges land here too.
+        if not stress_low <= stress_high:
+            raise ValueError(
+                "sanity_stress_modifiers.growth.stress.optimal_range must be "
+                f"[low, high], got {optimal_range!r}"
+            )
+        gs_path = "sanity_stress_modifiers.growth.sanity"
+        gt_path = "sanity_stress_modifiers.growth.stress"
+        growth = GrowthModifiers(
+            critical_threshold=_number(critical, "threshold", 20, gs_path),
+            critical_factor=_number(critical, "factor", 0.6, gs_path),
+            low_slope=_number(growth_sanity, "low_slope", 0.013, gs_path),
+            high_slope=_number(growth_sanity, "high_slope", 0.007, gs_path),
+            excellent_threshold=_number(excellent, "threshold", 80, gs_path),
+            excellent_factor=_number(excellent, "factor", 1.2, gs_path),
+            stress_optimal_low=stress_low,
+            stress_optimal_high=stress_high,
+            optimal_factor=_number(growth_stress, "optimal_factor", 1.3, gt_path),
+            suboptimal_factor=_number(
+                growth_stress, "suboptimal_factor", 0.85, gt_path
+            ),
+            extreme_factor=_number(growth_stress, "extreme_factor", 0.6, gt_path),
+        )
+
+        exam_cfg = _section(modifiers, "exam", "sanity_stress_modifiers")
+        exam_sanity = _section(exam_cfg, "sanity", "sanity_stress_modifiers.exam")
+        exam_stress = _section(exam_cfg, "stress", "sanity_stress_modifiers.exam")
+        es_path = "sanity_stress_modifiers.exam.sanity"
+        et_path = "sanity_stress_modifiers.exam.stress"
+        exam_modifiers = ExamModifiers(
+            low_slope=_number(exam_sanity, "low_slope", 0.3, es_path),
+            high_slope=_number(exam_sanity, "high_slope", 0.12, es_path),
+            excellent_bonus=_number(exam_sanity, "excellent_bonus", 6, es_path),
+            optimal_bonus=_number(exam_stress, "optimal_bonus", 6, et_path),
+            suboptimal_penalty=_number(exam_stress, "suboptimal_penalty", -5, et_path),
+            extreme_penalty=_number(exam_stress, "extreme_penalty", -10, et_path),
+        )
+
+        events = _section(config, "events", "")
+        random_cfg = _section(events, "random_event", "events")
+        dingtalk_cfg = _section(events, "dingtalk", "events")
+        relax = _section(config, "relax_actions", "")
+        relax_cooldowns = {}
+        for action, action_cfg in relax.items():
+            if not isinstance(action_cfg, Mapping):
+                raise ValueError(f"relax_actions.{action} must be an object")
+            relax_cooldowns[action] = _int(
+                action_cfg,
+                "cooldown_seconds",
+                0,
+                f"relax_actions.{action}",
+                minimum=0,
+            )
+        exam = _section(config, "exam", "")
+
+        return cls(
+            version=str(config.get("version", "unknown")),
+            tick_interval=_int(tick, "interval_seconds", 3, "tick", minimum=1),
+            base_energy_drain=_number(tick, "base_energy_drain", 0.8, "tick"),
+            base_mastery_growth=_number(tick, "base_mastery_growth", 0.5, "tick"),
+            default_semester_duration=default_duration,
+            semester_durations=semester_durations,
+            course_states=course_states,
+            growth=growth,
+            exam=exam_modifiers,
+            random_event=EventCheck(
+                interval_ticks=_int(
+                    random_cfg,
+                    "check_interval_ticks",
+                    5,
+                    "events.random_event",
+                    minimum=1,
+                ),
+                probability=_number(
+                    random_cfg,
+                    "trigger_probability",
+                    0.4,
+                    "events.random_event",
+                    minimum=0,
+                    maximum=1,
+                ),
+            ),
+            dingtalk=EventCheck(
+                interval_ticks=_int(
+                    dingtalk_cfg,
+                    "check_interval_ticks",
+                    10,
+                    "events.dingtalk",
+                    minimum=1,
+                ),
+                probability=_number(
+                    dingtalk_cfg,
+                    "trigger_probability",
+                    0.3,
+                    "events.dingtalk",
+                    minimum=0,
+                    maximum=1,
+                ),
+            ),
+            dingtalk_max_contacts=_int(
+                dingtalk_cfg, "max_contacts", 12, "events.dingtalk", minimum=1
+            ),
+            dingtalk_reuse_closed_contact_probability=_number(
+                dingtalk_cfg,
+                "reuse_closed_contact_probability",
+                0.7,
+                "events.dingtalk",
+                minimum=0,
+                maximum=1,
+            ),
+            relax_cooldowns=MappingProxyType(relax_cooldowns),
+            fail_threshold=_number(exam, "fail_threshold", 60, "exam"),
+            fail_sanity_penalty=_int(
+                exam, "fail_sanity_penalty_per_course", -10, "exam"
+            ),
+            pass_all_bonus=_int(exam, "pass_all_sanity_bonus", 10, "exam"),
+        )
+
+
 class GameBalance:
     """Singleton loader for gameplay balance values."""
-    _instance: Optional['GameBalance'] = None
+
+    _instance: Optional["GameBalance"] = None
     _config: Dict[str, Any] = {}
+    _snapshot: Optional[BalanceSnapshot] = None
     _config_path: Path | None = None
 
     def __new__(cls):
@@ -57,8 +387,10 @@ class GameBalance:
                 logger.error("配置文件不存在: %s", path)
                 raise FileNotFoundError(f"配置文件不存在: {path}")
 
-            with open(path, 'r', encoding='utf-8') as f:
-                self._config = json.load(f)
+            config = read_world_json(path)
+            snapshot = BalanceSnapshot.from_config(config)
+            # Swap both only after validation so readers never mix versions.
+            self._config, self._snapshot = config, snapshot
             self._config_path = path
 
             logger.info(
@@ -70,11 +402,17 @@ class GameBalance:
             raise
 
     def reload(self, config_path: str | Path | None = None):
-        """Hot-reload balance values after admin or world-data edits."""
-        self._config = {}
+        """Hot-reload balance values; the old config stays if loading fails."""
         self.load(config_path or self._config_path)
         logger.info("Game balance reloaded")
 
+    @property
+    def snapshot(self) -> BalanceSnapshot:
+        """Current validated snapshot; engines hold this between ticks."""
+        if self._snapshot is None:
+            self._snapshot = BalanceSnapshot.from_config(self._config)
+        return self._snapshot
+
     @property
     def raw(self) -> Dict[str, Any]:
         """Raw loaded balance dictionary."""
@@ -88,22 +426,22 @@ class GameBalance:
     @property
     def version(self) -> str:
         """Balance configuration version."""
-        return self._config.get("version", "unknown")
+        return self.snapshot.version
 
     @property
     def tick_interval(self) -> int:
         """Tick interval in seconds."""
-        return self._config.get("tick", {}).get("interval_seconds", 3)
+        return self.snapshot.tick_interval
 
     @property
     def base_energy_drain(self) -> float:
         """Base energy drain per tick before course-state weighting."""
-        return self._config.get("tick", {}).get("base_energy_drain", 0.8)
+        return self.snapshot.base_energy_drain
 
     @property
     def base_mastery_growth(self) -> float:
         """Base course mastery growth before stat modifiers."""
-        return self._config.get("tick", {}).get("base_mastery_growth", 0.5)
+        return self.snapshot.base_mastery_growth
 
     @property
     def semester_config(self) -> Dict:
@@ -112,16 +450,14 @@ class GameBalance:
 
     def get_semester_duration(self, semester_index: int) -> int:
         """Return configured duration for a semester index."""
-        duration_map = self.semester_config.get("duration_by_index", {})
-        default_duration = self.semester_config.get("default_duration_seconds", 360)
-        return duration_map.get(str(semester_index), default_duration)
+        return self.snapshot.semester_duration(semester_index)
 
     @property
     def speed_modes(self) -> Dict:
         """Available speed-mode definitions."""
-        return self.semester_config.get("speed_modes", {
-            "1.0": {"label": "正常速度", "multiplier": 1.0}
-        })
+        return self.semester_config.get(
+            "speed_modes", {"1.0": {"label": "正常速度", "multiplier": 1.0}}
+        )
 
     @property
     def course_states(self) -> Dict[str, Dict]:
@@ -130,10 +466,7 @@ class GameBalance:
 
     def get_course_state_coeffs(self) -> Dict[int, Dict]:
         """Return course strategy coefficients keyed by integer state."""
-        return {
-            int(k): v
-            for k, v in self.course_states.items()
-        }
+        return {int(k): v for k, v in self.course_states.items()}
 
     @property
     def sanity_stress_modifiers(self) -> Dict:
@@ -159,7 +492,7 @@ class GameBalance:
 
     def get_cooldown(self, action: str) -> int:
         """Return relax-action cooldown in seconds."""
-        return self.relax_actions.get(action, {}).get("cooldown_seconds", 0)
+        return self.snapshot.relax_cooldowns.get(action, 0)
 
     @property
     def events(self) -> Dict:
@@ -177,24 +510,12 @@ class GameBalance:
     @property
     def dingtalk_max_contacts(self) -> int:
         """Maximum DingTalk contacts kept in the inbox."""
-        try:
-            value = int(self.get_dingtalk_config().get("max_contacts", 12))
-        except (TypeError, ValueError):
-            value = 12
-        return max(1, value)
+        return self.snapshot.dingtalk_max_contacts
 
     @property
     def dingtalk_reuse_closed_contact_probability(self) -> float:
         """Probability of reusing a closed DingTalk contact."""
-        try:
-            value = float(
-                self.get_dingtalk_config().get(
-                    "reuse_closed_contact_probability", 0.7
-                )
-            )
-        except (TypeError, ValueError):
-            value = 0.7
-        return max(0.0, min(1.0, value))
+        return self.snapshot.dingtalk_reuse_closed_contact_probability
 
     @property
     def exam_config(self) -> Dict:
@@ -202,19 +523,19 @@ class GameBalance:
         return self._config.get("exam", {})
 
     @property
-    def fail_threshold(self) -> int:
+    def fail_threshold(self) -> float:
         """Score below which a course is considered failed."""
-        return self.exam_config.get("fail_threshold", 60)
+        return self.snapshot.fail_threshold
 
     @property
     def fail_sanity_penalty(self) -> int:
         """Sanity penalty applied per failed course."""
-        return self.exam_config.get("fail_sanity_penalty_per_course", -10)
+        return self.snapshot.fail_sanity_penalty
 
     @property
     def pass_all_bonus(self) -> int:
         """Sanity bonus when all courses pass."""
-        return self.exam_config.get("pass_all_sanity_bonus", 10)
+        return self.snapshot.pass_all_bonus
 
     @property
     def game_over_config(self) -> Dict:
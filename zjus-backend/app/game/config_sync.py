@@ -0,0 +1,178 @@
+"""Cross-process hot reload for balance, items, and stat definitions.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Admin publishes bump a per-kind version in Redis and announce it on a pub/sub
+channel; every worker reloads that world file, and running engines pick up
+the new balance snapshot at their next tick.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Optional
+
+from app.api.cache import RedisCache
+from app.core.metrics import metrics
+from app.core.state_backend import StateBackend
+from app.game.balance import balance
+from app.game.items import items
+from app.game.stat_definitions import stat_definitions
+
+logger = logging.getLogger(__name__)
+
+CONFIG_CHANNEL = "world:config"
+CONFIG_VERSIONS_KEY = "world:config:versions"
+# Versions are also polled, so a message lost during a reconnect still lands.
+POLL_INTERVAL_SECONDS = 5.0
+_MAX_BACKOFF_SECONDS = 30.0
+
+CONFIG_VERSION = metrics.gauge(
+    "zjus_config_version",
+    "World config version active in this worker, by config kind.",
+)
+CONFIG_RELOADS = metrics.counter(
+    "zjus_config_reloads_total",
+    "World config reloads triggered by the config channel.",
+)
+
+# Config kind -> reload of the process-wide singleton from disk.
+RELOADERS: dict[str, Callable[[], Any]] = {
+    "stat_definitions": stat_definitions.reload,
+    "balance": balance.reload,
+    "items": items.reload,
+}
+
+_active_versions: dict[str, int] = {}
+
+
+def _mark_active(kind: str, version: int) -> None:
+    _active_versions[kind] = version
+    CONFIG_VERSION.set(version, kind=kind)
+
+
+def apply_config_version(kind: str, version: int) -> bool:
+    """Reload `kind` if `version` is newer than the one active here.
+
+    A failed reload keeps the previous config and is retried on the next poll.
+    """
+    reload = RELOADERS.get(kind)
+    if reload is None or version <= _active_versions.get(kind, 0):
+        return False
+    try:
+        reload()
+    except Exception as exc:
+        CONFIG_RELOADS.inc(kind=kind, result="error")
+        logger.error("Reloading %s config version %s failed: %s", kind, version, exc)
+        return False
+    _mark_active(kind, version)
+    CONFIG_RELOADS.inc(kind=kind, result="ok")
+    logger.info("Reloaded %s config version %s", kind, version)
+    return True
+
+
+async def announce_config_change(
+    kind: str, client: Optional[StateBackend] = None
+) -> Optional[int]:
+    """Tell other workers about a config this process has already reloaded.
+
+    Returns the new version, or None if Redis was unreachable; local engines
+    switch either way.
+    """
+    client = client or RedisCache.get_client()
+    try:
+        version = int(await client.hincrby(CONFIG_VERSIONS_KEY, kind, 1))
+        _mark_active(kind, version)
+        await client.publish(
+            CONFIG_CHANNEL, json.dumps({"kind": kind, "version": version})
+        )
+    except Exception as exc:
+        logger.warning("Config change for %s was not announced: %s", kind, exc)
+        return None
+    return version
+
+
+def _parse_message(data: Any) -> Optional[tuple[str, int]]:
+    try:
+        payload = json.loads(data)
+        return str(payload["kind"]), int(payload["version"])
+    except (TypeError, ValueError, KeyError):
+        logger.warning("Ignoring malformed config message: %r", data)
+        return None
+
+
+class ConfigSyncWorker:
+    """Per-process subscriber that applies announced config versions."""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], StateBackend] = RedisCache.get_client,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+    ):
+        self._client_factory = client_factory
+        self._poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _sync_versions(self, client: StateBackend, reload: bool) -> None:
+        versions = await client.hgetall(CONFIG_VERSIONS_KEY)
+        for kind, raw_version in versions.items():
+            version = int(raw_version)
+            if reload:
+                apply_config_version(kind, version)
+            elif version > _active_versions.get(kind, 0):
+                _mark_active(kind, version)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+        # World files were read at import, so the first sync only records
+        # versions; later (re)connects reload anything that moved meanwhile.
+        reload_on_sync = False
+        while True:
+            client = self._client_factory()
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(CONFIG_CHANNEL)
+                await self._sync_versions(client, reload=reload_on_sync)
+                reload_on_sync = True
+                backoff = 1.0
+                next_poll = loop.time() + self._poll_interval
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=min(1.0, self._poll_interval),
+                    )
+                    if message is not None:
+                        parsed = _parse_message(message.get("data"))
+                        if parsed is not None:
+                            apply_config_version(*parsed)
+                    if loop.time() >= next_poll:
+                        await self._sync_versions(client, reload=True)
+                        next_poll = loop.time() + self._poll_interval
+            except Exception as exc:
+                logger.warning(
+                    "Config channel dropped, retrying in %.0fs: %s", backoff, exc
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, _MAX_BACKOFF_SECONDS)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+config_sync_worker = ConfigSyncWorker()
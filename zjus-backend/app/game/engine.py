@@ -12,28 +12,55 @@ import logging
 import math
 import random
 import time
+from collections import deque
 from pathlib import Path
 from typing import Any, Callable, Coroutine, Literal, Optional
 
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
 from sqlalchemy import update
 
-from app.content.event_library import pick_cc98_post, pick_random_event
+from app.content.event_library import (
+    library_dingtalk_reply,
+    pick_dingtalk_thread,
+    pick_random_event,
+    sample_cc98_post,
+    seen_event_offset,
+    seen_events,
+    seen_events_layout,
+)
+from app.content.state_vector import PlayerStateVector
+from app.core.config import settings
 from app.core.database import AsyncSessionLocal
+from app.core.dingtalk_context import DINGTALK_RECENT_TURNS, extractive_summary
 from app.core.events import GameEvent
+from app.core.hedging import hedged
 from app.core.input_safety import safe_username_for_prompt
 from app.core.llm import (
     generate_cc98_post,
     generate_dingtalk_message,
     generate_dingtalk_message_for_character,
     generate_dingtalk_reply_message,
+    generate_dingtalk_summary,
     generate_random_event,
+    llm_gate,
+    pop_pooled_random_event,
+)
+from app.core.metrics import metrics
+from app.core.reply_cache import (
+    SHARED_REPLY_USERNAME,
+    dingtalk_reply_cache,
+    reply_fingerprint,
 )
-from app.game.balance import balance
+from app.core.reply_stream import DeltaCallback
+from app.core.world_bundle import read_world_json
+from app.game.balance import BalanceSnapshot, balance
 from app.game.items import items
 from app.game.stat_definitions import stat_definitions
 from app.models.user import User
 from app.repositories.redis_repo import RedisRepository
 from app.schemas.dingtalk import (
+    DINGTALK_HISTORY_PAGE_SIZE,
     DingTalkContact,
     DingTalkMessage,
     DingTalkReplyOption,
@@ -44,11 +71,34 @@ from app.schemas.dingtalk import (
     normalize_dingtalk_role,
     now_ts,
 )
-from app.services.game_service import GameService
+from app.services.game_service import FINAL_SEMESTER_IDX, GameService
+from app.services.save_queue import autosave_queue
 from app.services.save_service import SaveService
 
 logger = logging.getLogger(__name__)
 
+# Reply prompts only use the newest turns, so replies load a bounded window.
+DINGTALK_REPLY_HISTORY_MESSAGES = DINGTALK_RECENT_TURNS
+# A round is the opener plus three reply exchanges; summaries read this many.
+DINGTALK_SUMMARY_SOURCE_MESSAGES = 12
+# Library CC98 posts shown this recently are skipped while fresh ones remain.
+CC98_RECENT_POSTS = 30
+# Library DingTalk threads skipped while they are among the last few shown.
+DINGTALK_RECENT_THREADS = 20
+
+ENGINE_TICKS_SKIPPED = metrics.counter(
+    "zjus_engine_ticks_skipped_total",
+    "Engine ticks skipped because Redis was unavailable or saturated.",
+)
+WENYAN_REPORTS = metrics.counter(
+    "zjus_wenyan_reports_total",
+    "Graduation wenyan reports by source: hit, stale, cold, or timeout.",
+)
+HOLIDAY_EVENTS = metrics.counter(
+    "zjus_holiday_events_total",
+    "Semester holiday events by source: prefetched or library.",
+)
+
 
 class GameMode:
     """Content-generation mode identifiers accepted by the running engine."""
@@ -365,6 +415,15 @@ class GameEngine:
         self._random_event_inflight = False
         self._dingtalk_inflight = False
         self._relax_inflight: set[str] = set()
+        self._recent_cc98_ids: deque[str] = deque(maxlen=CC98_RECENT_POSTS)
+        self._recent_dingtalk_threads: deque[str] = deque(
+            maxlen=DINGTALK_RECENT_THREADS
+        )
+        # (stats digest, task) for the graduation report started after the
+        # last final exam.
+        self._wenyan_prefetch: tuple[str, asyncio.Task[str]] | None = None
+        # Holiday event generated while the exam summary is on screen.
+        self._holiday_event_prefetch: asyncio.Task[Any] | None = None
         self._dingtalk_state_lock = asyncio.Lock()
         self._items_lock = asyncio.Lock()
         self._ttl_refresh_interval_seconds = 600
@@ -387,20 +446,22 @@ class GameEngine:
             )
         self._achievement_config: dict[str, Any] | None = None
 
-        # Course strategy values: 0=lay flat, 1=balanced, 2=hardcore.
-        self.COURSE_STATE_COEFFS = balance.get_course_state_coeffs()
-        self.BASE_ENERGY_DRAIN = balance.base_energy_drain
-        self.BASE_MASTERY_GROWTH = balance.base_mastery_growth
+        self._balance: BalanceSnapshot = balance.snapshot
+
+    def _refresh_config_snapshot(self) -> None:
+        """Adopt a reloaded balance snapshot; only called between ticks."""
+        self._balance = balance.snapshot
 
     def _make_dingtalk_message(
         self,
         speaker: Literal["npc", "player", "system"],
         content: str,
         round_id: str | None = None,
+        message_id: str | None = None,
     ) -> DingTalkMessage:
         """Create a DingTalk message with consistent IDs and timestamps."""
         return DingTalkMessage(
-            message_id=new_message_id(),
+            message_id=message_id or new_message_id(),
             speaker=speaker,
             content=str(content or "").strip(),
             created_at=now_ts(),
@@ -507,7 +568,7 @@ class GameEngine:
         if not closed:
             return None
         should_reuse = force or (
-            random.random() < balance.dingtalk_reuse_closed_contact_probability
+            random.random() < self._balance.dingtalk_reuse_closed_contact_probability
         )
         if not should_reuse:
             return None
@@ -587,10 +648,78 @@ class GameEngine:
         msg_data["is_urgent"] = contact.is_urgent
         return msg_data
 
-    async def _emit_dingtalk_contact_update(self, contact: DingTalkContact):
+    async def _emit_dingtalk_delta(
+        self, contact_id: str, seq: int, ops: list[dict[str, Any]]
+    ):
+        """Push one incremental DingTalk change for a contact.
+
+        Every persisted change bumps the contact's `seq` by exactly one, so a
+        client that sees a gap asks for `dingtalk_sync` instead of guessing.
+        Emitted under `_dingtalk_state_lock` to keep per-contact order.
+        """
+        await self.emit(
+            "dingtalk_delta",
+            {"contact_id": contact_id, "seq": seq, "ops": ops},
+        )
+
+    @staticmethod
+    def _dingtalk_contact_op(contact: DingTalkContact) -> dict[str, Any]:
+        header = contact.model_dump(
+            exclude={"messages", "pending_options", "round", "unread_count", "seq"}
+        )
+        return {"op": "contact", "contact": header}
+
+    @staticmethod
+    def _dingtalk_message_op(message: DingTalkMessage) -> dict[str, Any]:
+        return {"op": "message", "message": message.model_dump()}
+
+    @staticmethod
+    def _dingtalk_reply_state_ops(contact: DingTalkContact) -> list[dict[str, Any]]:
+        return [
+            {
+                "op": "options",
+                "pending_options": [o.model_dump() for o in contact.pending_options],
+            },
+            {"op": "round", "round": contact.round.model_dump(exclude={"library_id"})},
+        ]
+
+    async def _emit_dingtalk_thread(self, contact_id: str):
+        """Resend one contact's latest page after the client saw a seq gap."""
+        contact = await self.repo.get_dingtalk_contact(
+            contact_id, message_limit=DINGTALK_HISTORY_PAGE_SIZE
+        )
+        if contact is None:
+            return
+        _, has_more = await self.repo.get_dingtalk_history(
+            contact_id, len(contact.messages), 0
+        )
         await self.emit(
-            "dingtalk_thread_update",
-            {"contact": contact.model_dump()},
+            "dingtalk_thread",
+            {"contact": contact.model_dump(), "has_more": has_more},
+        )
+
+    async def _emit_dingtalk_history(self, data: dict[str, Any]):
+        """Send one page of older messages for a contact on demand."""
+        contact_id = str(data.get("contact_id") or "").strip()
+        if not contact_id:
+            return
+        try:
+            offset = max(0, int(data.get("offset", 0)))
+            limit = int(data.get("limit", DINGTALK_HISTORY_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return
+        limit = min(max(limit, 1), DINGTALK_HISTORY_PAGE_SIZE)
+        messages, has_more = await self.repo.get_dingtalk_history(
+            contact_id, offset, limit
+        )
+        await self.emit(
+            "dingtalk_history",
+            {
+                "contact_id": contact_id,
+                "offset": offset,
+                "messages": [m.model_dump() for m in messages],
+                "has_more": has_more,
+            },
         )
 
     async def _store_dingtalk_npc_message(
@@ -600,16 +729,16 @@ class GameEngine:
         if not content:
             return None
         async with self._dingtalk_state_lock:
-            state = await self.repo.get_dingtalk_state()
-            contact_limit = balance.dingtalk_max_contacts
-            contact = state.contacts.get(contact_meta["contact_id"])
+            contacts = await self.repo.get_dingtalk_contacts()
+            contact_limit = self._balance.dingtalk_max_contacts
+            contact = contacts.get(contact_meta["contact_id"])
             if contact and contact.round.status == "open":
                 return None
             if not contact:
-                force_reuse = len(state.contacts) >= contact_limit
+                force_reuse = len(contacts) >= contact_limit
                 if force_reuse:
                     reusable = self._choose_reusable_dingtalk_contact(
-                        state.contacts,
+                        contacts,
                         force=True,
                     )
                     if reusable:
@@ -625,6 +754,7 @@ class GameEngine:
                         contact = reusable
                     else:
                         return None
+            is_new_contact = contact is None
             if not contact:
                 contact = DingTalkContact(**contact_meta)
             else:
@@ -639,6 +769,7 @@ class GameEngine:
                     round_id=f"dtr_{new_message_id()[4:]}",
                     status="open",
                     player_reply_count=0,
+                    library_id=str(msg_data.get("library_id") or ""),
                 )
                 round_id = contact.round.round_id
                 contact.pending_options = options
@@ -647,13 +778,21 @@ class GameEngine:
                 contact.round = DingTalkRoundState()
 
             message = self._make_dingtalk_message("npc", content, round_id=round_id)
-            contact.messages.append(message)
-            contact.unread_count += 1
             contact.last_message_at = message.created_at
-            contact.trim_messages()
-            state.contacts[contact.contact_id] = contact
-            state.compact(max_contacts=contact_limit)
-            await self.repo.set_dingtalk_state(state)
+            await self.repo.append_dingtalk_message(contact, message, unread_delta=1)
+            contact.messages = [message]
+            if is_new_contact:
+                await self.repo.compact_dingtalk_contacts(contact_limit)
+            await self._emit_dingtalk_delta(
+                contact.contact_id,
+                contact.seq,
+                [
+                    self._dingtalk_contact_op(contact),
+                    self._dingtalk_message_op(message),
+                    {"op": "unread", "unread_count": contact.unread_count},
+                    *self._dingtalk_reply_state_ops(contact),
+                ],
+            )
             return contact
 
     def _fallback_dingtalk_reply_result(
@@ -678,9 +817,48 @@ class GameEngine:
         player_reply: str,
         reply_count: int,
         stats: dict[str, Any],
+        on_delta: Optional[DeltaCallback] = None,
     ) -> dict[str, Any]:
+        # Library threads stay scripted in every mode; library mode never
+        # spends tokens on replies.
+        scripted = library_dingtalk_reply(
+            contact.round.library_id, reply_count, player_reply
+        )
+        if scripted:
+            return scripted
+        if self.mode == GameMode.LIBRARY:
+            return self._fallback_dingtalk_reply_result(contact, reply_count)
         rp_override = self.rp_llm_override
-        if rp_override or not self.llm_override:
+        history = [m.model_dump() for m in contact.messages]
+        fingerprint = self._dingtalk_reply_fingerprint(
+            contact, player_reply, reply_count, stats
+        )
+        if fingerprint is not None:
+            try:
+                cached = await dingtalk_reply_cache.get(fingerprint)
+            except Exception as e:
+                logger.warning("DingTalk reply cache lookup failed: %s", e)
+                cached = None
+            if cached:
+                return cached
+            # A shared reply must not address this player by name.
+            stats = {**stats, "username": SHARED_REPLY_USERNAME}
+        streaming: list[str] = []
+
+        def stream_from(source: str) -> Optional[DeltaCallback]:
+            """Forward deltas from whichever hedged source streams first."""
+            if on_delta is None:
+                return None
+
+            async def forward(text: str) -> None:
+                if not streaming:
+                    streaming.append(source)
+                if streaming[0] == source:
+                    await on_delta(text)
+
+            return forward
+
+        async def via_m2her() -> Optional[dict[str, Any]]:
             try:
                 from app.core.dingtalk_llm import (
                     generate_dingtalk_reply_via_m2her,
@@ -693,40 +871,87 @@ class GameEngine:
                     "content": f"你是{contact.sender}。",
                     "examples": [],
                 }
-                history = [m.model_dump() for m in contact.messages]
-                generated = await generate_dingtalk_reply_via_m2her(
+                return await generate_dingtalk_reply_via_m2her(
                     character,
                     stats,
                     history,
                     player_reply,
                     reply_count,
                     llm_override=rp_override,
+                    on_delta=stream_from("m2her"),
+                    summary=contact.summary,
                 )
-                if generated:
-                    return generated
             except Exception as e:
                 logger.warning("M2-her dingtalk reply fallback: %s", e)
-        try:
-            character = {
-                "name": contact.sender,
-                "role": contact.role,
-                "content": f"你是{contact.sender}。",
-                "examples": [],
-            }
-            history = [m.model_dump() for m in contact.messages]
-            generated = await generate_dingtalk_reply_message(
-                character,
-                stats,
-                history,
-                player_reply,
-                reply_count,
-                llm_override=self.llm_override,
+                return None
+
+        async def via_generic() -> Optional[dict[str, Any]]:
+            try:
+                character = {
+                    "name": contact.sender,
+                    "role": contact.role,
+                    "content": f"你是{contact.sender}。",
+                    "examples": [],
+                }
+                return await generate_dingtalk_reply_message(
+                    character,
+                    stats,
+                    history,
+                    player_reply,
+                    reply_count,
+                    llm_override=self.llm_override,
+                    on_delta=stream_from("generic"),
+                    summary=contact.summary,
+                )
+            except Exception as e:
+                logger.warning("Generic dingtalk reply fallback failed: %s", e)
+                return None
+
+        if rp_override or not self.llm_override:
+            # A slow M2-her reply races the generic LLM when hedging is on.
+            result = await hedged(
+                "dingtalk_reply",
+                via_m2her,
+                via_generic,
+                secondary_gate=llm_gate(self.llm_override),
             )
-            if generated:
-                return generated
-        except Exception as e:
-            logger.warning("Generic dingtalk reply fallback failed: %s", e)
-        return self._fallback_dingtalk_reply_result(contact, reply_count)
+            generated = result.value
+        else:
+            generated = await via_generic()
+        if generated and fingerprint is not None:
+            try:
+                await dingtalk_reply_cache.put(fingerprint, generated)
+            except Exception as e:
+                logger.warning("DingTalk reply cache store failed: %s", e)
+        return generated or self._fallback_dingtalk_reply_result(contact, reply_count)
+
+    def _dingtalk_reply_fingerprint(
+        self,
+        contact: DingTalkContact,
+        player_reply: str,
+        reply_count: int,
+        stats: dict[str, Any],
+    ) -> str | None:
+        """Shared reply-cache key, or None when the context is player-specific.
+
+        Only platform-key replies are shared, and only before a contact has a
+        rolling summary, since the summary makes each thread's context unique.
+        Threads that already mention the player's name stay unshared too.
+        """
+        if self.llm_override or self.rp_llm_override or contact.summary:
+            return None
+        if not dingtalk_reply_cache.enabled():
+            return None
+        username = str(stats.get("username") or "").strip()
+        if username and any(username in m.content for m in contact.messages):
+            return None
+        last_npc_line = next(
+            (m.content for m in reversed(contact.messages) if m.speaker == "npc"),
+            "",
+        )
+        return reply_fingerprint(
+            contact.contact_id, stats, reply_count, player_reply, last_npc_line
+        )
 
     def _sanitize_dingtalk_effects(
         self, settlement: Any
@@ -855,39 +1080,28 @@ class GameEngine:
         Sanity uses 50 as a neutral baseline. Stress rewards the configured
         optimal range and penalizes extreme values.
         """
-        growth_mod = balance.get_growth_modifiers()
-        sanity_cfg = growth_mod.get("sanity", {})
-        stress_cfg = growth_mod.get("stress", {})
-
-        critical_threshold = sanity_cfg.get("critical_low", {}).get("threshold", 20)
-        critical_factor = sanity_cfg.get("critical_low", {}).get("factor", 0.6)
-        low_slope = sanity_cfg.get("low_slope", 0.013)
-        high_slope = sanity_cfg.get("high_slope", 0.007)
-        excellent_threshold = sanity_cfg.get("excellent", {}).get("threshold", 80)
-        excellent_factor = sanity_cfg.get("excellent", {}).get("factor", 1.2)
-
-        if sanity < critical_threshold:
-            sanity_factor = critical_factor
+        mod = self._balance.growth
+
+        if sanity < mod.critical_threshold:
+            sanity_factor = mod.critical_factor
         elif sanity < 50:
-            sanity_factor = 1 - (50 - sanity) * low_slope
-        elif sanity >= excellent_threshold:
-            sanity_factor = excellent_factor
+            sanity_factor = 1 - (50 - sanity) * mod.low_slope
+        elif sanity >= mod.excellent_threshold:
+            sanity_factor = mod.excellent_factor
         elif sanity > 50:
-            sanity_factor = 1 + (sanity - 50) * high_slope
+            sanity_factor = 1 + (sanity - 50) * mod.high_slope
         else:
             sanity_factor = 1.0
 
-        optimal_range = stress_cfg.get("optimal_range", [40, 70])
-        optimal_factor = stress_cfg.get("optimal_factor", 1.3)
-        suboptimal_factor = stress_cfg.get("suboptimal_factor", 0.85)
-        extreme_factor = stress_cfg.get("extreme_factor", 0.6)
-
-        if optimal_range[0] <= stress <= optimal_range[1]:
-            stress_factor = optimal_factor
-        elif 20 <= stress < optimal_range[0] or optimal_range[1] < stress <= 90:
-            stress_factor = suboptimal_factor
+        if mod.stress_optimal_low <= stress <= mod.stress_optimal_high:
+            stress_factor = mod.optimal_factor
+        elif (
+            20 <= stress < mod.stress_optimal_low
+            or mod.stress_optimal_high < stress <= 90
+        ):
+            stress_factor = mod.suboptimal_factor
         else:
-            stress_factor = extreme_factor
+            stress_factor = mod.extreme_factor
 
         return sanity_factor * stress_factor
 
@@ -896,33 +1110,23 @@ class GameEngine:
 
         The exact slopes and bonuses are read from `game_balance.json`.
         """
-        exam_mod = balance.get_exam_modifiers()
-        sanity_cfg = exam_mod.get("sanity", {})
-        stress_cfg = exam_mod.get("stress", {})
-
-        low_slope = sanity_cfg.get("low_slope", 0.3)
-        high_slope = sanity_cfg.get("high_slope", 0.12)
-        excellent_bonus = sanity_cfg.get("excellent_bonus", 6)
+        mod = self._balance.exam
 
         if sanity < 50:
-            sanity_bonus = (sanity - 50) * low_slope
+            sanity_bonus = (sanity - 50) * mod.low_slope
         elif sanity >= 80:
-            sanity_bonus = excellent_bonus
+            sanity_bonus = mod.excellent_bonus
         elif sanity > 50:
-            sanity_bonus = (sanity - 50) * high_slope
+            sanity_bonus = (sanity - 50) * mod.high_slope
         else:
             sanity_bonus = 0
 
-        optimal_bonus = stress_cfg.get("optimal_bonus", 6)
-        suboptimal_penalty = stress_cfg.get("suboptimal_penalty", -5)
-        extreme_penalty = stress_cfg.get("extreme_penalty", -10)
-
         if 40 <= stress <= 70:
-            stress_bonus = optimal_bonus
+            stress_bonus = mod.optimal_bonus
         elif 20 <= stress < 40 or 70 < stress <= 90:
-            stress_bonus = suboptimal_penalty
+            stress_bonus = mod.suboptimal_penalty
         else:
-            stress_bonus = extreme_penalty
+            stress_bonus = mod.extreme_penalty
 
         return sanity_bonus + stress_bonus
 
@@ -933,158 +1137,176 @@ class GameEngine:
         tick_count = 0
         try:
             while self.is_running:
+                # Config reloaded by this or another worker takes effect on a
+                # tick edge, so one tick never mixes two balance versions.
+                self._refresh_config_snapshot()
                 # Real-time sleep shortens under speed-up, while game time
                 # remains discrete.
-                tick_interval = max(1, int(balance.tick_interval))
+                tick_interval = self._balance.tick_interval
                 await asyncio.sleep(tick_interval / self.speed_multiplier)
                 if not self.is_running:
                     break
                 tick_count += 1
-
-                # Do not clamp elapsed time through update_stat_safe; timer values
-                # intentionally exceed ordinary stat max bounds.
-                elapsed = await self.repo.update_stat(
-                    "elapsed_game_time", tick_interval
-                )
-
-                snapshot = await self.repo.get_snapshot()
-                stats = await self._effective_stats(snapshot.stats.model_dump())
-
-                sem_idx = int(stats.get("semester_idx") or 1)
-                sem_duration = balance.get_semester_duration(sem_idx)
-                if elapsed >= sem_duration:
-                    logger.info(
-                        "Semester time exceeded for %s, triggering final exam.",
+                try:
+                    keep_running = await self._run_tick(tick_count, tick_interval)
+                except (RedisConnectionError, RedisTimeoutError) as e:
+                    # A saturated pool or a Redis blip costs one tick; the pool
+                    # metrics show the queueing and the session keeps running.
+                    ENGINE_TICKS_SKIPPED.inc(reason=type(e).__name__)
+                    logger.warning(
+                        "Skipping tick %s for %s after Redis error: %s",
+                        tick_count,
                         self.user_id,
+                        e,
                     )
-                    self.stop()
-                    await self._handle_final_exam()
+                    continue
+                if not keep_running:
                     break
 
-                # Refresh TTLs infrequently for active players.
-                now_ts = asyncio.get_running_loop().time()
-                if (
-                    now_ts - self._last_ttl_refresh
-                    >= self._ttl_refresh_interval_seconds
-                ):
-                    await self.repo.touch_ttl()
-                    self._last_ttl_refresh = now_ts
+        except Exception as e:
+            logger.error(f"Engine Loop Error: {e}", exc_info=True)
+            self.stop()
 
-                if await self.check_and_trigger_gameover(stats):
-                    break
+    async def _advance_clock(self, tick_interval: int) -> int:
+        """Add one tick to the semester clock and return the new elapsed time."""
+        # Do not clamp elapsed time through update_stat_safe; timer values
+        # intentionally exceed ordinary stat max bounds.
+        return await self.repo.update_stat("elapsed_game_time", tick_interval)
 
-                course_states_raw = snapshot.course_states
+    async def _run_tick(self, tick_count: int, tick_interval: int) -> bool:
+        """Apply one tick of progression; return False when the loop should end.
 
-                try:
-                    course_info = json.loads(stats.get("course_info_json", "[]"))
-                except (TypeError, json.JSONDecodeError):
-                    course_info = []
+        The clock advances only after the tick's stat writes, so a Redis error
+        that skips the tick never moves game time ahead of progression.
+        """
+        snapshot = await self.repo.get_snapshot()
+        stats = await self._effective_stats(snapshot.stats.model_dump())
 
-                # Empty-course periods behave like a light recovery break.
-                if not course_info:
-                    logger.warning(
-                        "[%s] course_info is EMPTY, skipping mastery growth",
-                        self.user_id,
-                    )
-                    await self.repo.update_stat_safe("energy", 1)
-                    snapshot = await self.repo.get_snapshot()
-                    stats = await self._effective_stats(snapshot.stats.model_dump())
-                    await self._push_update(snapshot=snapshot, effective_stats=stats)
-                    continue
+        elapsed = int(stats.get("elapsed_game_time") or 0) + tick_interval
+        sem_idx = int(stats.get("semester_idx") or 1)
+        sem_duration = self._balance.semester_duration(sem_idx)
+        if elapsed >= sem_duration:
+            logger.info(
+                "Semester time exceeded for %s, triggering final exam.",
+                self.user_id,
+            )
+            await self._advance_clock(tick_interval)
+            self.stop()
+            await self._handle_final_exam()
+            return False
 
-                # Course mastery and drain are credit-weighted each tick.
-                total_credits = sum(c.get("credits", 1.0) for c in course_info)
-                if total_credits <= 0:
-                    total_credits = 1.0
+        # Refresh TTLs infrequently for active players.
+        now_ts = asyncio.get_running_loop().time()
+        if now_ts - self._last_ttl_refresh >= self._ttl_refresh_interval_seconds:
+            await self.repo.touch_ttl()
+            self._last_ttl_refresh = now_ts
 
-                total_drain_factor = 0.0
-                mastery_updates = {}
+        if await self.check_and_trigger_gameover(stats):
+            return False
 
-                for course in course_info:
-                    c_id = str(course.get("id"))
-                    credits = float(course.get("credits", 1.0))
-                    state_val = int(course_states_raw.get(c_id, 1))
-                    coeffs = self.COURSE_STATE_COEFFS.get(
-                        state_val, self.COURSE_STATE_COEFFS[1]
-                    )
-                    iq_default = self._stat_default("iq")
-                    iq_buff = (int(stats.get("iq", iq_default)) - iq_default) * 0.01
-                    if state_val in (1, 2):
-                        sanity = int(stats.get("sanity", self._stat_default("sanity")))
-                        stress = int(stats.get("stress", self._stat_default("stress")))
-                        factor = self._sanity_stress_growth_factor(sanity, stress)
-                    else:
-                        factor = 1.0
-                    actual_growth = (
-                        self.BASE_MASTERY_GROWTH
-                        * coeffs["growth"]
-                        * (1 + iq_buff)
-                        * factor
-                    )
-                    if actual_growth > 0:
-                        mastery_updates[c_id] = actual_growth
-                    weight = credits / total_credits
-                    total_drain_factor += weight * coeffs["drain"]
-
-                if mastery_updates:
-                    await self.repo.batch_update_course_mastery(mastery_updates)
-                    if tick_count <= 3:
-                        logger.info(
-                            "[%s] tick#%s mastery_updates: %s",
-                            self.user_id,
-                            tick_count,
-                            mastery_updates,
-                        )
-                else:
-                    if tick_count <= 3:
-                        logger.warning(
-                            "[%s] tick#%s mastery_updates is EMPTY",
-                            self.user_id,
-                            tick_count,
-                        )
+        course_states_raw = snapshot.course_states
 
-                final_energy_cost_float = self.BASE_ENERGY_DRAIN * total_drain_factor
+        try:
+            course_info = json.loads(stats.get("course_info_json", "[]"))
+        except (TypeError, json.JSONDecodeError):
+            course_info = []
 
-                # Only near-zero drain counts as true recovery; avoid integer
-                # truncation.
-                if final_energy_cost_float < 0.3:
-                    await self.repo.update_stat_safe("energy", 2)
-                    await self.repo.update_stat_safe("stress", -2)
-                else:
-                    final_energy_cost = max(1, math.ceil(final_energy_cost_float))
-                    await self.repo.update_stat_safe("energy", -final_energy_cost)
-                    if total_drain_factor > 1.5:
-                        await self.repo.update_stat_safe("stress", 1)
-
-                if self.is_running:
-                    event_cfg = balance.get_random_event_config()
-                    event_interval = event_cfg.get("check_interval_ticks", 5)
-                    event_probability = event_cfg.get("trigger_probability", 0.4)
-
-                    if tick_count % event_interval == 0:
-                        if random.random() < event_probability:
-                            if not self._random_event_inflight:
-                                self._track_task(self._trigger_random_event())
-                        await self._check_achievements()
-
-                    dingtalk_cfg = balance.get_dingtalk_config()
-                    dingtalk_interval = dingtalk_cfg.get("check_interval_ticks", 10)
-                    dingtalk_probability = dingtalk_cfg.get("trigger_probability", 0.3)
-
-                    if (
-                        tick_count % dingtalk_interval == 0
-                        and random.random() < dingtalk_probability
-                    ):
-                        if not self._dingtalk_inflight:
-                            self._track_task(self._trigger_dingtalk_message())
+        # Empty-course periods behave like a light recovery break.
+        if not course_info:
+            logger.warning(
+                "[%s] course_info is EMPTY, skipping mastery growth",
+                self.user_id,
+            )
+            await self.repo.update_stat_safe("energy", 1)
+            await self._advance_clock(tick_interval)
+            snapshot = await self.repo.get_snapshot()
+            stats = await self._effective_stats(snapshot.stats.model_dump())
+            await self._push_update(snapshot=snapshot, effective_stats=stats)
+            return True
 
-                snapshot = await self.repo.get_snapshot()
-                stats = await self._effective_stats(snapshot.stats.model_dump())
-                await self._push_update(snapshot=snapshot, effective_stats=stats)
+        # Course mastery and drain are credit-weighted each tick.
+        total_credits = sum(c.get("credits", 1.0) for c in course_info)
+        if total_credits <= 0:
+            total_credits = 1.0
 
-        except Exception as e:
-            logger.error(f"Engine Loop Error: {e}", exc_info=True)
-            self.stop()
+        total_drain_factor = 0.0
+        mastery_updates = {}
+
+        for course in course_info:
+            c_id = str(course.get("id"))
+            credits = float(course.get("credits", 1.0))
+            state_val = int(course_states_raw.get(c_id, 1))
+            coeffs = self._balance.course_state(state_val)
+            iq_default = self._stat_default("iq")
+            iq_buff = (int(stats.get("iq", iq_default)) - iq_default) * 0.01
+            if state_val in (1, 2):
+                sanity = int(stats.get("sanity", self._stat_default("sanity")))
+                stress = int(stats.get("stress", self._stat_default("stress")))
+                factor = self._sanity_stress_growth_factor(sanity, stress)
+            else:
+                factor = 1.0
+            actual_growth = (
+                self._balance.base_mastery_growth
+                * coeffs.growth
+                * (1 + iq_buff)
+                * factor
+            )
+            if actual_growth > 0:
+                mastery_updates[c_id] = actual_growth
+            weight = credits / total_credits
+            total_drain_factor += weight * coeffs.drain
+
+        if mastery_updates:
+            await self.repo.batch_update_course_mastery(mastery_updates)
+            if tick_count <= 3:
+                logger.info(
+                    "[%s] tick#%s mastery_updates: %s",
+                    self.user_id,
+                    tick_count,
+                    mastery_updates,
+                )
+        else:
+            if tick_count <= 3:
+                logger.warning(
+                    "[%s] tick#%s mastery_updates is EMPTY",
+                    self.user_id,
+                    tick_count,
+                )
+
+        final_energy_cost_float = self._balance.base_energy_drain * total_drain_factor
+
+        # Only near-zero drain counts as true recovery; avoid integer
+        # truncation.
+        if final_energy_cost_float < 0.3:
+            await self.repo.update_stat_safe("energy", 2)
+            await self.repo.update_stat_safe("stress", -2)
+        else:
+            final_energy_cost = max(1, math.ceil(final_energy_cost_float))
+            await self.repo.update_stat_safe("energy", -final_energy_cost)
+            if total_drain_factor > 1.5:
+                await self.repo.update_stat_safe("stress", 1)
+        await self._advance_clock(tick_interval)
+
+        if self.is_running:
+            event_check = self._balance.random_event
+            if event_check.due(tick_count):
+                if random.random() < event_check.probability:
+                    if not self._random_event_inflight:
+                        self._track_task(self._trigger_random_event())
+                await self._check_achievements()
+
+            dingtalk_check = self._balance.dingtalk
+            if (
+                dingtalk_check.due(tick_count)
+                and random.random() < dingtalk_check.probability
+            ):
+                if not self._dingtalk_inflight:
+                    self._track_task(self._trigger_dingtalk_message())
+
+        snapshot = await self.repo.get_snapshot()
+        stats = await self._effective_stats(snapshot.stats.model_dump())
+        await self._push_update(snapshot=snapshot, effective_stats=stats)
+        return True
 
     async def _action_allowed_by_runtime_state(self, action: object) -> bool:
         """Return whether an action may run while the engine is stopped.
@@ -1107,6 +1329,8 @@ class GameEngine:
             "set_speed",
             "set_mode",
             "dingtalk_mark_read",
+            "dingtalk_history",
+            "dingtalk_sync",
         }
         if action_name in always_allowed:
             return True
@@ -1157,8 +1381,10 @@ class GameEngine:
         | set_speed | speed multiplier changes | unchanged | none |
         | set_mode | content mode changes | unchanged | mode_changed |
         | change_course_state | unchanged | course strategy hash | tick snapshot |
-        | dingtalk_mark_read | unchanged | DingTalk unread state | dingtalk_update |
-        | dingtalk_reply | background task | DingTalk messages | update/feedback |
+        | dingtalk_mark_read | unchanged | DingTalk unread state | dingtalk_delta |
+        | dingtalk_history | unchanged | unchanged | dingtalk_history page |
+        | dingtalk_sync | unchanged | unchanged | dingtalk_thread |
+        | dingtalk_reply | background task | DingTalk messages | delta/feedback |
         | item_buy/item_sell | unchanged | gold/items state | items_state/tick |
         | relax | background task | cooldowns/stats/logs | update/feedback |
         | exam | loop stops for modal | GPA/gold/achievements | semester_summary |
@@ -1225,10 +1451,22 @@ class GameEngine:
             contact_id = str(action_data.get("contact_id") or "").strip()
             if not contact_id:
                 return
-            state = await self.repo.mark_dingtalk_read(contact_id)
-            contact = state.contacts.get(contact_id)
-            if contact:
-                await self._emit_dingtalk_contact_update(contact)
+            async with self._dingtalk_state_lock:
+                seq = await self.repo.mark_dingtalk_read(contact_id)
+                if seq is not None:
+                    await self._emit_dingtalk_delta(
+                        contact_id, seq, [{"op": "unread", "unread_count": 0}]
+                    )
+            return
+
+        if action == "dingtalk_history":
+            await self._emit_dingtalk_history(action_data)
+            return
+
+        if action == "dingtalk_sync":
+            contact_id = str(action_data.get("contact_id") or "").strip()
+            if contact_id:
+                await self._emit_dingtalk_thread(contact_id)
             return
 
         if action == "dingtalk_reply":
@@ -1279,8 +1517,9 @@ class GameEngine:
             return
 
         async with self._dingtalk_state_lock:
-            state = await self.repo.get_dingtalk_state()
-            contact = state.contacts.get(contact_id)
+            contact = await self.repo.get_dingtalk_contact(
+                contact_id, message_limit=DINGTALK_REPLY_HISTORY_MESSAGES
+            )
             if not contact or not contact.is_replyable:
                 await self.emit(
                     "toast",
@@ -1315,32 +1554,42 @@ class GameEngine:
             )
             contact.messages.append(player_message)
             contact.last_message_at = player_message.created_at
-            contact.trim_messages()
-            state.contacts[contact_id] = contact
-            await self.repo.set_dingtalk_state(state)
-
-        await self._emit_dingtalk_contact_update(contact)
+            await self.repo.append_dingtalk_message(contact, player_message)
+            await self._emit_dingtalk_delta(
+                contact_id,
+                contact.seq,
+                [
+                    self._dingtalk_message_op(player_message),
+                    *self._dingtalk_reply_state_ops(contact),
+                ],
+            )
 
         snapshot = await self.repo.get_snapshot()
         stats = await self._effective_stats(snapshot.stats.model_dump())
         reply_count = contact.round.player_reply_count
+        # The streamed draft and the persisted NPC message share one ID, so
+        # the final delta replaces the draft on the client.
+        npc_message_id = new_message_id()
+
+        async def stream_reply(text: str) -> None:
+            await self.emit(
+                "dingtalk_stream",
+                {
+                    "contact_id": contact_id,
+                    "round_id": round_id,
+                    "message_id": npc_message_id,
+                    "delta": text,
+                },
+            )
+
         result = await self._generate_dingtalk_reply_result(
-            contact, option.text, reply_count, stats
+            contact, option.text, reply_count, stats, on_delta=stream_reply
         )
 
         async with self._dingtalk_state_lock:
-            state = await self.repo.get_dingtalk_state()
-            contact = state.contacts.get(contact_id)
+            contact = await self.repo.get_dingtalk_contact(contact_id, message_limit=0)
             if contact is None:
                 return
-            npc_content = str(result.get("content") or "").strip()
-            if npc_content:
-                npc_message = self._make_dingtalk_message(
-                    "npc", npc_content, round_id=contact.round.round_id
-                )
-                contact.messages.append(npc_message)
-                contact.unread_count += 1
-                contact.last_message_at = npc_message.created_at
             if reply_count >= 3:
                 contact.pending_options = []
                 contact.round.status = "closed"
@@ -1348,15 +1597,58 @@ class GameEngine:
                 contact.pending_options = self._coerce_dingtalk_options(
                     result.get("reply_options"), contact.role
                 )
-            contact.trim_messages()
-            state.contacts[contact_id] = contact
-            await self.repo.set_dingtalk_state(state)
-
-        await self._emit_dingtalk_contact_update(contact)
+            ops = self._dingtalk_reply_state_ops(contact)
+            npc_content = str(result.get("content") or "").strip()
+            if npc_content:
+                npc_message = self._make_dingtalk_message(
+                    "npc",
+                    npc_content,
+                    round_id=contact.round.round_id,
+                    message_id=npc_message_id,
+                )
+                contact.last_message_at = npc_message.created_at
+                await self.repo.append_dingtalk_message(
+                    contact, npc_message, unread_delta=1
+                )
+                ops = [
+                    self._dingtalk_message_op(npc_message),
+                    {"op": "unread", "unread_count": contact.unread_count},
+                    *ops,
+                ]
+            else:
+                await self.repo.save_dingtalk_contact_meta(contact)
+            await self._emit_dingtalk_delta(contact_id, contact.seq, ops)
         if reply_count >= 3:
             await self.repo.increment_action_count("dingtalk_round")
             await self._apply_dingtalk_settlement(contact, result.get("settlement"))
             await self._check_achievements()
+            self._track_task(self._summarize_dingtalk_round(contact_id, round_id))
+
+    async def _summarize_dingtalk_round(self, contact_id: str, round_id: str):
+        """Fold a closed round into the contact's rolling prompt summary."""
+        contact = await self.repo.get_dingtalk_contact(
+            contact_id, message_limit=DINGTALK_SUMMARY_SOURCE_MESSAGES
+        )
+        if contact is None:
+            return
+        round_messages = [
+            m.model_dump() for m in contact.messages if m.round_id == round_id
+        ]
+        if not round_messages:
+            return
+        summary = None
+        if self.mode != GameMode.LIBRARY:
+            summary = await generate_dingtalk_summary(
+                contact.sender,
+                contact.summary,
+                round_messages,
+                llm_override=self.llm_override,
+            )
+        summary = summary or extractive_summary(
+            contact.summary, round_messages, contact.sender
+        )
+        async with self._dingtalk_state_lock:
+            await self.repo.save_dingtalk_summary(contact_id, summary)
 
     def _item_effect_changes(
         self, item: dict[str, Any], sign: int = 1
@@ -1511,7 +1803,7 @@ class GameEngine:
             final_score = max(0, min(100, mastery * 0.9 + exam_bonus + luck_bonus + 10))
 
             gp = max(0.0, round(final_score / 10 - 5, 2))
-            fail_threshold = balance.fail_threshold
+            fail_threshold = self._balance.fail_threshold
             if final_score < fail_threshold:
                 failed_count += 1
 
@@ -1539,11 +1831,11 @@ class GameEngine:
 
         msg = f"期末考试结束！GPA: {term_gpa}"
         if failed_count > 0:
-            penalty = balance.fail_sanity_penalty * failed_count
+            penalty = self._balance.fail_sanity_penalty * failed_count
             await self.repo.update_stat_safe("sanity", penalty)
             msg += f" | 挂了 {failed_count} 门！"
         else:
-            bonus = balance.pass_all_bonus
+            bonus = self._balance.pass_all_bonus
             await self.repo.update_stat_safe("sanity", bonus)
 
         gold_earned = items.calculate_exam_gold(term_gpa, failed_count)
@@ -1581,6 +1873,11 @@ class GameEngine:
         )
 
         await self._push_update(msg)
+        semester_idx = int(stats.get("semester_idx") or 1)
+        if semester_idx >= FINAL_SEMESTER_IDX:
+            await self._prefetch_wenyan_report()
+        else:
+            self._prefetch_holiday_event(semester_idx + 1)
 
     async def _update_db_highest_gpa(self, gpa: float):
         """Persist the user's best single-term GPA summary."""
@@ -1641,6 +1938,16 @@ class GameEngine:
 
         await self._push_update(msg)
 
+    def _pick_cc98_post(self, effect: str, trigger: str) -> str | None:
+        """Pick a library post, avoiding ones shown earlier this session."""
+        post = sample_cc98_post(effect, trigger, self._recent_cc98_ids)
+        if post is None:
+            return None
+        post_id = post.get("id")
+        if post_id:
+            self._recent_cc98_ids.append(str(post_id))
+        return post.get("content", "CC98 帖子加载失败...")
+
     async def _handle_relax(self, target: str):
         # Enforce the server-side cooldown before applying an action.
         remaining_cd = await self._check_cooldown(target)
@@ -1798,7 +2105,7 @@ class GameEngine:
                 post_content = None
             else:
                 # Hybrid and library modes prefer zero-token precompiled posts.
-                post_content = pick_cc98_post(effect=effect_type, trigger=trigger)
+                post_content = self._pick_cc98_post(effect_type, trigger)
             if not post_content and self.mode != GameMode.LIBRARY:
                 # Non-library modes can fall back to LLM generation on a miss.
                 snapshot = await self.repo.get_snapshot()
@@ -1820,7 +2127,7 @@ class GameEngine:
                             "level": "warning",
                         },
                     )
-                    fallback_post = pick_cc98_post(effect=effect_type, trigger=trigger)
+                    fallback_post = self._pick_cc98_post(effect_type, trigger)
                     if fallback_post:
                         post_content = fallback_post
             elif not post_content:
@@ -1868,7 +2175,9 @@ class GameEngine:
 
         self._random_event_inflight = True
         try:
-            history = await self.repo.get_event_history()
+            layout = seen_events_layout()
+            history, seen_bitmap = await self.repo.get_seen_events(layout)
+            seen = seen_events(seen_bitmap, history)
             snapshot = await self.repo.get_snapshot()
             stats = await self._effective_stats(snapshot.stats.model_dump())
             if not self.is_running:
@@ -1877,13 +2186,42 @@ class GameEngine:
 
             if self.mode == GameMode.AI:
                 # AI mode bypasses the event library and uses the LLM path.
+                llm_failed = True
                 if self.llm_available:
-                    event_data = await generate_random_event(
-                        stats, history, llm_override=self.llm_override
+
+                    async def from_library() -> Optional[dict[str, Any]]:
+                        return pick_random_event(
+                            sanity=int(
+                                stats.get("sanity", self._stat_default("sanity"))
+                            ),
+                            stress=int(
+                                stats.get("stress", self._stat_default("stress"))
+                            ),
+                            seen_ids=seen,
+                            state=PlayerStateVector.from_stats(stats),
+                        )
+
+                    # Pool hits skip the hedge so its delay tracks real LLM
+                    # batches, not instant pops.
+                    event_data = await pop_pooled_random_event(
+                        stats, self.llm_override
                     )
+                    llm_failed = False
+                    if event_data is None:
+                        # A slow LLM races the library when hedging is on;
+                        # only an LLM failure, not a lost race, leaves AI mode.
+                        result = await hedged(
+                            "random_event",
+                            lambda: generate_random_event(
+                                stats, history, llm_override=self.llm_override
+                            ),
+                            from_library,
+                        )
+                        event_data = result.value
+                        llm_failed = result.primary_failed
                     if not self.is_running:
                         return
-                if not event_data:
+                if llm_failed:
                     if not self.is_running:
                         return
                     self.llm_available = False
@@ -1899,17 +2237,19 @@ class GameEngine:
                             "level": "warning",
                         },
                     )
-                    event_data = pick_random_event(
+                    event_data = event_data or pick_random_event(
                         sanity=int(stats.get("sanity", self._stat_default("sanity"))),
                         stress=int(stats.get("stress", self._stat_default("stress"))),
-                        seen_ids=set(history) if history else None,
+                        seen_ids=seen,
+                        state=PlayerStateVector.from_stats(stats),
                     )
             else:
                 # Hybrid and library modes prefer zero-token precompiled events.
                 event_data = pick_random_event(
                     sanity=int(stats.get("sanity", self._stat_default("sanity"))),
                     stress=int(stats.get("stress", self._stat_default("stress"))),
-                    seen_ids=set(history) if history else None,
+                    seen_ids=seen,
+                    state=PlayerStateVector.from_stats(stats),
                 )
                 # Hybrid can fall back to LLM generation; library mode skips.
                 if (
@@ -1934,8 +2274,16 @@ class GameEngine:
                         f"llm_evt_{hashlib.md5(seed.encode('utf-8')).hexdigest()[:10]}"
                     )
                     event_data["id"] = event_id
+                    if event_id in seen:
+                        logger.info("Dropping repeated generated event %s", event_id)
+                        return
 
-                await self.repo.add_event_to_history(event_id)
+                await self.repo.add_event_to_history(
+                    event_id,
+                    seen_offset=seen_event_offset(event_id),
+                    seen_layout=layout,
+                    restart_seen=seen_bitmap is None,
+                )
                 if not self.is_running:
                     return
                 await self.repo.set_current_event(event_data)
@@ -2022,17 +2370,44 @@ class GameEngine:
             changes=changes,
         )
 
+    def _pick_dingtalk_thread(
+        self,
+        context: str,
+        contacts: dict[str, DingTalkContact],
+        allow_repeat: bool = True,
+    ) -> dict[str, Any] | None:
+        """Pick a library thread for an idle contact, avoiding recent threads.
+
+        With a full contact list only existing contacts may start a thread, so
+        a library opener never overwrites another character's conversation.
+        Recent threads are repeated only when `allow_repeat` is set.
+        """
+        busy = {cid for cid, c in contacts.items() if c.round.status == "open"}
+        full = len(contacts) >= self._balance.dingtalk_max_contacts
+        thread = pick_dingtalk_thread(
+            context,
+            self._recent_dingtalk_threads,
+            busy,
+            set(contacts) if full else None,
+            allow_repeat=allow_repeat,
+        )
+        if thread:
+            self._recent_dingtalk_threads.append(thread["library_id"])
+        return thread
+
     async def _trigger_dingtalk_message(self):
-        """Trigger a DingTalk message, preferring the M2-her RP pipeline."""
+        """Trigger a DingTalk message from the thread library or the LLM.
+
+        Hybrid and library modes prefer zero-token library threads; hybrid
+        falls back to M2-her/LLM generation on a miss, while AI mode uses the
+        library only after generation fails.
+        """
         if not self.is_running:
             return
         if self._dingtalk_inflight:
             return
 
-        # Library mode has no DingTalk library yet, so it skips AI messages.
-        if self.mode == GameMode.LIBRARY or not self.llm_available:
-            return
-
+        use_llm = self.mode != GameMode.LIBRARY and self.llm_available
         self._dingtalk_inflight = True
         try:
             snapshot = await self.repo.get_snapshot()
@@ -2053,16 +2428,27 @@ class GameEngine:
             elif gpa > 0 and gpa < 2.0:
                 context = "low_gpa"
 
-            state = await self.repo.get_dingtalk_state()
+            contacts = await self.repo.get_dingtalk_contacts()
             if not self.is_running:
                 return
-            reusable_contact = self._choose_reusable_dingtalk_contact(
-                state.contacts,
-                force=len(state.contacts) >= balance.dingtalk_max_contacts,
+            msg_data = None
+            if self.mode != GameMode.AI:
+                # With an LLM, a hybrid miss generates instead of repeating.
+                msg_data = self._pick_dingtalk_thread(
+                    context, contacts, allow_repeat=not use_llm
+                )
+            if not msg_data and not use_llm:
+                return
+            reusable_contact = (
+                None
+                if msg_data
+                else self._choose_reusable_dingtalk_contact(
+                    contacts,
+                    force=len(contacts) >= self._balance.dingtalk_max_contacts,
+                )
             )
 
             # Prefer M2-her RP unless a general custom LLM should absorb the cost.
-            msg_data = None
             rp_override = self.rp_llm_override
             if reusable_contact:
                 msg_data = await self._generate_dingtalk_for_existing_contact(
@@ -2096,11 +2482,7 @@ class GameEngine:
             if msg_data:
                 if not self.is_running:
                     return
-                contact = await self._store_dingtalk_npc_message(msg_data)
-                if not self.is_running:
-                    return
-                if contact:
-                    await self._emit_dingtalk_contact_update(contact)
+                await self._store_dingtalk_npc_message(msg_data)
             elif self.mode == GameMode.AI:
                 self.llm_available = False
                 self.mode = GameMode.HYBRID
@@ -2115,6 +2497,9 @@ class GameEngine:
                         "level": "warning",
                     },
                 )
+                fallback = self._pick_dingtalk_thread(context, contacts)
+                if fallback and self.is_running:
+                    await self._store_dingtalk_npc_message(fallback)
 
         except Exception as e:
             logger.error(f"DingTalk trigger error: {e}", exc_info=True)
@@ -2224,8 +2609,7 @@ class GameEngine:
             self._achievement_config = {}
             return self._achievement_config
         try:
-            with open(self.achievement_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = read_world_json(self.achievement_path)
             self._achievement_config = data if isinstance(data, dict) else {}
         except Exception as e:
             logger.error("Failed to load achievements config: %s", e)
@@ -2236,29 +2620,18 @@ class GameEngine:
         """Advance to the next semester or emit graduation payloads."""
         self.stop()
 
-        async with self.db_factory() as db:
-            transition = await self.game_service.process_semester_transition(
-                db,
-                holiday_event_factory=generate_random_event,
-                save_slot=self.save_slot,
-            )
+        # Only Redis is awaited here; the autosave drains in the background.
+        transition = await self.game_service.process_semester_transition(
+            holiday_event=self._take_holiday_event(),
+            save_slot=self.save_slot,
+            schedule_autosave=self._schedule_autosave,
+        )
 
         current_semester_idx = transition.get("semester_idx")
 
         if transition.get("status") == "graduated":
-            stats = await self._effective_stats(transition.get("stats") or {})
-            achievements = stats.get("achievements")
-            if isinstance(achievements, list):
-                stats["achievement_details"] = self._achievement_details(achievements)
-            # Generate the graduation summary after final stats are known.
-            from app.core.llm import fallback_wenyan_report, generate_wenyan_report
-
-            if self.mode == GameMode.LIBRARY or not self.llm_available:
-                wenyan_report = fallback_wenyan_report(stats)
-            else:
-                wenyan_report = await generate_wenyan_report(
-                    stats, llm_override=self.llm_override
-                )
+            stats = await self._graduation_stats(transition.get("stats") or {})
+            wenyan_report = await self._graduation_wenyan_report(stats)
             await self.emit(
                 "graduation",
                 {
@@ -2276,7 +2649,7 @@ class GameEngine:
         new_snapshot = await self.repo.get_snapshot()
         new_stats = await self._effective_stats(new_snapshot.stats.model_dump())
         semester_idx = int(new_stats.get("semester_idx") or current_semester_idx or 1)
-        base_duration = balance.get_semester_duration(semester_idx)
+        base_duration = self._balance.semester_duration(semester_idx)
         elapsed = int(new_stats.get("elapsed_game_time", 0) or 0)
         semester_time_left = self._get_semester_time_left(elapsed, base_duration)
 
@@ -2300,6 +2673,137 @@ class GameEngine:
         await self._push_update("新学期开始了，加油！")
         self.start()
 
+    def _prefetch_holiday_event(self, semester_idx: int):
+        """Generate the next holiday event while the exam summary is read."""
+        if self._holiday_event_prefetch is not None:
+            self._holiday_event_prefetch.cancel()
+            self._holiday_event_prefetch = None
+        if self.mode == GameMode.LIBRARY or not self.llm_available:
+            return
+        self._holiday_event_prefetch = self._track_task(
+            generate_random_event(
+                {"context": "假期", "semester": semester_idx},
+                llm_override=self.llm_override,
+            )
+        )
+
+    def _take_holiday_event(self) -> Optional[dict[str, Any]]:
+        """Use the prefetched holiday event if ready, else a library pick.
+
+        The transition never waits on generation, so an unfinished prefetch
+        is cancelled rather than awaited.
+        """
+        task, self._holiday_event_prefetch = self._holiday_event_prefetch, None
+        if task is not None and task.done() and not task.cancelled():
+            event = task.result() if task.exception() is None else None
+            if event:
+                HOLIDAY_EVENTS.inc(result="prefetched")
+                return event
+        elif task is not None:
+            task.cancel()
+        HOLIDAY_EVENTS.inc(result="library")
+        return pick_random_event()
+
+    async def _schedule_autosave(self):
+        """Capture the semester save now and queue its PostgreSQL write.
+
+        The row is read from Redis before the player can act again, so the
+        queued write stores the semester-start state, not a later one.
+        """
+        save_slot = self.save_slot
+        save_values = await SaveService.collect_save_values(self.repo, save_slot)
+        if save_values is None:
+            logger.warning("Auto-save skipped for user %s: no stats", self.user_id)
+            return
+
+        async def autosave() -> bool:
+            async with self.db_factory() as db:
+                return await SaveService.write_save_values(db, save_values)
+
+        autosave_queue.submit(
+            f"{self.user_id}:{save_slot}", autosave, self._report_autosave
+        )
+
+    async def _report_autosave(self, ok: bool):
+        if ok:
+            logger.info("Auto-save at end of semester for user %s", self.user_id)
+            return
+        await self.emit(
+            "toast",
+            {"message": "学期自动存档失败，请稍后手动存档", "level": "warning"},
+        )
+
+    async def _graduation_stats(self, stats: dict[str, Any]) -> dict[str, Any]:
+        """Final stats as the graduation payload and wenyan prompt see them."""
+        stats = await self._effective_stats(stats)
+        achievements = stats.get("achievements")
+        if isinstance(achievements, list):
+            stats["achievement_details"] = self._achievement_details(achievements)
+        return stats
+
+    async def _prefetch_wenyan_report(self):
+        """Start the graduation report once the last final exam has settled.
+
+        The report is keyed by a digest of the stats behind its prompt, so
+        graduation can reuse it unless something material changed since.
+        """
+        if self.mode == GameMode.LIBRARY or not self.llm_available:
+            return
+        from app.core.llm import generate_wenyan_report, wenyan_report_digest
+
+        try:
+            snapshot = await self.repo.get_snapshot()
+            stats = snapshot.stats.model_dump()
+            stats["achievements"] = list(await self.repo.get_unlocked_achievements())
+            stats = await self._graduation_stats(stats)
+        except Exception as e:
+            logger.warning("Wenyan report prefetch skipped: %s", e)
+            return
+        if self._wenyan_prefetch is not None:
+            self._wenyan_prefetch[1].cancel()
+        self._wenyan_prefetch = (
+            wenyan_report_digest(stats),
+            self._track_task(
+                generate_wenyan_report(stats, llm_override=self.llm_override)
+            ),
+        )
+
+    async def _graduation_wenyan_report(self, stats: dict[str, Any]) -> str:
+        """Use the prefetched report when its digest matches, else regenerate.
+
+        Either way graduation waits at most `WENYAN_REPORT_TIMEOUT_SECONDS`
+        before settling for the GPA-branched fallback comment.
+        """
+        from app.core.llm import (
+            fallback_wenyan_report,
+            generate_wenyan_report,
+            wenyan_report_digest,
+        )
+
+        prefetch, self._wenyan_prefetch = self._wenyan_prefetch, None
+        if self.mode == GameMode.LIBRARY or not self.llm_available:
+            if prefetch is not None:
+                prefetch[1].cancel()
+            return fallback_wenyan_report(stats)
+        if prefetch is not None and prefetch[0] == wenyan_report_digest(stats):
+            source, task = "hit", prefetch[1]
+        else:
+            source = "cold" if prefetch is None else "stale"
+            if prefetch is not None:
+                prefetch[1].cancel()
+            task = self._track_task(
+                generate_wenyan_report(stats, llm_override=self.llm_override)
+            )
+        try:
+            report = await asyncio.wait_for(
+                task, timeout=settings.WENYAN_REPORT_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            WENYAN_REPORTS.inc(result="timeout")
+            return fallback_wenyan_report(stats)
+        WENYAN_REPORTS.inc(result=source)
+        return report
+
     async def _probe_llm(self):
         """Probe LLM availability in the background and downgrade if needed."""
         try:
@@ -2347,7 +2851,7 @@ class GameEngine:
 
             # Compute remaining time from the persisted virtual elapsed clock.
             semester_idx = int(new_stats.get("semester_idx", 1))
-            base_duration = balance.get_semester_duration(semester_idx)
+            base_duration = self._balance.semester_duration(semester_idx)
             elapsed = int(new_stats.get("elapsed_game_time", 0))
             semester_time_left = self._get_semester_time_left(elapsed, base_duration)
 
@@ -2451,9 +2955,7 @@ class GameEngine:
                     major_info = (assignment or {}).get("major_info", {})
                     iq_buff = int(major_info.get("iq_buff", 0) or 0)
                 except Exception as exc:
-                    logger.warning(
-                        "Could not infer major IQ buff for restart: %s", exc
-                    )
+                    logger.warning("Could not infer major IQ buff for restart: %s", exc)
             iq_default = stat_definitions.by_id["iq"].default
             initial_iq = int(stats.get("iq", iq_default) or iq_default) - iq_buff
 
@@ -2481,8 +2983,10 @@ class GameEngine:
             elapsed = int(stats.get("elapsed_game_time", 0) or 0)
         except (TypeError, ValueError):
             elapsed = 0
-        base_duration = balance.get_semester_duration(semester_idx)
-        dingtalk_state = await self.repo.get_dingtalk_state()
+        base_duration = self._balance.semester_duration(semester_idx)
+        dingtalk_state = await self.repo.get_dingtalk_state(
+            message_limit=DINGTALK_HISTORY_PAGE_SIZE
+        )
         items_state = await self._get_items_state_payload()
 
         await self.emit(
@@ -2538,12 +3042,12 @@ class GameEngine:
             return 0
 
         elapsed = time.time() - float(last_use)
-        cd_time = balance.get_cooldown(action_type)
+        cd_time = self._balance.relax_cooldowns.get(action_type, 0)
         remaining = max(0, cd_time - elapsed)
         return math.ceil(remaining)
 
     async def _get_relax_cooldowns(self) -> dict[str, int]:
-        actions = list(balance.relax_actions.keys())
+        actions = list(self._balance.relax_cooldowns)
         try:
             timestamps = await self.repo.get_cooldown_timestamps(actions)
         except (AttributeError, TypeError):
@@ -2560,6 +3064,6 @@ class GameEngine:
                 cooldowns[action] = 0
                 continue
             elapsed = now - float(last_use)
-            cd_time = balance.get_cooldown(action)
+            cd_time = self._balance.relax_cooldowns.get(action, 0)
             cooldowns[action] = math.ceil(max(0, cd_time - elapsed))
         return cooldowns
@@ -5,12 +5,12 @@ Items are loaded from `world/items.json`, validated against the stat registry,
 and applied as temporary effective-stat bonuses.
 """
 
-import json
 import logging
 import time
 from pathlib import Path
 from typing import Any
 
+from app.core.world_bundle import read_world_json
 from app.game.stat_definitions import stat_definitions
 
 logger = logging.getLogger(__name__)
@@ -48,8 +48,7 @@ class ItemCatalog:
         path = self.resolve_config_path(config_path)
         self._config_path = path
         try:
-            with open(path, encoding="utf-8") as f:
-                raw = json.load(f)
+            raw = read_world_json(path)
             self._config, self._items_by_id = self._normalize_config(raw)
             logger.info(
                 "Item catalog loaded: version=%s items=%s",
@@ -66,10 +65,19 @@ class ItemCatalog:
             self._items_by_id = {}
 
     def reload(self, config_path: str | Path | None = None):
-        """Reload the item catalog, usually after world-data edits."""
-        self._config = {}
-        self._items_by_id = {}
-        self.load(config_path or self._config_path)
+        """Reload the item catalog; the old catalog stays if the new one is invalid.
+
+        Unlike `load`, errors propagate so callers can report a failed reload.
+        """
+        path = self.resolve_config_path(config_path or self._config_path)
+        config, items_by_id = self._normalize_config(read_world_json(path))
+        self._config_path = path
+        self._config, self._items_by_id = config, items_by_id
+        logger.info(
+            "Item catalog reloaded: version=%s items=%s",
+            self.version,
+            len(self._items_by_id),
+        )
 
     @property
     def config_path(self) -> Path:
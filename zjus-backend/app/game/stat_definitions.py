@@ -5,7 +5,6 @@ The registry is the source of truth for stat defaults, clamps, initial
 allocation rules, effect allowlists, and frontend metadata generation.
 """
 
-import json
 import logging
 import re
 from pathlib import Path
@@ -13,6 +12,8 @@ from typing import Any, Literal
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
+from app.core.world_bundle import read_world_json
+
 logger = logging.getLogger(__name__)
 
 PositiveEndpoint = Literal["max", "min", "none"]
@@ -142,8 +143,7 @@ class StatDefinitions:
         """Load and validate stat definitions from disk."""
         path = self.resolve_config_path(config_path)
         self._config_path = path
-        with open(path, encoding="utf-8") as f:
-            raw = json.load(f)
+        raw = read_world_json(path)
         self._config = StatDefinitionsConfig.model_validate(raw)
         logger.info(
             "Stat definitions loaded: version=%s stats=%s",
@@ -152,8 +152,7 @@ class StatDefinitions:
         )
 
     def reload(self, config_path: str | Path | None = None) -> None:
-        """Reload the registry, usually after world-data edits."""
-        self._config = None
+        """Reload the registry; the old config stays if validation fails."""
         self.load(config_path or self._config_path)
 
     @property
@@ -8,18 +8,24 @@ startup tasks for migrations-free local development.
 import logging
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.admin import setup_admin
 from app.api import auth, game
 from app.core.config import settings
+from app.core.content_pools import content_pool_warmer
 from app.core.database import Base, engine
+from app.core.llm_clients import client_pool_sweeper
 from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.game.config_sync import config_sync_worker
 from app.game.state import RedisState
 from app.models import admin as admin_models
 from app.models import game_save as game_save_model
 from app.models import user as user_model
+from app.services.save_queue import autosave_queue
 from app.websockets.manager import manager
 
 _MODEL_MODULES = (admin_models, game_save_model, user_model)
@@ -42,6 +48,14 @@ setup_admin(app)
 app.mount("/world", StaticFiles(directory="world"), name="world")
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Expose runtime metrics for scraping; nginx does not proxy this path."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 def _create_all_on_startup() -> bool:
     """Return whether startup should create tables without Alembic."""
     if settings.CREATE_ALL_ON_STARTUP is not None:
@@ -66,10 +80,21 @@ async def startup():
     manager.start_heartbeat_checker()
     logger.info("Global heartbeat checker registered at startup")
 
+    # Admin config publishes from any worker reach this one over Redis.
+    config_sync_worker.start()
+    client_pool_sweeper.start()
+    if settings.CONTENT_POOL_WARMING:
+        content_pool_warmer.start()
+
 
 @app.on_event("shutdown")
 async def shutdown():
     """Close shared outbound clients during application shutdown."""
+    # Let queued semester autosaves reach PostgreSQL before workers exit.
+    await autosave_queue.stop()
+    await config_sync_worker.stop()
+    await content_pool_warmer.stop()
+    await client_pool_sweeper.stop()
     try:
         from app.core.dingtalk_llm import close_m2her_client
         from app.core.llm import close_llm_clients
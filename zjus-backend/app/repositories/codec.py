@@ -0,0 +1,74 @@
+"""Compact binary codec for JSON-shaped Redis values.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Blob values are written as a two-byte header plus msgpack (or compact JSON),
+zlib-compressed above a size threshold; plain JSON written by older builds
+still decodes.
+"""
+
+import json
+import zlib
+from typing import Any
+
+from app.core.config import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack ships with requirements.txt
+    msgpack = None
+
+# 0xFF never starts UTF-8 text, so legacy JSON strings cannot look encoded.
+_MAGIC = 0xFF
+_FLAG_MSGPACK = 0x01
+_FLAG_ZLIB = 0x02
+_ZLIB_LEVEL = 6
+
+
+class CodecError(ValueError):
+    """Raised when a stored blob cannot be decoded."""
+
+
+def encode_value(value: Any, compress_threshold: int | None = None) -> bytes:
+    """Serialize a JSON-compatible value into the compact Redis blob format."""
+    if compress_threshold is None:
+        compress_threshold = settings.REDIS_BLOB_COMPRESS_THRESHOLD_BYTES
+    flags = 0
+    if msgpack is not None and settings.REDIS_BLOB_CODEC.lower() == "msgpack":
+        payload = msgpack.packb(value, use_bin_type=True)
+        flags |= _FLAG_MSGPACK
+    else:
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+    if compress_threshold >= 0 and len(payload) > compress_threshold:
+        compressed = zlib.compress(payload, _ZLIB_LEVEL)
+        if len(compressed) < len(payload):
+            payload = compressed
+            flags |= _FLAG_ZLIB
+    return bytes((_MAGIC, flags)) + payload
+
+
+def decode_value(raw: Any) -> Any:
+    """Decode a blob written by `encode_value` or a legacy plain-JSON string."""
+    if raw is None:
+        return None
+    try:
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if not isinstance(raw, (bytes, bytearray, memoryview)):
+            return raw
+        data = bytes(raw)
+        if len(data) < 2 or data[0] != _MAGIC:
+            return json.loads(data.decode("utf-8"))
+        flags, payload = data[1], data[2:]
+        if flags & _FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        if flags & _FLAG_MSGPACK:
+            if msgpack is None:
+                raise CodecError("msgpack blob found but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False)
+        return json.loads(payload.decode("utf-8"))
+    except CodecError:
+        raise
+    except Exception as exc:
+        raise CodecError(f"Undecodable Redis blob: {exc}") from exc
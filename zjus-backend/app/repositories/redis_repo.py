@@ -8,14 +8,30 @@ updates for stats, courses, cooldowns, achievements, DingTalk, and items.
 import inspect
 import json
 import logging
-from typing import Any, Awaitable, Dict, Iterable, List, Optional, Set, TypeVar
-
-from redis import asyncio as aioredis
+from typing import (
+    Any,
+    Awaitable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 from app.api.cache import RedisCache
 from app.core.config import settings
+from app.core.state_backend import StateBackend
 from app.game.stat_definitions import stat_definitions
-from app.schemas.dingtalk import DingTalkState
+from app.repositories.codec import CodecError, decode_value, encode_value
+from app.schemas.dingtalk import (
+    DINGTALK_MAX_MESSAGES_PER_CONTACT,
+    DingTalkContact,
+    DingTalkMessage,
+    DingTalkState,
+    now_ts,
+)
 from app.schemas.game_state import GameStateSnapshot
 
 logger = logging.getLogger(__name__)
@@ -31,7 +47,7 @@ async def _await_if_needed(value: T | Awaitable[T]) -> T:
 class RedisRepository:
     """Atomic Redis gateway for one player's active game session."""
 
-    def __init__(self, user_id: str, redis_client: aioredis.Redis):
+    def __init__(self, user_id: str, redis_client: StateBackend):
         self.user_id = user_id
         self.redis = redis_client
         self.keys = {
@@ -41,19 +57,39 @@ class RedisRepository:
             "actions": f"player:{user_id}:actions",
             "achievements": f"player:{user_id}:achievements",
             "history": f"player:{user_id}:event_history",
+            "seen_events": f"player:{user_id}:seen_events",
             "cooldowns": f"player:{user_id}:cooldowns",
             "current_event": f"player:{user_id}:current_event",
+            # Legacy whole-inbox blob; migrated to the per-contact keys on read.
             "dingtalk": f"player:{user_id}:dingtalk_state",
+            "dingtalk_contacts": f"player:{user_id}:dingtalk:contacts",
+            "dingtalk_unread": f"player:{user_id}:dingtalk:unread",
+            "dingtalk_seq": f"player:{user_id}:dingtalk:seq",
             "items": f"player:{user_id}:items_state",
         }
+        self._dingtalk_migrated = False
         self.ttl = RedisCache.normalize_ttl(
             getattr(settings, "REDIS_PLAYER_TTL_SECONDS", 86400)
         )
 
     def all_keys(self) -> List[str]:
-        """Return every Redis key owned by this player session."""
+        """Return every fixed Redis key owned by this player session."""
         return list(self.keys.values())
 
+    def _dingtalk_messages_key(self, contact_id: str) -> str:
+        return f"player:{self.user_id}:dingtalk:msgs:{contact_id}"
+
+    async def _dingtalk_message_keys(self) -> List[str]:
+        """Return per-contact message list keys for known contacts."""
+        contact_ids = await _await_if_needed(
+            self.redis.hkeys(self.keys["dingtalk_contacts"])
+        )
+        return [self._dingtalk_messages_key(cid) for cid in contact_ids or []]
+
+    async def _session_keys(self) -> List[str]:
+        """Return fixed keys plus dynamic per-contact DingTalk keys."""
+        return self.all_keys() + await self._dingtalk_message_keys()
+
     def _normalize_stats_update(self, stats: Dict) -> Dict:
         """Convert registry-backed stat updates into Redis-friendly values."""
         if not stats:
@@ -147,57 +183,330 @@ class RedisRepository:
         """Return recent event IDs used to reduce immediate repeats."""
         return await _await_if_needed(self.redis.lrange(self.keys["history"], 0, -1))
 
-    async def get_dingtalk_state(self) -> DingTalkState:
-        """Read DingTalk inbox state with corruption-tolerant fallback."""
-        raw = await _await_if_needed(self.redis.get(self.keys["dingtalk"]))
-        if not raw:
-            return DingTalkState()
+    def _decode_blob(self, raw: Any, key: str) -> Any:
+        """Decode a codec or legacy JSON value, treating corruption as empty."""
         try:
-            parsed = json.loads(raw) if isinstance(raw, str) else raw
-        except (TypeError, ValueError, json.JSONDecodeError):
-            parsed = {}
-        return DingTalkState.from_raw(parsed)
+            return decode_value(raw)
+        except CodecError as e:
+            logger.warning("Discarding undecodable Redis value %s: %s", key, e)
+            return None
 
     async def get_items_state(self) -> Dict[str, Any]:
         """Read persisted item inventory state for this active session."""
-        raw = await _await_if_needed(self.redis.get(self.keys["items"]))
+        raw = await _await_if_needed(self.redis.get_bytes(self.keys["items"]))
         if not raw:
             return {"version": 1, "owned": [], "updated_at": 0}
-        try:
-            parsed = json.loads(raw) if isinstance(raw, str) else raw
-        except (TypeError, ValueError, json.JSONDecodeError):
-            parsed = {}
+        parsed = self._decode_blob(raw, self.keys["items"])
         return parsed if isinstance(parsed, dict) else {}
 
     async def set_items_state(self, state: Dict[str, Any]):
         """Persist item inventory state and refresh its TTL."""
         await _await_if_needed(
-            self.redis.set(
-                self.keys["items"],
-                json.dumps(state or {}, ensure_ascii=False),
-                ex=self.ttl,
+            self.redis.set(self.keys["items"], encode_value(state or {}), ex=self.ttl)
+        )
+
+    @staticmethod
+    def _dump_dingtalk_meta(contact: DingTalkContact) -> str:
+        meta = contact.model_dump(exclude={"messages", "unread_count", "seq"})
+        return json.dumps(meta, ensure_ascii=False, separators=(",", ":"))
+
+    @staticmethod
+    def _dump_dingtalk_message(message: DingTalkMessage) -> str:
+        return json.dumps(
+            message.model_dump(), ensure_ascii=False, separators=(",", ":")
+        )
+
+    @staticmethod
+    def _load_dingtalk_messages(raw_messages: Any) -> List[DingTalkMessage]:
+        messages: List[DingTalkMessage] = []
+        for raw in raw_messages or []:
+            try:
+                messages.append(DingTalkMessage.model_validate_json(raw))
+            except ValueError:
+                continue
+        return messages
+
+    def _build_dingtalk_contact(
+        self, contact_id: str, raw_meta: Any, unread: Any, seq: Any = 0
+    ) -> DingTalkContact | None:
+        try:
+            meta = json.loads(raw_meta)
+            meta["contact_id"] = contact_id
+            meta["unread_count"] = int(unread or 0)
+            meta["seq"] = int(seq or 0)
+            return DingTalkContact.model_validate(meta)
+        except (TypeError, ValueError):
+            logger.warning("Skipping corrupt DingTalk contact %s", contact_id)
+            return None
+
+    async def _ensure_dingtalk_migrated(self):
+        """Split a legacy whole-inbox blob into per-contact records once."""
+        if self._dingtalk_migrated:
+            return
+        self._dingtalk_migrated = True
+        raw = await _await_if_needed(self.redis.get_bytes(self.keys["dingtalk"]))
+        if not raw:
+            return
+        parsed = self._decode_blob(raw, self.keys["dingtalk"])
+        if await _await_if_needed(self.redis.exists(self.keys["dingtalk_contacts"])):
+            # Per-contact data already exists; the blob is a stale leftover.
+            await _await_if_needed(self.redis.delete(self.keys["dingtalk"]))
+            return
+        await self.set_dingtalk_state(
+            DingTalkState.from_raw(parsed if isinstance(parsed, dict) else {})
+        )
+
+    async def get_dingtalk_contacts(self) -> Dict[str, DingTalkContact]:
+        """Return contact metadata and unread counts without message history."""
+        await self._ensure_dingtalk_migrated()
+        async with self.redis.pipeline() as pipe:
+            pipe.hgetall(self.keys["dingtalk_contacts"])
+            pipe.hgetall(self.keys["dingtalk_unread"])
+            pipe.hgetall(self.keys["dingtalk_seq"])
+            metas, unread, seqs = await pipe.execute()
+        contacts: Dict[str, DingTalkContact] = {}
+        for contact_id, raw_meta in (metas or {}).items():
+            contact = self._build_dingtalk_contact(
+                contact_id,
+                raw_meta,
+                (unread or {}).get(contact_id),
+                (seqs or {}).get(contact_id),
             )
+            if contact:
+                contacts[contact_id] = contact
+        return contacts
+
+    async def get_dingtalk_contact(
+        self, contact_id: str, message_limit: int | None = None
+    ) -> DingTalkContact | None:
+        """Return one contact with its newest `message_limit` messages.
+
+        `None` loads the whole capped history; `0` loads metadata only.
+        """
+        await self._ensure_dingtalk_migrated()
+        async with self.redis.pipeline() as pipe:
+            pipe.hget(self.keys["dingtalk_contacts"], contact_id)
+            pipe.hget(self.keys["dingtalk_unread"], contact_id)
+            pipe.hget(self.keys["dingtalk_seq"], contact_id)
+            if message_limit != 0:
+                start = -int(message_limit) if message_limit else 0
+                pipe.lrange(self._dingtalk_messages_key(contact_id), start, -1)
+            results = await pipe.execute()
+        if not results[0]:
+            return None
+        contact = self._build_dingtalk_contact(
+            contact_id, results[0], results[1], results[2]
         )
+        if contact and message_limit != 0:
+            contact.messages = self._load_dingtalk_messages(results[3])
+        return contact
+
+    async def get_dingtalk_history(
+        self, contact_id: str, offset: int, limit: int
+    ) -> tuple[List[DingTalkMessage], bool]:
+        """Return one page of older messages counted back from the newest.
+
+        Args:
+            contact_id: Contact whose history is paged.
+            offset: Number of newest messages the client already holds.
+            limit: Maximum messages in the returned page.
+
+        Returns:
+            The page in chronological order and whether older messages remain.
+        """
+        offset, limit = max(0, int(offset)), max(0, int(limit))
+        msgs_key = self._dingtalk_messages_key(contact_id)
+        if limit == 0:
+            total = await _await_if_needed(self.redis.llen(msgs_key))
+            return [], int(total or 0) > offset
+        async with self.redis.pipeline() as pipe:
+            pipe.llen(msgs_key)
+            pipe.lrange(msgs_key, -(offset + limit), -(offset + 1))
+            total, raw_page = await pipe.execute()
+        total = int(total or 0)
+        if offset >= total:
+            return [], False
+        # Redis clamps an out-of-range negative start to the list head.
+        return self._load_dingtalk_messages(raw_page), total > offset + limit
+
+    async def get_dingtalk_state(
+        self, message_limit: int | None = None
+    ) -> DingTalkState:
+        """Assemble the inbox; reserved for bootstrap and save paths.
+
+        `message_limit` keeps only each contact's newest messages, so the
+        bootstrap payload stays bounded; older pages load on demand.
+        """
+        contacts = await self.get_dingtalk_contacts()
+        ordered = list(contacts)
+        start = -int(message_limit) if message_limit else 0
+        if ordered and message_limit != 0:
+            async with self.redis.pipeline() as pipe:
+                for contact_id in ordered:
+                    pipe.lrange(self._dingtalk_messages_key(contact_id), start, -1)
+                histories = await pipe.execute()
+            for contact_id, raw_messages in zip(ordered, histories, strict=False):
+                contacts[contact_id].messages = self._load_dingtalk_messages(
+                    raw_messages
+                )
+        return DingTalkState(contacts=contacts, updated_at=now_ts())
 
     async def set_dingtalk_state(self, state: DingTalkState | Dict[str, Any]):
-        """Persist compact DingTalk state and refresh its TTL."""
+        """Replace the whole inbox, e.g. when restoring a save slot.
+
+        Delta sequence numbers are left in place so they stay monotonic for
+        clients that are still connected.
+        """
         normalized = DingTalkState.from_raw(state).compact()
-        await _await_if_needed(
-            self.redis.set(
+        stale_keys = await self._dingtalk_message_keys()
+        async with self.redis.pipeline() as pipe:
+            pipe.delete(
                 self.keys["dingtalk"],
-                json.dumps(normalized.model_dump(), ensure_ascii=False),
-                ex=self.ttl,
+                self.keys["dingtalk_contacts"],
+                self.keys["dingtalk_unread"],
+                *stale_keys,
+            )
+            for contact_id, contact in normalized.contacts.items():
+                pipe.hset(
+                    self.keys["dingtalk_contacts"],
+                    contact_id,
+                    self._dump_dingtalk_meta(contact),
+                )
+                pipe.hset(
+                    self.keys["dingtalk_unread"], contact_id, contact.unread_count
+                )
+                if contact.messages:
+                    msgs_key = self._dingtalk_messages_key(contact_id)
+                    pipe.rpush(
+                        msgs_key,
+                        *[self._dump_dingtalk_message(m) for m in contact.messages],
+                    )
+                    pipe.expire(msgs_key, self.ttl)
+            pipe.expire(self.keys["dingtalk_contacts"], self.ttl)
+            pipe.expire(self.keys["dingtalk_unread"], self.ttl)
+            await pipe.execute()
+        self._dingtalk_migrated = True
+
+    async def save_dingtalk_contact_meta(self, contact: DingTalkContact) -> int:
+        """Persist contact metadata (round, options, flags) without history.
+
+        Returns:
+            The contact's new delta sequence number.
+        """
+        async with self.redis.pipeline() as pipe:
+            pipe.hset(
+                self.keys["dingtalk_contacts"],
+                contact.contact_id,
+                self._dump_dingtalk_meta(contact),
+            )
+            pipe.hincrby(self.keys["dingtalk_seq"], contact.contact_id, 1)
+            pipe.expire(self.keys["dingtalk_contacts"], self.ttl)
+            pipe.expire(self.keys["dingtalk_seq"], self.ttl)
+            results = await pipe.execute()
+        contact.seq = int(results[1])
+        return contact.seq
+
+    async def save_dingtalk_summary(self, contact_id: str, summary: str) -> bool:
+        """Store a contact's rolling summary without advancing its `seq`.
+
+        The summary is prompt context, not thread state the client renders,
+        so no delta is owed. Callers hold the engine's DingTalk state lock.
+
+        Returns:
+            False when the contact no longer exists.
+        """
+        await self._ensure_dingtalk_migrated()
+        raw_meta = await _await_if_needed(
+            self.redis.hget(self.keys["dingtalk_contacts"], contact_id)
+        )
+        contact = self._build_dingtalk_contact(contact_id, raw_meta, 0)
+        if contact is None:
+            return False
+        contact.summary = summary
+        await _await_if_needed(
+            self.redis.hset(
+                self.keys["dingtalk_contacts"],
+                contact_id,
+                self._dump_dingtalk_meta(contact),
             )
         )
+        return True
+
+    async def append_dingtalk_message(
+        self,
+        contact: DingTalkContact,
+        message: DingTalkMessage,
+        unread_delta: int = 0,
+    ) -> tuple[int, int]:
+        """Append one message and save contact metadata in a single step.
+
+        Returns:
+            The contact's unread count after applying `unread_delta` and its
+            new delta sequence number. Both are also set on `contact`.
+        """
+        msgs_key = self._dingtalk_messages_key(contact.contact_id)
+        async with self.redis.pipeline() as pipe:
+            pipe.hset(
+                self.keys["dingtalk_contacts"],
+                contact.contact_id,
+                self._dump_dingtalk_meta(contact),
+            )
+            pipe.rpush(msgs_key, self._dump_dingtalk_message(message))
+            pipe.ltrim(msgs_key, -DINGTALK_MAX_MESSAGES_PER_CONTACT, -1)
+            pipe.hincrby(
+                self.keys["dingtalk_unread"], contact.contact_id, int(unread_delta)
+            )
+            pipe.hincrby(self.keys["dingtalk_seq"], contact.contact_id, 1)
+            pipe.expire(self.keys["dingtalk_contacts"], self.ttl)
+            pipe.expire(self.keys["dingtalk_unread"], self.ttl)
+            pipe.expire(self.keys["dingtalk_seq"], self.ttl)
+            pipe.expire(msgs_key, self.ttl)
+            results = await pipe.execute()
+        contact.unread_count = int(results[3])
+        contact.seq = int(results[4])
+        return contact.unread_count, contact.seq
 
-    async def mark_dingtalk_read(self, contact_id: str) -> DingTalkState:
-        """Clear unread count for one DingTalk contact."""
-        state = await self.get_dingtalk_state()
-        contact = state.contacts.get(contact_id)
-        if contact:
-            contact.unread_count = 0
-            await self.set_dingtalk_state(state)
-        return state
+    async def mark_dingtalk_read(self, contact_id: str) -> int | None:
+        """Clear unread count for one DingTalk contact if it exists.
+
+        Returns:
+            The contact's new delta sequence number, or None when unknown.
+        """
+        await self._ensure_dingtalk_migrated()
+        exists = await _await_if_needed(
+            self.redis.hexists(self.keys["dingtalk_contacts"], contact_id)
+        )
+        if not exists:
+            return None
+        async with self.redis.pipeline() as pipe:
+            pipe.hset(self.keys["dingtalk_unread"], contact_id, 0)
+            pipe.hincrby(self.keys["dingtalk_seq"], contact_id, 1)
+            pipe.expire(self.keys["dingtalk_seq"], self.ttl)
+            results = await pipe.execute()
+        return int(results[1])
+
+    async def compact_dingtalk_contacts(self, max_contacts: int) -> List[str]:
+        """Drop the oldest closed contacts beyond `max_contacts`.
+
+        Mirrors `DingTalkState.compact`: open rounds are never evicted.
+        Sequence numbers survive eviction so a re-created contact keeps
+        counting up for clients that still hold the old thread.
+        """
+        contacts = await self.get_dingtalk_contacts()
+        if max_contacts <= 0 or len(contacts) <= max_contacts:
+            return []
+        removable = sorted(
+            (c for c in contacts.values() if c.round.status != "open"),
+            key=lambda c: (c.last_message_at, c.contact_id),
+        )
+        evicted = [c.contact_id for c in removable[: len(contacts) - max_contacts]]
+        if evicted:
+            async with self.redis.pipeline() as pipe:
+                pipe.hdel(self.keys["dingtalk_contacts"], *evicted)
+                pipe.hdel(self.keys["dingtalk_unread"], *evicted)
+                pipe.delete(*[self._dingtalk_messages_key(cid) for cid in evicted])
+                await pipe.execute()
+        return evicted
 
     async def get_cooldown_timestamp(self, action_type: str) -> Optional[float]:
         """Return a relax-action cooldown timestamp if present."""
@@ -243,8 +552,9 @@ class RedisRepository:
         stats = self._normalize_stats_update(stats)
         courses = self._normalize_course_map(courses, float)
         states = self._normalize_course_map(states, int)
+        dingtalk_message_keys = await self._dingtalk_message_keys()
         async with self.redis.pipeline() as pipe:
-            pipe.delete(*self.keys.values())
+            pipe.delete(*self.keys.values(), *dingtalk_message_keys)
             pipe.hset(self.keys["stats"], mapping=stats)
             if courses:
                 pipe.hset(self.keys["courses"], mapping=courses)
@@ -253,22 +563,18 @@ class RedisRepository:
             if achievements:
                 pipe.sadd(self.keys["achievements"], *achievements)
             if items_state is not None:
-                pipe.set(
-                    self.keys["items"],
-                    json.dumps(items_state, ensure_ascii=False),
-                    ex=self.ttl,
-                )
+                pipe.set(self.keys["items"], encode_value(items_state), ex=self.ttl)
             for key in self.keys.values():
                 pipe.expire(key, self.ttl)
             await pipe.execute()
 
     async def delete_all(self):
         """Delete every active Redis key for this player."""
-        await _await_if_needed(self.redis.delete(*self.keys.values()))
+        await _await_if_needed(self.redis.delete(*await self._session_keys()))
 
     async def touch_ttl(self):
         """Refresh all active-session TTLs."""
-        await RedisCache.touch_ttl(self.all_keys(), self.ttl)
+        await RedisCache.touch_ttl(await self._session_keys(), self.ttl)
 
     async def update_courses_and_states(
         self,
@@ -315,24 +621,9 @@ class RedisRepository:
             min_val = definition.min if definition else 0
         if max_val is None:
             max_val = definition.max if definition else 200
-        script = """
-        local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or 0)
-        local delta = tonumber(ARGV[2])
-        local new_val = current + delta
-        if new_val < tonumber(ARGV[3]) then new_val = tonumber(ARGV[3]) end
-        if new_val > tonumber(ARGV[4]) then new_val = tonumber(ARGV[4]) end
-        redis.call('HSET', KEYS[1], ARGV[1], new_val)
-        return new_val
-        """
         result = await _await_if_needed(
-            self.redis.eval(
-                script,
-                1,
-                self.keys["stats"],
-                field,
-                delta,
-                min_val,
-                max_val,
+            self.redis.hincrby_clamped(
+                self.keys["stats"], field, delta, min_val, max_val
             )
         )
         return int(result)
@@ -380,11 +671,47 @@ class RedisRepository:
             self.redis.hset(self.keys["cooldowns"], action_type, str(timestamp))
         )
 
-    async def add_event_to_history(self, event_id: str, limit: int = 10):
-        """Record a recent event ID while keeping history bounded."""
+    async def get_seen_events(
+        self, layout: str = ""
+    ) -> Tuple[List[str], Optional[bytes]]:
+        """Return recent event IDs and the seen bitmap in one round trip.
+
+        The stored bitmap starts with the library `layout` tag; the bits after
+        it are returned, or None when the bitmap is missing or was written for
+        another layout and must be restarted.
+        """
+        header = bytes.fromhex(layout)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lrange(self.keys["history"], 0, -1)
+            pipe.get_bytes(self.keys["seen_events"])
+            history, raw = await pipe.execute()
+        if raw is None or raw[: len(header)] != header:
+            return list(history or []), None
+        return list(history or []), raw[len(header) :]
+
+    async def add_event_to_history(
+        self,
+        event_id: str,
+        limit: int = 10,
+        seen_offset: Optional[int] = None,
+        seen_layout: str = "",
+        restart_seen: bool = False,
+    ):
+        """Record a recent event ID and mark its bit in the seen bitmap.
+
+        `restart_seen` rewrites the bitmap as just the `seen_layout` tag first,
+        for when `get_seen_events` found none for this layout. The short list
+        only feeds LLM prompts; deduplication uses the bitmap.
+        """
+        header = bytes.fromhex(seen_layout)
         async with self.redis.pipeline() as pipe:
             pipe.lpush(self.keys["history"], event_id)
             pipe.ltrim(self.keys["history"], 0, limit - 1)
+            if seen_offset is not None:
+                if restart_seen:
+                    pipe.set(self.keys["seen_events"], header)
+                pipe.setbit(self.keys["seen_events"], len(header) * 8 + seen_offset, 1)
+                pipe.expire(self.keys["seen_events"], self.ttl)
             await pipe.execute()
 
     async def increment_semester(self) -> int:
@@ -397,18 +724,16 @@ class RedisRepository:
         """Cache the currently pending random event choice payload."""
         await _await_if_needed(
             self.redis.set(
-                self.keys["current_event"],
-                json.dumps(event_data, ensure_ascii=False),
-                ex=self.ttl,
+                self.keys["current_event"], encode_value(event_data), ex=self.ttl
             )
         )
 
     async def pop_current_event(self) -> Optional[Dict[str, Any]]:
         """Consume and return the pending random event choice payload."""
-        raw = await _await_if_needed(self.redis.getdel(self.keys["current_event"]))
+        raw = await _await_if_needed(
+            self.redis.getdel_bytes(self.keys["current_event"])
+        )
         if not raw:
             return None
-        try:
-            return json.loads(raw)
-        except (TypeError, ValueError, json.JSONDecodeError):
-            return None
+        parsed = self._decode_blob(raw, self.keys["current_event"])
+        return parsed if isinstance(parsed, dict) else None
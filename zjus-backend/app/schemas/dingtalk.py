@@ -41,6 +41,7 @@ DINGTALK_ROLE_ALIASES = {
 }
 
 DINGTALK_MAX_MESSAGES_PER_CONTACT = 50
+DINGTALK_HISTORY_PAGE_SIZE = 20
 DINGTALK_DEFAULT_MAX_CONTACTS = 12
 
 
@@ -85,6 +86,8 @@ class DingTalkRoundState(BaseModel):
     round_id: str = ""
     status: Literal["open", "closed"] = "closed"
     player_reply_count: int = 0
+    # Library thread scripting this round's replies; empty for LLM rounds.
+    library_id: str = ""
 
 
 class DingTalkMessage(BaseModel):
@@ -110,6 +113,10 @@ class DingTalkContact(BaseModel):
     messages: list[DingTalkMessage] = Field(default_factory=list)
     pending_options: list[DingTalkReplyOption] = Field(default_factory=list)
     round: DingTalkRoundState = Field(default_factory=DingTalkRoundState)
+    # Rolling summary of closed rounds; reply prompts send it with recent turns.
+    summary: str = ""
+    # Per-contact delta sequence; clients resync the thread when they see a gap.
+    seq: int = 0
 
     def trim_messages(self) -> None:
         """Keep only the latest messages for this contact."""
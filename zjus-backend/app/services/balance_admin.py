@@ -15,6 +15,7 @@ from typing import Any
 
 from sqlalchemy.orm import Session
 
+from app.game.balance import BalanceSnapshot
 from app.models.admin import AdminAuditLog
 
 ReplaceFunc = Callable[
@@ -763,7 +764,7 @@ def validate_balance_config(
     stress_range = _get_path(
         config, ("sanity_stress_modifiers", "growth", "stress", "optimal_range")
     )
-    if stress_range[0] > stress_range[1]:
+    if float(stress_range[0]) > float(stress_range[1]):
         raise BalanceConfigError("压力最佳下限不能大于压力最佳上限")
 
     cc98_effects = _get_path(config, ("relax_actions", "cc98", "effects"))
@@ -772,6 +773,15 @@ def validate_balance_config(
     weight_sum = sum(float(item.get("weight", 0)) for item in cc98_effects)
     if not 0.99 <= weight_sum <= 1.01:
         raise BalanceConfigError("CC98 效果权重之和必须等于 1")
+    build_runtime_snapshot(config)
+
+
+def build_runtime_snapshot(config: Mapping[str, Any]) -> BalanceSnapshot:
+    """Build the snapshot the game would load, as a `BalanceConfigError`."""
+    try:
+        return BalanceSnapshot.from_config(config)
+    except ValueError as exc:
+        raise BalanceConfigError(f"运行时配置校验失败：{exc}") from exc
 
 
 def summarize_balance_config(config: Mapping[str, Any]) -> dict[str, Any]:
@@ -834,7 +844,12 @@ def publish_balance_config(
     config: Mapping[str, Any],
     reload_func: Callable[[str], Any],
 ) -> None:
-    """Write a balance config and immediately reload runtime readers."""
+    """Write a balance config and immediately reload runtime readers.
+
+    The runtime snapshot is built first, so a config the game would reject
+    never reaches disk.
+    """
+    build_runtime_snapshot(config)
     write_balance_config_atomic(path, config)
     reload_func(str(path))
 
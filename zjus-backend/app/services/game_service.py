@@ -7,7 +7,7 @@ semesters while coordinating Redis state and PostgreSQL persistence.
 
 import json
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -21,6 +21,9 @@ from app.services.world_service import WorldService
 
 logger = logging.getLogger(__name__)
 
+# Finishing this semester graduates the player.
+FINAL_SEMESTER_IDX = 8
+
 
 class GameService:
     """Coordinate game lifecycle operations outside the real-time engine."""
@@ -214,14 +217,29 @@ class GameService:
 
     async def process_semester_transition(
         self,
-        db: AsyncSession,
+        db: Optional[AsyncSession] = None,
         holiday_event_factory=None,
         save_slot: int = 1,
+        holiday_event: Optional[Dict[str, Any]] = None,
+        schedule_autosave: Optional[Callable[[], Awaitable[None]]] = None,
     ) -> Dict[str, Any]:
-        """Advance to the next semester, auto-save, or return graduation state."""
+        """Advance to the next semester, auto-save, or return graduation state.
+
+        With `schedule_autosave` the save is captured from Redis once it is
+        reset and its write handed off, so `autosave_ok` is None; otherwise
+        it is awaited on `db`. A
+        prefetched `holiday_event` skips `holiday_event_factory`.
+        """
         current_semester_idx = await self.repo.increment_semester()
 
-        async def _autosave_current_state() -> bool:
+        async def _autosave_current_state() -> Optional[bool]:
+            if schedule_autosave is not None:
+                try:
+                    await schedule_autosave()
+                except Exception as e:
+                    logger.error("Auto-save failed for user %s: %s", self.user_id, e)
+                    return False
+                return None
             try:
                 autosave_ok = await SaveService.persist_to_db(
                     self.repo, db, save_slot=save_slot
@@ -235,7 +253,7 @@ class GameService:
                 logger.error("Auto-save failed for user %s: %s", self.user_id, e)
                 return False
 
-        if current_semester_idx > 8:
+        if current_semester_idx > FINAL_SEMESTER_IDX:
             snapshot = await self.repo.get_snapshot()
             stats = snapshot.stats.model_dump()
             achievements = list(await self.repo.get_unlocked_achievements())
@@ -249,8 +267,7 @@ class GameService:
             }
 
         semester_reset = await self.reset_courses_for_new_semester(current_semester_idx)
-        holiday_event = None
-        if holiday_event_factory is not None:
+        if holiday_event is None and holiday_event_factory is not None:
             holiday_event = await holiday_event_factory(
                 {"context": "假期", "semester": current_semester_idx}
             )
@@ -0,0 +1,144 @@
+"""Write-behind queue for autosaves that must not block gameplay.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Jobs are keyed by save slot: a slot already waiting keeps one pending job, and
+one slot never saves concurrently. Results reach the submitter via callback.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SaveJob = Callable[[], Awaitable[bool]]
+ResultCallback = Callable[[bool], Awaitable[None]]
+
+AUTOSAVE_JOBS = metrics.counter(
+    "zjus_autosave_jobs_total",
+    "Write-behind autosaves by result: ok, failed, or coalesced.",
+)
+AUTOSAVE_QUEUE_DEPTH = metrics.gauge(
+    "zjus_autosave_queue_depth",
+    "Autosave slots waiting in this worker's write-behind queue.",
+)
+
+
+@dataclass
+class _Pending:
+    job: SaveJob
+    callbacks: list[ResultCallback] = field(default_factory=list)
+
+
+class WriteBehindQueue:
+    """Coalescing per-key job queue drained by a small pool of worker tasks."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        attempts: Optional[int] = None,
+        retry_delay: float = 0.5,
+    ):
+        self._workers = max(1, workers or settings.AUTOSAVE_WORKERS)
+        self._attempts = max(1, attempts or settings.AUTOSAVE_ATTEMPTS)
+        self._retry_delay = retry_delay
+        self._pending: dict[str, _Pending] = {}
+        self._running: set[str] = set()
+        self._keys: Optional[asyncio.Queue[str]] = None
+        self._tasks: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._tasks and self._loop is loop:
+            return
+        # Workers from another (closed) loop are gone; start over on this one.
+        self._loop = loop
+        self._running.clear()
+        self._keys = asyncio.Queue()
+        for key in self._pending:
+            self._keys.put_nowait(key)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"autosave:{i}")
+            for i in range(self._workers)
+        ]
+
+    def submit(
+        self, key: str, job: SaveJob, on_result: Optional[ResultCallback] = None
+    ) -> None:
+        """Queue `job` for `key`; a newer job replaces one still waiting."""
+        self.start()
+        assert self._keys is not None
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.job = job
+            AUTOSAVE_JOBS.inc(result="coalesced")
+        else:
+            pending = self._pending[key] = _Pending(job)
+            if key not in self._running:
+                self._keys.put_nowait(key)
+        if on_result is not None:
+            pending.callbacks.append(on_result)
+        AUTOSAVE_QUEUE_DEPTH.set(len(self._pending))
+
+    async def drain(self) -> None:
+        """Wait until every queued and running job has finished."""
+        while self._pending or self._running:
+            await asyncio.sleep(0.01)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued saves `timeout` seconds to land, then cancel workers."""
+        if self._tasks and self._loop is asyncio.get_running_loop():
+            try:
+                await asyncio.wait_for(self.drain(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Autosave queue stopped with %d pending slot(s)",
+                    len(self._pending),
+                )
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _work(self) -> None:
+        assert self._keys is not None
+        keys = self._keys
+        while True:
+            key = await keys.get()
+            pending = self._pending.pop(key, None)
+            AUTOSAVE_QUEUE_DEPTH.set(len(self._pending))
+            if pending is None:
+                continue
+            self._running.add(key)
+            try:
+                ok = await self._run(key, pending.job)
+                AUTOSAVE_JOBS.inc(result="ok" if ok else "failed")
+                for callback in pending.callbacks:
+                    try:
+                        await callback(ok)
+                    except Exception as e:
+                        logger.warning("Autosave result callback failed: %s", e)
+            finally:
+                self._running.discard(key)
+                # A job submitted while this one ran waited for it to finish.
+                if key in self._pending:
+                    keys.put_nowait(key)
+
+    async def _run(self, key: str, job: SaveJob) -> bool:
+        for attempt in range(1, self._attempts + 1):
+            try:
+                if await job():
+                    return True
+            except Exception as e:
+                logger.error("Autosave %s attempt %d failed: %s", key, attempt, e)
+            if attempt < self._attempts:
+                await asyncio.sleep(self._retry_delay * attempt)
+        return False
+
+
+autosave_queue = WriteBehindQueue()
@@ -6,7 +6,7 @@ and item inventory data.
 """
 
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
@@ -35,26 +35,44 @@ class SaveService:
             rollback and logging.
         """
         try:
-            snapshot = await repo.get_snapshot()
-            if not snapshot.stats:
-                return False
+            save_values = await SaveService.collect_save_values(repo, save_slot)
+        except Exception as e:
+            logger.error(f"Persistence failed: {e}")
+            await db.rollback()
+            return False
+        if save_values is None:
+            return False
+        return await SaveService.write_save_values(db, save_values)
 
-            stats_dict = snapshot.stats.model_dump()
-            dingtalk_state = await repo.get_dingtalk_state()
-            items_state = items.normalize_state(await repo.get_items_state())
-
-            save_values = {
-                "user_id": int(repo.user_id),
-                "save_slot": save_slot,
-                "stats_data": stats_dict,
-                "courses_data": snapshot.courses,
-                "course_states_data": snapshot.course_states,
-                "achievements_data": snapshot.achievements,
-                "dingtalk_data": dingtalk_state.compact().model_dump(),
-                "items_data": items_state,
-                "semester_index": int(stats_dict.get("semester_idx", 1)),
-            }
+    @staticmethod
+    async def collect_save_values(
+        repo: RedisRepository, save_slot: int = 1
+    ) -> Optional[Dict[str, Any]]:
+        """Read the Redis session into `game_saves` row values, or None if empty."""
+        snapshot = await repo.get_snapshot()
+        if not snapshot.stats:
+            return None
+
+        stats_dict = snapshot.stats.model_dump()
+        dingtalk_state = await repo.get_dingtalk_state()
+        items_state = items.normalize_state(await repo.get_items_state())
+
+        return {
+            "user_id": int(repo.user_id),
+            "save_slot": save_slot,
+            "stats_data": stats_dict,
+            "courses_data": snapshot.courses,
+            "course_states_data": snapshot.course_states,
+            "achievements_data": snapshot.achievements,
+            "dingtalk_data": dingtalk_state.compact().model_dump(),
+            "items_data": items_state,
+            "semester_index": int(stats_dict.get("semester_idx", 1)),
+        }
 
+    @staticmethod
+    async def write_save_values(db: AsyncSession, save_values: Dict[str, Any]) -> bool:
+        """Upsert row values from `collect_save_values` into their save slot."""
+        try:
             stmt = pg_insert(GameSave).values(**save_values)
             stmt = stmt.on_conflict_do_update(
                 constraint="uq_user_save_slot",
@@ -6,19 +6,37 @@ code does not need to know whether it is running locally or in Docker.
 """
 
 import asyncio
-import json
 import logging
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.core.world_bundle import read_world_json
 
 logger = logging.getLogger(__name__)
 
 
+class _MajorIndex(NamedTuple):
+    majors: List[Dict[str, Any]]
+    by_abbr: Dict[str, Dict[str, Any]]
+
+
+class _CoursePlan(NamedTuple):
+    plan: Dict[str, Any]
+    # Semester course lists in order; index 0 is the first semester.
+    semesters: List[List[Dict[str, Any]]]
+
+
 class WorldService:
-    """Load static world data from the mounted or local world directory."""
+    """Load static world data from the mounted or local world directory.
+
+    Cached reads take no lock: the first load of each file is single-flighted
+    per path, after which plain dict lookups serve every caller.
+    """
 
     _static_cache: Dict[str, Any] = {}
-    _cache_lock = asyncio.Lock()
+    _inflight: Dict[str, "asyncio.Task[Any]"] = {}
+    # Derived lookups keyed by source path, built once per cached file.
+    _indexes: Dict[str, Any] = {}
 
     def __init__(self):
         """Resolve world-data paths for both local runs and Docker images."""
@@ -32,58 +50,96 @@ class WorldService:
         self.achievements_path = self.world_dir / "achievements.json"
 
     async def _load_json(self, path: Path) -> Any:
-        """Load a JSON file with a process-wide async cache."""
+        """Load a JSON file with a process-wide cache and single-flight loads."""
         path_str = str(path)
-        async with self._cache_lock:
-            if path_str in self._static_cache:
-                return self._static_cache[path_str]
+        cached = self._static_cache.get(path_str)
+        if cached is not None:
+            return cached
 
-            if not path.exists():
-                logger.error(f"World data missing: {path}")
-                return {}
+        task = self._inflight.get(path_str)
+        if task is None:
+            task = asyncio.ensure_future(self._load_uncached(path))
+            self._inflight[path_str] = task
+        # Shield so a cancelled caller does not cancel the shared load.
+        return await asyncio.shield(task)
 
+    async def _load_uncached(self, path: Path) -> Any:
+        path_str = str(path)
+        try:
             loop = asyncio.get_running_loop()
-            try:
-                content = await loop.run_in_executor(None, path.read_text, "utf-8")
-                data = json.loads(content)
+            data = await loop.run_in_executor(None, self._read, path)
+            if data:
                 self._static_cache[path_str] = data
-                return data
-            except Exception as e:
-                logger.error(f"Failed to parse {path}: {e}")
-                return {}
+            return data
+        finally:
+            self._inflight.pop(path_str, None)
 
-    async def get_all_majors(self) -> List[Dict[str, Any]]:
-        """Return all majors as a flat list, regardless of tier grouping."""
+    @staticmethod
+    def _read(path: Path) -> Any:
+        if not path.exists():
+            logger.error(f"World data missing: {path}")
+            return {}
+        try:
+            return read_world_json(path)
+        except Exception as e:
+            logger.error(f"Failed to parse {path}: {e}")
+            return {}
+
+    async def _major_index(self) -> _MajorIndex:
+        key = str(self.majors_path)
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
         majors_config = await self._load_json(self.majors_path)
-        result: List[Dict[str, Any]] = []
+        majors: List[Dict[str, Any]] = []
         for tier_majors in majors_config.values():
             if isinstance(tier_majors, list):
-                result.extend(tier_majors)
-        return result
+                majors.extend(tier_majors)
+        by_abbr: Dict[str, Dict[str, Any]] = {}
+        for major in majors:
+            # The first entry wins, matching the old linear scan.
+            by_abbr.setdefault(major.get("abbr"), major)
+        index = _MajorIndex(majors, by_abbr)
+        if majors_config:
+            self._indexes[key] = index
+        return index
+
+    async def _course_plan(self, major_abbr: str) -> _CoursePlan:
+        path = self.courses_dir / f"{major_abbr}.json"
+        key = str(path)
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+        plan = await self._load_json(path)
+        plan_data = plan.get("semesters") or plan.get("plan", [])
+        index = _CoursePlan(plan, [sem.get("courses", []) for sem in plan_data])
+        if plan:
+            self._indexes[key] = index
+        return index
+
+    async def get_all_majors(self) -> List[Dict[str, Any]]:
+        """Return all majors as a flat list, regardless of tier grouping."""
+        return list((await self._major_index()).majors)
 
     async def get_major_by_abbr(self, abbr: str) -> Optional[Dict[str, Any]]:
         """Find one major and its first-semester courses by abbreviation."""
-        all_majors = await self.get_all_majors()
-        for m in all_majors:
-            if m.get("abbr") == abbr:
-                course_plan = await self._load_json(
-                    self.courses_dir / f"{abbr}.json"
-                )
-                plan_data = course_plan.get("semesters") or course_plan.get("plan", [])
-                initial_courses = plan_data[0].get("courses", []) if plan_data else []
-                return {
-                    "major_info": m,
-                    "course_plan": course_plan,
-                    "initial_courses": initial_courses,
-                }
-        return None
+        major = (await self._major_index()).by_abbr.get(abbr)
+        if major is None:
+            return None
+        course_plan = await self._course_plan(abbr)
+        return {
+            "major_info": major,
+            "course_plan": course_plan.plan,
+            "initial_courses": (
+                course_plan.semesters[0] if course_plan.semesters else []
+            ),
+        }
 
     async def get_semester_courses(
         self, major_abbr: str, semester_idx: int
     ) -> List[Dict]:
         """Return the course list for a major and semester index."""
-        plan = await self._load_json(self.courses_dir / f"{major_abbr}.json")
-        plan_data = plan.get("semesters") or plan.get("plan", [])
-        if 0 < semester_idx <= len(plan_data):
-            return plan_data[semester_idx - 1].get("courses", [])
+        semesters = (await self._course_plan(major_abbr)).semesters
+        if 0 < semester_idx <= len(semesters):
+            return semesters[semester_idx - 1]
         return []
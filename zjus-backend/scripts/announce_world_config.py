@@ -0,0 +1,42 @@
+"""Tell running workers to reload hand-edited world config files.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Admin saves announce themselves; run this after editing `game_balance.json`,
+`items.json`, or `stat_definitions.json` directly on a shared world volume.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.game.config_sync import RELOADERS, announce_config_change  # noqa: E402
+
+
+async def _announce(kinds: list[str]) -> int:
+    failed = 0
+    for kind in kinds:
+        version = await announce_config_change(kind)
+        if version is None:
+            print(f"{kind}: Redis unreachable, nothing announced", file=sys.stderr)
+            failed += 1
+        else:
+            print(f"{kind}: announced version {version}")
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("kinds", nargs="+", choices=sorted(RELOADERS))
+    args = parser.parse_args()
+    return asyncio.run(_announce(args.kinds))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
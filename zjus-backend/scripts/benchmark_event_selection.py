@@ -0,0 +1,98 @@
+"""Benchmark library event selection against library size.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Replicates `world/event_library.json` to larger sizes and compares the old
+linear range scan with the load-time bucket index used by `pick_random_event`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.content.event_index import EventIndex  # noqa: E402
+from app.content.state_vector import PlayerStateVector  # noqa: E402
+from app.game.stat_definitions import stat_definitions  # noqa: E402
+
+WORLD_DIR = BACKEND_ROOT / "world"
+
+
+def _bounds(stat_id: str) -> tuple[int, int]:
+    definition = stat_definitions.by_id[stat_id]
+    return definition.min, definition.max
+
+
+def _replicate(events: list[dict], factor: int) -> list[dict]:
+    return [
+        {**evt, "id": f"{evt.get('id')}_{copy}"}
+        for copy in range(factor)
+        for evt in events
+    ]
+
+
+def _linear_pick(events: list[dict], sanity: int, stress: int, seen: set[str]):
+    """The pre-index selection path, kept here as the baseline."""
+    full_s, full_t = list(_bounds("sanity")), list(_bounds("stress"))
+    candidates = []
+    for evt in events:
+        if evt.get("id") in seen:
+            continue
+        sr = evt.get("sanity_range", full_s)
+        tr = evt.get("stress_range", full_t)
+        if sr[0] <= sanity <= sr[1] and tr[0] <= stress <= tr[1]:
+            candidates.append(evt)
+    if not candidates:
+        candidates = [e for e in events if e.get("id") not in seen]
+    return random.choice(candidates) if candidates else None
+
+
+def _time_per_call(fn, states, rounds: int) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(*states[i % len(states)])
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--factors", default="1,10,50")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(WORLD_DIR / "event_library.json", encoding="utf-8") as f:
+        base = json.load(f)
+    rng = random.Random(42)
+    states = [(rng.randint(0, 200), rng.randint(0, 200)) for _ in range(256)]
+    affinity = PlayerStateVector.from_stats(
+        {"sanity": 60, "stress": 120}
+    ).event_affinity_tags()
+
+    print(f"{'events':>8} {'build ms':>9} {'linear us':>10} {'index us':>9}")
+    for factor in (int(x) for x in args.factors.split(",")):
+        events = _replicate(base, factor)
+        seen = {evt["id"] for evt in rng.sample(events, 50)}
+        start = time.perf_counter()
+        index = EventIndex(events, _bounds("sanity"), _bounds("stress"))
+        build_ms = (time.perf_counter() - start) * 1e3
+        linear = _time_per_call(
+            lambda s, t, ev=events, sn=seen: _linear_pick(ev, s, t, sn),
+            states,
+            max(1, args.rounds // factor),
+        )
+        sample = lambda s, t, ix=index, sn=seen: ix.sample(s, t, sn, affinity)  # noqa: E731
+        # Warm the per-bucket tag caches so the timing shows steady state.
+        _time_per_call(sample, states, len(states))
+        indexed = _time_per_call(sample, states, args.rounds)
+        print(f"{len(events):>8} {build_ms:>9.1f} {linear:>10.1f} {indexed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
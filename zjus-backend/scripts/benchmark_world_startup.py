@@ -0,0 +1,89 @@
+"""Benchmark world-data startup with and without the compiled bundle.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Each mode runs in a fresh interpreter: it times importing the game modules,
+then the first touch of every lazily loaded world section.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+
+_CHILD = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.content import event_library, vector_store
+from app.core import dingtalk_llm, llm
+from app.services.world_service import WorldService
+t1 = time.perf_counter()
+event_library._load_event_index()
+event_library._load_cc98_index()
+vector_store._load_query_embeddings()
+dingtalk_llm._load_characters()
+llm._load_keywords()
+llm._load_graduation_comments()
+asyncio.run(WorldService().get_major_by_abbr("CS"))
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1e3, "first_use_ms": (t2 - t1) * 1e3}))
+"""
+
+
+def _run(bundle: str, runs: int) -> dict[str, float]:
+    env = {**os.environ, "WORLD_BUNDLE_PATH": bundle}
+    samples: dict[str, list[float]] = {"import_ms": [], "first_use_ms": []}
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD],
+            cwd=BACKEND_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        for key, value in result.items():
+            samples[key].append(value)
+    return {key: statistics.median(values) for key, values in samples.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = Path(tmp) / "world.bundle"
+        subprocess.run(
+            [
+                sys.executable,
+                "scripts/validate_world_data.py",
+                "--compile",
+                "--skip-frontend",
+                "--output",
+                str(bundle),
+            ],
+            cwd=BACKEND_ROOT,
+            check=True,
+            capture_output=True,
+        )
+        modes = {
+            "json": _run(str(Path(tmp) / "missing.bundle"), args.runs),
+            "bundle": _run(str(bundle), args.runs),
+        }
+
+    print(f"{'mode':>8} {'import ms':>10} {'first use ms':>13}")
+    for mode, result in modes.items():
+        print(f"{mode:>8} {result['import_ms']:>10.1f} {result['first_use_ms']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
-"""Generate offline event-library and CC98-library content.
+"""Generate offline event, CC98, and DingTalk library content.
 
 Copyright (c) 2026 pirate-608. Licensed under the MIT License.
 
 Notes:
     The script uses an OpenAI-compatible chat/completions endpoint and writes
-    generated data to `world/event_library.json` and `world/cc98_library.json`.
+    generated data to `world/event_library.json`, `world/cc98_library.json`,
+    and `world/dingtalk_library.json`.
     It can target cloud APIs or a local Ollama `/v1` endpoint.
 
 Usage:
     python scripts/generate_content_library.py --events 300 --cc98 500
     python scripts/generate_content_library.py --events-only 100
     python scripts/generate_content_library.py --cc98-only 200
+    python scripts/generate_content_library.py --dingtalk-only 120
 """
 
 import argparse
@@ -32,6 +34,7 @@ if str(BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(BACKEND_ROOT))
 
 from app.game.stat_definitions import stat_definitions  # noqa: E402
+from app.schemas.dingtalk import is_replyable_role  # noqa: E402
 
 # ============================================================
 # Configuration.
@@ -656,17 +659,211 @@ def generate_cc98_posts(target_count: int) -> List[Dict[str, Any]]:
     return posts[:target_count]
 
 
+# ============================================================
+# DingTalk thread library generation.
+# ============================================================
+
+DINGTALK_CONTEXT_SCENES = {
+    "random": "日常校园生活",
+    "low_sanity": "学生情绪低落需要关心",
+    "high_stress": "学生压力大需要适度放松",
+    "low_gpa": "学生成绩亮红灯需要学业提醒",
+}
+DINGTALK_TURNS = 3
+
+
+def load_dingtalk_characters() -> List[Dict[str, Any]]:
+    """Load characters whose names need no runtime course substitution."""
+    path = WORLD_DIR / "characters.json"
+    if not path.exists():
+        print("⚠️ 未找到 characters.json，无法生成钉钉对话库")
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        characters = json.load(f)
+    # Template names such as 【[课程名...]助教】 are filled per player at runtime.
+    return [
+        c for c in characters
+        if isinstance(c, dict) and c.get("name") and "[" not in str(c["name"])
+    ]
+
+
+def _string_list(value: Any, size: int) -> Optional[List[str]]:
+    if not isinstance(value, list) or len(value) < size:
+        return None
+    items = [str(item or "").strip() for item in value[:size]]
+    return items if all(items) else None
+
+
+def _clean_settlement(value: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(value, dict) or not str(value.get("desc") or "").strip():
+        return None
+    effects_raw = value.get("effects")
+    effects: Dict[str, int] = {}
+    if isinstance(effects_raw, dict):
+        for field, delta in effects_raw.items():
+            if field in ALLOWED_EVENT_EFFECT_FIELDS and field != "desc":
+                try:
+                    effects[field] = int(delta)
+                except (TypeError, ValueError):
+                    continue
+    return {"desc": str(value["desc"]).strip(), "effects": effects}
+
+
+def normalize_dingtalk_thread(
+    data: Any, character: Dict[str, Any], context: str
+) -> Optional[Dict[str, Any]]:
+    """Shape one generated conversation into a library thread, or None."""
+    if not isinstance(data, dict):
+        return None
+    opener = str(data.get("opener") or "").strip()
+    if not opener:
+        return None
+    role = str(character.get("role") or "unknown")
+    turns: List[Dict[str, Any]] = []
+    if is_replyable_role(role):
+        raw_turns = data.get("turns")
+        if not isinstance(raw_turns, list) or len(raw_turns) < DINGTALK_TURNS:
+            return None
+        for index, raw in enumerate(raw_turns[:DINGTALK_TURNS]):
+            if not isinstance(raw, dict):
+                return None
+            options = _string_list(raw.get("options"), 3)
+            replies = _string_list(raw.get("replies"), 3)
+            if options is None or replies is None:
+                return None
+            turn: Dict[str, Any] = {
+                "options": [option[:80] for option in options],
+                "replies": replies,
+            }
+            if index == DINGTALK_TURNS - 1:
+                raw_settlements = raw.get("settlements")
+                if not isinstance(raw_settlements, list):
+                    return None
+                settlements = [_clean_settlement(v) for v in raw_settlements[:3]]
+                if len(settlements) < 3 or None in settlements:
+                    return None
+                turn["settlements"] = settlements
+            turns.append(turn)
+    return {
+        "id": f"dtl_{uuid.uuid4().hex[:8]}",
+        "character": str(character["name"]),
+        "role": role,
+        "context": context,
+        "is_urgent": bool(data.get("is_urgent", False)),
+        "opener": opener,
+        "turns": turns,
+    }
+
+
+def _dingtalk_prompt(character: Dict[str, Any], context: str) -> str:
+    name = character["name"]
+    persona = str(character.get("content") or "")[:600]
+    examples = "\n".join(f"- {e}" for e in (character.get("examples") or [])[:3])
+    scene = DINGTALK_CONTEXT_SCENES.get(context, "日常校园生活")
+    if not is_replyable_role(str(character.get("role") or "")):
+        shape = '{"opener": "通知正文", "is_urgent": false}'
+        rules = "这是单向通知，玩家无法回复，只需要一条消息。"
+    else:
+        shape = (
+            '{"opener": "开场消息", "is_urgent": false, "turns": ['
+            '{"options": ["玩家回复1", "玩家回复2", "玩家回复3"], '
+            '"replies": ["对回复1的回应", "对回复2的回应", "对回复3的回应"]}, '
+            "{...同上...}, "
+            '{"options": [...], "replies": [...], "settlements": ['
+            '{"desc": "结算描述", "effects": {"sanity": 2}}, {...}, {...}]}]}'
+        )
+        rules = (
+            f"对话共 {DINGTALK_TURNS} 轮：每轮给出玩家可选的 3 条简短回复"
+            "（每条 15 字以内），以及你对每条回复的回应；"
+            "第 i 条回应必须接住第 i 条玩家回复，并自然引出下一轮的 3 个选项。"
+            "最后一轮为每个选项各写一条结算，effects 只能使用："
+            f"{allowed_event_effect_prompt()}，数值在 -5 到 5 之间。"
+        )
+    return f"""你扮演浙江大学钉钉里的「{name}」。
+人设：{persona}
+说话示例：
+{examples}
+
+当前情境：{scene}。
+请写一段{name}主动发给玩家的钉钉私聊。{rules}
+
+【重要】请直接输出一个 JSON 对象，不要包含任何其他文字：
+{shape}
+
+要求：
+1. 语气贴合人设，像真实浙大校园里的聊天，消息简短（每条 60 字以内）
+2. 不要出现玩家的真实姓名，用“你”称呼
+
+现在请直接输出 JSON："""
+
+
+def generate_dingtalk_threads(target_count: int) -> List[Dict[str, Any]]:
+    """Generate DingTalk library threads balanced over context and character."""
+    characters = load_dingtalk_characters()
+    if not characters:
+        return []
+    threads: List[Dict[str, Any]] = []
+    consecutive_failures = 0
+    contexts = list(DINGTALK_CONTEXT_SCENES)
+
+    print(f"\n💬 开始生成钉钉对话库（目标 {target_count} 段）...\n")
+
+    try:
+        while len(threads) < target_count:
+            if consecutive_failures > 10:
+                print("  ❌ 连续失败过多，提前结束钉钉对话生成")
+                break
+            slot = len(threads)
+            context = contexts[slot % len(contexts)]
+            character = characters[(slot // len(contexts)) % len(characters)]
+
+            raw = call_llm(
+                [{"role": "user", "content": _dingtalk_prompt(character, context)}]
+            )
+            if not raw:
+                print("  ❌ 生成失败，跳过本次")
+                consecutive_failures += 1
+                continue
+
+            thread = normalize_dingtalk_thread(extract_json(raw), character, context)
+            if thread is None:
+                print("  ❌ 对话结构不完整，跳过本次")
+                print(f"  📝 原始内容: {raw[:150]}...")
+                consecutive_failures += 1
+                continue
+
+            consecutive_failures = 0
+            threads.append(thread)
+            print(
+                f"  ✅ {len(threads)}/{target_count} 段对话已生成 "
+                f"({character['name']} / {context})"
+            )
+            time.sleep(0.2)
+
+    except KeyboardInterrupt:
+        print("\n⚠️ 用户中断，正在保存已生成的钉钉对话...")
+        return threads
+
+    return threads[:target_count]
+
+
 # ============================================================
 # CLI entry point.
 # ============================================================
 
 def main():
     """CLI entry point for offline event and CC98 library generation."""
-    parser = argparse.ArgumentParser(description="离线批量生成事件库和 CC98 帖子库")
+    parser = argparse.ArgumentParser(
+        description="离线批量生成事件库、CC98 帖子库和钉钉对话库"
+    )
     parser.add_argument("--events", type=int, default=0, help="生成随机事件数量")
     parser.add_argument("--cc98", type=int, default=0, help="生成 CC98 帖子数量")
     parser.add_argument("--events-only", type=int, default=0, help="仅生成事件")
     parser.add_argument("--cc98-only", type=int, default=0, help="仅生成帖子")
+    parser.add_argument("--dingtalk", type=int, default=0, help="生成钉钉对话数量")
+    parser.add_argument(
+        "--dingtalk-only", type=int, default=0, help="仅生成钉钉对话"
+    )
     parser.add_argument(
         "--model", type=str, default=_config["model"], help="调用的模型名"
     )
@@ -702,8 +899,9 @@ def main():
 
     event_count = args.events or args.events_only
     cc98_count = args.cc98 or args.cc98_only
+    dingtalk_count = args.dingtalk or args.dingtalk_only
 
-    if not event_count and not cc98_count:
+    if not event_count and not cc98_count and not dingtalk_count:
         print("请指定生成数量，例如：")
         print("  python scripts/generate_content_library.py --events 300 --cc98 500")
         print("  python scripts/generate_content_library.py --events-only 50")
@@ -728,6 +926,7 @@ def main():
 
     events: List[Dict[str, Any]] = []
     posts: List[Dict[str, Any]] = []
+    threads: List[Dict[str, Any]] = []
 
     try:
         # Generate and save random events.
@@ -766,6 +965,24 @@ def main():
                 json.dump(posts, f, ensure_ascii=False, indent=2)
             print(f"\n📦 CC98 帖子库已保存: {out_path} ({len(posts)} 条)")
 
+        # Generate and save DingTalk threads.
+        if dingtalk_count > 0:
+            threads = generate_dingtalk_threads(dingtalk_count)
+            out_path = WORLD_DIR / "dingtalk_library.json"
+
+            if args.append and out_path.exists():
+                with open(out_path, "r", encoding="utf-8") as f:
+                    existing = json.load(f)
+                threads = existing + threads
+                print(
+                    f"\n📎 追加模式：已有 {len(existing)} 段 + "
+                    f"新增 {len(threads) - len(existing)} 段"
+                )
+
+            with open(out_path, "w", encoding="utf-8") as f:
+                json.dump(threads, f, ensure_ascii=False, indent=2)
+            print(f"\n📦 钉钉对话库已保存: {out_path} ({len(threads)} 段)")
+
     except KeyboardInterrupt:
         print("\n⚠️ 程序被用户中断。")
         # Preserve partial output if the operator interrupts the run.
@@ -793,6 +1010,18 @@ def main():
             with open(out_path, "w", encoding="utf-8") as f:
                 json.dump(posts, f, ensure_ascii=False, indent=2)
             print(f"📦 已保存 {len(posts)} 条帖子到 {out_path}")
+        if threads:
+            out_path = WORLD_DIR / "dingtalk_library.json"
+            if args.append and out_path.exists():
+                try:
+                    with open(out_path, "r", encoding="utf-8") as f:
+                        existing = json.load(f)
+                    threads = existing + threads
+                except (OSError, json.JSONDecodeError, TypeError):
+                    pass
+            with open(out_path, "w", encoding="utf-8") as f:
+                json.dump(threads, f, ensure_ascii=False, indent=2)
+            print(f"📦 已保存 {len(threads)} 段钉钉对话到 {out_path}")
         sys.exit(0)
 
     print("\n🎉 生成完毕！")
@@ -0,0 +1,101 @@
+"""Report estimated prompt tokens for DingTalk replies as conversations grow.
+
+Copyright (c) 2026 pirate-608. Licensed under the MIT License.
+Builds reply prompts for every library character over synthetic threads and
+compares the old last-8-turns history with the summary-plus-budget context.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.core.dingtalk_context import (  # noqa: E402
+    DINGTALK_PROMPT_TOKEN_BUDGET,
+    DINGTALK_SUMMARY_MAX_CHARS,
+    conversation_context,
+    text_tokens,
+)
+from app.core.dingtalk_llm import (  # noqa: E402
+    _load_characters,
+    build_m2her_reply_messages,
+)
+from app.core.llm import build_dingtalk_reply_prompt  # noqa: E402
+from app.core.llm_admission import estimate_tokens  # noqa: E402
+
+STATS = {
+    "username": "测试同学",
+    "major": "计算机科学与技术",
+    "semester": "大二春夏",
+    "sanity": 60,
+    "stress": 40,
+    "gpa": 3.6,
+    "charm": 50,
+}
+
+
+def _thread(length: int, npc_chars: int) -> list[dict]:
+    return [
+        {
+            "speaker": "player" if i % 2 else "npc",
+            "content": ("好的呀" * 10)[:24] if i % 2 else ("这件事" * 200)[:npc_chars],
+        }
+        for i in range(length)
+    ]
+
+
+def _legacy_context(sender: str, history: list[dict]) -> str:
+    """History as prompts carried it before rolling summaries."""
+    lines = []
+    for msg in history[-8:]:
+        speaker = "玩家" if msg.get("speaker") == "player" else sender
+        content = str(msg.get("content") or "").strip()
+        if content:
+            lines.append(f"{speaker}: {content}")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lengths", default="2,8,20,50")
+    parser.add_argument("--npc-chars", type=int, default=500)
+    args = parser.parse_args()
+
+    characters = _load_characters() or [{"name": "室友", "role": "roommate"}]
+    summary = "摘" * DINGTALK_SUMMARY_MAX_CHARS
+    worst = 0
+    print(
+        f"{'messages':>8} {'legacy ctx':>10} {'ctx':>5} "
+        f"{'generic max':>11} {'m2her max':>9}"
+    )
+    for length in (int(x) for x in args.lengths.split(",")):
+        history = _thread(length, args.npc_chars)
+        legacy = new = generic = m2her = 0
+        for character in characters:
+            sender = str(character.get("name") or "未知")
+            legacy = max(legacy, text_tokens(_legacy_context(sender, history)))
+            new = max(
+                new, text_tokens(conversation_context(sender, history, summary))
+            )
+            prompt = build_dingtalk_reply_prompt(
+                character, STATS, history, "好的", 3, summary
+            )
+            generic = max(generic, text_tokens(prompt))
+            messages = build_m2her_reply_messages(
+                character, STATS, history, "好的", 3, summary
+            )
+            m2her = max(m2her, estimate_tokens(messages, 0))
+        worst = max(worst, generic, m2her)
+        print(f"{length:>8} {legacy:>10} {new:>5} {generic:>11} {m2her:>9}")
+
+    print(f"budget {DINGTALK_PROMPT_TOKEN_BUDGET}, worst {worst}")
+    return 0 if worst <= DINGTALK_PROMPT_TOKEN_BUDGET else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,19 @@
 """Validate gameplay world data and generated stat metadata.
 
 Copyright (c) 2026 pirate-608. Licensed under the MIT License.
-The checks catch unsupported item/event effect fields and stale generated
-frontend stat metadata before those mistakes reach runtime.
+The checks catch unsupported item/event/DingTalk effect fields and stale
+generated frontend stat metadata before those mistakes reach runtime. With `--compile`
+the validated data is also packed into the runtime world bundle.
 """
 
 # ruff: noqa: E402, I001
 
 from __future__ import annotations
 
+import argparse
 import json
 import sys
+import time
 from pathlib import Path
 from typing import Any
 
@@ -21,8 +24,13 @@ if str(BACKEND_ROOT) not in sys.path:
 if str(Path(__file__).resolve().parent) not in sys.path:
     sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+from app.content.cc98_index import Cc98Index  # noqa: E402
+from app.content.dingtalk_index import DINGTALK_LIBRARY_CONTEXTS  # noqa: E402
+from app.content.event_index import EventIndex  # noqa: E402
+from app.core.world_bundle import bundle_path, source_stamp, write_bundle  # noqa: E402
 from app.game.items import ItemCatalog  # noqa: E402
 from app.game.stat_definitions import StatDefinitions  # noqa: E402
+from app.schemas.dingtalk import is_replyable_role  # noqa: E402
 from sync_stat_definitions import OUTPUT_PATH, build_typescript  # noqa: E402
 
 WORLD_DIR = BACKEND_ROOT / "world"
@@ -80,6 +88,58 @@ def _validate_event_library(registry: StatDefinitions, errors: list[str]) -> Non
                     )
 
 
+def _validate_dingtalk_library(registry: StatDefinitions, errors: list[str]) -> None:
+    path = WORLD_DIR / "dingtalk_library.json"
+    if not path.exists():
+        return
+    raw = _load_json(path)
+    if not isinstance(raw, list):
+        errors.append(f"{path.relative_to(REPO_ROOT)}: expected a list")
+        return
+    allowed = registry.event_effect_fields
+    seen: set[str] = set()
+    for index, thread in enumerate(raw):
+        label = f"dingtalk_library[{index}]"
+        if not isinstance(thread, dict) or not thread.get("id"):
+            errors.append(f"{label}: missing id")
+            continue
+        if thread["id"] in seen:
+            errors.append(f"{label}: duplicate id {thread['id']}")
+        seen.add(thread["id"])
+        if not str(thread.get("opener") or "").strip():
+            errors.append(f"{label}: missing opener")
+        if thread.get("context", "random") not in DINGTALK_LIBRARY_CONTEXTS:
+            errors.append(f"{label}: unknown context {thread.get('context')}")
+        turns = thread.get("turns") or []
+        if not is_replyable_role(str(thread.get("role") or "")):
+            if turns:
+                errors.append(f"{label}: non-replyable role has turns")
+            continue
+        if not isinstance(turns, list) or len(turns) != 3:
+            errors.append(f"{label}: replyable threads need 3 turns")
+            continue
+        for turn_index, turn in enumerate(turns):
+            options = turn.get("options") if isinstance(turn, dict) else None
+            replies = turn.get("replies") if isinstance(turn, dict) else None
+            if not options or not isinstance(replies, list):
+                errors.append(f"{label}.turns[{turn_index}]: missing options")
+                continue
+            if len(replies) != len(options):
+                errors.append(
+                    f"{label}.turns[{turn_index}]: replies do not match options"
+                )
+        last = turns[-1] if isinstance(turns[-1], dict) else {}
+        settlements = last.get("settlements")
+        if not isinstance(settlements, list) or not settlements:
+            errors.append(f"{label}: last turn needs settlements")
+            continue
+        for settlement in settlements:
+            effects = settlement.get("effects") if isinstance(settlement, dict) else {}
+            for field in effects if isinstance(effects, dict) else ():
+                if field not in allowed:
+                    errors.append(f"{label}: unsupported effect field {field}")
+
+
 def _validate_generated_frontend(errors: list[str]) -> None:
     expected = build_typescript()
     actual = OUTPUT_PATH.read_text(encoding="utf-8") if OUTPUT_PATH.exists() else ""
@@ -90,8 +150,65 @@ def _validate_generated_frontend(errors: list[str]) -> None:
         )
 
 
+def _bundle_sections(registry: StatDefinitions):
+    """Yield `(name, value, sources)` for every world JSON file and index."""
+    for path in sorted(WORLD_DIR.rglob("*.json")):
+        relative = path.relative_to(WORLD_DIR).as_posix()
+        yield f"json:{relative}", _load_json(path), [source_stamp(WORLD_DIR, relative)]
+
+    events_path = WORLD_DIR / "event_library.json"
+    if events_path.exists():
+        bounds = [
+            (registry.by_id[s].min, registry.by_id[s].max) for s in ("sanity", "stress")
+        ]
+        index = EventIndex(_load_json(events_path), *bounds)
+        yield (
+            "index:events",
+            index.to_state(),
+            [
+                source_stamp(WORLD_DIR, "event_library.json"),
+                source_stamp(WORLD_DIR, "stat_definitions.json"),
+            ],
+        )
+
+    cc98_path = WORLD_DIR / "cc98_library.json"
+    if cc98_path.exists():
+        cc98 = Cc98Index(_load_json(cc98_path))
+        yield (
+            "index:cc98",
+            cc98.to_state(),
+            [source_stamp(WORLD_DIR, "cc98_library.json")],
+        )
+
+
+def _compile(registry: StatDefinitions, output: Path) -> None:
+    start = time.perf_counter()
+    sizes = write_bundle(output, _bundle_sections(registry))
+    elapsed = (time.perf_counter() - start) * 1e3
+    print(
+        f"compiled {len(sizes)} sections, {sum(sizes.values()) / 1024:.0f} KiB "
+        f"into {output} in {elapsed:.0f} ms"
+    )
+
+
 def main() -> int:
     """CLI entry point for validating registry, item, and event world data."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="write the runtime world bundle after validation passes",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=None, help="bundle path override"
+    )
+    parser.add_argument(
+        "--skip-frontend",
+        action="store_true",
+        help="skip the generated frontend check (e.g. in the backend image)",
+    )
+    args = parser.parse_args()
+
     errors: list[str] = []
     try:
         registry = StatDefinitions(WORLD_DIR / "stat_definitions.json")
@@ -107,13 +224,17 @@ def main() -> int:
 
     _validate_items(registry, errors)
     _validate_event_library(registry, errors)
-    _validate_generated_frontend(errors)
+    _validate_dingtalk_library(registry, errors)
+    if not args.skip_frontend:
+        _validate_generated_frontend(errors)
 
     if errors:
         for error in errors:
             print(f"ERROR: {error}", file=sys.stderr)
         return 1
     print("world data validation passed")
+    if args.compile:
+        _compile(registry, args.output or bundle_path())
     return 0
 
 
@@ -187,3 +187,28 @@ def mock_redis_cache():
         mock.rpush_many_with_limit = AsyncMock(side_effect=_rpush_many_with_limit)
         mock._store = store  # 暴露内部存储供断言使用
         yield mock
+
+
+# ==========================================
+# State backend fixtures
+# ==========================================
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    """进程内 StateBackend，RedisCache.get_client() 也返回它"""
+    from app.api.cache import RedisCache
+    from app.core.config import settings
+    from app.core.state_backend import MemoryStateBackend
+
+    backend = MemoryStateBackend()
+    monkeypatch.setattr(settings, "STATE_BACKEND", "memory")
+    monkeypatch.setattr(RedisCache, "_memory_backend", backend)
+    return backend
+
+
+@pytest.fixture
+def memory_repo(memory_backend):
+    """绑定到进程内后端的真实 RedisRepository"""
+    from app.repositories.redis_repo import RedisRepository
+
+    return RedisRepository("test-user", memory_backend)
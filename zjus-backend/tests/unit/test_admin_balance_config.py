@@ -75,6 +75,35 @@ def test_invalid_probability_does_not_build_or_write(tmp_path, balance_config):
     assert config_path.read_text(encoding="utf-8") == original_text
 
 
+def test_config_the_runtime_rejects_is_never_written(tmp_path, balance_config):
+    config_path = tmp_path / "game_balance.json"
+    original_text = json.dumps(balance_config, ensure_ascii=False)
+    config_path.write_text(original_text, encoding="utf-8")
+    reloads = []
+
+    next_config = copy.deepcopy(balance_config)
+    next_config["semester"]["duration_by_index"]["next"] = 300
+
+    with pytest.raises(BalanceConfigError, match="duration_by_index"):
+        publish_balance_config(config_path, next_config, reloads.append)
+
+    assert config_path.read_text(encoding="utf-8") == original_text
+    assert reloads == []
+
+
+def test_quoted_numbers_pass_both_validators(tmp_path, balance_config):
+    config_path = tmp_path / "game_balance.json"
+    config_path.write_text(json.dumps(balance_config), encoding="utf-8")
+    game_balance = GameBalance()
+    game_balance.load(config_path)
+
+    next_config = copy.deepcopy(balance_config)
+    next_config["events"]["dingtalk"]["max_contacts"] = "9"
+    publish_balance_config(config_path, next_config, game_balance.reload)
+
+    assert game_balance.dingtalk_max_contacts == 9
+
+
 def test_missing_form_field_is_rejected(balance_config):
     form = config_to_form_data(balance_config)
     del form["tick__interval_seconds"]
@@ -9,7 +9,7 @@ import json
 
 import pytest
 
-from app.game.balance import GameBalance
+from app.game.balance import BalanceSnapshot, GameBalance
 
 # ==========================================
 # 重置单例（每个测试独立）
@@ -20,10 +20,12 @@ def reset_singleton():
     """每个测试前重置 GameBalance 单例，避免状态泄漏"""
     GameBalance._instance = None
     GameBalance._config = {}
+    GameBalance._snapshot = None
     GameBalance._config_path = None
     yield
     GameBalance._instance = None
     GameBalance._config = {}
+    GameBalance._snapshot = None
     GameBalance._config_path = None
 
 
@@ -175,3 +177,95 @@ class TestCourseStatesConfig:
         gb.load(sample_balance_config)
         assert isinstance(gb.raw, dict)
         assert "version" in gb.raw
+
+
+# ==========================================
+# 不可变快照
+# ==========================================
+
+
+class TestBalanceSnapshot:
+    """测试校验后的不可变快照"""
+
+    def test_snapshot_precomputes_tick_values(self):
+        snap = BalanceSnapshot.from_config(
+            {
+                "semester": {
+                    "default_duration_seconds": 360,
+                    "duration_by_index": {"1": 420, "3": 300},
+                },
+                "course_states": {
+                    "0": {"growth": 0.0, "drain": 0.0},
+                    "2": {"growth": 4.0, "drain": 3.6},
+                },
+                "events": {"dingtalk": {"check_interval_ticks": 4}},
+                "relax_actions": {"gym": {"cooldown_seconds": 30}, "walk": {}},
+            }
+        )
+        assert snap.semester_durations == (360, 420, 360, 300)
+        assert snap.semester_duration(3) == 300
+        assert snap.semester_duration(9) == 360
+        assert snap.course_state(2).growth == 4.0
+        # 未配置的状态与越界状态都按“摸”处理
+        assert snap.course_state(1) == snap.course_state(7)
+        assert snap.dingtalk.due(8) and not snap.dingtalk.due(9)
+        assert dict(snap.relax_cooldowns) == {"gym": 30, "walk": 0}
+
+        with pytest.raises(AttributeError):
+            snap.tick_interval = 1  # type: ignore[misc]
+        with pytest.raises(TypeError):
+            snap.relax_cooldowns["gym"] = 0  # type: ignore[index]
+
+    def test_quoted_numbers_are_cast_like_the_old_accessors(self):
+        snap = BalanceSnapshot.from_config(
+            {
+                "events": {"dingtalk": {"max_contacts": "12"}},
+                "sanity_stress_modifiers": {
+                    "growth": {"stress": {"optimal_range": ["35", 75]}}
+                },
+            }
+        )
+        assert snap.dingtalk_max_contacts == 12
+        assert snap.growth.stress_optimal_low == 35.0
+        assert snap.growth.stress_optimal_high == 75.0
+
+    @pytest.mark.parametrize(
+        "config, field",
+        [
+            ({"tick": {"interval_seconds": 0}}, "tick.interval_seconds"),
+            ({"tick": {"base_energy_drain": "fast"}}, "tick.base_energy_drain"),
+            (
+                {"events": {"random_event": {"trigger_probability": 1.5}}},
+                "events.random_event.trigger_probability",
+            ),
+            ({"course_states": {"x": {}}}, "course_states"),
+            ({"exam": {"fail_threshold": "nan"}}, "exam.fail_threshold"),
+            (
+                {
+                    "sanity_stress_modifiers": {
+                        "growth": {"stress": {"optimal_range": [80, "low"]}}
+                    }
+                },
+                "optimal_range",
+            ),
+        ],
+    )
+    def test_invalid_values_name_the_field(self, config, field):
+        with pytest.raises(ValueError, match=field):
+            BalanceSnapshot.from_config(config)
+
+    def test_invalid_reload_keeps_previous_snapshot(self, tmp_path):
+        path = tmp_path / "game_balance.json"
+        path.write_text(json.dumps({"version": "1.0"}), encoding="utf-8")
+        gb = GameBalance.__new__(GameBalance)
+        gb.load(str(path))
+        before = gb.snapshot
+
+        path.write_text(
+            json.dumps({"version": "2.0", "tick": {"interval_seconds": -1}}),
+            encoding="utf-8",
+        )
+        with pytest.raises(ValueError):
+            gb.reload(str(path))
+        assert gb.snapshot is before
+        assert gb.version == "1.0"
@@ -0,0 +1,87 @@
+import random
+
+from app.content import event_library
+from app.content.cc98_index import Cc98Index
+
+
+def _post(post_id, effect, topic, content):
+    return {"id": post_id, "effect": effect, "topic": topic, "content": content}
+
+
+def _linear_hits(posts, effect, trigger):
+    """The pre-index matching rule, kept as the reference."""
+    pool = [i for i, p in enumerate(posts) if p["effect"] == effect]
+    norm = trigger.strip().lower().replace(" ", "")
+    hits = [
+        i
+        for i in pool
+        if norm in posts[i]["topic"].lower().replace(" ", "")
+        or norm in posts[i]["content"].lower().replace(" ", "")
+    ]
+    return tuple(hits or pool)
+
+
+def test_trigger_lookup_matches_linear_scan():
+    rng = random.Random(5)
+    alphabet = "浙大紫金港郁闷小屋烂坑GPAab "
+    posts = [
+        _post(
+            f"p{i}",
+            rng.choice(["positive", "negative", "neutral"]),
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6))),
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20))),
+        )
+        for i in range(300)
+    ]
+    index = Cc98Index(posts)
+
+    for trigger in ["郁闷小屋", "烂坑", "gpa", "G P A", "港", "大紫", "不存在的词"]:
+        for effect in ["positive", "negative", "neutral"]:
+            assert index.candidates(effect, trigger) == _linear_hits(
+                posts, effect, trigger
+            )
+
+
+def test_trigger_does_not_match_across_topic_and_content():
+    index = Cc98Index(
+        [_post("a", "neutral", "郁闷", "小屋"), _post("b", "neutral", "x", "y")]
+    )
+
+    assert index.candidates("neutral", "郁闷小屋") == (0, 1)
+    assert index.candidates("missing", "") == (0, 1)
+
+
+def test_sample_avoids_recent_posts_until_exhausted():
+    posts = [_post(f"hit{i}", "negative", "郁闷小屋", "") for i in range(3)]
+    posts += [_post(f"other{i}", "negative", "水区", "") for i in range(3)]
+    index = Cc98Index(posts)
+    rng = random.Random(2)
+
+    recent: list[str] = []
+    for _ in range(3):
+        recent.append(index.ids[index.sample("negative", "郁闷小屋", recent, rng)])
+    assert sorted(recent) == ["hit0", "hit1", "hit2"]
+    # Fresh trigger hits are gone, so fresh effect-matched posts come next.
+    assert index.ids[index.sample("negative", "郁闷小屋", recent, rng)].startswith(
+        "other"
+    )
+    everything = set(index.ids)
+    assert index.ids[index.sample("negative", "郁闷小屋", everything, rng)].startswith(
+        "hit"
+    )
+
+
+def test_pick_cc98_post_uses_index(monkeypatch):
+    posts = [
+        _post("a", "positive", "今日开怀", "好耶"),
+        _post("b", "negative", "x", "唉"),
+    ]
+    monkeypatch.setattr(event_library, "_cc98_library", posts)
+    monkeypatch.setattr(event_library, "_cc98_index", None)
+
+    assert (
+        event_library.pick_cc98_post(effect="positive", trigger="今日 开怀") == "好耶"
+    )
+    assert (
+        event_library.sample_cc98_post(effect="negative", recent_ids={"b"})["id"] == "b"
+    )
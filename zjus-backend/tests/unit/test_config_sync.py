@@ -0,0 +1,105 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.game import config_sync
+from app.game.balance import BalanceSnapshot, balance
+from app.game.engine import GameEngine
+
+
+@pytest.fixture
+def reloads(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(config_sync, "_active_versions", {})
+    monkeypatch.setitem(config_sync.RELOADERS, "balance", lambda: calls.append("b"))
+    monkeypatch.setitem(config_sync.RELOADERS, "items", lambda: calls.append("i"))
+    return calls
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_apply_only_moves_forward_and_survives_failed_reloads(reloads, monkeypatch):
+    assert config_sync.apply_config_version("balance", 2)
+    assert not config_sync.apply_config_version("balance", 2)
+    assert not config_sync.apply_config_version("balance", 1)
+    assert not config_sync.apply_config_version("unknown", 9)
+    assert reloads == ["b"]
+    assert config_sync.CONFIG_VERSION.value(kind="balance") == 2
+
+    def broken():
+        raise ValueError("bad file")
+
+    monkeypatch.setitem(config_sync.RELOADERS, "items", broken)
+    assert not config_sync.apply_config_version("items", 1)
+    # Still behind, so the next poll retries it.
+    assert config_sync._active_versions.get("items") is None
+
+
+async def test_worker_applies_announcements_from_other_workers(reloads, memory_backend):
+    await memory_backend.hset(config_sync.CONFIG_VERSIONS_KEY, "items", 4)
+    worker = config_sync.ConfigSyncWorker(lambda: memory_backend, poll_interval=0.05)
+    worker.start()
+    try:
+        # The version present at startup is recorded without a reload.
+        await _wait_for(lambda: config_sync._active_versions.get("items") == 4)
+        assert reloads == []
+
+        # Another worker publishing over the channel.
+        await memory_backend.hincrby(config_sync.CONFIG_VERSIONS_KEY, "balance", 1)
+        await memory_backend.publish(
+            config_sync.CONFIG_CHANNEL, json.dumps({"kind": "balance", "version": 1})
+        )
+        await _wait_for(lambda: reloads == ["b"])
+
+        # A bump whose message was lost is caught by the poll.
+        await memory_backend.hincrby(config_sync.CONFIG_VERSIONS_KEY, "items", 1)
+        await _wait_for(lambda: reloads == ["b", "i"])
+
+        # Our own announcement does not reload this process again.
+        assert await config_sync.announce_config_change("balance") == 2
+        await asyncio.sleep(0.1)
+        assert reloads == ["b", "i"]
+    finally:
+        await worker.stop()
+
+
+async def test_engine_adopts_reloaded_balance_at_tick_boundary(reloads, monkeypatch):
+    engine = GameEngine("1", repo=Mock(), save_service=Mock(), game_service=Mock())  # type: ignore[arg-type]
+    before = engine._balance
+    patched_config = {
+        **balance.raw,
+        "tick": {
+            **balance.raw.get("tick", {}),
+            "base_energy_drain": before.base_energy_drain + 1,
+        },
+    }
+
+    def reload_balance():
+        monkeypatch.setattr(
+            balance, "_snapshot", BalanceSnapshot.from_config(patched_config)
+        )
+
+    monkeypatch.setitem(config_sync.RELOADERS, "balance", reload_balance)
+    seen: list[float] = []
+
+    async def tick(tick_count, tick_interval):
+        seen.append(engine._balance.base_energy_drain)
+        if tick_count == 1:
+            config_sync.apply_config_version("balance", 1)
+            # Mid-tick reloads do not touch the snapshot this tick is using.
+            assert engine._balance is before
+        return tick_count < 2
+
+    engine.is_running = True
+    engine._run_tick = tick
+    monkeypatch.setattr("app.game.engine.asyncio.sleep", AsyncMock())
+    await engine.run_loop()
+
+    assert seen == [before.base_energy_drain, before.base_energy_drain + 1]
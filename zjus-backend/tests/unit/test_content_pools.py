@@ -0,0 +1,264 @@
+import asyncio
+
+import pytest
+
+from app.content.state_vector import PlayerStateVector, stats_for_pool_bucket
+from app.core import content_pools
+from app.core.content_pools import (
+    POOL_FLIGHT_KEY,
+    POOL_LOCK_KEY,
+    BucketedPool,
+    ContentPoolWarmer,
+    PoolRefiller,
+    PoolSpec,
+    bucketed_pool_keys,
+    pop_or_generate,
+)
+
+
+class FakeGenerator:
+    def __init__(self, batch_size=3, delay=0.0):
+        self.batch_size = batch_size
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self):
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return [f"item-{self.calls}-{i}" for i in range(self.batch_size)]
+
+
+def _spec(generate, low=4, high=10):
+    return PoolSpec(
+        name="test",
+        key="pool:test",
+        low_watermark=low,
+        high_watermark=high,
+        max_len=100,
+        ttl_seconds=600,
+        generate=generate,
+    )
+
+
+@pytest.fixture
+def clock():
+    now = [100.0]
+    return now
+
+
+def _refiller(spec, backend, clock, slots=4):
+    return PoolRefiller(
+        spec,
+        lambda: backend,
+        asyncio.Semaphore(slots),
+        clock=lambda: clock[0],
+    )
+
+
+async def test_refills_below_low_watermark_up_to_high(memory_backend, clock):
+    generate = FakeGenerator()
+    refiller = _refiller(_spec(generate), memory_backend, clock)
+
+    assert await refiller.check_once() == 12
+    assert await memory_backend.llen("pool:test") == 12
+    assert generate.peak <= content_pools.POOL_PARALLEL_BATCHES
+    assert await memory_backend.hget(content_pools.POOL_PUSHED_KEY, "test") == "12"
+    assert await memory_backend.exists(POOL_LOCK_KEY.format(name="test")) == 0
+    assert content_pools.POOL_DEPTH.value(pool="test") == 12
+
+    # Above the low watermark nothing is generated.
+    calls = generate.calls
+    assert await refiller.check_once() == 0
+    assert generate.calls == calls
+
+
+async def test_consumption_rate_raises_the_watermarks(memory_backend, clock):
+    generate = FakeGenerator()
+    refiller = _refiller(_spec(generate), memory_backend, clock)
+    await refiller.check_once()
+    assert refiller.next_check_in() == content_pools.MAX_CHECK_SECONDS
+
+    # Players drain the pool while another worker tops it up by 3.
+    for _ in range(10):
+        await memory_backend.lpop("pool:test")
+    await memory_backend.rpush("pool:test", "a", "b", "c")
+    await memory_backend.hincrby(content_pools.POOL_PUSHED_KEY, "test", 3)
+    clock[0] += 10
+
+    pushed = await refiller.check_once()
+    # 10 consumed in 10s, smoothed: the low mark now covers 36 items.
+    assert refiller.rate == pytest.approx(0.3)
+    assert refiller.target_low() == 36
+    assert await memory_backend.llen("pool:test") == 5 + pushed
+    assert await memory_backend.llen("pool:test") >= refiller.target_high()
+    assert refiller.next_check_in() < content_pools.MAX_CHECK_SECONDS
+
+
+async def test_failed_batches_and_held_lock_do_not_push(memory_backend, clock):
+    async def broken():
+        raise RuntimeError("LLM down")
+
+    refiller = _refiller(_spec(broken), memory_backend, clock)
+    assert await refiller.check_once() == 0
+    assert content_pools.POOL_BATCHES.value(pool="test", result="error") >= 1
+
+    generate = FakeGenerator()
+    refiller = _refiller(_spec(generate), memory_backend, clock)
+    await memory_backend.set(POOL_LOCK_KEY.format(name="test"), "other-worker")
+    assert await refiller.check_once() == 0
+    assert generate.calls == 0
+
+
+def _pop(generate, key="pool:flight"):
+    return pop_or_generate("flight", key, generate, max_len=100, ttl_seconds=600)
+
+
+async def test_concurrent_misses_share_one_batch(memory_backend):
+    generate = FakeGenerator(batch_size=5, delay=0.05)
+
+    results = await asyncio.gather(*(_pop(generate) for _ in range(4)))
+
+    assert generate.calls == 1
+    assert len(set(results)) == 4
+    # The one item nobody in this worker needed is left for the next player.
+    assert await memory_backend.lrange("pool:flight", 0, -1) == ["item-1-4"]
+    assert await memory_backend.exists(POOL_FLIGHT_KEY.format(key="pool:flight")) == 0
+
+
+async def test_miss_waits_for_batch_led_by_another_worker(memory_backend, monkeypatch):
+    monkeypatch.setattr(content_pools, "FLIGHT_POLL_SECONDS", 0.01)
+    lock_key = POOL_FLIGHT_KEY.format(key="pool:flight")
+    await memory_backend.set(lock_key, "other-worker", ex=30)
+    generate = FakeGenerator()
+
+    waiter = asyncio.create_task(_pop(generate))
+    await asyncio.sleep(0.03)
+    await memory_backend.rpush("pool:flight", "remote-1", "remote-2")
+
+    assert await waiter == "remote-1"
+    assert generate.calls == 0
+
+
+async def test_failed_leader_releases_waiters_and_lock(memory_backend):
+    calls = 0
+
+    async def broken():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        raise RuntimeError("LLM down")
+
+    results = await asyncio.gather(
+        *(_pop(broken) for _ in range(3)), return_exceptions=True
+    )
+
+    assert calls == 1
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == [None, None]
+    assert await memory_backend.exists(POOL_FLIGHT_KEY.format(key="pool:flight")) == 0
+
+
+async def test_cancelled_leader_still_serves_waiters_and_pool(memory_backend):
+    generate = FakeGenerator(batch_size=3, delay=0.05)
+
+    leader = asyncio.create_task(_pop(generate))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(_pop(generate))
+    await asyncio.sleep(0.01)
+    # A lost hedge race cancels the leader mid-batch.
+    leader.cancel()
+
+    assert await waiter == "item-1-0"
+    assert leader.cancelled()
+    assert generate.calls == 1
+    # The leader's share and the spare item land in the pool.
+    assert await memory_backend.lrange("pool:flight", 0, -1) == [
+        "item-1-1",
+        "item-1-2",
+    ]
+    assert await memory_backend.exists(POOL_FLIGHT_KEY.format(key="pool:flight")) == 0
+
+
+def test_bucket_stats_round_trip_and_neighbours():
+    bucket = "正常|适中|普通"
+    state = PlayerStateVector.from_stats(stats_for_pool_bucket(bucket))
+    assert state.pool_bucket() == bucket
+    assert state.neighbour_pool_buckets() == [
+        "低落|适中|普通",
+        "高昂|适中|普通",
+        "正常|轻松|普通",
+        "正常|高压|普通",
+        "正常|适中|挂科边缘",
+        "正常|适中|学霸",
+    ]
+    # Edge buckets only step inwards.
+    edge = PlayerStateVector.from_stats(stats_for_pool_bucket("崩溃|爆表|学霸"))
+    assert len(edge.neighbour_pool_buckets()) == 3
+
+
+async def test_bucket_miss_falls_back_to_neighbour_before_generating(
+    memory_backend, monkeypatch
+):
+    monkeypatch.setattr(content_pools, "_bucket_demand", {})
+    bucket, key, neighbours = bucketed_pool_keys(
+        "pool:b:{bucket}", stats_for_pool_bucket("正常|适中|普通")
+    )
+    await memory_backend.rpush("pool:b:正常|轻松|普通", "nearby")
+    generate = FakeGenerator()
+
+    async def pop():
+        return await pop_or_generate(
+            "bucketed",
+            key,
+            generate,
+            max_len=100,
+            ttl_seconds=600,
+            bucket=bucket,
+            fallback_keys=neighbours,
+        )
+
+    assert await pop() == "nearby"
+    assert generate.calls == 0
+    assert content_pools.POOL_POPS.value(pool="bucketed", result="neighbour") >= 1
+
+    # Every neighbour is empty too: the batch is generated into our bucket.
+    assert await pop() == "item-1-0"
+    assert await memory_backend.llen("pool:b:正常|适中|普通") == 2
+    assert content_pools.active_buckets("bucketed") == [bucket]
+
+
+async def test_warmer_refills_only_buckets_in_demand(memory_backend, monkeypatch):
+    monkeypatch.setattr(content_pools, "BUCKET_SCAN_SECONDS", 0.01)
+    monkeypatch.setattr(content_pools, "_bucket_demand", {})
+    refilled: list[str] = []
+
+    async def generate(bucket):
+        refilled.append(bucket)
+        return [f"{bucket}-{i}" for i in range(3)]
+
+    pool = BucketedPool(
+        name="warm",
+        key_template="pool:warm:{bucket}",
+        low_watermark=2,
+        high_watermark=3,
+        max_len=10,
+        ttl_seconds=600,
+        generate=generate,
+        always_warm=("正常|适中|普通",),
+    )
+    warmer = ContentPoolWarmer(lambda: [pool], lambda: memory_backend)
+    warmer.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert set(refilled) == {"正常|适中|普通"}
+
+        content_pools._bucket_demand["warm"] = {"崩溃|爆表|挂科边缘": 1e12}
+        await asyncio.sleep(0.05)
+        assert await memory_backend.llen("pool:warm:崩溃|爆表|挂科边缘") == 3
+    finally:
+        await warmer.stop()
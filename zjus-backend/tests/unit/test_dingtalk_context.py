@@ -0,0 +1,46 @@
+from app.core.dingtalk_context import (
+    DINGTALK_CONTEXT_TOKEN_BUDGET,
+    DINGTALK_SUMMARY_MAX_CHARS,
+    conversation_context,
+    extractive_summary,
+    text_tokens,
+)
+
+
+def _thread(length):
+    return [
+        {"speaker": "player" if i % 2 else "npc", "content": f"{i}" + "长" * 400}
+        for i in range(length)
+    ]
+
+
+def test_context_stays_within_budget_however_long_the_thread():
+    summary = "摘" * 1000
+    for length in (1, 8, 50):
+        context = conversation_context("室友", _thread(length), summary)
+        assert text_tokens(context) <= DINGTALK_CONTEXT_TOKEN_BUDGET
+        assert context.startswith("此前聊天摘要：" + "摘" * DINGTALK_SUMMARY_MAX_CHARS)
+        # The newest turn always survives the budget.
+        assert f"{length - 1}长" in context
+
+
+def test_context_keeps_recent_turns_in_order():
+    history = [
+        {"speaker": "npc", "content": "在吗"},
+        {"speaker": "player", "content": "在的"},
+        {"speaker": "npc", "content": ""},
+    ]
+    assert conversation_context("室友", history) == "室友: 在吗\n玩家: 在的"
+    assert conversation_context("室友", history, recent=0) == ""
+
+
+def test_extractive_summary_keeps_the_newest_text():
+    round_messages = [
+        {"speaker": "npc", "content": "作业" * 100},
+        {"speaker": "npc", "content": "记得" * 100},
+        {"speaker": "player", "content": "明天交"},
+    ]
+    summary = extractive_summary("旧摘要", round_messages, "室友")
+    assert len(summary) == DINGTALK_SUMMARY_MAX_CHARS
+    assert "旧摘要" not in summary
+    assert summary.endswith("；玩家: 明天交")
@@ -0,0 +1,96 @@
+import random
+
+from app.content import event_library
+from app.content.dingtalk_index import DingTalkIndex
+from app.schemas.dingtalk import build_contact_id
+
+
+def _turn(prefix, settle=False):
+    turn = {
+        "options": [f"{prefix}选项{i}" for i in range(3)],
+        "replies": [f"{prefix}回应{i}" for i in range(3)],
+    }
+    if settle:
+        turn["settlements"] = [
+            {"desc": f"结算{i}", "effects": {"sanity": i}} for i in range(3)
+        ]
+    return turn
+
+
+def _thread(thread_id, character="【室友】", role="roommate", context="random"):
+    return {
+        "id": thread_id,
+        "character": character,
+        "role": role,
+        "context": context,
+        "opener": f"{thread_id} 开场",
+        "turns": [_turn("一"), _turn("二"), _turn("三", settle=True)],
+    }
+
+
+def test_sample_prefers_context_and_skips_busy_and_recent_threads():
+    threads = [
+        _thread("calm"),
+        _thread("sad_a", "【crush】", "crush", "low_sanity"),
+        _thread("sad_b", "【学霸同学】", "classmate", "low_sanity"),
+    ]
+    index = DingTalkIndex(threads)
+    rng = random.Random(0)
+    crush = build_contact_id("【crush】", "crush")
+
+    picks = {index.ids[index.sample("low_sanity", rng=rng)] for _ in range(30)}
+    assert picks == {"sad_a", "sad_b"}
+    assert index.ids[index.sample("low_sanity", busy={crush}, rng=rng)] == "sad_b"
+    # A context with every thread recent falls back to a fresh thread elsewhere.
+    assert index.ids[index.sample("low_sanity", recent={"sad_a", "sad_b"})] == "calm"
+    # Unknown contexts draw from the `random` pool.
+    assert index.ids[index.sample("low_gpa", rng=rng)] == "calm"
+
+
+def test_sample_without_repeats_returns_none_once_every_thread_is_recent():
+    index = DingTalkIndex([_thread("a"), _thread("b", "【crush】", "crush")])
+
+    assert index.ids[index.sample(recent={"a", "b"})] in {"a", "b"}
+    assert index.sample(recent={"a", "b"}, allow_repeat=False) is None
+    assert index.ids[index.sample(recent={"a"}, allow_repeat=False)] == "b"
+
+
+def test_sample_limits_full_contact_lists_to_existing_contacts():
+    index = DingTalkIndex([_thread("roomie"), _thread("crush", "【crush】", "crush")])
+    roommate = build_contact_id("【室友】", "roommate")
+
+    assert index.ids[index.sample(contacts={roommate})] == "roomie"
+    assert index.sample(contacts={roommate}, busy={roommate}) is None
+
+
+def test_reply_follows_the_chosen_option_to_a_settlement():
+    index = DingTalkIndex([_thread("t1")])
+
+    first = index.reply("t1", 1, "一选项2")
+    assert first == {"content": "一回应2", "reply_options": _turn("二")["options"]}
+    last = index.reply("t1", 3, "三选项1")
+    assert last == {
+        "content": "三回应1",
+        "settlement": {"desc": "结算1", "effects": {"sanity": 1}},
+    }
+    assert index.reply("t1", 2, "不存在的选项") is None
+    assert index.reply("missing", 1, "一选项0") is None
+
+
+def test_pick_dingtalk_thread_returns_llm_compatible_payload(monkeypatch):
+    monkeypatch.setattr(event_library, "_dingtalk_library", [_thread("t1")])
+    monkeypatch.setattr(event_library, "_dingtalk_index", None)
+
+    picked = event_library.pick_dingtalk_thread("high_stress")
+
+    assert picked == {
+        "library_id": "t1",
+        "sender": "【室友】",
+        "role": "roommate",
+        "content": "t1 开场",
+        "reply_options": _turn("一")["options"],
+        "is_urgent": False,
+    }
+    assert event_library.library_dingtalk_reply("t1", 1, "一选项0")["content"] == (
+        "一回应0"
+    )
@@ -5,12 +5,14 @@ dingtalk_llm 单元测试
 API 调用和 Redis 缓存使用 mock，不需要真实服务。
 """
 
+import asyncio
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 import app.core.dingtalk_llm as dingtalk_llm
+from app.core.content_pools import bucketed_pool_keys
 from app.core.dingtalk_llm import (
     _build_m2her_messages,
     _call_m2her_api,
@@ -18,11 +20,22 @@ from app.core.dingtalk_llm import (
     _sanitize_m2her_messages,
     generate_dingtalk_via_m2her,
 )
+from app.core.llm_clients import ClientPool
 
 
 @pytest.fixture(autouse=True)
-def reset_m2her_client_cache():
+def reset_m2her_client_cache(monkeypatch):
     dingtalk_llm._M2HER_CLIENTS.clear()
+    monkeypatch.setattr(
+        dingtalk_llm,
+        "_PLAYER_M2HER_CLIENTS",
+        ClientPool(
+            "m2her",
+            lambda api_key, base_url: dingtalk_llm.AsyncOpenAI(
+                api_key=api_key, base_url=base_url, timeout=15.0
+            ),
+        ),
+    )
     yield
     dingtalk_llm._M2HER_CLIENTS.clear()
 
@@ -205,16 +218,21 @@ class TestCallM2herApi:
                 mock_client.close = AsyncMock()
                 MockClient.return_value = mock_client
 
+                override = {
+                    "api_key": "player-rp-key",
+                    "model": "M2-her",
+                    "base_url": "https://api.minimaxi.com/v1/chat/completions",
+                }
                 result = await _call_m2her_api(
-                    [{"role": "user", "content": "test"}],
-                    llm_override={
-                        "api_key": "player-rp-key",
-                        "model": "M2-her",
-                        "base_url": "https://api.minimaxi.com/v1/chat/completions",
-                    },
+                    [{"role": "user", "content": "test"}], llm_override=override
+                )
+                await _call_m2her_api(
+                    [{"role": "user", "content": "again"}], llm_override=override
                 )
 
                 assert result == "自定义 RP 回复"
+                # The player's client is pooled and reused, never shared with
+                # the platform cache.
                 MockClient.assert_called_once_with(
                     api_key="player-rp-key",
                     base_url="https://api.minimaxi.com/v1",
@@ -222,8 +240,9 @@ class TestCallM2herApi:
                 )
                 kwargs = mock_client.chat.completions.create.await_args.kwargs
                 assert kwargs["model"] == "M2-her"
-                mock_client.close.assert_awaited_once()
+                mock_client.close.assert_not_awaited()
                 assert dingtalk_llm._M2HER_CLIENTS == {}
+                assert len(dingtalk_llm._PLAYER_M2HER_CLIENTS) == 1
 
     @pytest.mark.asyncio
     async def test_empty_choices_returns_none(self):
@@ -346,6 +365,8 @@ class TestGenerateDingtalkViaM2her:
             mock_settings.MINIMAX_API_KEY = "test-key"
             with patch("app.core.dingtalk_llm.RedisCache") as mock_cache:
                 mock_cache.lpop = AsyncMock(return_value=None)
+                mock_cache.acquire_lock = AsyncMock(return_value="token")
+                mock_cache.release_lock = AsyncMock(return_value=True)
                 mock_cache.rpush_many_with_limit = AsyncMock()
                 with patch(
                     "app.core.dingtalk_llm._load_characters",
@@ -374,6 +395,8 @@ class TestGenerateDingtalkViaM2her:
             mock_settings.MINIMAX_API_KEY = "test-key"
             with patch("app.core.dingtalk_llm.RedisCache") as mock_cache:
                 mock_cache.lpop = AsyncMock(return_value=None)
+                mock_cache.acquire_lock = AsyncMock(return_value="token")
+                mock_cache.release_lock = AsyncMock(return_value=True)
                 with patch(
                     "app.core.dingtalk_llm._load_characters",
                     return_value=sample_characters_list,
@@ -393,6 +416,122 @@ class TestGenerateDingtalkViaM2her:
             mock_settings.MINIMAX_API_KEY = "test-key"
             with patch("app.core.dingtalk_llm.RedisCache") as mock_cache:
                 mock_cache.lpop = AsyncMock(return_value=None)
+                mock_cache.acquire_lock = AsyncMock(return_value="token")
+                mock_cache.release_lock = AsyncMock(return_value=True)
                 with patch("app.core.dingtalk_llm._load_characters", return_value=[]):
                     result = await generate_dingtalk_via_m2her(sample_player_stats)
                     assert result is None
+
+    @pytest.mark.asyncio
+    async def test_first_candidate_answers_and_the_rest_feed_the_pool(
+        self, sample_player_stats, sample_characters_list, memory_backend
+    ):
+        """最快的候选直接返回，其余候选完成后写回共享池"""
+        delays = {"【辅导员】": 0.0, "【学习委员】": 0.05}
+        finished: list[str] = []
+
+        async def fake_opener(char, *_args, **_kwargs):
+            await asyncio.sleep(delays.get(char["name"], 0.05))
+            finished.append(char["name"])
+            return {"sender": char["name"], "content": "hi"}
+
+        with (
+            patch("app.core.dingtalk_llm.settings") as mock_settings,
+            patch(
+                "app.core.dingtalk_llm._load_characters",
+                return_value=sample_characters_list,
+            ),
+            patch(
+                "app.core.dingtalk_llm.generate_dingtalk_for_character_via_m2her",
+                side_effect=fake_opener,
+            ),
+        ):
+            mock_settings.MINIMAX_API_KEY = "test-key"
+            result = await generate_dingtalk_via_m2her(sample_player_stats)
+            assert result["sender"] == "【辅导员】"
+            assert finished == ["【辅导员】"]
+
+            await asyncio.gather(*dingtalk_llm._background_tasks)
+
+        _, key, _ = bucketed_pool_keys(dingtalk_llm.M2HER_POOL_KEY, sample_player_stats)
+        assert len(await memory_backend.lrange(key, 0, -1)) == 2
+
+    @pytest.mark.asyncio
+    async def test_coalesced_waiters_share_one_candidate_batch(
+        self, sample_player_stats, sample_characters_list, memory_backend
+    ):
+        """同 worker 的并发未命中共用一批候选，每位玩家各得一条"""
+        delays = {"【辅导员】": 0.0, "【学习委员】": 0.02}
+        calls: list[str] = []
+
+        async def fake_opener(char, *_args, **_kwargs):
+            calls.append(char["name"])
+            await asyncio.sleep(delays.get(char["name"], 0.05))
+            return {"sender": char["name"], "content": "hi"}
+
+        with (
+            patch("app.core.dingtalk_llm.settings") as mock_settings,
+            patch(
+                "app.core.dingtalk_llm._load_characters",
+                return_value=sample_characters_list,
+            ),
+            patch(
+                "app.core.dingtalk_llm.generate_dingtalk_for_character_via_m2her",
+                side_effect=fake_opener,
+            ),
+        ):
+            mock_settings.MINIMAX_API_KEY = "test-key"
+            results = await asyncio.gather(
+                generate_dingtalk_via_m2her(sample_player_stats),
+                generate_dingtalk_via_m2her(sample_player_stats),
+            )
+            await asyncio.gather(*dingtalk_llm._background_tasks)
+
+        assert {r["sender"] for r in results} == {"【辅导员】", "【学习委员】"}
+        assert len(calls) == len(sample_characters_list[:3])
+
+
+class TestCombinedOpener:
+    """开场消息与回复选项一次生成"""
+
+    @pytest.mark.asyncio
+    async def test_json_opener_skips_the_options_call(
+        self, sample_character, sample_player_stats
+    ):
+        with patch("app.core.dingtalk_llm.settings") as mock_settings:
+            mock_settings.MINIMAX_API_KEY = "test-key"
+            with patch(
+                "app.core.dingtalk_llm._call_m2her_api", new_callable=AsyncMock
+            ) as mock_api:
+                mock_api.return_value = json.dumps(
+                    {"content": "今晚吃啥", "reply_options": ["麻辣烫", "食堂"]},
+                    ensure_ascii=False,
+                )
+                result = await dingtalk_llm.generate_dingtalk_for_character_via_m2her(
+                    {**sample_character, "role": "roommate"}, sample_player_stats
+                )
+
+        assert mock_api.await_count == 1
+        assert result["content"] == "今晚吃啥"
+        assert [o["text"] for o in result["reply_options"]] == ["麻辣烫", "食堂"]
+
+    @pytest.mark.asyncio
+    async def test_prose_opener_falls_back_to_a_separate_options_call(
+        self, sample_character, sample_player_stats
+    ):
+        with patch("app.core.dingtalk_llm.settings") as mock_settings:
+            mock_settings.MINIMAX_API_KEY = "test-key"
+            with patch(
+                "app.core.dingtalk_llm._call_m2her_api", new_callable=AsyncMock
+            ) as mock_api:
+                mock_api.side_effect = [
+                    "今晚吃啥",
+                    json.dumps({"reply_options": ["都行"]}, ensure_ascii=False),
+                ]
+                result = await dingtalk_llm.generate_dingtalk_for_character_via_m2her(
+                    {**sample_character, "role": "roommate"}, sample_player_stats
+                )
+
+        assert mock_api.await_count == 2
+        assert result["content"] == "今晚吃啥"
+        assert [o["text"] for o in result["reply_options"]] == ["都行"]
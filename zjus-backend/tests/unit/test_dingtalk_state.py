@@ -4,7 +4,10 @@ from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
-from app.game.engine import GameEngine
+from app.content import event_library
+from app.core.state_backend import MemoryStateBackend
+from app.game.engine import GameEngine, GameMode
+from app.repositories.redis_repo import RedisRepository
 from app.schemas.dingtalk import (
     DINGTALK_MAX_MESSAGES_PER_CONTACT,
     DingTalkContact,
@@ -117,18 +120,14 @@ class _StatsSnapshot:
         )
 
 
-class _Repo:
-    def __init__(self, state: DingTalkState):
-        self.state = state
+class _Repo(RedisRepository):
+    """Real per-contact DingTalk storage with stubbed stats and counters."""
+
+    def __init__(self):
+        super().__init__("1", MemoryStateBackend())
         self.effects: list[tuple[str, int]] = []
         self.action_counts: list[str] = []
 
-    async def get_dingtalk_state(self):
-        return self.state
-
-    async def set_dingtalk_state(self, state):
-        self.state = DingTalkState.from_raw(state)
-
     async def get_snapshot(self):
         return _StatsSnapshot()
 
@@ -144,6 +143,12 @@ class _Repo:
         return len(self.action_counts)
 
 
+async def _make_repo(state: DingTalkState) -> _Repo:
+    repo = _Repo()
+    await repo.set_dingtalk_state(state)
+    return repo
+
+
 class _RelaxRepo:
     def __init__(self, stats):
         self.stats = dict(stats)
@@ -205,7 +210,7 @@ async def test_engine_dingtalk_reply_closes_round_and_applies_effects():
             player_reply_count=2,
         ),
     )
-    repo = _Repo(DingTalkState(contacts={contact.contact_id: contact}))
+    repo = await _make_repo(DingTalkState(contacts={contact.contact_id: contact}))
     engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock()) # type: ignore
     engine.emit = AsyncMock()
     engine._push_update = AsyncMock()
@@ -224,7 +229,7 @@ async def test_engine_dingtalk_reply_closes_round_and_applies_effects():
         {"contact_id": contact.contact_id, "option_id": "opt_1"}
     )
 
-    saved_contact = repo.state.contacts[contact.contact_id]
+    saved_contact = (await repo.get_dingtalk_state()).contacts[contact.contact_id]
     assert saved_contact.round.status == "closed"
     assert saved_contact.pending_options == []
     assert [m.speaker for m in saved_contact.messages[-2:]] == ["player", "npc"]
@@ -257,19 +262,22 @@ async def test_engine_emits_player_dingtalk_reply_before_generating_npc_reply():
             player_reply_count=0,
         ),
     )
-    repo = _Repo(DingTalkState(contacts={contact.contact_id: contact}))
+    repo = await _make_repo(DingTalkState(contacts={contact.contact_id: contact}))
     engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
     engine.emit = AsyncMock()
 
     async def generate_after_player_update(*args, **kwargs):
         del args, kwargs
-        saved_contact = repo.state.contacts[contact.contact_id]
+        saved_contact = (await repo.get_dingtalk_state()).contacts[contact.contact_id]
         assert [m.speaker for m in saved_contact.messages] == ["npc", "player"]
         assert saved_contact.pending_options == []
         assert engine.emit.await_count == 1
         first_emit = engine.emit.await_args_list[0]
-        assert first_emit.args[0] == "dingtalk_thread_update"
-        assert first_emit.args[1]["contact"]["messages"][-1]["speaker"] == "player"
+        assert first_emit.args[0] == "dingtalk_delta"
+        delta = first_emit.args[1]
+        assert delta["seq"] == 1
+        assert [op["op"] for op in delta["ops"]] == ["message", "options", "round"]
+        assert delta["ops"][0]["message"]["speaker"] == "player"
         return {
             "content": "我看到了。",
             "reply_options": [{"option_id": "opt_1", "text": "好"}],
@@ -283,14 +291,255 @@ async def test_engine_emits_player_dingtalk_reply_before_generating_npc_reply():
         {"contact_id": contact.contact_id, "option_id": "opt_1"}
     )
 
-    assert engine.emit.await_args_list[1].args[0] == "dingtalk_thread_update"
-    final_contact = repo.state.contacts[contact.contact_id]
+    second_emit = engine.emit.await_args_list[1]
+    assert second_emit.args[0] == "dingtalk_delta"
+    assert second_emit.args[1]["seq"] == 2
+    assert [op["op"] for op in second_emit.args[1]["ops"]] == [
+        "message",
+        "unread",
+        "options",
+        "round",
+    ]
+    final_contact = (await repo.get_dingtalk_state()).contacts[contact.contact_id]
     assert [m.speaker for m in final_contact.messages] == ["npc", "player", "npc"]
 
 
+@pytest.mark.asyncio
+async def test_engine_streams_npc_reply_under_the_final_message_id():
+    contact = DingTalkContact(
+        contact_id=build_contact_id("【室友】", "roommate"),
+        sender="【室友】",
+        role="roommate",
+        is_replyable=True,
+        pending_options=[DingTalkReplyOption(option_id="opt_1", text="在的")],
+        round=DingTalkRoundState(round_id="r1", status="open"),
+    )
+    repo = await _make_repo(DingTalkState(contacts={contact.contact_id: contact}))
+    engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
+    engine.emit = AsyncMock()
+
+    async def streaming_reply(*args, on_delta=None, **kwargs):
+        del args, kwargs
+        await on_delta("我看")
+        await on_delta("到了。")
+        # Nothing is persisted until the reply is complete.
+        saved = (await repo.get_dingtalk_state()).contacts[contact.contact_id]
+        assert [m.speaker for m in saved.messages] == ["player"]
+        return {"content": "我看到了。", "reply_options": []}
+
+    engine._generate_dingtalk_reply_result = AsyncMock(side_effect=streaming_reply)
+
+    await engine._handle_dingtalk_reply(
+        {"contact_id": contact.contact_id, "option_id": "opt_1"}
+    )
+
+    events = [call.args for call in engine.emit.await_args_list]
+    assert [name for name, _ in events] == [
+        "dingtalk_delta",
+        "dingtalk_stream",
+        "dingtalk_stream",
+        "dingtalk_delta",
+    ]
+    streamed = [payload for name, payload in events if name == "dingtalk_stream"]
+    assert "".join(p["delta"] for p in streamed) == "我看到了。"
+    final_message = events[-1][1]["ops"][0]["message"]
+    assert {p["message_id"] for p in streamed} == {final_message["message_id"]}
+    assert streamed[0]["round_id"] == final_message["round_id"] == "r1"
+
+
+@pytest.mark.asyncio
+async def test_platform_key_replies_are_served_from_the_shared_cache():
+    contact = DingTalkContact(
+        contact_id=build_contact_id("【室友】", "roommate"),
+        sender="【室友】",
+        role="roommate",
+        is_replyable=True,
+        messages=[
+            DingTalkMessage(
+                message_id="m1", speaker="npc", content="你在吗？", created_at=1
+            )
+        ],
+    )
+    repo = await _make_repo(DingTalkState())
+    engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
+    cached = {"content": "在的话来趟宿舍。", "reply_options": []}
+    cache = SimpleNamespace(
+        enabled=lambda: True,
+        get=AsyncMock(return_value=cached),
+        put=AsyncMock(),
+    )
+    stats = {"sanity": 60, "stress": 30}
+
+    with (
+        patch("app.game.engine.dingtalk_reply_cache", cache),
+        patch("app.game.engine.generate_dingtalk_reply_message") as generic,
+    ):
+        result = await engine._generate_dingtalk_reply_result(
+            contact, "在的", 1, stats
+        )
+        assert result == cached
+        generic.assert_not_called()
+
+        # Player keys and summarized threads never touch the shared cache.
+        engine.llm_override = {"api_key": "sk-player"}
+        assert engine._dingtalk_reply_fingerprint(contact, "在的", 1, stats) is None
+        engine.llm_override = None
+        contact.summary = "之前聊过作业。"
+        assert engine._dingtalk_reply_fingerprint(contact, "在的", 1, stats) is None
+
+
+@pytest.mark.asyncio
+async def test_shared_replies_are_generated_without_the_player_name():
+    contact = DingTalkContact(
+        contact_id=build_contact_id("【室友】", "roommate"),
+        sender="【室友】",
+        role="roommate",
+        is_replyable=True,
+        messages=[
+            DingTalkMessage(
+                message_id="m1", speaker="npc", content="你在吗？", created_at=1
+            )
+        ],
+    )
+    repo = await _make_repo(DingTalkState())
+    engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
+    engine.mode = GameMode.HYBRID
+    cache = SimpleNamespace(
+        enabled=lambda: True, get=AsyncMock(return_value=None), put=AsyncMock()
+    )
+    stats = {"username": "小明", "major": "计算机", "semester": "大一秋冬"}
+    reply = {"content": "在的话来趟宿舍。", "reply_options": []}
+
+    async def generic_only(_name, _primary, secondary, **_kwargs):
+        return SimpleNamespace(value=await secondary())
+
+    with (
+        patch("app.game.engine.dingtalk_reply_cache", cache),
+        patch("app.game.engine.hedged", new=generic_only),
+        patch(
+            "app.game.engine.generate_dingtalk_reply_message",
+            new=AsyncMock(return_value=reply),
+        ) as generic,
+    ):
+        await engine._generate_dingtalk_reply_result(contact, "在的", 1, stats)
+
+    prompt_stats = generic.await_args.args[1]
+    assert prompt_stats["username"] == "同学"
+    assert prompt_stats["major"] == "计算机"
+    cache.put.assert_awaited_once()
+
+    # Major and semester reach the prompt, so they split the fingerprint.
+    other_major = {**stats, "major": "数学"}
+    assert engine._dingtalk_reply_fingerprint(
+        contact, "在的", 1, stats
+    ) != engine._dingtalk_reply_fingerprint(contact, "在的", 1, other_major)
+    contact.messages[0].content = "小明，你在吗？"
+    assert engine._dingtalk_reply_fingerprint(contact, "在的", 1, stats) is None
+
+
+@pytest.mark.asyncio
+async def test_closed_round_is_folded_into_the_contact_summary():
+    messages = [
+        DingTalkMessage(
+            message_id=f"m{i}",
+            speaker="player" if i % 2 else "npc",
+            content=f"第{i}句",
+            created_at=i,
+            round_id="r_old" if i < 2 else "r1",
+        )
+        for i in range(5)
+    ]
+    contact = DingTalkContact(
+        contact_id=build_contact_id("【室友】", "roommate"),
+        sender="【室友】",
+        role="roommate",
+        is_replyable=True,
+        messages=messages,
+        summary="上周约好一起自习。",
+    )
+    repo = await _make_repo(DingTalkState(contacts={contact.contact_id: contact}))
+    seq_before = (await repo.get_dingtalk_contact(contact.contact_id)).seq
+    engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
+
+    with patch(
+        "app.game.engine.generate_dingtalk_summary",
+        AsyncMock(return_value="约好周末去图书馆。"),
+    ) as summarize:
+        await engine._summarize_dingtalk_round(contact.contact_id, "r1")
+
+    sender, previous, round_messages = summarize.await_args.args
+    assert (sender, previous) == ("【室友】", "上周约好一起自习。")
+    assert [m["message_id"] for m in round_messages] == ["m2", "m3", "m4"]
+    saved = await repo.get_dingtalk_contact(contact.contact_id)
+    assert saved.summary == "约好周末去图书馆。"
+    assert saved.seq == seq_before
+
+    # Without an LLM the round is appended extractively.
+    with patch(
+        "app.game.engine.generate_dingtalk_summary", AsyncMock(return_value=None)
+    ):
+        await engine._summarize_dingtalk_round(contact.contact_id, "r1")
+    saved = await repo.get_dingtalk_contact(contact.contact_id)
+    assert saved.summary.startswith("约好周末去图书馆。；【室友】: 第2句")
+
+
+@pytest.mark.asyncio
+async def test_library_mode_plays_a_library_thread_without_llm_calls(monkeypatch):
+    turn = {"options": ["好", "不好", "再说"], "replies": ["那走吧", "行吧", "嗯"]}
+    thread = {
+        "id": "dtl_test",
+        "character": "【室友】",
+        "role": "roommate",
+        "context": "random",
+        "opener": "去食堂吗？",
+        "turns": [
+            turn,
+            turn,
+            {**turn, "settlements": [{"desc": "吃饱了", "effects": {"sanity": 2}}] * 3},
+        ],
+    }
+    monkeypatch.setattr(event_library, "_dingtalk_library", [thread])
+    monkeypatch.setattr(event_library, "_dingtalk_index", None)
+    repo = await _make_repo(DingTalkState())
+    engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
+    engine.mode = GameMode.LIBRARY
+    engine.is_running = True
+    engine.emit = AsyncMock()
+    engine._push_update = AsyncMock()
+    engine._check_achievements = AsyncMock()
+    contact_id = build_contact_id("【室友】", "roommate")
+
+    with (
+        patch("app.game.engine.generate_dingtalk_message", AsyncMock()) as llm,
+        patch("app.game.engine.generate_dingtalk_reply_message", AsyncMock()) as reply,
+        patch("app.game.engine.generate_dingtalk_summary", AsyncMock()) as summary,
+    ):
+        await engine._trigger_dingtalk_message()
+        contact = await repo.get_dingtalk_contact(contact_id)
+        assert contact.round.library_id == "dtl_test"
+        for _ in range(3):
+            await engine._handle_dingtalk_reply(
+                {"contact_id": contact_id, "option_id": "opt_1"}
+            )
+        await asyncio.gather(*engine._background_tasks)
+
+    llm.assert_not_awaited()
+    reply.assert_not_awaited()
+    summary.assert_not_awaited()
+    contact = await repo.get_dingtalk_contact(contact_id)
+    assert [m.content for m in contact.messages if m.speaker == "npc"] == [
+        "去食堂吗？",
+        "那走吧",
+        "那走吧",
+        "那走吧",
+    ]
+    assert contact.round.status == "closed"
+    assert repo.effects == [("sanity", 2)]
+
+
 @pytest.mark.asyncio
 async def test_engine_schedules_dingtalk_reply_without_blocking_actions():
-    repo = _Repo(DingTalkState())
+    repo = await _make_repo(DingTalkState())
     engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
     started = asyncio.Event()
     release = asyncio.Event()
@@ -317,7 +566,7 @@ async def test_engine_schedules_dingtalk_reply_without_blocking_actions():
 
 @pytest.mark.asyncio
 async def test_engine_schedules_relax_action_and_deduplicates_inflight_target():
-    repo = _Repo(DingTalkState())
+    repo = await _make_repo(DingTalkState())
     engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
     engine.emit = AsyncMock()
     engine.check_and_trigger_gameover = AsyncMock(return_value=False)
@@ -353,7 +602,7 @@ async def test_engine_schedules_relax_action_and_deduplicates_inflight_target():
 @pytest.mark.asyncio
 async def test_random_event_result_is_discarded_when_paused_during_generation():
     repo = Mock()
-    repo.get_event_history = AsyncMock(return_value=[])
+    repo.get_seen_events = AsyncMock(return_value=([], None))
     repo.get_snapshot = AsyncMock(return_value=_StatsSnapshot())
     repo.get_items_state = AsyncMock(
         return_value={"version": 1, "owned": [], "updated_at": 0}
@@ -382,9 +631,41 @@ async def test_random_event_result_is_discarded_when_paused_during_generation():
     engine.emit.assert_not_awaited()
 
 
+@pytest.mark.asyncio
+async def test_pooled_random_event_skips_the_hedge():
+    repo = Mock()
+    repo.get_seen_events = AsyncMock(return_value=([], None))
+    repo.get_snapshot = AsyncMock(return_value=_StatsSnapshot())
+    repo.get_items_state = AsyncMock(
+        return_value={"version": 1, "owned": [], "updated_at": 0}
+    )
+    repo.add_event_to_history = AsyncMock()
+    repo.set_current_event = AsyncMock()
+    engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())
+    engine.mode = "ai"
+    engine.llm_available = True
+    engine.is_running = True
+    engine.emit = AsyncMock()
+    pooled = {"id": "evt_pool", "title": "池中事件", "desc": "", "options": []}
+
+    with (
+        patch(
+            "app.game.engine.pop_pooled_random_event",
+            new=AsyncMock(return_value=pooled),
+        ),
+        patch("app.game.engine.hedged", new=AsyncMock()) as hedge,
+    ):
+        await engine._trigger_random_event()
+
+    hedge.assert_not_awaited()
+    repo.set_current_event.assert_awaited()
+    assert engine.llm_available is True
+    assert engine.mode == "ai"
+
+
 @pytest.mark.asyncio
 async def test_dingtalk_result_is_discarded_when_paused_during_generation():
-    repo = _Repo(DingTalkState())
+    repo = await _make_repo(DingTalkState())
     engine = GameEngine(
         "1",
         repo=repo,
@@ -409,13 +690,16 @@ async def test_dingtalk_result_is_discarded_when_paused_during_generation():
             "reply_options": ["好"],
         }
 
-    with patch(
-        "app.game.engine.generate_dingtalk_message",
-        new=AsyncMock(side_effect=pause_and_return_message),
+    with (
+        patch("app.game.engine.pick_dingtalk_thread", return_value=None),
+        patch(
+            "app.game.engine.generate_dingtalk_message",
+            new=AsyncMock(side_effect=pause_and_return_message),
+        ),
     ):
         await engine._trigger_dingtalk_message()
 
-    assert repo.state.contacts == {}
+    assert (await repo.get_dingtalk_state()).contacts == {}
     engine.emit.assert_not_awaited()
 
 
@@ -470,7 +754,7 @@ async def test_store_new_dingtalk_contact_does_not_double_apply_reuse_probabilit
         is_replyable=True,
         last_message_at=1,
     )
-    repo = _Repo(DingTalkState(contacts={existing.contact_id: existing}))
+    repo = await _make_repo(DingTalkState(contacts={existing.contact_id: existing}))
     engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
 
     with patch("app.game.engine.random.random", return_value=0.0):
@@ -489,7 +773,7 @@ async def test_store_new_dingtalk_contact_does_not_double_apply_reuse_probabilit
 
     assert contact is not None
     assert contact.contact_id == "dt_new"
-    assert set(repo.state.contacts) == {"dt_existing", "dt_new"}
+    assert set((await repo.get_dingtalk_state()).contacts) == {"dt_existing", "dt_new"}
 
 
 @pytest.mark.asyncio
@@ -504,7 +788,7 @@ async def test_engine_reuses_existing_dingtalk_contact_when_contact_cap_is_reach
         )
         for idx in range(12)
     }
-    repo = _Repo(DingTalkState(contacts=contacts))
+    repo = await _make_repo(DingTalkState(contacts=contacts))
     engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
 
     contact = await engine._store_dingtalk_npc_message(
@@ -522,9 +806,10 @@ async def test_engine_reuses_existing_dingtalk_contact_when_contact_cap_is_reach
 
     assert contact is not None
     assert contact.contact_id in contacts
-    assert len(repo.state.contacts) == 12
-    assert "dt_new" not in repo.state.contacts
-    stored_message = repo.state.contacts[contact.contact_id].messages[-1]
+    stored = (await repo.get_dingtalk_state()).contacts
+    assert len(stored) == 12
+    assert "dt_new" not in stored
+    stored_message = stored[contact.contact_id].messages[-1]
     assert stored_message.content == "今天一起复习吗？"
 
 
@@ -662,3 +947,152 @@ async def test_achievement_check_normalizes_legacy_unlocked_codes():
 
     assert await engine._check_achievements() == []
     repo.unlock_achievement.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_repo_appends_messages_to_capped_per_contact_list(memory_repo):
+    contact = DingTalkContact(contact_id="dt_a", sender="室友", role="roommate")
+
+    for idx in range(DINGTALK_MAX_MESSAGES_PER_CONTACT + 3):
+        message = DingTalkMessage(
+            message_id=f"m{idx}", speaker="npc", content=str(idx), created_at=idx
+        )
+        unread, seq = await memory_repo.append_dingtalk_message(
+            contact, message, unread_delta=1
+        )
+
+    assert unread == DINGTALK_MAX_MESSAGES_PER_CONTACT + 3
+    assert seq == contact.seq == DINGTALK_MAX_MESSAGES_PER_CONTACT + 3
+    stored = await memory_repo.get_dingtalk_contact("dt_a")
+    assert len(stored.messages) == DINGTALK_MAX_MESSAGES_PER_CONTACT
+    assert stored.messages[0].content == "3"
+    recent = await memory_repo.get_dingtalk_contact("dt_a", message_limit=2)
+    assert [m.content for m in recent.messages] == ["51", "52"]
+
+    assert await memory_repo.mark_dingtalk_read("dt_a") == seq + 1
+    assert await memory_repo.mark_dingtalk_read("dt_missing") is None
+    contacts = await memory_repo.get_dingtalk_contacts()
+    assert contacts["dt_a"].unread_count == 0
+    assert contacts["dt_a"].seq == seq + 1
+    assert contacts["dt_a"].messages == []
+
+
+@pytest.mark.asyncio
+async def test_repo_migrates_legacy_dingtalk_blob(memory_repo):
+    legacy = DingTalkState(
+        contacts={
+            "dt_old": DingTalkContact(
+                contact_id="dt_old",
+                sender="辅导员",
+                role="counselor",
+                unread_count=2,
+                messages=[
+                    DingTalkMessage(
+                        message_id="m1", speaker="npc", content="开会", created_at=1
+                    )
+                ],
+            )
+        }
+    )
+    await memory_repo.redis.set(memory_repo.keys["dingtalk"], legacy.model_dump_json())
+
+    state = await memory_repo.get_dingtalk_state()
+
+    assert state.contacts["dt_old"].unread_count == 2
+    assert state.contacts["dt_old"].messages[0].content == "开会"
+    assert await memory_repo.redis.exists(memory_repo.keys["dingtalk"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_repo_compaction_keeps_open_rounds_and_drops_histories(memory_repo):
+    await memory_repo.set_dingtalk_state(
+        DingTalkState(
+            contacts={
+                "old": DingTalkContact(
+                    contact_id="old", sender="旧", role="friend", last_message_at=1
+                ),
+                "open": DingTalkContact(
+                    contact_id="open",
+                    sender="进行中",
+                    role="teacher",
+                    last_message_at=0,
+                    round=DingTalkRoundState(round_id="r1", status="open"),
+                ),
+                "new": DingTalkContact(
+                    contact_id="new", sender="新", role="friend", last_message_at=3
+                ),
+            }
+        )
+    )
+    await memory_repo.append_dingtalk_message(
+        DingTalkContact(
+            contact_id="old", sender="旧", role="friend", last_message_at=5
+        ),
+        DingTalkMessage(message_id="m", speaker="npc", content="x", created_at=5),
+    )
+
+    evicted = await memory_repo.compact_dingtalk_contacts(2)
+
+    assert evicted == ["new"]
+    assert set(await memory_repo.get_dingtalk_contacts()) == {"old", "open"}
+    msgs_key = memory_repo._dingtalk_messages_key("new")
+    assert await memory_repo.redis.exists(msgs_key) == 0
+
+
+@pytest.mark.asyncio
+async def test_repo_pages_history_back_from_newest(memory_repo):
+    contact = DingTalkContact(contact_id="dt_a", sender="室友", role="roommate")
+    for idx in range(45):
+        await memory_repo.append_dingtalk_message(
+            contact,
+            DingTalkMessage(
+                message_id=f"m{idx}", speaker="npc", content=str(idx), created_at=idx
+            ),
+        )
+
+    page, has_more = await memory_repo.get_dingtalk_history("dt_a", 20, 20)
+    assert [m.content for m in page] == [str(i) for i in range(5, 25)]
+    assert has_more
+    page, has_more = await memory_repo.get_dingtalk_history("dt_a", 40, 20)
+    assert [m.content for m in page] == [str(i) for i in range(5)]
+    assert not has_more
+    assert await memory_repo.get_dingtalk_history("dt_a", 45, 20) == ([], False)
+
+    state = await memory_repo.get_dingtalk_state(message_limit=20)
+    assert len(state.contacts["dt_a"].messages) == 20
+    assert state.contacts["dt_a"].seq == 45
+
+
+@pytest.mark.asyncio
+async def test_engine_delta_payload_stays_constant_as_history_grows():
+    contact = DingTalkContact(contact_id="dt_a", sender="辅导员", role="counselor")
+    repo = await _make_repo(DingTalkState(contacts={contact.contact_id: contact}))
+    engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore
+    engine.emit = AsyncMock()
+
+    sizes = []
+    for idx in range(30):
+        await engine._store_dingtalk_npc_message(
+            {
+                "contact": {
+                    "contact_id": contact.contact_id,
+                    "sender": "辅导员",
+                    "role": "counselor",
+                },
+                "content": f"第{idx:02d}条通知",
+            }
+        )
+        event_type, payload = engine.emit.await_args.args
+        assert event_type == "dingtalk_delta"
+        assert payload["seq"] == idx + 1
+        sizes.append(len(str(payload)))
+
+    assert len(set(sizes)) <= 2
+    assert sizes[-1] <= sizes[0] + 16
+
+    engine.emit.reset_mock()
+    await engine.process_action({"action": "dingtalk_mark_read", "contact_id": "dt_a"})
+    engine.emit.assert_awaited_once_with(
+        "dingtalk_delta",
+        {"contact_id": "dt_a", "seq": 31, "ops": [{"op": "unread", "unread_count": 0}]},
+    )
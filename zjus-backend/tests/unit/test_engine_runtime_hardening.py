@@ -4,8 +4,9 @@ from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock
 
 import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
 
-from app.game.balance import balance
+from app.game.balance import BalanceSnapshot, balance
 from app.game.engine import GameEngine
 
 
@@ -106,20 +107,65 @@ async def test_run_loop_uses_balance_tick_interval_for_sleep_and_elapsed(monkeyp
     engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore[arg-type]
     engine.speed_multiplier = 2.0
     engine.is_running = True
-    engine.check_and_trigger_gameover = AsyncMock(return_value=True)
+    repo.update_stat_safe = AsyncMock()
+    repo.touch_ttl = AsyncMock()
+    engine.check_and_trigger_gameover = AsyncMock(return_value=False)
+    engine._push_update = AsyncMock()
     slept: list[float] = []
 
     async def fake_sleep(seconds: float):
         slept.append(seconds)
+        # Let exactly one tick run.
+        engine.is_running = len(slept) == 1
 
     patched_config = {
         **balance.raw,
         "tick": {**balance.raw.get("tick", {}), "interval_seconds": 7},
     }
-    monkeypatch.setattr(balance, "_config", patched_config)
+    monkeypatch.setattr(
+        balance, "_snapshot", BalanceSnapshot.from_config(patched_config)
+    )
     monkeypatch.setattr("app.game.engine.asyncio.sleep", fake_sleep)
 
     await engine.run_loop()
 
-    assert slept == [3.5]
+    assert slept == [3.5, 3.5]
     repo.update_stat.assert_awaited_once_with("elapsed_game_time", 7)
+
+
+@pytest.mark.asyncio
+async def test_skipped_tick_does_not_advance_the_clock(monkeypatch):
+    repo = Mock()
+    repo.update_stat = AsyncMock(return_value=3)
+    repo.get_snapshot = AsyncMock(
+        return_value=_Snapshot(
+            {
+                "semester_idx": 1,
+                "elapsed_game_time": 0,
+                "course_info_json": '[{"id": "CS1001", "credits": 2.0}]',
+                "iq": 100,
+            }
+        )
+    )
+    repo.get_items_state = AsyncMock(
+        return_value={"version": 1, "owned": [], "updated_at": 0}
+    )
+    repo.touch_ttl = AsyncMock()
+    repo.batch_update_course_mastery = AsyncMock(
+        side_effect=RedisConnectionError("redis went away")
+    )
+    engine = GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())  # type: ignore[arg-type]
+    engine.is_running = True
+    engine.check_and_trigger_gameover = AsyncMock(return_value=False)
+    slept: list[float] = []
+
+    async def fake_sleep(seconds: float):
+        slept.append(seconds)
+        engine.is_running = len(slept) == 1
+
+    monkeypatch.setattr("app.game.engine.asyncio.sleep", fake_sleep)
+
+    await engine.run_loop()
+
+    repo.batch_update_course_mastery.assert_awaited_once()
+    repo.update_stat.assert_not_awaited()
@@ -0,0 +1,200 @@
+import random
+
+from app.content import event_library
+from app.content.event_index import SEEN_HASHED_BITS, EventIndex, SeenEventBitmap
+from app.content.state_vector import PlayerStateVector
+from app.repositories.redis_repo import RedisRepository
+
+BOUNDS = (0, 200)
+
+
+def _event(event_id, sanity_range, stress_range, tags=()):
+    return {
+        "id": event_id,
+        "title": event_id,
+        "desc": "",
+        "options": [],
+        "tags": list(tags),
+        "sanity_range": sanity_range,
+        "stress_range": stress_range,
+    }
+
+
+def _linear_candidates(events, sanity, stress):
+    return [
+        idx
+        for idx, evt in enumerate(events)
+        if evt["sanity_range"][0] <= sanity <= evt["sanity_range"][1]
+        and evt["stress_range"][0] <= stress <= evt["stress_range"][1]
+    ]
+
+
+def test_buckets_match_linear_range_scan():
+    rng = random.Random(3)
+    events = []
+    for i in range(120):
+        lo_s, lo_t = rng.randint(0, 200), rng.randint(0, 200)
+        events.append(
+            _event(
+                f"e{i}",
+                [lo_s, rng.randint(lo_s, 200)],
+                [lo_t, rng.randint(lo_t, 200)],
+            )
+        )
+    index = EventIndex(events, BOUNDS, BOUNDS)
+
+    for sanity in range(0, 201, 7):
+        for stress in range(0, 201, 11):
+            assert list(index.candidates(sanity, stress)) == _linear_candidates(
+                events, sanity, stress
+            )
+    assert index.candidates(-50, 999) == index.candidates(0, 200)
+
+
+def test_sample_skips_seen_and_falls_back_to_whole_library():
+    events = [
+        _event("low_a", [0, 30], [0, 30]),
+        _event("low_b", [0, 30], [0, 30]),
+        _event("high", [70, 200], [70, 200]),
+    ]
+    index = EventIndex(events, BOUNDS, BOUNDS)
+    rng = random.Random(0)
+
+    picks = {index.ids[index.sample(10, 10, {"low_a"}, rng=rng)] for _ in range(20)}
+    assert picks == {"low_b"}
+    assert index.ids[index.sample(10, 10, {"low_a", "low_b"}, rng=rng)] == "high"
+    assert index.sample(10, 10, {"low_a", "low_b", "high"}, rng=rng) is None
+
+
+def test_sample_prefers_events_matching_state_tags():
+    events = [_event(f"plain{i}", [0, 200], [0, 200]) for i in range(9)]
+    events.append(_event("exam", [0, 200], [0, 200], tags=["学业压力"]))
+    index = EventIndex(events, BOUNDS, BOUNDS)
+    state = PlayerStateVector.from_stats({"sanity": 10, "stress": 150, "gpa": 1.5})
+    rng = random.Random(1)
+
+    hits = sum(
+        index.ids[index.sample(100, 100, (), state.event_affinity_tags(), rng)]
+        == "exam"
+        for _ in range(3000)
+    )
+
+    # Weight 3 against nine weight-1 events: 3/12 instead of 1/10.
+    assert 0.2 < hits / 3000 < 0.3
+
+
+def test_pick_random_event_uses_state_index(monkeypatch):
+    events = [_event("calm", [70, 200], [0, 30]), _event("storm", [0, 30], [70, 200])]
+    monkeypatch.setattr(event_library, "_event_library", events)
+    monkeypatch.setattr(event_library, "_event_index", None)
+
+    picked = event_library.pick_random_event(sanity=150, stress=5)
+
+    assert picked == {"id": "calm", "title": "calm", "desc": "", "options": []}
+    assert (
+        event_library.pick_random_event(sanity=150, stress=5, seen_ids={"calm"})["id"]
+        == "storm"
+    )
+
+
+class _RoundTrips:
+    """Backend proxy counting commands and pipeline executions."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.count = 0
+
+    def pipeline(self, *args, **kwargs):
+        pipe = self.backend.pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def counted_execute(*a, **kw):
+            self.count += 1
+            return await execute(*a, **kw)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    def __getattr__(self, name):
+        command = getattr(self.backend, name)
+
+        async def counted(*args, **kwargs):
+            self.count += 1
+            return await command(*args, **kwargs)
+
+        return counted
+
+
+async def test_seen_bitmap_excludes_whole_playthrough(memory_backend, monkeypatch):
+    events = [_event(f"e{i}", [0, 200], [0, 200]) for i in range(30)]
+    monkeypatch.setattr(event_library, "_event_library", events)
+    monkeypatch.setattr(event_library, "_event_index", None)
+    layout = event_library.seen_events_layout()
+    backend = _RoundTrips(memory_backend)
+    repo = RedisRepository("test-user", backend)
+
+    picked = []
+    for _ in range(30):
+        backend.count = 0
+        history, bitmap = await repo.get_seen_events(layout)
+        seen = event_library.seen_events(bitmap, history)
+        event = event_library.pick_random_event(sanity=80, stress=0, seen_ids=seen)
+        picked.append(event["id"])
+        await repo.add_event_to_history(
+            event["id"],
+            seen_offset=event_library.seen_event_offset(event["id"]),
+            seen_layout=layout,
+            restart_seen=bitmap is None,
+        )
+        # One read and one write per trigger.
+        assert backend.count == 2
+
+    assert sorted(picked) == sorted(e["id"] for e in events)
+    history, bitmap = await repo.get_seen_events(layout)
+    assert len(history) == 10
+    assert len(bitmap) == (SEEN_HASHED_BITS + len(events) + 7) // 8
+
+
+async def test_regenerated_library_restarts_the_seen_bitmap(memory_repo):
+    old = EventIndex([_event("a", [0, 200], [0, 200])], BOUNDS, BOUNDS)
+    new = EventIndex(
+        [_event("b", [0, 200], [0, 200]), _event("a", [0, 200], [0, 200])],
+        BOUNDS,
+        BOUNDS,
+    )
+    assert old.seen_layout != new.seen_layout
+
+    await memory_repo.add_event_to_history(
+        "a",
+        seen_offset=old.seen_bit_offset("a"),
+        seen_layout=old.seen_layout,
+        restart_seen=True,
+    )
+    # The old bits would map "a" onto "b", so the bitmap reads as missing.
+    _, bitmap = await memory_repo.get_seen_events(new.seen_layout)
+    assert bitmap is None
+    await memory_repo.add_event_to_history(
+        "a",
+        seen_offset=new.seen_bit_offset("a"),
+        seen_layout=new.seen_layout,
+        restart_seen=True,
+    )
+    _, bitmap = await memory_repo.get_seen_events(new.seen_layout)
+    seen = SeenEventBitmap(bitmap, new)
+    assert "a" in seen
+    assert "b" not in seen
+
+
+def test_seen_bitmap_hashes_generated_ids_and_keeps_legacy_history():
+    index = EventIndex([_event("lib", [0, 200], [0, 200])], BOUNDS, BOUNDS)
+    offset = index.seen_bit_offset("llm_evt_0123456789")
+    assert 0 <= offset < SEEN_HASHED_BITS
+    assert index.seen_bit_offset("lib") == SEEN_HASHED_BITS
+
+    data = bytearray(SEEN_HASHED_BITS // 8 + 1)
+    data[offset // 8] |= 0x80 >> (offset % 8)
+    seen = SeenEventBitmap(bytes(data), index, extra=["legacy_evt"])
+
+    assert "llm_evt_0123456789" in seen
+    assert "legacy_evt" in seen
+    assert "lib" not in seen
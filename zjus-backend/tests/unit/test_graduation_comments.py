@@ -1,9 +1,17 @@
-"""Tests for deterministic graduation fallback comments.
+"""Tests for graduation fallback comments and wenyan report prefetching.
 
 Copyright (c) 2026 pirate-608. Licensed under the MIT License.
 """
 
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
 from app.core import llm
+from app.core.config import settings
+from app.game.engine import GameEngine
 
 
 def test_fallback_wenyan_report_uses_gpa_branches():
@@ -14,3 +22,58 @@ def test_fallback_wenyan_report_uses_gpa_branches():
     assert "仓廪殷实" in llm.fallback_wenyan_report({"gpa": "4.2"})
     assert "偶尔摸摸鱼" in llm.fallback_wenyan_report({"gpa": "3.8"})
     assert "一改前非" in llm.fallback_wenyan_report({"gpa": "3.2"})
+
+
+def test_wenyan_digest_ignores_small_drift_but_not_grades():
+    stats = {"username": "小明", "gpa": "3.8", "sanity": 64, "achievements": ["a"]}
+
+    digest = llm.wenyan_report_digest(stats)
+
+    assert llm.wenyan_report_digest({**stats, "sanity": 61, "semester_idx": 9}) == (
+        digest
+    )
+    assert llm.wenyan_report_digest({**stats, "gpa": "3.9"}) != digest
+    assert llm.wenyan_report_digest({**stats, "achievements": ["a", "b"]}) != digest
+
+
+def _graduation_engine(stats):
+    repo = Mock()
+    repo.get_snapshot = AsyncMock(
+        return_value=SimpleNamespace(stats=SimpleNamespace(model_dump=lambda: stats))
+    )
+    repo.get_unlocked_achievements = AsyncMock(return_value=set())
+    repo.get_items_state = AsyncMock(
+        return_value={"version": 1, "owned": [], "updated_at": 0}
+    )
+    return GameEngine("1", repo=repo, save_service=Mock(), game_service=Mock())
+
+
+@pytest.mark.asyncio
+async def test_graduation_reuses_prefetched_report_until_stats_change():
+    stats = {"username": "小明", "gpa": "3.8", "sanity": 64}
+    engine = _graduation_engine(stats)
+    generate = AsyncMock(side_effect=["预制文", "重写文"])
+
+    with patch("app.core.llm.generate_wenyan_report", generate):
+        await engine._prefetch_wenyan_report()
+        final = {**stats, "achievements": []}
+        assert await engine._graduation_wenyan_report(final) == "预制文"
+        assert generate.await_count == 1
+
+        await engine._prefetch_wenyan_report()
+        changed = {**final, "gpa": "2.1"}
+        assert await engine._graduation_wenyan_report(changed) == "重写文"
+
+
+@pytest.mark.asyncio
+async def test_slow_graduation_report_falls_back_after_timeout(monkeypatch):
+    engine = _graduation_engine({"gpa": "4.6"})
+    monkeypatch.setattr(settings, "WENYAN_REPORT_TIMEOUT_SECONDS", 0.01)
+
+    async def never_finishes(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    with patch("app.core.llm.generate_wenyan_report", never_finishes):
+        report = await engine._graduation_wenyan_report({"gpa": "4.6"})
+
+    assert report == llm.fallback_wenyan_report({"gpa": "4.6"})
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.core import hedging
+from app.core.hedging import LatencyTracker, hedged
+
+
+@pytest.fixture(autouse=True)
+def fast_hedges(monkeypatch):
+    monkeypatch.setattr(hedging, "_trackers", {})
+    monkeypatch.setattr(hedging, "HEDGE_DEFAULT_DELAY_SECONDS", 0.02)
+
+
+def _source(value, delay=0.0, calls=None):
+    async def run():
+        if calls is not None:
+            calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+
+    return run
+
+
+async def test_fast_primary_never_starts_the_secondary():
+    calls: list = []
+    result = await hedged(
+        "t", _source("p", calls=calls), _source("s", calls=calls), enabled=True
+    )
+    assert (result.value, result.source, result.primary_failed) == (
+        "p",
+        "primary",
+        False,
+    )
+    assert calls == ["p"]
+
+
+async def test_slow_primary_loses_to_secondary_and_is_cancelled():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    result = await hedged("t", slow, _source("s"), enabled=True)
+
+    assert (result.value, result.source, result.primary_failed) == (
+        "s",
+        "secondary",
+        False,
+    )
+    assert cancelled.is_set()
+    assert hedging.HEDGES.value(name="t", outcome="secondary_won") >= 1
+
+
+async def test_failed_primary_falls_back_even_when_hedging_is_off():
+    async def broken():
+        raise RuntimeError("M2-her down")
+
+    result = await hedged("t", broken, _source("s"), enabled=False)
+    assert (result.value, result.primary_failed) == ("s", True)
+
+    # Disabled hedging waits on a slow primary instead of racing it.
+    calls: list = []
+    result = await hedged(
+        "t", _source("p", delay=0.05), _source("s", calls=calls), enabled=False
+    )
+    assert result.value == "p"
+    assert calls == []
+
+
+def test_hedge_delay_tracks_the_primary_p90():
+    tracker = LatencyTracker()
+    assert tracker.hedge_delay() == hedging.HEDGE_DEFAULT_DELAY_SECONDS
+    for ms in range(1, 101):
+        tracker.observe(ms / 10)
+    assert tracker.p90() == pytest.approx(9.0)
+    assert tracker.hedge_delay() == pytest.approx(9.0)
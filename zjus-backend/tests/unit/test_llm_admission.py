@@ -0,0 +1,154 @@
+import asyncio
+from collections import OrderedDict
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core import llm_admission
+from app.core.llm_admission import (
+    CircuitBreaker,
+    LLMUnavailable,
+    ProviderGate,
+    ProviderLimits,
+    TokenBucket,
+    create_chat_completion,
+    provider_for,
+)
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture(autouse=True)
+def fresh_gates(monkeypatch):
+    monkeypatch.setattr(llm_admission, "_gates", {})
+    monkeypatch.setattr(llm_admission, "_player_gates", OrderedDict())
+
+
+def _gate(clock, concurrency=2, rps=100.0, tpm=1_000_000.0):
+    return ProviderGate(
+        "test", ProviderLimits(concurrency, rps, tpm), clock=lambda: clock[0]
+    )
+
+
+async def test_token_bucket_refuses_budget_past_the_deadline(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2.0, clock=lambda: clock[0])
+    assert await bucket.take(2, deadline=0)
+    assert not await bucket.take(1, deadline=0.5)
+    clock[0] = 1.0
+    assert await bucket.take(1, deadline=1.0)
+
+
+def test_breaker_opens_on_errors_and_recovers_through_one_probe(clock):
+    breaker = CircuitBreaker("test", clock=lambda: clock[0])
+    for ok in [True] * 5 + [False] * 5:
+        assert breaker.allow()
+        breaker.record(ok)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert llm_admission.BREAKER_STATE.value(provider="test") == 2
+
+    clock[0] += llm_admission.BREAKER_OPEN_SECONDS
+    assert breaker.allow()
+    # Only one probe while half-open.
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert llm_admission.BREAKER_STATE.value(provider="test") == 0
+
+
+async def test_gate_sheds_calls_beyond_concurrency(clock, monkeypatch):
+    monkeypatch.setattr(llm_admission, "MAX_QUEUE_SECONDS", 0.02)
+    gate = _gate(clock, concurrency=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with gate.admit(10):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    with pytest.raises(LLMUnavailable):
+        async with gate.admit(10):
+            pass
+    assert llm_admission.REJECTED.value(provider="test", reason="queue_timeout") >= 1
+
+    release.set()
+    await holder
+    async with gate.admit(10):
+        pass
+
+
+async def test_slow_calls_trip_the_breaker(monkeypatch):
+    monkeypatch.setattr(llm_admission, "BREAKER_SLOW_SECONDS", 0.0)
+    client = SimpleNamespace(
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(create=AsyncMock(return_value="ok"))
+        )
+    )
+    base_url = "https://slow.example.test/v1"
+
+    for _ in range(llm_admission.BREAKER_MIN_CALLS):
+        assert (
+            await create_chat_completion(
+                client, base_url=base_url, messages=[], max_tokens=10
+            )
+            == "ok"
+        )
+    with pytest.raises(LLMUnavailable):
+        await create_chat_completion(client, base_url=base_url, messages=[])
+    assert provider_for(base_url) == "slow.example.test"
+    assert client.chat.completions.create.await_count == (
+        llm_admission.BREAKER_MIN_CALLS
+    )
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _failing_client(status_code):
+    return SimpleNamespace(
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(
+                create=AsyncMock(side_effect=_StatusError(status_code))
+            )
+        )
+    )
+
+
+async def test_player_key_failures_do_not_open_the_platform_breaker():
+    base_url = "https://shared.example.test/v1"
+    player = _failing_client(503)
+
+    for _ in range(llm_admission.BREAKER_MIN_CALLS):
+        with pytest.raises(_StatusError):
+            await create_chat_completion(
+                player, base_url=base_url, credential="sk-player", messages=[]
+            )
+
+    assert llm_admission.gate_for("shared.example.test", "sk-player").breaker.state == (
+        "open"
+    )
+    assert llm_admission.gate_for("shared.example.test").breaker.state == "closed"
+    with pytest.raises(LLMUnavailable):
+        await create_chat_completion(
+            player, base_url=base_url, credential="sk-player", messages=[]
+        )
+
+
+async def test_client_errors_do_not_count_as_provider_failures():
+    base_url = "https://auth.example.test/v1"
+    client = _failing_client(401)
+
+    for _ in range(llm_admission.BREAKER_MIN_CALLS * 2):
+        with pytest.raises(_StatusError):
+            await create_chat_completion(client, base_url=base_url, messages=[])
+
+    assert llm_admission.gate_for("auth.example.test").breaker.state == "closed"
+    assert llm_admission.is_client_error(_StatusError(429)) is False
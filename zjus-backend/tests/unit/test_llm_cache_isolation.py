@@ -5,7 +5,13 @@ from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
+from app.core import llm
 from app.core.llm import generate_random_event
+from app.core.llm_clients import ClientPool
+
+
+def llm_client(api_key, base_url):
+    return llm.AsyncOpenAI(api_key=api_key, base_url=base_url)
 
 
 @pytest.mark.asyncio
@@ -32,18 +38,22 @@ async def test_custom_llm_random_event_does_not_use_global_content_cache():
             "app.core.llm._resolve_llm_config",
             return_value=("custom-key", "https://example.test/v1", "custom-model"),
         ),
-        patch("app.core.llm._get_client", return_value=client),
+        patch("app.core.llm.AsyncOpenAI", return_value=client) as client_cls,
+        patch("app.core.llm._PLAYER_LLM_CLIENTS", ClientPool("llm", llm_client)),
         patch("app.core.llm.RedisCache") as redis_cache,
     ):
         redis_cache.lpop = AsyncMock()
         redis_cache.rpush_many_with_limit = AsyncMock()
 
-        result = await generate_random_event(
-            {"sanity": 80, "stress": 20},
-            llm_override={"api_key": "custom-key", "model": "custom-model"},
-        )
+        for _ in range(2):
+            result = await generate_random_event(
+                {"sanity": 80, "stress": 20},
+                llm_override={"api_key": "custom-key", "model": "custom-model"},
+            )
 
     assert result["title"] == "云端事件"
     redis_cache.lpop.assert_not_awaited()
     redis_cache.rpush_many_with_limit.assert_not_awaited()
-    client.close.assert_awaited_once()
+    # The player's client is pooled across calls rather than rebuilt.
+    client_cls.assert_called_once()
+    client.close.assert_not_awaited()
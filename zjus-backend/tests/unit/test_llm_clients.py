@@ -0,0 +1,124 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.core.llm_clients import ClientPool, ClientPoolSweeper
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+def _pool(clock, **kwargs):
+    def factory(api_key, base_url):
+        client = Mock(api_key=api_key, base_url=base_url)
+        client.close = AsyncMock()
+        return client
+
+    return ClientPool("test", factory, clock=lambda: clock[0], **kwargs)
+
+
+async def test_reuses_client_per_credentials_and_hides_raw_keys(clock):
+    pool = _pool(clock)
+    first = pool.acquire("sk-player", "https://a.test/v1")
+    await pool.release(first)
+
+    assert pool.acquire("sk-player", "https://a.test/v1") is first
+    assert pool.acquire("sk-player", "https://b.test/v1") is not first
+    assert pool.acquire("sk-other", "https://a.test/v1") is not first
+    assert len(pool) == 3
+    assert not any("sk-" in key for key in pool._entries)
+
+
+async def test_evicts_least_recently_used_idle_client(clock):
+    pool = _pool(clock, max_size=2)
+    a = pool.acquire("a", None)
+    b = pool.acquire("b", None)
+    await pool.release(a)
+    await pool.release(b)
+    await pool.release(pool.acquire("a", None))
+
+    c = pool.acquire("c", None)
+    await pool.release(c)
+
+    b.close.assert_awaited_once()
+    a.close.assert_not_awaited()
+    assert len(pool) == 2
+
+
+async def test_idle_and_ttl_expiry(clock):
+    pool = _pool(clock, idle_seconds=10, ttl_seconds=100)
+    idle = pool.acquire("idle", None)
+    await pool.release(idle)
+    busy = pool.acquire("busy", None)
+
+    clock[0] = 50
+    await pool.release(pool.acquire("other", None))
+    idle.close.assert_awaited_once()
+    # Leased clients do not go idle.
+    busy.close.assert_not_awaited()
+
+    # Past the TTL a busy client is replaced and closed once its call ends.
+    clock[0] = 101
+    fresh = pool.acquire("busy", None)
+    assert fresh is not busy
+    busy.close.assert_not_awaited()
+    await pool.release(busy)
+    busy.close.assert_awaited_once()
+    await pool.release(fresh)
+    fresh.close.assert_not_awaited()
+
+
+async def test_close_shuts_every_client(clock):
+    pool = _pool(clock)
+    leased = pool.acquire("a", None)
+    pooled = pool.acquire("b", None)
+    await pool.release(pooled)
+
+    await pool.close()
+
+    leased.close.assert_awaited_once()
+    pooled.close.assert_awaited_once()
+    assert len(pool) == 0
+
+
+async def test_idle_clients_close_without_new_traffic(clock):
+    pool = _pool(clock, idle_seconds=10)
+    idle = pool.acquire("idle", None)
+    await pool.release(idle)
+
+    clock[0] = 11
+    await pool.sweep()
+
+    idle.close.assert_awaited_once()
+    assert len(pool) == 0
+
+
+async def test_release_expires_other_idle_clients(clock):
+    pool = _pool(clock, idle_seconds=10)
+    idle = pool.acquire("idle", None)
+    await pool.release(idle)
+    busy = pool.acquire("busy", None)
+
+    clock[0] = 11
+    await pool.release(busy)
+
+    idle.close.assert_awaited_once()
+    busy.close.assert_not_awaited()
+
+
+async def test_sweeper_expires_pools_on_its_timer(clock):
+    pool = _pool(clock, idle_seconds=10)
+    idle = pool.acquire("idle", None)
+    await pool.release(idle)
+    clock[0] = 11
+    sweeper = ClientPoolSweeper(interval=0)
+
+    sweeper.start()
+    for _ in range(5):
+        await asyncio.sleep(0)
+    await sweeper.stop()
+
+    idle.close.assert_awaited_once()
@@ -1,10 +1,10 @@
+import asyncio
 import json
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
 from app.game.engine import GameEngine
-from app.schemas.dingtalk import DingTalkState
 from app.services.game_service import GameService
 
 
@@ -267,6 +267,98 @@ async def test_engine_next_semester_autosaves_selected_slot():
     assert game_service.process_semester_transition.await_args.kwargs["save_slot"] == 4
 
 
+@pytest.mark.asyncio
+async def test_semester_transition_hands_autosave_to_scheduler():
+    repo = Mock()
+    repo.increment_semester = AsyncMock(return_value=2)
+    repo.get_snapshot = AsyncMock(return_value=_Snapshot({"major_abbr": "CS"}))
+    repo.update_courses_and_states = AsyncMock()
+    world = Mock()
+    world.get_semester_courses = AsyncMock(return_value=[])
+    service = GameService("1", repo, world=world)
+    schedule = AsyncMock()
+    factory = AsyncMock()
+
+    with patch(
+        "app.services.game_service.SaveService.persist_to_db", new=AsyncMock()
+    ) as persist:
+        result = await service.process_semester_transition(
+            holiday_event_factory=factory,
+            holiday_event={"id": "evt_holiday"},
+            schedule_autosave=schedule,
+        )
+
+    schedule.assert_awaited_once_with()
+    persist.assert_not_awaited()
+    factory.assert_not_awaited()
+    assert result["autosave_ok"] is None
+    assert result["holiday_event"] == {"id": "evt_holiday"}
+
+
+@pytest.mark.asyncio
+async def test_engine_next_semester_emits_before_queued_autosave():
+    repo = Mock()
+    repo.get_snapshot = AsyncMock(
+        return_value=_Snapshot({"semester": "大一春夏", "semester_idx": 2})
+    )
+    repo.get_items_state = AsyncMock(
+        return_value={"version": 1, "owned": [], "updated_at": 0}
+    )
+
+    async def transition(**kwargs):
+        await kwargs["schedule_autosave"]()
+        return {
+            "status": "continued",
+            "semester_idx": 2,
+            "holiday_event": kwargs["holiday_event"],
+        }
+
+    game_service = Mock()
+    game_service.process_semester_transition = AsyncMock(side_effect=transition)
+    engine = GameEngine(
+        "1",
+        repo=repo,
+        save_service=Mock(),
+        game_service=game_service,
+        db_factory=lambda: _AsyncContext(Mock()),
+        save_slot=4,
+    )
+    engine.emit = AsyncMock()
+    engine.start = Mock()
+    engine._push_update = AsyncMock()
+    prefetched = asyncio.get_running_loop().create_future()
+    prefetched.set_result({"id": "evt_holiday"})
+    engine._holiday_event_prefetch = prefetched
+
+    save_values = {"save_slot": 4, "semester_index": 2}
+    with (
+        patch("app.game.engine.autosave_queue") as queue,
+        patch(
+            "app.game.engine.SaveService.collect_save_values",
+            new=AsyncMock(return_value=save_values),
+        ) as collect,
+    ):
+        await engine._next_semester()
+
+    event_type, payload = engine.emit.await_args.args
+    assert event_type == "new_semester"
+    assert payload["data"]["holiday_event"] == {"id": "evt_holiday"}
+    assert collect.await_args.args[1] == 4
+    key, job, on_result = queue.submit.call_args.args
+    assert key == "1:4"
+
+    # The queued job writes the row captured at transition time.
+    with patch(
+        "app.game.engine.SaveService.write_save_values",
+        new=AsyncMock(return_value=True),
+    ) as write:
+        assert await job() is True
+    assert write.await_args.args[1] is save_values
+
+    await on_result(False)
+    assert engine.emit.await_args.args[0] == "toast"
+
+
 @pytest.mark.asyncio
 async def test_final_exam_reports_credit_weighted_cumulative_gpa():
     repo = Mock()
@@ -377,7 +469,7 @@ async def test_dingtalk_uses_general_llm_when_custom_llm_has_no_rp_key():
     repo.get_items_state = AsyncMock(
         return_value={"version": 1, "owned": [], "updated_at": 0}
     )
-    repo.get_dingtalk_state = AsyncMock(return_value=DingTalkState())
+    repo.get_dingtalk_contacts = AsyncMock(return_value={})
     engine = GameEngine(
         "1",
         repo=repo,
@@ -389,6 +481,7 @@ async def test_dingtalk_uses_general_llm_when_custom_llm_has_no_rp_key():
     engine._store_dingtalk_npc_message = AsyncMock(return_value=None)
 
     with (
+        patch("app.game.engine.pick_dingtalk_thread", return_value=None),
         patch(
             "app.core.dingtalk_llm.generate_dingtalk_via_m2her",
             new=AsyncMock(return_value={"content": "rp"}),
@@ -417,7 +510,7 @@ async def test_dingtalk_uses_custom_rp_key_before_general_llm():
     repo.get_items_state = AsyncMock(
         return_value={"version": 1, "owned": [], "updated_at": 0}
     )
-    repo.get_dingtalk_state = AsyncMock(return_value=DingTalkState())
+    repo.get_dingtalk_contacts = AsyncMock(return_value={})
     rp_override = {"api_key": "rp-key", "model": "M2-her"}
     engine = GameEngine(
         "1",
@@ -431,6 +524,7 @@ async def test_dingtalk_uses_custom_rp_key_before_general_llm():
     engine._store_dingtalk_npc_message = AsyncMock(return_value=None)
 
     with (
+        patch("app.game.engine.pick_dingtalk_thread", return_value=None),
         patch(
             "app.core.dingtalk_llm.generate_dingtalk_via_m2her",
             new=AsyncMock(return_value={"content": "rp"}),
@@ -447,6 +541,53 @@ async def test_dingtalk_uses_custom_rp_key_before_general_llm():
     generic.assert_not_awaited()
 
 
+@pytest.mark.asyncio
+async def test_hybrid_dingtalk_generates_once_library_threads_are_all_recent(
+    monkeypatch,
+):
+    from app.content import event_library
+
+    thread = {
+        "id": "dtl_only",
+        "character": "【室友】",
+        "role": "roommate",
+        "context": "random",
+        "opener": "在吗",
+        "turns": [{"options": ["在"], "replies": ["好"]}],
+    }
+    monkeypatch.setattr(event_library, "_dingtalk_library", [thread])
+    monkeypatch.setattr(event_library, "_dingtalk_index", None)
+    repo = Mock()
+    repo.get_snapshot = AsyncMock(
+        return_value=_Snapshot({"sanity": 80, "stress": 20, "gpa": "3.5"})
+    )
+    repo.get_items_state = AsyncMock(
+        return_value={"version": 1, "owned": [], "updated_at": 0}
+    )
+    repo.get_dingtalk_contacts = AsyncMock(return_value={})
+    engine = GameEngine(
+        "1",
+        repo=repo,
+        save_service=Mock(),
+        game_service=Mock(),
+        llm_override={"api_key": "general-key", "model": "generic"},
+    )
+    engine.is_running = True
+    engine._store_dingtalk_npc_message = AsyncMock(return_value=None)
+    engine._recent_dingtalk_threads.append("dtl_only")
+
+    with patch(
+        "app.game.engine.generate_dingtalk_message",
+        new=AsyncMock(return_value={"content": "generic"}),
+    ) as generic:
+        await engine._trigger_dingtalk_message()
+
+    generic.assert_awaited_once()
+    engine._store_dingtalk_npc_message.assert_awaited_once_with(
+        {"content": "generic"}
+    )
+
+
 class _AsyncContext:
     def __init__(self, value):
         self.value = value
@@ -0,0 +1,95 @@
+"""Redis blob codec tests: compact encoding, compression, legacy JSON reads."""
+
+import json
+import random
+
+import pytest
+
+from app.repositories.codec import CodecError, decode_value, encode_value
+from app.schemas.dingtalk import DingTalkState
+
+_PHRASES = [
+    "明天早八的微积分记得带作业本",
+    "紫金港的晚霞今天特别好看，拍了几张发你",
+    "实验报告周五前要交到学在浙大上",
+    "食堂新开的麻辣香锅窗口排队好长",
+    "辅导员说下周要开班会，别忘了签到",
+    "你上次借我的线代笔记我复印好了",
+    "图书馆三楼的位置都被占满了",
+    "社团招新摊位需要人手，来帮忙吗",
+]
+
+
+def _heavy_dingtalk_state(contacts: int = 12, messages: int = 50) -> dict:
+    rng = random.Random(7)
+    state: dict = {"version": 1, "contacts": {}}
+    for c in range(contacts):
+        contact_id = f"contact_{c:02d}"
+        state["contacts"][contact_id] = {
+            "contact_id": contact_id,
+            "sender": f"【同学{c}】",
+            "role": "classmate",
+            "is_replyable": True,
+            "unread_count": rng.randint(0, 5),
+            "last_message_at": 1_700_000_000 + c,
+            "messages": [
+                {
+                    "message_id": f"dtm_{c:02d}{m:02d}{rng.getrandbits(40):010x}",
+                    "speaker": "npc" if m % 2 else "player",
+                    "content": "，".join(rng.sample(_PHRASES, 3)),
+                    "created_at": 1_700_000_000 + c * 100 + m,
+                    "round_id": f"round_{c}_{m // 6}",
+                }
+                for m in range(messages)
+            ],
+        }
+    return DingTalkState.from_raw(state).compact().model_dump()
+
+
+def test_round_trip_preserves_json_shape():
+    value = {"owned": ["planner"], "gold": 12, "ratio": 0.5, "note": "中文", "x": None}
+
+    assert decode_value(encode_value(value)) == value
+    assert decode_value(encode_value(value, compress_threshold=0)) == value
+
+
+def test_legacy_plain_json_still_decodes():
+    value = {"event_id": "evt_1", "title": "早八迟到"}
+    legacy = json.dumps(value, ensure_ascii=False)
+
+    assert decode_value(legacy) == value
+    assert decode_value(legacy.encode("utf-8")) == value
+
+
+def test_corrupt_blob_raises_codec_error():
+    with pytest.raises(CodecError):
+        decode_value(b"\xff\x03not-zlib")
+
+
+def test_heavy_dingtalk_state_shrinks_several_times():
+    state = _heavy_dingtalk_state()
+    assert len(state["contacts"]) == 12
+    legacy = json.dumps(state, ensure_ascii=False).encode("utf-8")
+
+    encoded = encode_value(state)
+
+    assert decode_value(encoded) == state
+    assert len(encoded) * 3 < len(legacy)
+
+
+async def test_repository_reads_legacy_json_and_writes_codec(memory_repo):
+    legacy = {"version": 1, "owned": [{"item_id": "planner"}], "updated_at": 1}
+    await memory_repo.redis.set(
+        memory_repo.keys["items"], json.dumps(legacy, ensure_ascii=False)
+    )
+
+    assert await memory_repo.get_items_state() == legacy
+
+    await memory_repo.set_items_state(legacy)
+    stored = await memory_repo.redis.get_bytes(memory_repo.keys["items"])
+    assert stored[:1] == b"\xff"
+    assert await memory_repo.get_items_state() == legacy
+
+    await memory_repo.set_current_event({"id": "evt_1", "options": []})
+    assert await memory_repo.pop_current_event() == {"id": "evt_1", "options": []}
+    assert await memory_repo.pop_current_event() is None
@@ -0,0 +1,105 @@
+"""Redis pool instrumentation, read retry, and tick-skip tests."""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from redis import asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.api.cache import (
+    REDIS_COMMAND_RETRIES,
+    REDIS_POOL_TIMEOUTS,
+    InstrumentedBlockingConnectionPool,
+    InstrumentedRedis,
+    PoolTimeoutError,
+)
+from app.core.metrics import MetricsRegistry
+from app.game.engine import ENGINE_TICKS_SKIPPED, GameEngine
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("app.api.cache.asyncio.sleep", AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_idempotent_read_is_retried_after_connection_error(
+    monkeypatch, no_backoff
+):
+    calls = []
+
+    async def flaky(self, *args, **options):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RedisConnectionError("reset by peer")
+        return "value"
+
+    monkeypatch.setattr(aioredis.Redis, "execute_command", flaky)
+    before = REDIS_COMMAND_RETRIES.value(command="HGETALL")
+
+    result = await InstrumentedRedis().execute_command("HGETALL", "player:1:stats")
+
+    assert result == "value"
+    assert len(calls) == 2
+    assert REDIS_COMMAND_RETRIES.value(command="HGETALL") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_write_commands_are_not_replayed(monkeypatch, no_backoff):
+    failing = AsyncMock(side_effect=RedisConnectionError("reset by peer"))
+    monkeypatch.setattr(aioredis.Redis, "execute_command", failing)
+
+    with pytest.raises(RedisConnectionError):
+        await InstrumentedRedis().execute_command("HINCRBY", "player:1:stats", "iq", 1)
+
+    assert failing.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_timeout_surfaces_as_pool_timeout(monkeypatch):
+    async def exhausted(self, *args, **kwargs):
+        raise RedisConnectionError("No connection available.") from (
+            asyncio.TimeoutError()
+        )
+
+    monkeypatch.setattr(aioredis.BlockingConnectionPool, "get_connection", exhausted)
+    pool = InstrumentedBlockingConnectionPool(max_connections=1, timeout=0.01)
+    before = REDIS_POOL_TIMEOUTS.value()
+
+    with pytest.raises(PoolTimeoutError):
+        await pool.get_connection()
+
+    assert REDIS_POOL_TIMEOUTS.value() == before + 1
+
+
+def test_metrics_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "Demo counter.")
+    histogram = registry.histogram("demo_seconds", "Demo latency.", buckets=(0.1, 1))
+    counter.inc(command="GET")
+    histogram.observe(0.5, command="GET")
+
+    text = registry.render()
+
+    assert registry.counter("demo_total", "Demo counter.") is counter
+    assert 'demo_total{command="GET"} 1' in text
+    assert 'demo_seconds_bucket{command="GET",le="0.1"} 0' in text
+    assert 'demo_seconds_bucket{command="GET",le="1"} 1' in text
+    assert 'demo_seconds_count{command="GET"} 1' in text
+
+
+@pytest.mark.asyncio
+async def test_run_loop_skips_tick_on_redis_error_without_stopping(monkeypatch):
+    engine = GameEngine("1", repo=Mock(), save_service=Mock(), game_service=Mock())  # type: ignore[arg-type]
+    engine.is_running = True
+    engine.stop = Mock()
+    engine._run_tick = AsyncMock(side_effect=[PoolTimeoutError("saturated"), False])
+    monkeypatch.setattr("app.game.engine.asyncio.sleep", AsyncMock())
+    before = ENGINE_TICKS_SKIPPED.value(reason="PoolTimeoutError")
+
+    await engine.run_loop()
+
+    assert engine._run_tick.await_count == 2
+    engine.stop.assert_not_called()
+    assert ENGINE_TICKS_SKIPPED.value(reason="PoolTimeoutError") == before + 1
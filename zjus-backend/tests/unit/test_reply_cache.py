@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from app.core import reply_cache
+from app.core.config import settings
+from app.core.reply_cache import (
+    REPLY_CACHE_INDEX_KEY,
+    REPLY_CACHE_VARIANTS,
+    ReplyCache,
+    reply_fingerprint,
+)
+from app.core.state_backend import MemoryStateBackend
+
+STATS = {"sanity": 60, "stress": 30, "gpa": 3.5}
+
+
+@pytest.fixture
+def backend():
+    return MemoryStateBackend()
+
+
+def _cache(backend, seed=0):
+    return ReplyCache(lambda: backend, rng=random.Random(seed))
+
+
+def test_fingerprint_ignores_formatting_but_not_context():
+    base = reply_fingerprint("dt_a", STATS, 1, "好的！", "明天交作业")
+    assert reply_fingerprint("dt_a", STATS, 1, " 好的 ", "明天交作业。") == base
+    assert reply_fingerprint("dt_a", STATS, 2, "好的", "明天交作业") != base
+    assert reply_fingerprint("dt_b", STATS, 1, "好的", "明天交作业") != base
+    assert (
+        reply_fingerprint("dt_a", {**STATS, "stress": 190}, 1, "好的", "明天交作业")
+        != base
+    )
+
+
+async def test_collects_variants_then_always_serves(backend, monkeypatch):
+    monkeypatch.setattr(settings, "DINGTALK_REPLY_CACHE_SAMPLE_RATE", 0.0001)
+    cache = _cache(backend)
+
+    assert await cache.get("fp") is None
+    await cache.put("fp", {"content": "v0"})
+    # Below the variant target a near-zero sample rate sends callers to the LLM.
+    assert await cache.get("fp") is None
+    for i in range(1, REPLY_CACHE_VARIANTS + 1):
+        await cache.put("fp", {"content": f"v{i}"})
+
+    served = {(await cache.get("fp"))["content"] for _ in range(20)}
+    assert served <= {f"v{i}" for i in range(REPLY_CACHE_VARIANTS)}
+    assert reply_cache.LOOKUPS.value(result="sampled_out") >= 1
+    assert reply_cache.HIT_RATIO.value() > 0
+
+
+async def test_lru_cap_evicts_least_recently_used_entries(backend, monkeypatch):
+    monkeypatch.setattr(settings, "DINGTALK_REPLY_CACHE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "DINGTALK_REPLY_CACHE_MAX_ENTRIES", 2)
+    clock = iter(range(100, 200))
+    monkeypatch.setattr(reply_cache.time, "time", lambda: next(clock))
+    cache = _cache(backend)
+
+    await cache.put("a", {"content": "a"})
+    await cache.put("b", {"content": "b"})
+    assert await cache.get("a") is not None
+    await cache.put("c", {"content": "c"})
+
+    assert await cache.get("b") is None
+    assert await backend.zrange(REPLY_CACHE_INDEX_KEY, 0, -1) == ["a", "c"]
+    assert await backend.ttl("dingtalk:reply_cache:a") > 0
+
+
+async def test_zero_sample_rate_disables_the_cache(backend, monkeypatch):
+    monkeypatch.setattr(settings, "DINGTALK_REPLY_CACHE_SAMPLE_RATE", 0)
+    cache = _cache(backend)
+    await cache.put("fp", {"content": "v"})
+    assert await cache.get("fp") is None
+    assert await backend.exists("dingtalk:reply_cache:fp") == 0
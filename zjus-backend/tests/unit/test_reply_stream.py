@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core import llm_admission
+from app.core.llm_admission import stream_chat_completion
+from app.core.reply_stream import ReplyTextStream
+
+
+@pytest.fixture(autouse=True)
+def fresh_gates(monkeypatch):
+    monkeypatch.setattr(llm_admission, "_gates", {})
+
+
+async def _feed(chunks, **kwargs):
+    received: list[str] = []
+
+    async def collect(text):
+        received.append(text)
+
+    stream = ReplyTextStream(collect, **kwargs)
+    for chunk in chunks:
+        await stream(chunk)
+    return received
+
+
+async def test_forwards_only_the_reply_field_across_split_escapes():
+    chunks = [
+        '```json\n{"npc_',
+        'reply": "好\\',
+        "n的\\u4f60",
+        '\\"呀\\"", ',
+        '"x": "no"}',
+    ]
+    received = await _feed(chunks)
+    assert "".join(received) == '好\n的你"呀"'
+    # The split escape is held back instead of leaking a backslash.
+    assert received[0] == "好"
+
+
+async def test_prose_output_streams_verbatim_within_the_limit():
+    assert "".join(await _feed(["  在的，", "马上到"], limit=4)) == "在的，马"
+
+
+class _Stream:
+    def __init__(self, parts):
+        self._parts = iter(parts)
+        self.close = AsyncMock()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            text = next(self._parts)
+        except StopIteration:
+            raise StopAsyncIteration from None
+        delta = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+async def test_stream_chat_completion_forwards_deltas_and_closes_the_stream():
+    stream = _Stream(["你", None, "好"])
+    client = SimpleNamespace(
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(create=AsyncMock(return_value=stream))
+        )
+    )
+    deltas: list[str] = []
+
+    async def on_delta(text):
+        deltas.append(text)
+
+    text = await stream_chat_completion(
+        client,
+        base_url="https://stream.example.test/v1",
+        on_delta=on_delta,
+        messages=[],
+        max_tokens=10,
+    )
+
+    assert text == "你好"
+    assert deltas == ["你", "好"]
+    assert client.chat.completions.create.await_args.kwargs["stream"] is True
+    stream.close.assert_awaited_once()
+    breaker = llm_admission.gate_for("stream.example.test").breaker
+    assert [ok for _, ok in breaker._outcomes] == [True]
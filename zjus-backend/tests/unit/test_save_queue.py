@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.services.save_queue import WriteBehindQueue
+
+
+@pytest.mark.asyncio
+async def test_queue_coalesces_waiting_jobs_and_serializes_each_key():
+    queue = WriteBehindQueue(workers=2, attempts=1)
+    release = asyncio.Event()
+    calls: list[str] = []
+    results: list[tuple[str, bool]] = []
+
+    def job(name, gate=None):
+        async def run():
+            calls.append(name)
+            if gate is not None:
+                await gate.wait()
+            return True
+
+        return run
+
+    def report(name):
+        async def on_result(ok):
+            results.append((name, ok))
+
+        return on_result
+
+    queue.submit("u1:1", job("first", release), report("first"))
+    await asyncio.sleep(0)
+    # Both wait behind the running save; only the newest job runs next.
+    queue.submit("u1:1", job("second"), report("second"))
+    queue.submit("u1:1", job("third"), report("third"))
+    queue.submit("u2:1", job("other"))
+    await asyncio.sleep(0.05)
+    assert calls == ["first", "other"]
+
+    release.set()
+    await asyncio.wait_for(queue.drain(), timeout=1)
+    await queue.stop()
+
+    assert calls == ["first", "other", "third"]
+    assert results == [("first", True), ("second", True), ("third", True)]
+
+
+@pytest.mark.asyncio
+async def test_queue_retries_then_reports_failure():
+    queue = WriteBehindQueue(workers=1, attempts=2, retry_delay=0)
+    attempts = 0
+    results: list[bool] = []
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        raise RuntimeError("db down")
+
+    async def on_result(ok):
+        results.append(ok)
+
+    queue.submit("u1:1", flaky, on_result)
+    await asyncio.wait_for(queue.drain(), timeout=1)
+    await queue.stop()
+
+    assert attempts == 2
+    assert results == [False]
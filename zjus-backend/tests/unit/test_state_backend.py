@@ -0,0 +1,233 @@
+"""Conformance tests shared by the Redis and in-process state backends."""
+
+import uuid
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.api.cache import RedisCache, RedisStateBackend
+from app.core.config import settings
+from app.core.state_backend import MemoryStateBackend
+from app.game.stat_definitions import stat_definitions
+
+
+async def _redis_backend_or_skip() -> RedisStateBackend:
+    client = RedisStateBackend.from_url(
+        settings.REDIS_URL, decode_responses=True, socket_connect_timeout=0.2
+    )
+    try:
+        await client.ping()
+    except Exception as exc:
+        await client.aclose()
+        pytest.skip(f"Redis not reachable at {settings.REDIS_URL}: {exc}")
+    return client
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def backend(request):
+    if request.param == "memory":
+        yield MemoryStateBackend()
+        return
+    client = await _redis_backend_or_skip()
+    yield client
+    keys = [k async for k in client.scan_iter(match="conformance:*", count=1000)]
+    if keys:
+        await client.delete(*keys)
+    await client.aclose()
+
+
+@pytest.fixture
+def key():
+    prefix = f"conformance:{uuid.uuid4().hex}"
+    return lambda name: f"{prefix}:{name}"
+
+
+async def test_string_set_get_getdel_and_nx(backend, key):
+    assert await backend.get(key("s")) is None
+    assert await backend.set(key("s"), "v1", ex=60)
+    assert await backend.get(key("s")) == "v1"
+    assert await backend.ttl(key("s")) == 60
+    assert await backend.set(key("s"), "v2", nx=True) is None
+    assert await backend.getdel(key("s")) == "v1"
+    assert await backend.exists(key("s")) == 0
+    assert await backend.ttl(key("s")) == -2
+
+
+async def test_delete_if_equals_only_removes_matching_token(backend, key):
+    lock = key("lock")
+    assert await backend.set(lock, "mine", ex=60)
+    assert await backend.delete_if_equals(lock, "theirs") == 0
+    assert await backend.get(lock) == "mine"
+    assert await backend.delete_if_equals(lock, "mine") == 1
+    assert await backend.exists(lock) == 0
+    assert await backend.delete_if_equals(lock, "mine") == 0
+
+
+async def test_redis_backend_hashes_lua_scripts_once(monkeypatch):
+    monkeypatch.setattr(RedisStateBackend, "_scripts", {})
+    registered = []
+    register = RedisStateBackend.register_script
+
+    def counting_register(self, source):
+        registered.append(source)
+        return register(self, source)
+
+    monkeypatch.setattr(RedisStateBackend, "register_script", counting_register)
+    for _ in range(3):
+        # get_client() hands out a fresh client per call.
+        client = RedisStateBackend()
+        client.evalsha = AsyncMock(return_value=1)
+        assert await client.delete_if_equals("lock", "token") == 1
+        client.evalsha.assert_awaited_once()
+
+    assert len(registered) == 1
+
+
+async def test_hash_commands_match_redis_types(backend, key):
+    h = key("h")
+    assert await backend.hset(h, mapping={"iq": 100, "gpa": "3.5"}) == 2
+    assert await backend.hset(h, "iq", 101) == 0
+    assert await backend.hget(h, "iq") == "101"
+    assert await backend.hmget(h, ["iq", "missing"]) == ["101", None]
+    assert await backend.hincrby(h, "iq", 4) == 105
+    assert await backend.hincrbyfloat(h, "mastery", 1.5) == 1.5
+    assert await backend.hdel(h, "gpa", "missing") == 1
+    assert await backend.hgetall(h) == {"iq": "105", "mastery": "1.5"}
+    assert await backend.ttl(h) == -1
+
+
+async def test_hincrby_clamped_applies_bounds(backend, key):
+    h = key("stats")
+    await backend.hset(h, "energy", 95)
+    assert await backend.hincrby_clamped(h, "energy", 10, 0, 100) == 100
+    assert await backend.hincrby_clamped(h, "energy", -250, 0, 100) == 0
+    assert await backend.hincrby_clamped(h, "fresh", -3, -10, 10) == -3
+    assert await backend.hget(h, "energy") == "0"
+    assert await backend.hget(h, "fresh") == "-3"
+
+
+async def test_bitmap_setbit_getbit_and_raw_bytes(backend, key):
+    b = key("bits")
+    assert await backend.setbit(b, 9, 1) == 0
+    assert await backend.setbit(b, 9, 1) == 1
+    assert await backend.setbit(b, 0, 1) == 0
+    assert await backend.getbit(b, 9) == 1
+    assert await backend.getbit(b, 8) == 0
+    assert await backend.getbit(b, 4096) == 0
+    assert await backend.get_bytes(b) == b"\x80\x40"
+    assert await backend.setbit(b, 9, 0) == 1
+    assert await backend.get_bytes(b) == b"\x80\x00"
+
+
+async def test_publish_reaches_subscribers(backend, key):
+    channel = key("channel")
+    pubsub = backend.pubsub()
+    await pubsub.subscribe(channel)
+    ack = await pubsub.get_message(timeout=1.0)
+    assert (ack["type"], ack["channel"], ack["data"]) == ("subscribe", channel, 1)
+
+    assert await backend.publish(channel, 7) == 1
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+    assert (message["type"], message["data"]) == ("message", "7")
+    assert await pubsub.get_message(timeout=0.05) is None
+
+    await pubsub.unsubscribe(channel)
+    await pubsub.aclose()
+    assert await backend.publish(channel, "gone") == 0
+
+
+async def test_sets_and_lists(backend, key):
+    s, lst = key("set"), key("list")
+    assert await backend.sadd(s, "a", "b") == 2
+    assert await backend.sadd(s, "a") == 0
+    assert await backend.smembers(s) == {"a", "b"}
+
+    assert await backend.rpush(lst, "1", "2", "3") == 3
+    assert await backend.lpush(lst, "0") == 4
+    assert await backend.lrange(lst, 0, -1) == ["0", "1", "2", "3"]
+    assert await backend.lrange(lst, -2, -1) == ["2", "3"]
+    assert await backend.ltrim(lst, 0, 1)
+    assert await backend.llen(lst) == 2
+    assert await backend.lpop(lst) == "0"
+    assert await backend.lpop(lst) == "1"
+    assert await backend.lpop(lst) is None
+    assert await backend.exists(lst) == 0
+
+
+async def test_sorted_sets_order_by_score(backend, key):
+    z = key("zset")
+    assert await backend.zadd(z, {"b": 2, "a": 1, "c": 3}) == 3
+    assert await backend.zadd(z, {"a": 4}) == 0
+    assert await backend.zcard(z) == 3
+    assert await backend.zrange(z, 0, -1) == ["b", "c", "a"]
+    assert await backend.zremrangebyrank(z, 0, 0) == 1
+    assert await backend.zrem(z, "a", "missing") == 1
+    assert await backend.zrange(z, 0, -1) == ["c"]
+    assert await backend.zrem(z, "c") == 1
+    assert await backend.exists(z) == 0
+
+
+async def test_pipeline_returns_results_in_order(backend, key):
+    h, lst = key("ph"), key("pl")
+    async with backend.pipeline() as pipe:
+        pipe.hset(h, mapping={"a": 1})
+        pipe.hincrby(h, "a", 2)
+        pipe.rpush(lst, "x")
+        pipe.expire(lst, 30)
+        results = await pipe.execute()
+
+    assert results == [1, 3, 1, True]
+    assert await backend.ttl(lst) == 30
+
+
+async def test_pipeline_reads_raw_bytes_alongside_decoded_values(backend, key):
+    b, lst = key("pb"), key("plb")
+    await backend.set(b, b"\xde\xad")
+    await backend.setbit(b, 23, 1)
+    await backend.rpush(lst, "x")
+    async with backend.pipeline(transaction=False) as pipe:
+        pipe.lrange(lst, 0, -1)
+        pipe.get_bytes(b)
+        results = await pipe.execute()
+
+    assert results == [["x"], b"\xde\xad\x01"]
+
+
+async def test_memory_backend_expires_keys_lazily():
+    now = [1000.0]
+    backend = MemoryStateBackend(clock=lambda: now[0])
+    await backend.set("k", "v", ex=10)
+    await backend.hset("h", "f", 1)
+    await backend.expire("h", 5)
+
+    now[0] += 6
+    assert await backend.hgetall("h") == {}
+    assert await backend.get("k") == "v"
+    now[0] += 5
+    assert await backend.get("k") is None
+    assert await backend.scan(match="*") == (0, [])
+
+
+async def test_redis_cache_returns_memory_backend_when_configured(memory_backend):
+    assert RedisCache.get_client() is memory_backend
+    await RedisCache.rpush_many_with_limit("pool", ["a", "b", "c"], max_len=2)
+    assert await RedisCache.lpop("pool") == "b"
+
+
+async def test_repository_round_trip_on_memory_backend(memory_repo):
+    await memory_repo.set_game_data(
+        {"username": "Tester", "energy": 50, "semester_idx": 1},
+        courses={"CS1": 10.0},
+        states={"CS1": 2},
+        achievements=["first_day"],
+    )
+
+    energy_max = stat_definitions.by_id["energy"].max
+    assert await memory_repo.update_stat_safe("energy", 10_000) == energy_max
+    await memory_repo.batch_update_course_mastery({"CS1": 2.5})
+    snapshot = await memory_repo.get_snapshot()
+
+    assert snapshot.stats.energy == energy_max
+    assert snapshot.courses == {"CS1": 12.5}
+    assert snapshot.course_states == {"CS1": 2}
+    assert "first_day" in snapshot.achievements
@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+from app.content.cc98_index import Cc98Index
+from app.content.event_index import EventIndex
+from app.core import world_bundle
+from app.core.config import settings
+
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    root = tmp_path / "world"
+    (root / "courses").mkdir(parents=True)
+    (root / "items.json").write_text(json.dumps({"items": [1, 2]}), encoding="utf-8")
+    (root / "courses" / "CS.json").write_text(
+        json.dumps({"semesters": []}), encoding="utf-8"
+    )
+    bundle = tmp_path / "build" / "world.bundle"
+    monkeypatch.setattr(world_bundle, "world_dir", lambda: root)
+    monkeypatch.setattr(settings, "WORLD_BUNDLE_PATH", str(bundle))
+    world_bundle.reset_world_bundle()
+    yield root, bundle
+    world_bundle.reset_world_bundle()
+
+
+def _compile(root, bundle):
+    sections = [
+        (
+            f"json:{rel}",
+            json.loads((root / rel).read_text(encoding="utf-8")),
+            [world_bundle.source_stamp(root, rel)],
+        )
+        for rel in ("items.json", "courses/CS.json")
+    ]
+    sections.append(("index:demo", {"ids": ["a"]}, []))
+    world_bundle.write_bundle(bundle, sections)
+
+
+def test_sections_are_served_from_the_bundle(world):
+    root, bundle = world
+    _compile(root, bundle)
+    # Same size and mtime, different bytes: proves the read hit the bundle.
+    os.replace(root / "items.json", root / "items.bak")
+    (root / "items.json").write_text(json.dumps({"items": [9, 9]}), encoding="utf-8")
+    stat = (root / "items.bak").stat()
+    os.utime(root / "items.json", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert world_bundle.read_world_json(root / "items.json") == {"items": [1, 2]}
+    assert world_bundle.read_world_json(root / "courses" / "CS.json") == {
+        "semesters": []
+    }
+    assert world_bundle.load_world_section("index:demo") == {"ids": ["a"]}
+    assert world_bundle.load_world_section("index:missing") is None
+
+
+def test_stale_or_outside_paths_fall_back_to_json(world, tmp_path):
+    root, bundle = world
+    _compile(root, bundle)
+    (root / "items.json").write_text(json.dumps({"items": [3]}), encoding="utf-8")
+    outside = tmp_path / "items.json"
+    outside.write_text(json.dumps({"items": ["explicit"]}), encoding="utf-8")
+
+    assert world_bundle.read_world_json(root / "items.json") == {"items": [3]}
+    assert world_bundle.read_world_json(outside) == {"items": ["explicit"]}
+
+
+def test_missing_or_foreign_bundle_is_ignored(world):
+    root, bundle = world
+    assert world_bundle.get_world_bundle() is None
+    assert world_bundle.read_world_json(root / "items.json") == {"items": [1, 2]}
+
+    bundle.parent.mkdir(parents=True)
+    bundle.write_bytes(b"not a bundle at all")
+    world_bundle.reset_world_bundle()
+    assert world_bundle.get_world_bundle() is None
+
+
+def test_index_states_round_trip():
+    events = [
+        {"id": f"e{i}", "sanity_range": [i * 10, 200], "stress_range": [0, i * 20]}
+        for i in range(8)
+    ]
+    built = EventIndex(events, (0, 200), (0, 200))
+    restored = EventIndex(events, (0, 200), (0, 200), state=built.to_state())
+    for sanity in range(0, 201, 9):
+        for stress in range(0, 201, 13):
+            assert restored.candidates(sanity, stress) == built.candidates(
+                sanity, stress
+            )
+    with pytest.raises(ValueError):
+        EventIndex(events[1:], (0, 200), (0, 200), state=built.to_state())
+
+    posts = [
+        {"id": "a", "effect": "negative", "topic": "郁闷小屋", "content": "唉"},
+        {"id": "b", "effect": "positive", "topic": "水区", "content": "今日 开怀"},
+    ]
+    cc98 = Cc98Index(posts)
+    restored_cc98 = Cc98Index(posts, state=cc98.to_state())
+    assert restored_cc98.candidates("positive", "今日开怀") == (1,)
+    assert restored_cc98.candidates("negative", "小屋") == (0,)
+    with pytest.raises(ValueError):
+        Cc98Index(posts[:1], state=cc98.to_state())
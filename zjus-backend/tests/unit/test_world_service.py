@@ -0,0 +1,76 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.services import world_service
+from app.services.world_service import WorldService
+
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    (tmp_path / "courses").mkdir()
+    majors = {
+        "TIER_1": [
+            {"abbr": "CS", "name": "计算机"},
+            {"abbr": "AI", "name": "人工智能"},
+        ],
+        "TIER_2": [{"abbr": "MATH", "name": "数学"}],
+        "notes": "ignored",
+    }
+    (tmp_path / "majors.json").write_text(json.dumps(majors), encoding="utf-8")
+    plan = {"semesters": [{"courses": [{"id": "c1"}]}, {"courses": [{"id": "c2"}]}]}
+    (tmp_path / "courses" / "CS.json").write_text(json.dumps(plan), encoding="utf-8")
+
+    monkeypatch.setattr(WorldService, "_static_cache", {})
+    monkeypatch.setattr(WorldService, "_inflight", {})
+    monkeypatch.setattr(WorldService, "_indexes", {})
+    service = WorldService()
+    service.majors_path = tmp_path / "majors.json"
+    service.courses_dir = tmp_path / "courses"
+    return service
+
+
+async def test_majors_and_courses_come_from_indexes(world):
+    assert [m["abbr"] for m in await world.get_all_majors()] == ["CS", "AI", "MATH"]
+
+    major = await world.get_major_by_abbr("CS")
+    assert major["major_info"]["name"] == "计算机"
+    assert major["initial_courses"] == [{"id": "c1"}]
+    assert await world.get_semester_courses("CS", 2) == [{"id": "c2"}]
+    assert await world.get_semester_courses("CS", 3) == []
+    assert await world.get_semester_courses("NOPE", 1) == []
+    assert await world.get_major_by_abbr("NOPE") is None
+
+    ai = await world.get_major_by_abbr("AI")
+    assert ai["course_plan"] == {} and ai["initial_courses"] == []
+
+
+async def test_concurrent_first_loads_read_each_file_once(world, monkeypatch):
+    reads: list[str] = []
+    release = threading.Event()
+    original = world_service.read_world_json
+
+    def slow_read(path):
+        reads.append(path.name)
+        release.wait(timeout=5)
+        return original(path)
+
+    monkeypatch.setattr(world_service, "read_world_json", slow_read)
+    callers = [
+        asyncio.create_task(world.get_major_by_abbr("CS")) for _ in range(20)
+    ] + [asyncio.create_task(world.get_all_majors()) for _ in range(20)]
+    await asyncio.sleep(0.05)
+    # One caller giving up must not cancel the load the others share.
+    callers[0].cancel()
+    release.set()
+    results = await asyncio.gather(*callers[1:])
+
+    assert sorted(reads) == ["CS.json", "majors.json"]
+    assert all(r["major_info"]["abbr"] == "CS" for r in results[:19])
+    assert WorldService._inflight == {}
+
+    reads.clear()
+    await world.get_semester_courses("CS", 1)
+    assert reads == []
@@ -7,7 +7,7 @@
 import { ref, onUnmounted } from 'vue'
 import { useGameStore } from '../stores/gameStore.ts'
 import type { CourseMetadata } from '../types/course'
-import type { FeedbackChange } from '../types/modal'
+import type { DingTalkDeltaOp, DingTalkThreadMessage, FeedbackChange } from '../types/modal'
 import type { WsMessage, WsClientAction } from '../types/websocket'
 import { extractGraduationFinalStats, extractNewSemesterName } from '../types/websocket'
 import { ALLOCATABLE_STATS } from '@/data/statDefinitions.generated'
@@ -214,7 +214,10 @@ export function useGameWebSocket() {
         'random_event',
         'dingtalk_message',
         'dingtalk_state',
-        'dingtalk_thread_update',
+        'dingtalk_delta',
+        'dingtalk_stream',
+        'dingtalk_thread',
+        'dingtalk_history',
         'dingtalk_effect',
         'items_state',
         'achievement_unlocked',
@@ -418,14 +421,39 @@ export function useGameWebSocket() {
           break
         }
 
-        case 'dingtalk_thread_update': {
-          const data = isRecord(wsMsg.data) ? wsMsg.data : {}
-          const contact = isRecord(wsMsg.contact)
-            ? wsMsg.contact
-            : isRecord(data.contact)
-              ? data.contact
-              : null
-          gameStore.upsertDingTalkContact(contact)
+        case 'dingtalk_delta': {
+          const contactId = typeof wsMsg.contact_id === 'string' ? wsMsg.contact_id : ''
+          if (!contactId || typeof wsMsg.seq !== 'number' || !Array.isArray(wsMsg.ops)) break
+          if (!gameStore.applyDingTalkDelta(contactId, wsMsg.seq, wsMsg.ops as DingTalkDeltaOp[])) {
+            send({ action: 'dingtalk_sync', contact_id: contactId })
+          }
+          break
+        }
+
+        case 'dingtalk_stream': {
+          const contactId = typeof wsMsg.contact_id === 'string' ? wsMsg.contact_id : ''
+          const messageId = typeof wsMsg.message_id === 'string' ? wsMsg.message_id : ''
+          if (!contactId || !messageId || typeof wsMsg.delta !== 'string') break
+          gameStore.appendDingTalkDraft(contactId, messageId, wsMsg.delta)
+          break
+        }
+
+        case 'dingtalk_thread': {
+          gameStore.upsertDingTalkContact(
+            isRecord(wsMsg.contact) ? wsMsg.contact : null,
+            Boolean(wsMsg.has_more),
+          )
+          break
+        }
+
+        case 'dingtalk_history': {
+          if (typeof wsMsg.contact_id !== 'string' || !Array.isArray(wsMsg.messages)) break
+          gameStore.prependDingTalkHistory(
+            wsMsg.contact_id,
+            Number(wsMsg.offset ?? 0),
+            wsMsg.messages as DingTalkThreadMessage[],
+            Boolean(wsMsg.has_more),
+          )
           break
         }
 
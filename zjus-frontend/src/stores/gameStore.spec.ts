@@ -73,6 +73,100 @@ describe('gameStore DingTalk threads', () => {
     expect(store.dingtalkContacts.b.unread_count).toBe(3)
     expect(store.unreadDingtalk).toBe(3)
   })
+
+  it('applies deltas in seq order and reports gaps', () => {
+    const store = useGameStore()
+    const header = {
+      contact_id: 'dt_ta',
+      sender: '助教',
+      role: 'teaching_assistant',
+      is_replyable: true,
+      is_urgent: false,
+      last_message_at: 5,
+    }
+    const message = {
+      message_id: 'm1',
+      speaker: 'npc' as const,
+      content: '作业记得交',
+      created_at: 5,
+      round_id: null,
+    }
+
+    expect(store.applyDingTalkDelta('dt_ta', 1, [
+      { op: 'contact', contact: header },
+      { op: 'message', message },
+      { op: 'unread', unread_count: 1 },
+    ])).toBe(true)
+    expect(store.applyDingTalkDelta('dt_ta', 1, [{ op: 'unread', unread_count: 9 }])).toBe(true)
+    expect(store.dingtalkContacts.dt_ta.messages).toHaveLength(1)
+    expect(store.unreadDingtalk).toBe(1)
+
+    expect(store.applyDingTalkDelta('dt_ta', 3, [{ op: 'unread', unread_count: 0 }])).toBe(false)
+    expect(store.applyDingTalkDelta('dt_ta', 2, [{ op: 'unread', unread_count: 0 }])).toBe(true)
+    expect(store.dingtalkContacts.dt_ta.seq).toBe(2)
+    expect(store.unreadDingtalk).toBe(0)
+
+    store.prependDingTalkHistory('dt_ta', 1, [{ ...message, message_id: 'm0', created_at: 1 }], false)
+    expect(store.dingtalkContacts.dt_ta.messages.map(m => m.message_id)).toEqual(['m0', 'm1'])
+  })
+
+  it('assembles streamed reply drafts until the persisted message arrives', () => {
+    const store = useGameStore()
+    store.applyDingTalkDelta('dt_ta', 1, [{
+      op: 'contact',
+      contact: {
+        contact_id: 'dt_ta',
+        sender: '助教',
+        role: 'teaching_assistant',
+        is_replyable: true,
+        is_urgent: false,
+        last_message_at: 5,
+      },
+    }])
+
+    store.appendDingTalkDraft('dt_ta', 'm2', '我看')
+    store.appendDingTalkDraft('dt_ta', 'm2', '到了。')
+    expect(store.dingtalkDrafts.dt_ta).toEqual({ message_id: 'm2', content: '我看到了。' })
+
+    // Unrelated deltas arriving mid-stream keep the draft.
+    store.applyDingTalkDelta('dt_ta', 2, [{ op: 'unread', unread_count: 0 }])
+    expect(store.dingtalkDrafts.dt_ta).toEqual({ message_id: 'm2', content: '我看到了。' })
+
+    store.applyDingTalkDelta('dt_ta', 3, [{
+      op: 'message',
+      message: { message_id: 'm2', speaker: 'npc', content: '我看到了。', created_at: 6, round_id: 'r1' },
+    }])
+    expect(store.dingtalkDrafts.dt_ta).toBeUndefined()
+    // Late fragments of an already persisted message are dropped.
+    store.appendDingTalkDraft('dt_ta', 'm2', '。')
+    expect(store.dingtalkDrafts.dt_ta).toBeUndefined()
+  })
+
+  it('drops drafts when the round closes or the game resets', () => {
+    const store = useGameStore()
+    store.applyDingTalkDelta('dt_ta', 1, [{
+      op: 'contact',
+      contact: {
+        contact_id: 'dt_ta',
+        sender: '助教',
+        role: 'teaching_assistant',
+        is_replyable: true,
+        is_urgent: false,
+        last_message_at: 5,
+      },
+    }])
+
+    store.appendDingTalkDraft('dt_ta', 'm3', '稍等')
+    store.applyDingTalkDelta('dt_ta', 2, [{
+      op: 'round',
+      round: { round_id: 'r1', status: 'closed', player_reply_count: 3 },
+    }])
+    expect(store.dingtalkDrafts.dt_ta).toBeUndefined()
+
+    store.appendDingTalkDraft('dt_ta', 'm4', '下次')
+    store.resetRuntimeStateForInit()
+    expect(store.dingtalkDrafts.dt_ta).toBeUndefined()
+  })
 })
 
 describe('gameStore course metadata', () => {
@@ -10,9 +10,12 @@ import { STAT_DEFINITIONS } from '@/data/statDefinitions.generated'
 import type { GamePhase, PlayerStats } from '../types/game'
 import type { CoursesMap, CourseMetadata, CourseProgressUpdate } from '../types/course'
 import type { GameItem, ItemsState } from '../types/items'
-import type { AchievementSummary, DingTalkContact, DingTalkMessage, DingTalkState, FeedbackModalData, ModalData } from '../types/modal'
+import type { AchievementSummary, DingTalkContact, DingTalkDeltaOp, DingTalkMessage, DingTalkState, DingTalkThreadMessage, FeedbackModalData, ModalData } from '../types/modal'
 import type { RelaxTarget } from '../types/websocket'
 
+/** Newest messages per contact sent at bootstrap; mirrors the backend page size. */
+export const DINGTALK_HISTORY_PAGE_SIZE = 20
+
 type ToastType = 'success' | 'danger' | 'warning' | 'info'
 type ToastState = { message: string; type: ToastType }
 
@@ -143,6 +146,9 @@ export const useGameStore = defineStore('game', () => {
   const dingMessages = ref<DingTalkMessage[]>([])
   const dingtalkContacts = reactive<Record<string, DingTalkContact>>({})
   const unreadDingtalk = ref<number>(0)
+  const dingtalkHasMoreHistory = reactive<Record<string, boolean>>({})
+  // NPC replies still streaming in, keyed by contact; never persisted.
+  const dingtalkDrafts = reactive<Record<string, { message_id: string; content: string }>>({})
   const unlockedAchievements = ref<AchievementSummary[]>([])
   const itemCatalog = ref<GameItem[]>([])
   const ownedItems = ref<string[]>([])
@@ -370,17 +376,108 @@ export const useGameStore = defineStore('game', () => {
     for (const key in dingtalkContacts) {
       delete dingtalkContacts[key]
     }
+    for (const key in dingtalkHasMoreHistory) {
+      delete dingtalkHasMoreHistory[key]
+    }
+    for (const key in dingtalkDrafts) {
+      delete dingtalkDrafts[key]
+    }
     const contacts = state && typeof state === 'object' && 'contacts' in state
       ? (state as DingTalkState).contacts
       : {}
     if (contacts && typeof contacts === 'object') {
       for (const [id, contact] of Object.entries(contacts)) {
         dingtalkContacts[id] = contact as DingTalkContact
+        dingtalkHasMoreHistory[id] = (contact as DingTalkContact).messages.length >= DINGTALK_HISTORY_PAGE_SIZE
       }
     }
     recalcUnreadDingtalk()
   }
 
+  /**
+   * Apply one `dingtalk_delta` event in per-contact sequence order.
+   *
+   * Returns false when the delta cannot be applied because earlier deltas
+   * were missed; the caller should then request a `dingtalk_sync`.
+   */
+  function applyDingTalkDelta(contactId: string, seq: number, ops: DingTalkDeltaOp[]): boolean {
+    let contact = dingtalkContacts[contactId]
+    const knownSeq = Number(contact?.seq ?? 0)
+    if (contact && seq <= knownSeq) return true
+    if (contact && seq !== knownSeq + 1) return false
+    if (!contact) {
+      const header = ops.find(op => op.op === 'contact')
+      if (!header || header.op !== 'contact') return false
+      contact = {
+        ...header.contact,
+        is_urgent: Boolean(header.contact.is_urgent),
+        unread_count: 0,
+        messages: [],
+        pending_options: [],
+        round: { round_id: '', status: 'closed', player_reply_count: 0 },
+      }
+      dingtalkContacts[contactId] = contact
+      dingtalkHasMoreHistory[contactId] = seq > 1
+    }
+    const draftId = dingtalkDrafts[contactId]?.message_id
+    let draftDone = false
+    for (const op of ops) {
+      if (op.op === 'contact') {
+        Object.assign(contact, op.contact)
+      } else if (op.op === 'message') {
+        if (!contact.messages.some(m => m.message_id === op.message.message_id)) {
+          contact.messages.push(op.message)
+        }
+        contact.last_message_at = Math.max(contact.last_message_at, op.message.created_at)
+        if (op.message.message_id === draftId) draftDone = true
+      } else if (op.op === 'unread') {
+        contact.unread_count = op.unread_count
+      } else if (op.op === 'options') {
+        contact.pending_options = op.pending_options
+      } else if (op.op === 'round') {
+        contact.round = op.round
+        if (op.round.status === 'closed') draftDone = true
+      }
+    }
+    contact.seq = seq
+    // Only the persisted reply or the end of the round supersedes the draft;
+    // unrelated deltas arriving mid-stream leave it in place.
+    if (draftDone) delete dingtalkDrafts[contactId]
+    recalcUnreadDingtalk()
+    return true
+  }
+
+  /**
+   * Append one `dingtalk_stream` fragment to the contact's draft NPC reply.
+   */
+  function appendDingTalkDraft(contactId: string, messageId: string, delta: string) {
+    const contact = dingtalkContacts[contactId]
+    if (contact?.messages.some(m => m.message_id === messageId)) return
+    const draft = dingtalkDrafts[contactId]
+    if (draft && draft.message_id === messageId) {
+      draft.content += delta
+    } else {
+      dingtalkDrafts[contactId] = { message_id: messageId, content: delta }
+    }
+  }
+
+  /**
+   * Prepend one page of older messages loaded through `dingtalk_history`.
+   */
+  function prependDingTalkHistory(
+    contactId: string,
+    offset: number,
+    messages: DingTalkThreadMessage[],
+    hasMore: boolean,
+  ) {
+    const contact = dingtalkContacts[contactId]
+    // A resync replaced the thread since this page was requested.
+    if (!contact || offset > contact.messages.length) return
+    const known = new Set(contact.messages.map(m => m.message_id))
+    contact.messages.unshift(...messages.filter(m => !known.has(m.message_id)))
+    dingtalkHasMoreHistory[contactId] = hasMore
+  }
+
   /**
    * Normalize and replace item catalog, ownership, and passive bonuses.
    */
@@ -430,11 +527,15 @@ export const useGameStore = defineStore('game', () => {
   /**
    * Upsert one DingTalk contact pushed by a thread-update message.
    */
-  function upsertDingTalkContact(contact: DingTalkContact | Record<string, unknown> | null | undefined) {
+  function upsertDingTalkContact(
+    contact: DingTalkContact | Record<string, unknown> | null | undefined,
+    hasMore?: boolean,
+  ) {
     if (!contact || typeof contact !== 'object') return
     const contactId = (contact as DingTalkContact).contact_id
     if (!contactId) return
     dingtalkContacts[contactId] = contact as DingTalkContact
+    if (hasMore !== undefined) dingtalkHasMoreHistory[contactId] = hasMore
     recalcUnreadDingtalk()
   }
 
@@ -568,6 +669,12 @@ export const useGameStore = defineStore('game', () => {
     for (const key in dingtalkContacts) {
       delete dingtalkContacts[key]
     }
+    for (const key in dingtalkHasMoreHistory) {
+      delete dingtalkHasMoreHistory[key]
+    }
+    for (const key in dingtalkDrafts) {
+      delete dingtalkDrafts[key]
+    }
     unreadDingtalk.value = 0
     itemCatalog.value = []
     ownedItems.value = []
@@ -625,6 +732,11 @@ export const useGameStore = defineStore('game', () => {
     addDingMessage,
     dingtalkContacts,
     setDingTalkState,
+    applyDingTalkDelta,
+    dingtalkDrafts,
+    appendDingTalkDraft,
+    prependDingTalkHistory,
+    dingtalkHasMoreHistory,
     upsertDingTalkContact,
     markDingContactReadLocal,
     unreadDingtalk,
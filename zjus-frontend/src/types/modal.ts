@@ -105,8 +105,22 @@ export interface DingTalkContact {
   messages: DingTalkThreadMessage[]
   pending_options: DingTalkReplyOption[]
   round: DingTalkRoundState
+  seq?: number
 }
 
+/**
+ * One field-level change inside a `dingtalk_delta` event.
+ */
+export type DingTalkDeltaOp =
+  | {
+      op: 'contact'
+      contact: Pick<DingTalkContact, 'contact_id' | 'sender' | 'role' | 'is_replyable' | 'is_urgent' | 'last_message_at'>
+    }
+  | { op: 'message'; message: DingTalkThreadMessage }
+  | { op: 'unread'; unread_count: number }
+  | { op: 'options'; pending_options: DingTalkReplyOption[] }
+  | { op: 'round'; round: DingTalkRoundState }
+
 /**
  * Full DingTalk inbox state synchronized from the backend.
  */
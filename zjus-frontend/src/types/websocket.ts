@@ -1,7 +1,7 @@
 import type { CoursesMap } from './course'
 import type { PlayerStats } from './game'
 import type { ItemsState } from './items'
-import type { AchievementSummary, DingTalkContact, DingTalkMessage, DingTalkState, FeedbackModalData, RandomEventModalData, TranscriptModalData } from './modal'
+import type { AchievementSummary, DingTalkContact, DingTalkDeltaOp, DingTalkMessage, DingTalkState, DingTalkThreadMessage, FeedbackModalData, RandomEventModalData, TranscriptModalData } from './modal'
 
 /**
  * Server-to-client game WebSocket messages accepted by the frontend store.
@@ -44,7 +44,22 @@ export type WsMessage =
   | { type: 'random_event'; data?: RandomEventModalData | unknown }
   | { type: 'dingtalk_message'; data?: DingTalkMessage | unknown }
   | { type: 'dingtalk_state'; state?: DingTalkState | unknown; data?: DingTalkState | unknown }
-  | { type: 'dingtalk_thread_update'; contact?: DingTalkContact | unknown; data?: { contact?: DingTalkContact } | unknown }
+  | { type: 'dingtalk_delta'; contact_id?: string; seq?: number; ops?: DingTalkDeltaOp[] | unknown }
+  | {
+      type: 'dingtalk_stream'
+      contact_id?: string
+      round_id?: string
+      message_id?: string
+      delta?: string
+    }
+  | { type: 'dingtalk_thread'; contact?: DingTalkContact | unknown; has_more?: boolean }
+  | {
+      type: 'dingtalk_history'
+      contact_id?: string
+      offset?: number
+      messages?: DingTalkThreadMessage[] | unknown
+      has_more?: boolean
+    }
   | { type: 'dingtalk_effect'; contact_id?: string; summary?: string; effects?: unknown }
   | { type: 'items_state'; data?: ItemsState | unknown }
   | { type: 'achievement_unlocked'; data?: AchievementSummary | unknown }
@@ -131,6 +146,8 @@ export type WsClientAction =
   | { action: 'set_mode'; mode: 'library' | 'ai' | 'hybrid' }
   | { action: 'dingtalk_mark_read'; contact_id: string }
   | { action: 'dingtalk_reply'; contact_id: string; option_id: string }
+  | { action: 'dingtalk_history'; contact_id: string; offset: number; limit?: number }
+  | { action: 'dingtalk_sync'; contact_id: string }
   | { action: 'item_buy'; item_id: string }
   | { action: 'item_sell'; item_id: string }
   | { action: 'restart' }